@@ -1,5 +1,8 @@
+import json
+import logging
 import os
 import uuid
+from collections.abc import Callable, Iterator
 from pathlib import Path, PurePosixPath
 from typing import Annotated, Any, Optional
 
@@ -16,7 +19,7 @@ from fastapi import (
     status,
 )
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import BaseModel, Field, ValidationError, field_validator
 
 from backend.core.embeddings import (
@@ -24,7 +27,10 @@ from backend.core.embeddings import (
     text_embedding,
     video_embedding_from_path,
 )
-from backend.core.multimodal_rag import LocalRAG
+from backend.core.llm import GenerationQueueFullError
+from backend.core.model_residency import ModelBudgetExceededError
+from backend.core.multimodal_rag import LocalRAG, SearchCapacityError
+from backend.core.remote_llm import RemoteLLMUnavailableError
 from backend.services.admin_audit import AdminAuditService
 from backend.services.admin_rate_limiter import AdminRateLimiter
 from backend.services.data_consistency import DataConsistencyService
@@ -37,6 +43,8 @@ from backend.services.storage import delete_stored_file, save_upload_file
 from backend.utils.config_handler import Config
 from backend.utils.supabase_client import get_supabase_client
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 rag = LocalRAG()
 REQUIRED_UPLOAD_FILE = File(...)
@@ -52,9 +60,13 @@ DEFAULT_MAX_STORAGE_BYTES_PER_USER = 10 * 1024 * 1024 * 1024
 DEFAULT_MAX_FILES_PER_FOLDER_UPLOAD = 100
 DEFAULT_ASK_RATE_LIMIT_PER_MINUTE_AUTH = 120
 DEFAULT_ASK_RATE_LIMIT_PER_MINUTE_GUEST = 40
+DEFAULT_SEARCH_RATE_LIMIT_PER_MINUTE_AUTH = 300
+DEFAULT_SEARCH_RATE_LIMIT_PER_MINUTE_GUEST = 100
 DEFAULT_UPLOAD_RATE_LIMIT_PER_MINUTE_AUTH = 60
 DEFAULT_UPLOAD_RATE_LIMIT_PER_MINUTE_GUEST = 20
 IMAGE_MIME_TYPES = {'image/jpeg', 'image/png', 'image/webp'}
+NDJSON_MEDIA_TYPE = 'application/x-ndjson'
+SSE_MEDIA_TYPE = 'text/event-stream'
 
 
 def _api_error(
@@ -101,12 +113,46 @@ class QueryRequest(BaseModel):
 
     query: str = Field(min_length=1, max_length=4000)
     top_k: int = Field(default=5, ge=1, le=50)
-    image: Optional[str] = None
+    image: Optional[str] = Field(default=None, max_length=2048)
     model: Optional[str] = Field(default=None, max_length=256)
     attachment_id: Optional[str] = Field(default=None, max_length=64)
     guest_session_id: Optional[str] = Field(default=None, max_length=128)
     folder_ids: list[str] = Field(default_factory=list)
     file_ids: list[str] = Field(default_factory=list)
+    stream: bool = False
+
+    @field_validator('query')
+    @classmethod
+    def validate_query(cls, value: str) -> str:
+        """Ensure query is not empty after trimming."""
+        stripped = value.strip()
+        if not stripped:
+            raise ValueError('query must not be empty')
+        return stripped
+
+    @field_validator('image')
+    @classmethod
+    def validate_image(cls, value: Optional[str]) -> Optional[str]:
+        """Accept only image URLs; local images are sent as attachments."""
+        if value is None or not value.strip():
+            return None
+        stripped = value.strip()
+        if not stripped.lower().startswith(('http://', 'https://')):
+            raise ValueError(
+                'image must be an http(s) URL; upload local images as attachment'
+            )
+        return stripped
+
+
+class SearchRequest(BaseModel):
+    """Schema for retrieval-only search requests."""
+
+    query: str = Field(min_length=1, max_length=4000)
+    top_k: int = Field(default=5, ge=1, le=50)
+    folder_ids: list[str] = Field(default_factory=list)
+    file_ids: list[str] = Field(default_factory=list)
+    guest_session_id: Optional[str] = Field(default=None, max_length=128)
+    stream: bool = False
 
     @field_validator('query')
     @classmethod
@@ -210,6 +256,12 @@ class KBFolderCreateRequest(BaseModel):
         return stripped
 
 
+class KBFolderMoveRequest(BaseModel):
+    """Move KB folder request (``parent_id`` null moves it to root)."""
+
+    parent_id: str | None = Field(default=None, max_length=64)
+
+
 class KBFileAttachRequest(BaseModel):
     """Attach uploaded file to folder request."""
 
@@ -498,6 +550,11 @@ def _ingest_with_job(
         next_attempt = int(existing.get('attempt') or 0) + 1 if existing else 1
         jobs.mark_processing(job_id=job_id, attempt=next_attempt)
     try:
+        folder_ancestors = None
+        if user_id and folder_id:
+            _, folder_ancestors = _kb_service().get_folder_payload(
+                user_id=user_id, folder_id=folder_id
+            )
         ingest.ingest_file(
             file_id=file_id,
             file_path=file_path,
@@ -509,6 +566,7 @@ def _ingest_with_job(
             folder_name=folder_name,
             folder_path=folder_path,
             source_path=source_path,
+            folder_ancestors=folder_ancestors,
         )
     except Exception as exc:
         jobs.mark_failed(job_id=job_id, error=str(exc))
@@ -569,6 +627,13 @@ async def _parse_auth_request(
         raise RequestValidationError(exc.errors()) from exc
 
 
+def _split_form_ids(raw: str | None) -> list[str]:
+    """Split a comma-separated form field into non-empty ids."""
+    if not raw:
+        return []
+    return [item.strip() for item in raw.split(',') if item.strip()]
+
+
 async def _parse_query_request(
     request: Request,
     query_form: str | None,
@@ -579,6 +644,7 @@ async def _parse_query_request(
     guest_session_id_form: str | None,
     folder_ids_form: str | None,
     file_ids_form: str | None,
+    stream_form: bool = False,
 ) -> QueryRequest:
     """Parse query payload from JSON or multipart form."""
     content_type = (request.headers.get('content-type') or '').lower()
@@ -597,15 +663,6 @@ async def _parse_query_request(
         except ValidationError as exc:
             raise RequestValidationError(exc.errors()) from exc
 
-    folder_ids = []
-    if folder_ids_form:
-        folder_ids = [
-            f.strip() for f in folder_ids_form.split(',') if f.strip()
-        ]
-    file_ids = []
-    if file_ids_form:
-        file_ids = [f.strip() for f in file_ids_form.split(',') if f.strip()]
-
     payload = {
         'query': query_form,
         'top_k': top_k_form,
@@ -613,8 +670,9 @@ async def _parse_query_request(
         'model': model_form,
         'attachment_id': attachment_id_form,
         'guest_session_id': guest_session_id_form,
-        'folder_ids': folder_ids,
-        'file_ids': file_ids,
+        'folder_ids': _split_form_ids(folder_ids_form),
+        'file_ids': _split_form_ids(file_ids_form),
+        'stream': stream_form,
     }
     try:
         return QueryRequest(**payload)
@@ -622,6 +680,203 @@ async def _parse_query_request(
         raise RequestValidationError(exc.errors()) from exc
 
 
+async def _parse_search_request(
+    request: Request,
+    query_form: str | None,
+    top_k_form: int,
+    folder_ids_form: str | None,
+    file_ids_form: str | None,
+    stream_form: bool,
+    guest_session_id_form: str | None = None,
+) -> SearchRequest:
+    """Parse search payload from JSON or form, honouring NDJSON Accept."""
+    content_type = (request.headers.get('content-type') or '').lower()
+    if 'application/json' in content_type:
+        payload = await request.json()
+        if not isinstance(payload, dict):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail={
+                    'detail': 'JSON body must be an object',
+                    'error_code': 'json_body_must_be_object',
+                },
+            )
+    else:
+        payload = {
+            'query': query_form,
+            'top_k': top_k_form,
+            'folder_ids': _split_form_ids(folder_ids_form),
+            'file_ids': _split_form_ids(file_ids_form),
+            'guest_session_id': guest_session_id_form,
+            'stream': stream_form,
+        }
+    accept = (request.headers.get('accept') or '').lower()
+    if NDJSON_MEDIA_TYPE in accept:
+        payload['stream'] = True
+    try:
+        return SearchRequest(**payload)
+    except ValidationError as exc:
+        raise RequestValidationError(exc.errors()) from exc
+
+
+def _resolve_folder_scopes(
+    *,
+    user_id: str,
+    folder_ids: list[str],
+    file_ids: list[str],
+) -> list[str] | None:
+    """Turn selected folders into retrieval scopes (file ids take priority).
+
+    In ``ancestors`` mode the ids are matched against the
+    ``folder_ancestors`` payload directly, so no folder lookup is needed.
+    """
+    if file_ids or not folder_ids:
+        return None
+    if Config.rag_folder_filter == 'ancestors':
+        return ['root', *dict.fromkeys(folder_ids)]
+    expanded = _kb_service().get_descendant_folder_ids(
+        user_id=user_id, folder_ids=folder_ids
+    )
+    return ['root', *expanded]
+
+
+def _stream_format(request: Request, stream: bool) -> str | None:
+    """Pick the event stream format from Accept, or SSE for ``stream``."""
+    accept = (request.headers.get('accept') or '').lower()
+    if SSE_MEDIA_TYPE in accept:
+        return 'sse'
+    if NDJSON_MEDIA_TYPE in accept:
+        return 'ndjson'
+    return 'sse' if stream else None
+
+
+def _encode_event(event: dict[str, Any], fmt: str) -> str:
+    data = json.dumps(event, ensure_ascii=False, default=str)
+    if fmt == 'sse':
+        return f'event: {event.get("event", "message")}\ndata: {data}\n\n'
+    return data + '\n'
+
+
+def _event_stream_response(
+    events: Iterator[dict[str, Any]],
+    *,
+    fmt: str,
+    error_detail: str,
+    error_code: str,
+    on_close: Callable[[], None] | None = None,
+) -> StreamingResponse:
+    """Stream events as SSE or NDJSON.
+
+    A failure after the stream started is reported as a final ``error``
+    event; ``on_close`` runs once the stream ends or the client goes away.
+    """
+
+    def _body() -> Iterator[str]:
+        try:
+            for event in events:
+                yield _encode_event(event, fmt)
+        except (
+            GenerationQueueFullError,
+            ModelBudgetExceededError,
+            RemoteLLMUnavailableError,
+        ) as exc:
+            yield _encode_event(
+                {
+                    'event': 'error',
+                    'detail': 'LLM is busy, retry later',
+                    'error_code': exc.error_code,
+                },
+                fmt,
+            )
+        except SearchCapacityError as exc:
+            yield _encode_event(
+                {
+                    'event': 'error',
+                    'detail': 'Search is busy, retry later',
+                    'error_code': exc.error_code,
+                },
+                fmt,
+            )
+        except Exception:
+            logger.exception('Event stream failed: %s', error_code)
+            yield _encode_event(
+                {
+                    'event': 'error',
+                    'detail': error_detail,
+                    'error_code': error_code,
+                },
+                fmt,
+            )
+        finally:
+            if on_close is not None:
+                on_close()
+
+    return StreamingResponse(
+        _body(),
+        media_type=SSE_MEDIA_TYPE if fmt == 'sse' else NDJSON_MEDIA_TYPE,
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+
+def _search_response(
+    payload: SearchRequest,
+    *,
+    user_id: str | None,
+    folder_scopes: list[str] | None,
+    file_ids: list[str] | None,
+    guest_session_id: str | None = None,
+) -> dict | StreamingResponse:
+    """Run retrieval only, as one JSON body or as NDJSON events.
+
+    In stream mode every line is one event from
+    ``LocalRAG.iter_retrieve_data``: per-modality hits as each collection
+    search completes, then the fused ``results``. A failure after the
+    stream started is reported as a final ``error`` event.
+    """
+    retrieval_kwargs = {
+        'top_k': payload.top_k,
+        'user_id': user_id,
+        'folder_scopes': folder_scopes,
+        'file_ids': file_ids,
+        'guest_session_id': guest_session_id,
+    }
+    if not payload.stream:
+        final: dict[str, Any] = {'results': [], 'timed_out': []}
+        for event in rag.iter_retrieve_data(payload.query, **retrieval_kwargs):
+            if event['event'] == 'results':
+                final = event
+        return {
+            'query': payload.query,
+            'results': final['results'],
+            'timed_out': final['timed_out'],
+        }
+
+    return _event_stream_response(
+        rag.iter_retrieve_data(payload.query, **retrieval_kwargs),
+        fmt='ndjson',
+        error_detail='Search failed',
+        error_code='search_failed',
+    )
+
+
+def _record_query_history(
+    *,
+    user_id: str,
+    query: str,
+    answer: str,
+    retrieved_docs: list[dict[str, Any]],
+) -> None:
+    supabase = get_supabase_client(role='service')
+    supabase.table('query_history').insert(
+        {
+            'user_id': user_id,
+            'query': query,
+            'answer': answer,
+            'retrieved_docs': retrieved_docs,
+        }
+    ).execute()
+
+
 def _resolve_attachment(
     *,
     attachment_id: str,
@@ -973,7 +1228,7 @@ async def upload_folder_files(
     projected_files = usage['total_files']
     projected_size = usage['total_size']
 
-    folder_rows = kb.list_folders(user_id=user['id'])
+    folder_rows = kb.get_folder_tree(user_id=user['id']).folders
     folder_by_parent_and_name: dict[tuple[str | None, str], str] = {}
     folder_name_by_id: dict[str, str] = {}
     for folder in folder_rows:
@@ -1226,6 +1481,20 @@ def delete_kb_folder(
     return {'ok': True}
 
 
+@router.patch('/kb/folders/{folder_id}')
+def move_kb_folder(
+    folder_id: str,
+    request: KBFolderMoveRequest,
+    user: Annotated[dict, Depends(get_current_user)],
+) -> dict:
+    """Move folder under another parent and re-scope indexed files."""
+    kb = _kb_service()
+    folder = kb.move_folder(
+        user_id=user['id'], folder_id=folder_id, parent_id=request.parent_id
+    )
+    return {'folder': folder}
+
+
 @router.post('/kb/files')
 def attach_kb_file(
     background_tasks: BackgroundTasks,
@@ -1242,7 +1511,7 @@ def attach_kb_file(
         file_id=request.file_id,
         folder_id=request.folder_id,
     )
-    kb.delete_vectors_for_file(request.file_id)
+    kb.delete_vectors_for_file(request.file_id, user_id=user['id'])
     folder_path = kb.get_folder_path(
         user_id=user['id'],
         folder_id=request.folder_id,
@@ -1286,7 +1555,7 @@ def delete_kb_file(
     return {'ok': True}
 
 
-@router.post('/ask')
+@router.post('/ask', response_model=None)
 async def ask_mixed(
     request: Request,
     query: str | None = Form(default=None),
@@ -1297,9 +1566,14 @@ async def ask_mixed(
     guest_session_id: str | None = Form(default=None),
     folder_ids: str | None = Form(default=None),
     file_ids: str | None = Form(default=None),
+    stream: bool = Form(default=False),
     attachment: UploadFile | None = OPTIONAL_UPLOAD_FILE,
-) -> dict:
-    """Handle chat request with optional model selection and attachment."""
+) -> dict | StreamingResponse:
+    """Handle chat request with optional model selection and attachment.
+
+    With ``stream`` (or an SSE/NDJSON ``Accept`` header) the answer is
+    streamed: a ``sources`` event, ``token`` events, then ``done``.
+    """
     payload = await _parse_query_request(
         request,
         query,
@@ -1310,6 +1584,7 @@ async def ask_mixed(
         guest_session_id,
         folder_ids,
         file_ids,
+        stream,
     )
     effective_guest_session_id = (
         payload.guest_session_id or f'guest-{uuid.uuid4()}'
@@ -1353,30 +1628,50 @@ async def ask_mixed(
     if attachment_file_id and not image_query_path:
         effective_file_ids.append(attachment_file_id)
 
-    try:
-        result = rag.generate_answer(
-            payload.query,
-            top_k=payload.top_k,
-            image=payload.image,
-            image_query_path=image_query_path,
-            model=payload.model,
-            file_ids=effective_file_ids or None,
-            exclude_file_ids=[attachment_file_id]
-            if attachment_file_id
-            else None,
-            extra_docs=extra_docs,
-        )
-        result['guest_session_id'] = effective_guest_session_id
-        return result
-    finally:
+    def _cleanup() -> None:
         if attachment_file_id and transient_storage_path:
             ingest = _ingest_service()
             ingest.delete_vectors_for_file(file_id=attachment_file_id)
         if transient_storage_path:
             delete_stored_file(transient_storage_path)
 
+    answer_kwargs = {
+        'top_k': payload.top_k,
+        'image': payload.image,
+        'image_query_path': image_query_path,
+        'model': payload.model,
+        'file_ids': effective_file_ids or None,
+        'exclude_file_ids': [attachment_file_id]
+        if attachment_file_id
+        else None,
+        'extra_docs': extra_docs,
+    }
+    stream_format = _stream_format(request, payload.stream)
+    if stream_format is not None:
+
+        def _events() -> Iterator[dict[str, Any]]:
+            for event in rag.stream_answer(payload.query, **answer_kwargs):
+                if event['event'] == 'sources':
+                    event['guest_session_id'] = effective_guest_session_id
+                yield event
+
+        return _event_stream_response(
+            _events(),
+            fmt=stream_format,
+            error_detail='Answer generation failed',
+            error_code='ask_failed',
+            on_close=_cleanup,
+        )
+
+    try:
+        result = rag.generate_answer(payload.query, **answer_kwargs)
+        result['guest_session_id'] = effective_guest_session_id
+        return result
+    finally:
+        _cleanup()
+
 
-@router.post('/ask_auth')
+@router.post('/ask_auth', response_model=None)
 async def ask_mixed_auth(
     request: Request,
     user: Annotated[dict, Depends(get_current_user)],
@@ -1388,9 +1683,14 @@ async def ask_mixed_auth(
     guest_session_id: str | None = Form(default=None),
     folder_ids: str | None = Form(default=None),
     file_ids: str | None = Form(default=None),
+    stream: bool = Form(default=False),
     attachment: UploadFile | None = OPTIONAL_UPLOAD_FILE,
-) -> dict:
-    """Run RAG with user filtering and optional attachment/model."""
+) -> dict | StreamingResponse:
+    """Run RAG with user filtering and optional attachment/model.
+
+    Supports the same ``stream`` mode as ``/ask``; the answer is saved to
+    query history once generation completes.
+    """
     payload = await _parse_query_request(
         request,
         query,
@@ -1401,6 +1701,7 @@ async def ask_mixed_auth(
         guest_session_id,
         folder_ids,
         file_ids,
+        stream,
     )
     ask_limit = _env_int(
         'ASK_RATE_LIMIT_PER_MINUTE_AUTH',
@@ -1422,7 +1723,6 @@ async def ask_mixed_auth(
             message='Upload rate limit exceeded',
         )
 
-    kb = _kb_service()
     (
         extra_docs,
         transient_storage_path,
@@ -1438,43 +1738,143 @@ async def ask_mixed_auth(
     if attachment_file_id and not image_query_path:
         effective_file_ids.append(attachment_file_id)
 
-    folder_scopes: list[str] | None = None
-    if not effective_file_ids and payload.folder_ids:
-        expanded = kb.get_descendant_folder_ids(
-            user_id=user['id'], folder_ids=payload.folder_ids
+    folder_scopes = _resolve_folder_scopes(
+        user_id=user['id'],
+        folder_ids=payload.folder_ids,
+        file_ids=effective_file_ids,
+    )
+
+    def _cleanup() -> None:
+        if transient_storage_path:
+            delete_stored_file(transient_storage_path)
+
+    answer_kwargs = {
+        'top_k': payload.top_k,
+        'image': payload.image,
+        'image_query_path': image_query_path,
+        'user_id': user['id'],
+        'model': payload.model,
+        'folder_scopes': folder_scopes,
+        'file_ids': effective_file_ids or None,
+        'exclude_file_ids': [attachment_file_id]
+        if attachment_file_id
+        else None,
+        'extra_docs': extra_docs,
+    }
+    stream_format = _stream_format(request, payload.stream)
+    if stream_format is not None:
+
+        def _events() -> Iterator[dict[str, Any]]:
+            retrieved_docs: list[dict[str, Any]] = []
+            for event in rag.stream_answer(payload.query, **answer_kwargs):
+                if event['event'] == 'sources':
+                    retrieved_docs = event['retrieved_docs']
+                elif event['event'] == 'done':
+                    _record_query_history(
+                        user_id=user['id'],
+                        query=payload.query,
+                        answer=event['answer'],
+                        retrieved_docs=retrieved_docs,
+                    )
+                yield event
+
+        return _event_stream_response(
+            _events(),
+            fmt=stream_format,
+            error_detail='Answer generation failed',
+            error_code='ask_failed',
+            on_close=_cleanup,
         )
-        folder_scopes = ['root', *expanded]
 
     try:
-        result = rag.generate_answer(
-            payload.query,
-            top_k=payload.top_k,
-            image=payload.image,
-            image_query_path=image_query_path,
+        result = rag.generate_answer(payload.query, **answer_kwargs)
+        _record_query_history(
             user_id=user['id'],
-            model=payload.model,
-            folder_scopes=folder_scopes,
-            file_ids=effective_file_ids or None,
-            exclude_file_ids=[attachment_file_id]
-            if attachment_file_id
-            else None,
-            extra_docs=extra_docs,
+            query=payload.query,
+            answer=result.get('answer', ''),
+            retrieved_docs=result.get('retrieved_docs', []),
         )
-
-        supabase = get_supabase_client(role='service')
-        supabase.table('query_history').insert(
-            {
-                'user_id': user['id'],
-                'query': payload.query,
-                'answer': result.get('answer', ''),
-                'retrieved_docs': result.get('retrieved_docs', []),
-            }
-        ).execute()
-
         return result
     finally:
-        if transient_storage_path:
-            delete_stored_file(transient_storage_path)
+        _cleanup()
+
+
+@router.post('/search', response_model=None)
+async def search(
+    request: Request,
+    query: str | None = Form(default=None),
+    top_k: int = Form(default=5),
+    folder_ids: str | None = Form(default=None),
+    file_ids: str | None = Form(default=None),
+    guest_session_id: str | None = Form(default=None),
+    stream: bool = Form(default=False),
+) -> dict | StreamingResponse:
+    """Return ranked sources from the guest session's files, without LLM.
+
+    Guests only see what their own session ingested; without a
+    ``guest_session_id`` a fresh session is used, which matches nothing.
+    """
+    payload = await _parse_search_request(
+        request,
+        query,
+        top_k,
+        folder_ids,
+        file_ids,
+        stream,
+        guest_session_id,
+    )
+    search_limit = _env_int(
+        'SEARCH_RATE_LIMIT_PER_MINUTE_GUEST',
+        DEFAULT_SEARCH_RATE_LIMIT_PER_MINUTE_GUEST,
+    )
+    _enforce_request_rate_limit(
+        scope=f'search_guest:{_client_identifier(request)}',
+        limit=search_limit,
+        message='Search rate limit exceeded',
+    )
+    return _search_response(
+        payload,
+        user_id=None,
+        folder_scopes=None,
+        file_ids=list(dict.fromkeys(payload.file_ids)) or None,
+        guest_session_id=payload.guest_session_id or f'guest-{uuid.uuid4()}',
+    )
+
+
+@router.post('/search_auth', response_model=None)
+async def search_auth(
+    request: Request,
+    user: Annotated[dict, Depends(get_current_user)],
+    query: str | None = Form(default=None),
+    top_k: int = Form(default=5),
+    folder_ids: str | None = Form(default=None),
+    file_ids: str | None = Form(default=None),
+    stream: bool = Form(default=False),
+) -> dict | StreamingResponse:
+    """Return ranked sources from the user's KB without running the LLM."""
+    payload = await _parse_search_request(
+        request, query, top_k, folder_ids, file_ids, stream
+    )
+    search_limit = _env_int(
+        'SEARCH_RATE_LIMIT_PER_MINUTE_AUTH',
+        DEFAULT_SEARCH_RATE_LIMIT_PER_MINUTE_AUTH,
+    )
+    _enforce_request_rate_limit(
+        scope=f'search_auth:{user["id"]}',
+        limit=search_limit,
+        message='Search rate limit exceeded',
+    )
+    effective_file_ids = list(dict.fromkeys(payload.file_ids))
+    return _search_response(
+        payload,
+        user_id=user['id'],
+        folder_scopes=_resolve_folder_scopes(
+            user_id=user['id'],
+            folder_ids=payload.folder_ids,
+            file_ids=effective_file_ids,
+        ),
+        file_ids=effective_file_ids or None,
+    )
 
 
 @router.get('/ingest/jobs')
@@ -0,0 +1,224 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from threading import Lock
+from typing import Any, Callable
+
+from backend.utils.config_handler import Config
+
+_MIN_OVERLAP_CHARS = 16
+_BLOCK_SEPARATOR_TOKENS = 2
+
+
+class _TokenCountCache:
+    """LRU of token counts keyed by (tokenizer, chunk text)."""
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max(0, max_entries)
+        self._lock = Lock()
+        self._counts: OrderedDict[tuple[str, str], int] = OrderedDict()
+
+    def get(self, key: tuple[str, str]) -> int | None:
+        with self._lock:
+            count = self._counts.get(key)
+            if count is not None:
+                self._counts.move_to_end(key)
+            return count
+
+    def put(self, key: tuple[str, str], count: int) -> None:
+        if not self.max_entries:
+            return
+        with self._lock:
+            self._counts[key] = count
+            self._counts.move_to_end(key)
+            while len(self._counts) > self.max_entries:
+                self._counts.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._counts.clear()
+
+
+_TOKEN_COUNTS = _TokenCountCache(Config.llm_context_token_cache_size)
+
+
+def clear_token_count_cache() -> None:
+    """Drop cached chunk token counts (tests, tokenizer changes)."""
+    _TOKEN_COUNTS.clear()
+
+
+class TokenCounter:
+    """Count and truncate text with a model tokenizer."""
+
+    def __init__(self, tokenizer) -> None:
+        """Wrap a Hugging Face style tokenizer (``encode``/``decode``)."""
+        self.tokenizer = tokenizer
+        self._name = str(
+            getattr(tokenizer, 'name_or_path', None)
+            or type(tokenizer).__name__
+        )
+
+    def _encode(self, text: str) -> list[int]:
+        return list(self.tokenizer.encode(text, add_special_tokens=False))
+
+    def count(self, text: str, *, cache: bool = True) -> int:
+        """Return the number of tokens in ``text`` (cached for chunks)."""
+        if not cache:
+            return len(self._encode(text))
+        key = (self._name, text)
+        count = _TOKEN_COUNTS.get(key)
+        if count is None:
+            count = len(self._encode(text))
+            _TOKEN_COUNTS.put(key, count)
+        return count
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Return the longest token prefix of ``text`` within the limit."""
+        ids = self._encode(text)
+        if len(ids) <= max_tokens:
+            return text
+        return self.tokenizer.decode(
+            ids[: max(0, max_tokens)], skip_special_tokens=True
+        )
+
+
+def _overlap(left: str, right: str, max_chars: int) -> int:
+    """Return length of the longest suffix of ``left`` starting ``right``."""
+    limit = min(len(left), len(right), max_chars)
+    for size in range(limit, _MIN_OVERLAP_CHARS - 1, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+def dedupe_overlapping_chunks(
+    docs: list[dict[str, Any]], *, max_overlap_chars: int | None = None
+) -> tuple[list[dict[str, Any]], int]:
+    """Drop repeated chunks and trim text repeated by overlapping chunks.
+
+    Only chunks of the same ``file_id`` are compared: a chunk contained in
+    an earlier one is dropped, and text shared with an earlier chunk of
+    the same file (the splitter's ``chunk_overlap``) is cut from the later
+    one. Earlier docs win, so pass docs in priority order.
+
+    Retrieval returns at most one doc per file (``LocalRAG._merge_results``
+    fuses hits by ``file_id``), so in practice this trims the chunks of an
+    attachment, which all share its ``file_id``, and the retrieved doc of
+    that same file when it is searched as well.
+
+    Returns:
+        tuple[list[dict[str, Any]], int]: Kept docs and the number dropped.
+    """
+    max_chars = (
+        max_overlap_chars
+        if max_overlap_chars is not None
+        else max(2 * Config.chunk_overlap, 64)
+    )
+    seen_by_file: dict[str, list[str]] = {}
+    kept: list[dict[str, Any]] = []
+    dropped = 0
+    for doc in docs:
+        file_id = doc.get('file_id')
+        text = (doc.get('text') or '').strip()
+        if not file_id or not text:
+            kept.append(doc)
+            continue
+        seen = seen_by_file.setdefault(str(file_id), [])
+        if any(text in previous for previous in seen):
+            dropped += 1
+            continue
+        trimmed = text
+        for previous in seen:
+            head = _overlap(previous, trimmed, max_chars)
+            if head:
+                trimmed = trimmed[head:].lstrip()
+            tail = _overlap(trimmed, previous, max_chars)
+            if tail:
+                trimmed = trimmed[:-tail].rstrip()
+        seen.append(text)
+        if not trimmed:
+            dropped += 1
+            continue
+        kept.append(doc if trimmed == text else {**doc, 'text': trimmed})
+    return kept, dropped
+
+
+def _priority(doc: dict[str, Any]) -> tuple[int, float]:
+    """Attachments (no score) first, then retrieved docs by score."""
+    score = doc.get('score')
+    try:
+        return (1, -float(score)) if score is not None else (0, 0.0)
+    except (TypeError, ValueError):
+        return (1, 0.0)
+
+
+@dataclass
+class PackedContext:
+    """Context blocks chosen to fit a prompt token budget."""
+
+    blocks: list[str] = field(default_factory=list)
+    docs: list[dict[str, Any]] = field(default_factory=list)
+    tokens: int = 0
+    duplicates: int = 0
+    skipped: int = 0
+    truncated: int = 0
+
+
+def pack_context(
+    docs: list[dict[str, Any]],
+    *,
+    counter: TokenCounter,
+    token_budget: int,
+    header: Callable[[dict[str, Any], int], str],
+    text: Callable[[dict[str, Any]], str],
+) -> PackedContext:
+    """Fill ``token_budget`` with whole context blocks, best docs first.
+
+    A doc that does not fit is skipped so smaller, lower-ranked docs can
+    still use the remaining budget. Only when nothing fits is the top doc
+    truncated, so the model never sees an empty context.
+
+    Args:
+        docs (list[dict[str, Any]]): Retrieved docs and attachment docs.
+        counter (TokenCounter): Tokenizer wrapper of the target model.
+        token_budget (int): Maximum tokens for all context blocks.
+        header (Callable): Builds a block header for ``(doc, idx)``.
+        text (Callable): Returns the block body for a doc.
+    """
+    ordered = sorted(docs, key=_priority)
+    candidates, duplicates = dedupe_overlapping_chunks(ordered)
+    packed = PackedContext(duplicates=duplicates)
+    for doc in candidates:
+        block_header = header(doc, len(packed.blocks) + 1)
+        body = text(doc)
+        cost = (
+            counter.count(block_header, cache=False)
+            + counter.count(body)
+            + _BLOCK_SEPARATOR_TOKENS
+        )
+        if packed.tokens + cost > token_budget:
+            packed.skipped += 1
+            continue
+        packed.blocks.append(f'{block_header}\n{body}')
+        packed.docs.append(doc)
+        packed.tokens += cost
+    if packed.blocks or not candidates:
+        return packed
+
+    doc = candidates[0]
+    block_header = header(doc, 1)
+    room = (
+        token_budget
+        - counter.count(block_header, cache=False)
+        - _BLOCK_SEPARATOR_TOKENS
+    )
+    if room > 0:
+        packed.blocks.append(
+            f'{block_header}\n{counter.truncate(text(doc), room)}'
+        )
+        packed.docs.append(doc)
+        packed.tokens = token_budget
+        packed.skipped -= 1
+        packed.truncated = 1
+    return packed
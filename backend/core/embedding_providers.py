@@ -1,18 +1,220 @@
 from __future__ import annotations
 
+import logging
+import queue
+import threading
+import time
 from abc import ABC, abstractmethod
-from typing import Dict
+from concurrent.futures import Future
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator
 
 import numpy as np
 from PIL import Image
 from sentence_transformers import SentenceTransformer
 
+from backend.monitoring.metrics import (
+    observe_embedding_micro_batch,
+    observe_embedding_model_load,
+    observe_embedding_video_frames,
+)
 from backend.utils.config_handler import Config
 
+logger = logging.getLogger(__name__)
+
+
+_IMAGE_SPACE_MODALITIES = {'image', 'video', 'multimodal_text'}
+_VIDEO_SEEK_MIN_GAP_SECONDS = 4.0
+_VIDEO_SAMPLING_STRATEGIES = ('fps', 'budget')
+
+
+def _model_slots(modalities: Iterable[str] | None) -> list[str]:
+    """Map requested modalities to the model slots that serve them."""
+    requested = {'text', 'image'} if modalities is None else set(modalities)
+    unknown = requested - {'text'} - _IMAGE_SPACE_MODALITIES
+    if unknown:
+        raise ValueError(
+            f'Unknown embedding modalities: {", ".join(sorted(unknown))}'
+        )
+    slots: list[str] = []
+    if 'text' in requested:
+        slots.append('text')
+    if requested & _IMAGE_SPACE_MODALITIES:
+        slots.append('image')
+    return slots
+
+
+def _frame_dhash(image: Image.Image) -> int:
+    """Return a 64-bit difference hash used to spot near-identical frames."""
+    pixels = np.asarray(
+        image.convert('L').resize((9, 8), Image.Resampling.BILINEAR),
+        dtype=np.int16,
+    )
+    bits = np.packbits(pixels[:, 1:] > pixels[:, :-1])
+    return int.from_bytes(bits.tobytes(), 'big')
+
+
+def _probe_duration_seconds(container, stream) -> float | None:
+    """Return video duration from metadata, or by scanning packet headers."""
+    if stream.duration is not None and stream.time_base is not None:
+        return float(stream.duration * stream.time_base)
+    if container.duration is not None:
+        # Container duration is expressed in av.time_base (microseconds).
+        return container.duration / 1_000_000
+    last_time = None
+    for packet in container.demux(stream):
+        if packet.pts is not None and packet.time_base is not None:
+            packet_time = float(packet.pts * packet.time_base)
+            last_time = max(last_time or packet_time, packet_time)
+    container.seek(0)
+    return last_time
+
+
+class VideoFrameSampler:
+    """Select which frames of a video are embedded.
+
+    Strategies:
+        - ``fps``: one frame per ``1 / sample_fps`` seconds.
+        - ``budget``: like ``fps``, but the rate is lowered so at most
+          ``max_frames`` frames cover the whole duration uniformly, and
+          frames whose difference hash is within ``dedup_distance`` bits
+          of the last kept frame are skipped.
+
+    Frames are decoded one at a time and only sampled frames are converted
+    to PIL, so memory does not grow with video length. When the next
+    sample is further away than ``_VIDEO_SEEK_MIN_GAP_SECONDS`` the
+    decoder seeks to the preceding keyframe instead of decoding through.
+    Counters are updated while iterating and can be read afterwards.
+    """
+
+    def __init__(
+        self,
+        sample_fps: float = 1.0,
+        *,
+        strategy: str = 'fps',
+        max_frames: int = 0,
+        dedup_distance: int = 0,
+    ) -> None:
+        """Validate sampling options.
+
+        Args:
+            sample_fps (float): Target frame sampling rate.
+            strategy (str): ``fps`` or ``budget``.
+            max_frames (int): Max frames kept per video, 0 = unlimited.
+            dedup_distance (int): Max dHash bit distance treated as a
+                duplicate frame, negative disables deduplication.
+        """
+        if sample_fps <= 0:
+            raise ValueError('sample_fps must be > 0')
+        if strategy not in _VIDEO_SAMPLING_STRATEGIES:
+            raise ValueError(
+                f'Unknown video sampling strategy "{strategy}". '
+                f'Available: {", ".join(_VIDEO_SAMPLING_STRATEGIES)}'
+            )
+        self.sample_fps = sample_fps
+        self.strategy = strategy
+        self.max_frames = max(0, max_frames) if strategy == 'budget' else 0
+        self.dedup_distance = dedup_distance if strategy == 'budget' else -1
+        self.decoded_frames = 0
+        self.deduplicated_frames = 0
+        self.sampled_frames = 0
+
+    @classmethod
+    def from_config(cls, sample_fps: float) -> VideoFrameSampler:
+        """Build a sampler from ``Config.embedding_video_*`` settings."""
+        return cls(
+            sample_fps,
+            strategy=Config.embedding_video_sampling_strategy,
+            max_frames=Config.embedding_video_max_frames,
+            dedup_distance=Config.embedding_video_dedup_distance,
+        )
+
+    @property
+    def signature(self) -> str:
+        """Return a stable id of options that change the produced vector."""
+        if self.strategy == 'fps':
+            return f'fps@{self.sample_fps}'
+        return (
+            f'budget@{self.sample_fps}/{self.max_frames}/{self.dedup_distance}'
+        )
+
+    def iter_frames(self, video_path: str) -> Iterator[Image.Image]:
+        """Decode ``video_path`` lazily and yield selected RGB frames."""
+        # Delayed import avoids loading video stack for text-only workloads.
+        import av
+
+        with av.open(video_path) as container:
+            if not container.streams.video:
+                raise ValueError(f'No video stream in file: {video_path}')
+            stream = container.streams.video[0]
+            stream.thread_type = 'AUTO'
+            interval = 1.0 / self.sample_fps
+            if self.max_frames:
+                duration = _probe_duration_seconds(container, stream)
+                if duration and duration * self.sample_fps > self.max_frames:
+                    interval = duration / self.max_frames
+            yield from self._iter_sampled(container, stream, interval)
+
+        if not self.sampled_frames:
+            raise ValueError(f'No frames extracted from video: {video_path}')
+
+    def _iter_sampled(
+        self, container, stream, interval: float
+    ) -> Iterator[Image.Image]:
+        fallback_fps = float(stream.average_rate or 1.0)
+        next_time: float | None = None
+        last_hash: int | None = None
+        frames = container.decode(stream)
+        while not self.max_frames or self.sampled_frames < self.max_frames:
+            frame = next(frames, None)
+            if frame is None:
+                return
+            frame_time = (
+                frame.time
+                if frame.time is not None
+                else self.decoded_frames / fallback_fps
+            )
+            self.decoded_frames += 1
+            if next_time is None:
+                next_time = frame_time
+            if frame_time + 1e-6 < next_time:
+                continue
+            while next_time <= frame_time + 1e-6:
+                next_time += interval
+
+            image = frame.to_image()
+            if self.dedup_distance >= 0:
+                frame_hash = _frame_dhash(image)
+                if (
+                    last_hash is not None
+                    and (frame_hash ^ last_hash).bit_count()
+                    <= self.dedup_distance
+                ):
+                    self.deduplicated_frames += 1
+                    image = None
+                else:
+                    last_hash = frame_hash
+            if image is not None:
+                self.sampled_frames += 1
+                yield image
+
+            if (
+                next_time - frame_time > _VIDEO_SEEK_MIN_GAP_SECONDS
+                and frame.time is not None
+            ):
+                container.seek(
+                    int(next_time / stream.time_base),
+                    stream=stream,
+                    backward=True,
+                )
+                frames = container.decode(stream)
+
 
 class EmbeddingProvider(ABC):
     """Base interface for embedding providers."""
 
+    batch_size: int = 32
+
     @abstractmethod
     def encode_text(self, text: str) -> list[float]:
         """Encode text into an embedding vector."""
@@ -25,11 +227,57 @@ class EmbeddingProvider(ABC):
     def encode_image(self, image: Image.Image) -> list[float]:
         """Encode image into an embedding vector."""
 
-    @abstractmethod
     def encode_video(
         self, video_path: str, sample_fps: float = 1.0
     ) -> list[float]:
-        """Encode video into an embedding vector."""
+        """Encode a video by sampling frames and mean-pooling frame vectors.
+
+        Frames are selected by ``VideoFrameSampler`` per the configured
+        strategy, streamed from the decoder and encoded in batches of
+        ``batch_size`` with a running sum, so peak memory is bounded by the
+        batch rather than the video length.
+
+        Args:
+            video_path (str): Path to a local video file.
+            sample_fps (float): Target frame sampling rate.
+
+        Returns:
+            list[float]: Aggregated video embedding.
+        """
+        sampler = VideoFrameSampler.from_config(sample_fps)
+        frames = sampler.iter_frames(video_path)
+        vector_sum: np.ndarray | None = None
+        count = 0
+        while batch := list(islice(frames, self.batch_size)):
+            batch_vectors = np.asarray(self.encode_images(batch))
+            batch_sum = batch_vectors.sum(axis=0, dtype=np.float64)
+            vector_sum = (
+                batch_sum if vector_sum is None else vector_sum + batch_sum
+            )
+            count += len(batch)
+        observe_embedding_video_frames(
+            decoded=sampler.decoded_frames,
+            deduplicated=sampler.deduplicated_frames,
+            encoded=count,
+        )
+        return (vector_sum / count).astype(np.float32).tolist()
+
+    def encode_texts(self, texts: list[str]) -> list[list[float]]:
+        """Encode a batch of texts into embedding vectors."""
+        return [self.encode_text(text) for text in texts]
+
+    def warmup(self, modalities: Iterable[str] | None = None) -> None:
+        """Load models for modalities ahead of the first request."""
+        # Providers without heavy state have nothing to preload.
+        return None
+
+    def encode_multimodal_texts(self, texts: list[str]) -> list[list[float]]:
+        """Encode a batch of texts into the shared image/video space."""
+        return [self.encode_multimodal_text(text) for text in texts]
+
+    def encode_images(self, images: list[Image.Image]) -> list[list[float]]:
+        """Encode a batch of images into embedding vectors."""
+        return [self.encode_image(image) for image in images]
 
 
 class SentenceTransformerProvider(EmbeddingProvider):
@@ -39,24 +287,89 @@ class SentenceTransformerProvider(EmbeddingProvider):
         self,
         text_model_name: str = 'all-MiniLM-L6-v2',
         image_model_name: str = 'clip-ViT-B-32',
+        batch_size: int = 32,
     ) -> None:
-        """Initialize text and image encoders used for all modalities.
+        """Configure text and image encoders used for all modalities.
+
+        Models are loaded lazily on first use of their modality, so a
+        text-only process never pays for the CLIP model and vice versa.
 
         Args:
             text_model_name (str): SentenceTransformers model name for text.
             image_model_name (str): SentenceTransformers CLIP-like model for images.
+            batch_size (int): Max items per forward pass for batch encoding.
         """
-        self._text_model = SentenceTransformer(text_model_name)
-        self._image_model = SentenceTransformer(image_model_name)
+        self.text_model_name = text_model_name
+        self.image_model_name = image_model_name
+        self.batch_size = max(1, batch_size)
+        self._models: dict[str, SentenceTransformer] = {}
+        self._models_lock = threading.Lock()
+
+    @property
+    def _text_model(self) -> SentenceTransformer:
+        return self._load_model('text', self.text_model_name)
+
+    @property
+    def _image_model(self) -> SentenceTransformer:
+        return self._load_model('image', self.image_model_name)
+
+    def _load_model(self, slot: str, model_name: str) -> SentenceTransformer:
+        """Load a model once per slot and record load duration."""
+        model = self._models.get(slot)
+        if model is not None:
+            return model
+        with self._models_lock:
+            model = self._models.get(slot)
+            if model is None:
+                started = time.perf_counter()
+                model = SentenceTransformer(model_name)
+                duration = time.perf_counter() - started
+                observe_embedding_model_load(
+                    model=model_name,
+                    duration_seconds=duration,
+                )
+                logger.info(
+                    'Loaded embedding model %s in %.2fs', model_name, duration
+                )
+                self._models[slot] = model
+        return model
+
+    def warmup(self, modalities: Iterable[str] | None = None) -> None:
+        """Load models needed for modalities before serving traffic."""
+        for slot in _model_slots(modalities):
+            if slot == 'text':
+                _ = self._text_model
+            else:
+                _ = self._image_model
 
     def encode_text(self, text: str) -> list[float]:
         """Encode a text string into a dense vector."""
         return self._text_model.encode(text).tolist()
 
+    def encode_texts(self, texts: list[str]) -> list[list[float]]:
+        """Encode many text strings with batched forward passes."""
+        if not texts:
+            return []
+        return self._text_model.encode(
+            texts,
+            batch_size=self.batch_size,
+            convert_to_numpy=True,
+        ).tolist()
+
     def encode_multimodal_text(self, text: str) -> list[float]:
         """Encode text in CLIP-compatible space for image/video retrieval."""
         return self._image_model.encode(text).tolist()
 
+    def encode_multimodal_texts(self, texts: list[str]) -> list[list[float]]:
+        """Encode many texts in CLIP-compatible space in batches."""
+        if not texts:
+            return []
+        return self._image_model.encode(
+            texts,
+            batch_size=self.batch_size,
+            convert_to_numpy=True,
+        ).tolist()
+
     def encode_image(self, image: Image.Image) -> list[float]:
         """Encode a PIL image into a dense vector."""
         rgb_image = image.convert('RGB')
@@ -65,47 +378,180 @@ class SentenceTransformerProvider(EmbeddingProvider):
             convert_to_numpy=True,
         ).tolist()
 
-    def encode_video(
-        self, video_path: str, sample_fps: float = 1.0
-    ) -> list[float]:
-        """Encode a video by sampling frames and mean-pooling frame vectors.
+    def encode_images(self, images: list[Image.Image]) -> list[list[float]]:
+        """Encode many PIL images with batched forward passes."""
+        if not images:
+            return []
+        return self._image_model.encode(
+            [image.convert('RGB') for image in images],
+            batch_size=self.batch_size,
+            convert_to_numpy=True,
+        ).tolist()
 
-        Args:
-            video_path (str): Path to a local video file.
-            sample_fps (float): Target frame sampling rate.
 
-        Returns:
-            list[float]: Aggregated video embedding.
-        """
-        if sample_fps <= 0:
-            raise ValueError('sample_fps must be > 0')
+class MicroBatchScheduler:
+    """Coalesce concurrent single-item encode calls into batched calls.
 
-        # Delayed import avoids loading video stack for text-only workloads.
-        from torchvision.io import read_video
+    Callers block on a future while a daemon thread collects requests that
+    arrive within ``max_wait_seconds`` (or until ``max_batch_size`` is
+    reached) and runs them through one batched ``encode`` call.
+    """
 
-        frames, _, info = read_video(video_path, pts_unit='sec')
-        if frames.numel() == 0:
-            raise ValueError(f'No frames extracted from video: {video_path}')
+    def __init__(
+        self,
+        *,
+        provider_name: str,
+        modality: str,
+        batch_fn: Callable[[list[Any]], list[list[float]]],
+        max_wait_seconds: float,
+        max_batch_size: int,
+    ) -> None:
+        """Configure batching window and the batched encode function."""
+        self.provider_name = provider_name
+        self.modality = modality
+        self.batch_fn = batch_fn
+        self.max_wait_seconds = max(0.0, max_wait_seconds)
+        self.max_batch_size = max(1, max_batch_size)
+        self._queue: queue.Queue[tuple[Any, Future]] = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._thread_lock = threading.Lock()
 
-        source_fps = float(info.get('video_fps') or 1.0)
-        stride = max(int(round(source_fps / sample_fps)), 1)
-        sampled_frames = frames[::stride]
-        if sampled_frames.numel() == 0:
-            sampled_frames = frames[:1]
-
-        pil_frames = [
-            Image.fromarray(frame.numpy()).convert('RGB')
-            for frame in sampled_frames
-        ]
-        frame_vectors = self._image_model.encode(
-            pil_frames,
-            convert_to_numpy=True,
-        )
-        video_vector = np.mean(frame_vectors, axis=0)
-        return video_vector.tolist()
+    def submit(self, item: Any) -> Future:
+        """Enqueue one item and return a future for its vector."""
+        future: Future = Future()
+        self._ensure_thread()
+        self._queue.put((item, future))
+        return future
+
+    def encode(self, item: Any) -> list[float]:
+        """Encode one item through the batching queue and wait for it."""
+        return self.submit(item).result()
+
+    def _ensure_thread(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._thread_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(
+                target=self._run,
+                name=f'embed-batch-{self.provider_name}-{self.modality}',
+                daemon=True,
+            )
+            self._thread.start()
+
+    def _collect_batch(self) -> list[tuple[Any, Future]]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait_seconds
+        while len(batch) < self.max_batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except queue.Empty:
+                pass
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect_batch()
+            observe_embedding_micro_batch(
+                modality=self.modality,
+                provider=self.provider_name,
+                batch_size=len(batch),
+                queue_depth=self._queue.qsize(),
+            )
+            try:
+                vectors = self.batch_fn([item for item, _ in batch])
+                if len(vectors) != len(batch):
+                    raise RuntimeError(
+                        f'Batched encode returned {len(vectors)} vectors '
+                        f'for {len(batch)} inputs'
+                    )
+            except Exception as exc:
+                logger.exception(
+                    'Micro-batch encode failed for %s/%s',
+                    self.provider_name,
+                    self.modality,
+                )
+                for _, future in batch:
+                    future.set_exception(exc)
+                continue
+            for (_, future), vector in zip(batch, vectors, strict=True):
+                future.set_result(vector)
+
+
+class MicroBatchingProvider(EmbeddingProvider):
+    """Provider wrapper routing single-item calls through micro-batching."""
+
+    def __init__(
+        self,
+        provider: EmbeddingProvider,
+        *,
+        name: str,
+        max_wait_seconds: float,
+        max_batch_size: int,
+    ) -> None:
+        """Wrap ``provider`` with one scheduler per single-item modality."""
+        self.provider = provider
+        self._schedulers = {
+            modality: MicroBatchScheduler(
+                provider_name=name,
+                modality=modality,
+                batch_fn=batch_fn,
+                max_wait_seconds=max_wait_seconds,
+                max_batch_size=max_batch_size,
+            )
+            for modality, batch_fn in (
+                ('text', provider.encode_texts),
+                ('multimodal_text', provider.encode_multimodal_texts),
+                ('image', provider.encode_images),
+            )
+        }
+
+    def encode_text(self, text: str) -> list[float]:
+        """Encode text, coalescing with concurrent callers."""
+        return self._schedulers['text'].encode(text)
+
+    def encode_multimodal_text(self, text: str) -> list[float]:
+        """Encode CLIP-space text, coalescing with concurrent callers."""
+        return self._schedulers['multimodal_text'].encode(text)
+
+    def encode_image(self, image: Image.Image) -> list[float]:
+        """Encode an image, coalescing with concurrent callers."""
+        return self._schedulers['image'].encode(image.convert('RGB'))
+
+    def encode_texts(self, texts: list[str]) -> list[list[float]]:
+        """Encode an already batched text request directly."""
+        return self.provider.encode_texts(texts)
+
+    def encode_multimodal_texts(self, texts: list[str]) -> list[list[float]]:
+        """Encode an already batched CLIP-space text request directly."""
+        return self.provider.encode_multimodal_texts(texts)
+
+    def encode_images(self, images: list[Image.Image]) -> list[list[float]]:
+        """Encode an already batched image request directly."""
+        return self.provider.encode_images(images)
+
+    def encode_video(
+        self, video_path: str, sample_fps: float = 1.0
+    ) -> list[float]:
+        """Encode video directly; frames are already batched per video."""
+        return self.provider.encode_video(video_path, sample_fps=sample_fps)
+
+    def warmup(self, modalities: Iterable[str] | None = None) -> None:
+        """Warm up the wrapped provider."""
+        self.provider.warmup(modalities)
 
 
 _PROVIDER_INSTANCES: Dict[str, EmbeddingProvider] = {}
+_PROVIDER_LOCK = threading.Lock()
 
 
 def _build_provider(name: str) -> EmbeddingProvider:
@@ -121,15 +567,93 @@ def _build_provider(name: str) -> EmbeddingProvider:
         return SentenceTransformerProvider(
             text_model_name=provider_config['text_model_name'],
             image_model_name=provider_config['image_model_name'],
+            batch_size=int(
+                provider_config.get('batch_size')
+                or Config.embedding_batch_size
+            ),
+        )
+    if provider_type == 'onnx':
+        # Delayed import keeps onnxruntime optional for torch-only setups.
+        from backend.core.onnx_embeddings import OnnxEmbeddingProvider
+
+        return OnnxEmbeddingProvider(
+            text_model_name=provider_config['text_model_name'],
+            image_model_name=provider_config['image_model_name'],
+            model_dir=provider_config.get('model_dir', 'data/onnx_models'),
+            quantize=bool(provider_config.get('quantize', True)),
+            intra_op_threads=int(provider_config.get('intra_op_threads', 0)),
+            batch_size=int(
+                provider_config.get('batch_size')
+                or Config.embedding_batch_size
+            ),
         )
     raise ValueError(
         f'Unsupported provider type "{provider_type}" for "{name}"'
     )
 
 
+def get_provider_model_id(name: str | None = None, *, modality: str) -> str:
+    """Return the model identity that produces vectors for a modality."""
+    resolved_name = name or Config.default_embedding_provider
+    provider_config = Config.embedding_providers.get(resolved_name) or {}
+    model_key = 'text_model_name' if modality == 'text' else 'image_model_name'
+    provider_type = provider_config.get('type', '')
+    model_id = f'{provider_type}:{provider_config.get(model_key, "")}'
+    if provider_type == 'onnx':
+        from backend.core.onnx_embeddings import encoder_variant
+
+        quantize = bool(provider_config.get('quantize', True))
+        model_id = f'{model_id}@{encoder_variant(quantize=quantize)}'
+    return model_id
+
+
 def get_provider(name: str | None = None) -> EmbeddingProvider:
     """Resolve embedding provider by name."""
     resolved_name = name or Config.default_embedding_provider
-    if resolved_name not in _PROVIDER_INSTANCES:
-        _PROVIDER_INSTANCES[resolved_name] = _build_provider(resolved_name)
-    return _PROVIDER_INSTANCES[resolved_name]
+    provider = _PROVIDER_INSTANCES.get(resolved_name)
+    if provider is not None:
+        return provider
+    with _PROVIDER_LOCK:
+        if resolved_name not in _PROVIDER_INSTANCES:
+            provider = _build_provider(resolved_name)
+            if Config.embedding_micro_batch_enabled:
+                provider = MicroBatchingProvider(
+                    provider,
+                    name=resolved_name,
+                    max_wait_seconds=(
+                        Config.embedding_micro_batch_max_wait_ms / 1000.0
+                    ),
+                    max_batch_size=Config.embedding_micro_batch_max_size,
+                )
+            _PROVIDER_INSTANCES[resolved_name] = provider
+        return _PROVIDER_INSTANCES[resolved_name]
+
+
+def warmup_providers(
+    modalities: Iterable[str] | None = None,
+    provider_names: Iterable[str] | None = None,
+) -> None:
+    """Load embedding models for modalities before reporting ready.
+
+    Args:
+        modalities (Iterable[str] | None): Modalities to warm up. Defaults
+            to ``Config.embedding_warmup_modalities``.
+        provider_names (Iterable[str] | None): Providers to warm up.
+            Defaults to the configured default provider.
+    """
+    resolved_modalities = list(
+        Config.embedding_warmup_modalities
+        if modalities is None
+        else modalities
+    )
+    if not resolved_modalities:
+        return
+    for name in provider_names or [Config.default_embedding_provider]:
+        started = time.perf_counter()
+        get_provider(name).warmup(resolved_modalities)
+        logger.info(
+            'Embedding provider %s warmed up for %s in %.2fs',
+            name,
+            ','.join(resolved_modalities),
+            time.perf_counter() - started,
+        )
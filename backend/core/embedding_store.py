@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+from pathlib import Path
+from threading import Lock
+
+import numpy as np
+
+from backend.monitoring.metrics import observe_embedding_store_lookup
+from backend.utils.config_handler import Config
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    provider TEXT NOT NULL,
+    model TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    dim INTEGER NOT NULL,
+    row_index INTEGER NOT NULL,
+    PRIMARY KEY (provider, model, content_hash)
+)
+"""
+_LOOKUP_CHUNK = 500
+
+
+def content_hash(text: str) -> str:
+    """Return a stable sha256 fingerprint for a text chunk."""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def file_content_hash(path: str | Path) -> str:
+    """Return sha256 of file content, matching ``kb_files.content_hash``."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class EmbeddingStore:
+    """Persistent embedding store keyed by (provider, model, content hash).
+
+    The SQLite index maps every key to a row inside an append-only
+    float32 file per vector dimension. Vector files are read through
+    ``np.memmap`` so lookups do not load whole shards into RAM. Writers
+    take the SQLite write lock before appending, which keeps row indexes
+    consistent across threads and worker processes sharing a directory.
+    """
+
+    def __init__(self, root_dir: str | Path) -> None:
+        """Open (or create) the store in ``root_dir``."""
+        self.root_dir = Path(root_dir)
+        self.root_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = Lock()
+        self._conn = sqlite3.connect(
+            self.root_dir / 'index.sqlite3',
+            timeout=30,
+            check_same_thread=False,
+            isolation_level=None,
+        )
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(_SCHEMA)
+        self._memmaps: dict[int, np.memmap] = {}
+
+    def get_many(
+        self,
+        *,
+        provider: str,
+        model: str,
+        hashes: list[str],
+    ) -> list[list[float] | None]:
+        """Return stored vectors for hashes, None where missing."""
+        if not hashes:
+            return []
+        locations: dict[str, tuple[int, int]] = {}
+        unique_hashes = list(dict.fromkeys(hashes))
+        with self._lock:
+            for start in range(0, len(unique_hashes), _LOOKUP_CHUNK):
+                chunk = unique_hashes[start : start + _LOOKUP_CHUNK]
+                placeholders = ','.join('?' for _ in chunk)
+                rows = self._conn.execute(
+                    'SELECT content_hash, dim, row_index FROM embeddings '
+                    'WHERE provider = ? AND model = ? '
+                    f'AND content_hash IN ({placeholders})',
+                    (provider, model, *chunk),
+                ).fetchall()
+                for found_hash, dim, row_index in rows:
+                    locations[found_hash] = (int(dim), int(row_index))
+
+            vectors: list[list[float] | None] = []
+            for item_hash in hashes:
+                location = locations.get(item_hash)
+                vectors.append(self._read_row(*location) if location else None)
+        return vectors
+
+    def put_many(
+        self,
+        *,
+        provider: str,
+        model: str,
+        hashes: list[str],
+        vectors: list[list[float]],
+    ) -> None:
+        """Persist vectors for hashes that are not stored yet."""
+        if not hashes:
+            return
+        pending: dict[str, list[float]] = {}
+        for item_hash, vector in zip(hashes, vectors, strict=True):
+            pending.setdefault(item_hash, vector)
+
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                for item_hash, vector in pending.items():
+                    exists = self._conn.execute(
+                        'SELECT 1 FROM embeddings WHERE provider = ? '
+                        'AND model = ? AND content_hash = ?',
+                        (provider, model, item_hash),
+                    ).fetchone()
+                    if exists:
+                        continue
+                    array = np.asarray(vector, dtype=np.float32)
+                    row_index = self._append_row(array)
+                    self._conn.execute(
+                        'INSERT INTO embeddings '
+                        '(provider, model, content_hash, dim, row_index) '
+                        'VALUES (?, ?, ?, ?, ?)',
+                        (provider, model, item_hash, array.size, row_index),
+                    )
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+
+    def close(self) -> None:
+        """Close the SQLite connection and drop memory maps."""
+        with self._lock:
+            self._memmaps.clear()
+            self._conn.close()
+
+    def _vectors_path(self, dim: int) -> Path:
+        return self.root_dir / f'vectors_{dim}.f32'
+
+    def _append_row(self, array: np.ndarray) -> int:
+        """Append one vector to its dimension shard and return its row."""
+        path = self._vectors_path(array.size)
+        row_bytes = array.size * np.dtype(np.float32).itemsize
+        with open(path, 'ab') as f:
+            offset = f.tell()
+            if offset % row_bytes:
+                # Drop a torn tail left by an interrupted writer.
+                f.truncate(offset - offset % row_bytes)
+                offset = f.tell()
+            f.write(array.tobytes())
+        return offset // row_bytes
+
+    def _read_row(self, dim: int, row_index: int) -> list[float] | None:
+        mapped = self._memmaps.get(dim)
+        if mapped is None or row_index >= mapped.shape[0]:
+            path = self._vectors_path(dim)
+            if not path.exists():
+                return None
+            rows = path.stat().st_size // (dim * 4)
+            if row_index >= rows:
+                return None
+            mapped = np.memmap(path, dtype=np.float32, mode='r').reshape(
+                -1, dim
+            )[:rows]
+            self._memmaps[dim] = mapped
+        return mapped[row_index].tolist()
+
+
+_STORES: dict[str, EmbeddingStore] = {}
+_STORES_LOCK = Lock()
+
+
+def get_embedding_store() -> EmbeddingStore | None:
+    """Return the shared store, or None when it is disabled in config."""
+    if not Config.embedding_store_enabled:
+        return None
+    root_dir = str(Config.embedding_store_dir)
+    with _STORES_LOCK:
+        if root_dir not in _STORES:
+            _STORES[root_dir] = EmbeddingStore(root_dir)
+        return _STORES[root_dir]
+
+
+def lookup_or_embed(
+    *,
+    provider: str,
+    model: str,
+    modality: str,
+    hashes: list[str],
+    embed_missing,
+) -> list[list[float]]:
+    """Resolve vectors from the store and embed only the missing items.
+
+    Args:
+        provider (str): Embedding provider name.
+        model (str): Model identity the vectors were produced with.
+        modality (str): Metrics label for hit/miss accounting.
+        hashes (list[str]): Content hashes, one per requested vector.
+        embed_missing: Callable receiving indexes of missing items and
+            returning their vectors in the same order.
+
+    Returns:
+        list[list[float]]: Vectors aligned with ``hashes``.
+    """
+    store = get_embedding_store()
+    if store is None:
+        return embed_missing(list(range(len(hashes))))
+
+    found = store.get_many(provider=provider, model=model, hashes=hashes)
+    missing = [idx for idx, vector in enumerate(found) if vector is None]
+    hits = len(hashes) - len(missing)
+    if hits:
+        observe_embedding_store_lookup(modality, 'hit', hits)
+    if missing:
+        observe_embedding_store_lookup(modality, 'miss', len(missing))
+        new_vectors = embed_missing(missing)
+        store.put_many(
+            provider=provider,
+            model=model,
+            hashes=[hashes[idx] for idx in missing],
+            vectors=new_vectors,
+        )
+        for idx, vector in zip(missing, new_vectors, strict=True):
+            found[idx] = vector
+    if any(vector is None for vector in found):
+        # A shorter list would pair vectors with the wrong chunks.
+        raise RuntimeError(f'No {modality} vector resolved for some items')
+    return found
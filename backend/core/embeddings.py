@@ -1,12 +1,113 @@
 import time
+from collections import OrderedDict
+from threading import Lock
 from typing import List
 
 from PIL import Image
 
 from backend.core.embedding_providers import get_provider
-from backend.monitoring.metrics import observe_embedding_request
+from backend.core.embedding_store import file_content_hash
+from backend.monitoring.metrics import (
+    observe_embedding_cache_event,
+    observe_embedding_request,
+)
 from backend.utils.config_handler import Config
 
+QueryCacheKey = tuple[str, str, str]
+
+
+class QueryVectorCache:
+    """Bounded in-process LRU cache with TTL for query embedding vectors.
+
+    Keys are ``(provider, modality, fingerprint)`` tuples where the
+    fingerprint is normalized query text or an attachment content hash.
+    """
+
+    def __init__(self, *, max_entries: int, ttl_seconds: float) -> None:
+        """Initialize cache capacity and entry lifetime."""
+        self.max_entries = max(0, max_entries)
+        self.ttl_seconds = max(0.0, ttl_seconds)
+        self._lock = Lock()
+        self._entries: OrderedDict[
+            QueryCacheKey, tuple[float, tuple[float, ...]]
+        ] = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        """Return whether caching is turned on."""
+        return self.max_entries > 0 and self.ttl_seconds > 0
+
+    def get(self, key: QueryCacheKey) -> list[float] | None:
+        """Return a cached vector or None on miss/expiry."""
+        if not self.enabled:
+            return None
+        provider, modality, _ = key
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= now:
+                del self._entries[key]
+                observe_embedding_cache_event(modality, provider, 'eviction')
+                entry = None
+            if entry is None:
+                observe_embedding_cache_event(modality, provider, 'miss')
+                return None
+            self._entries.move_to_end(key)
+        observe_embedding_cache_event(modality, provider, 'hit')
+        return list(entry[1])
+
+    def put(self, key: QueryCacheKey, vector: list[float]) -> None:
+        """Store a vector and evict least recently used entries."""
+        if not self.enabled:
+            return
+        expires_at = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            self._entries[key] = (expires_at, tuple(vector))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                (provider, modality, _), _ = self._entries.popitem(last=False)
+                observe_embedding_cache_event(modality, provider, 'eviction')
+
+    def clear(self) -> None:
+        """Drop all cached vectors."""
+        with self._lock:
+            self._entries.clear()
+
+
+_QUERY_VECTOR_CACHE = QueryVectorCache(
+    max_entries=Config.embedding_query_cache_max_entries,
+    ttl_seconds=Config.embedding_query_cache_ttl_seconds,
+)
+
+
+def get_query_vector_cache() -> QueryVectorCache:
+    """Return the process-wide query vector cache."""
+    return _QUERY_VECTOR_CACHE
+
+
+def _normalize_query_text(text: str) -> str:
+    """Collapse whitespace so trivially different queries share a key."""
+    return ' '.join(text.split())
+
+
+def _observe_batch(
+    *,
+    modality: str,
+    provider: str,
+    status: str,
+    duration_seconds: float,
+    batch_size: int,
+) -> None:
+    """Record one embedding observation per batch item."""
+    per_item_seconds = duration_seconds / max(batch_size, 1)
+    for _ in range(batch_size):
+        observe_embedding_request(
+            modality=modality,
+            provider=provider,
+            status=status,
+            duration_seconds=per_item_seconds,
+        )
+
 
 def text_embedding(
     text: str,
@@ -22,15 +123,22 @@ def text_embedding(
         List[float]: A list of floats representing the text embedding.
 
     Notes:
+        - Repeated queries are served from the in-process query vector cache.
         - This embedding can be stored in a vector database like Qdrant.
         - Ensure the model used for text embeddings is compatible with your retrieval pipeline.
     """
-    started = time.perf_counter()
     resolved_provider = provider_name or Config.default_embedding_provider
+    cache_key = (resolved_provider, 'text', _normalize_query_text(text))
+    cached = _QUERY_VECTOR_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
+
+    started = time.perf_counter()
     status = 'ok'
     try:
         provider = get_provider(resolved_provider)
         vector = provider.encode_text(text)
+        _QUERY_VECTOR_CACHE.put(cache_key, vector)
         return vector
     except Exception:
         status = 'error'
@@ -44,17 +152,64 @@ def text_embedding(
         )
 
 
+def text_embeddings_batch(
+    texts: list[str],
+    provider_name: str | None = None,
+) -> list[list[float]]:
+    """Generate embedding vectors for many text strings in one batch.
+
+    Args:
+        texts (list[str]): Input texts to encode.
+        provider_name (str | None): Optional provider name override.
+
+    Returns:
+        list[list[float]]: Embedding vectors in the same order as ``texts``.
+
+    Notes:
+        - Metrics are recorded per item with the batch latency amortized.
+    """
+    if not texts:
+        return []
+    started = time.perf_counter()
+    resolved_provider = provider_name or Config.default_embedding_provider
+    status = 'ok'
+    try:
+        provider = get_provider(resolved_provider)
+        return provider.encode_texts(texts)
+    except Exception:
+        status = 'error'
+        raise
+    finally:
+        _observe_batch(
+            modality='text',
+            provider=resolved_provider,
+            status=status,
+            duration_seconds=time.perf_counter() - started,
+            batch_size=len(texts),
+        )
+
+
 def multimodal_text_embedding(
     text: str,
     provider_name: str | None = None,
 ) -> list[float]:
     """Generate a query embedding in the shared image/video space."""
-    started = time.perf_counter()
     resolved_provider = provider_name or Config.default_embedding_provider
+    cache_key = (
+        resolved_provider,
+        'multimodal_text',
+        _normalize_query_text(text),
+    )
+    cached = _QUERY_VECTOR_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
+
+    started = time.perf_counter()
     status = 'ok'
     try:
         provider = get_provider(resolved_provider)
         vector = provider.encode_multimodal_text(text)
+        _QUERY_VECTOR_CACHE.put(cache_key, vector)
         return vector
     except Exception:
         status = 'error'
@@ -71,28 +226,46 @@ def multimodal_text_embedding(
 def image_embedding_from_path(
     image_path: str,
     provider_name: str | None = None,
+    *,
+    use_cache: bool = True,
 ) -> List[float]:
     """Generate an embedding vector for an image from a file path.
 
     Args:
         image_path (str): Path to the image file to encode.
         provider_name (str | None): Optional provider name override.
+        use_cache (bool): Look up and store the vector in the query cache.
+            Ingest passes ``False``: its vectors go to the embedding store.
 
     Returns:
         List[float]: A list of floats representing the image embedding.
 
     Notes:
+        - Vectors are cached by file content hash, so re-sent attachments skip the model.
         - The image is converted to RGB before encoding.
         - Uses a CLIP-based model ("clip-ViT-B-32") for generating visual embeddings.
         - Embeddings can be stored in Qdrant or compared with other image embeddings.
     """
-    started = time.perf_counter()
     resolved_provider = provider_name or Config.default_embedding_provider
+    cache_key: QueryCacheKey | None = None
+    if use_cache and _QUERY_VECTOR_CACHE.enabled:
+        cache_key = (
+            resolved_provider,
+            'image',
+            file_content_hash(image_path),
+        )
+        cached = _QUERY_VECTOR_CACHE.get(cache_key)
+        if cached is not None:
+            return cached
+
+    started = time.perf_counter()
     status = 'ok'
     try:
         provider = get_provider(resolved_provider)
         with Image.open(image_path) as img:
             vector = provider.encode_image(img)
+        if cache_key is not None:
+            _QUERY_VECTOR_CACHE.put(cache_key, vector)
         return vector
     except Exception:
         status = 'error'
@@ -106,6 +279,44 @@ def image_embedding_from_path(
         )
 
 
+def image_embeddings_batch_from_paths(
+    image_paths: list[str],
+    provider_name: str | None = None,
+) -> list[list[float]]:
+    """Generate embedding vectors for many image files in one batch.
+
+    Args:
+        image_paths (list[str]): Paths to the image files to encode.
+        provider_name (str | None): Optional provider name override.
+
+    Returns:
+        list[list[float]]: Embedding vectors in the same order as ``image_paths``.
+    """
+    if not image_paths:
+        return []
+    started = time.perf_counter()
+    resolved_provider = provider_name or Config.default_embedding_provider
+    status = 'ok'
+    try:
+        provider = get_provider(resolved_provider)
+        images: list[Image.Image] = []
+        for image_path in image_paths:
+            with Image.open(image_path) as img:
+                images.append(img.convert('RGB'))
+        return provider.encode_images(images)
+    except Exception:
+        status = 'error'
+        raise
+    finally:
+        _observe_batch(
+            modality='image',
+            provider=resolved_provider,
+            status=status,
+            duration_seconds=time.perf_counter() - started,
+            batch_size=len(image_paths),
+        )
+
+
 def video_embedding_from_path(
     video_path: str,
     sample_fps: float | None = None,
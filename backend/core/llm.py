@@ -1,19 +1,49 @@
+import copy
 import logging
 import os
+import queue
+import time
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from threading import Event, Lock, Thread
+from typing import Any, Callable, Dict, Iterator, List
 
-import requests
 import torch
 from PIL import Image
-from transformers import AutoProcessor, AutoTokenizer, pipeline
-
+from transformers import (
+    AutoProcessor,
+    AutoTokenizer,
+    DynamicCache,
+    LogitsProcessorList,
+    StoppingCriteria,
+    StoppingCriteriaList,
+    TextIteratorStreamer,
+    pipeline,
+)
+
+from backend.core.context_packer import TokenCounter, pack_context
+from backend.core.model_residency import (
+    ModelResidencyManager,
+    default_memory_budget_bytes,
+)
+from backend.core.vision_inputs import (
+    count_visual_tokens,
+    load_image,
+    patch_factor,
+)
+from backend.monitoring.metrics import (
+    observe_llm_batch_step,
+    observe_llm_context_packing,
+    observe_llm_generation,
+    observe_llm_queue_wait,
+    observe_llm_scheduler_rejection,
+    observe_llm_visual_tokens,
+)
 from backend.utils.config_handler import Config
 
 logger = logging.getLogger(__name__)
 
-_BACKENDS: dict[str, 'BaseLLMBackend'] = {}
-
 
 def _default_torch_dtype() -> torch.dtype:
     """Pick a conservative dtype for the current runtime."""
@@ -98,6 +128,550 @@ def _resolve_auto_model_class():
         ) from exc
 
 
+def _with_context(prompt: str, context: list[dict[str, Any]] | None) -> str:
+    """Prepend raw context texts to the prompt (backend-level fallback)."""
+    if not context:
+        return prompt
+    context_text = '\n'.join(item.get('text', '') for item in context)
+    return (
+        'Используя следующий контекст:\n'
+        f'{context_text}\n\n'
+        'Ответьте на вопрос:\n'
+        f'{prompt}'
+    )
+
+
+class _CountingStreamer(TextIteratorStreamer):
+    """Text streamer that also counts generated (non-prompt) tokens."""
+
+    def __init__(self, tokenizer, **kwargs: Any) -> None:
+        super().__init__(tokenizer, **kwargs)
+        self.generated_tokens = 0
+
+    def put(self, value) -> None:
+        """Count new tokens, then decode them as usual."""
+        if not (self.skip_prompt and self.next_tokens_are_prompt):
+            self.generated_tokens += int(value.numel())
+        super().put(value)
+
+
+class _StopOnEvent(StoppingCriteria):
+    """Stop generation once the consumer of a stream has gone away."""
+
+    def __init__(self, event: Event) -> None:
+        self.event = event
+
+    def __call__(self, input_ids, scores, **kwargs: Any):
+        """Return one stop flag per sequence."""
+        return torch.full(
+            (input_ids.shape[0],),
+            self.event.is_set(),
+            dtype=torch.bool,
+            device=input_ids.device,
+        )
+
+
+def _stream_generate(
+    *,
+    model_name: str,
+    tokenizer,
+    submit: Callable[[TextIteratorStreamer, Event], Future],
+) -> Iterator[str]:
+    """Yield decoded text as the scheduler produces tokens.
+
+    ``submit`` enqueues the prompt with the given streamer and cancel
+    event. Closing the iterator early (client disconnect) sets the event,
+    so the sequence leaves its batch at the next decode step. Time to
+    first token and decode throughput are observed per model.
+    """
+    streamer = _CountingStreamer(
+        tokenizer, skip_prompt=True, skip_special_tokens=True
+    )
+    cancelled = Event()
+    started = time.perf_counter()
+    first_token_at: float | None = None
+    future = submit(streamer, cancelled)
+    try:
+        for text in streamer:
+            if not text:
+                continue
+            if first_token_at is None:
+                first_token_at = time.perf_counter()
+            yield text
+    finally:
+        cancelled.set()
+    future.result()
+    finished = time.perf_counter()
+    observe_llm_generation(
+        model=model_name,
+        mode='stream',
+        generated_tokens=streamer.generated_tokens,
+        duration_seconds=finished - started,
+        time_to_first_token_seconds=(
+            first_token_at - started if first_token_at is not None else None
+        ),
+    )
+
+
+class GenerationQueueFullError(RuntimeError):
+    """Raised when a model's generation queue has no free slots."""
+
+    error_code = 'llm_queue_full'
+
+
+_STEP_INPUT_KEYS = frozenset({'input_ids', 'attention_mask'})
+
+
+@dataclass
+class _GenerationRequest:
+    inputs: Any
+    max_new_tokens: int
+    streamer: TextIteratorStreamer | None
+    cancelled: Event
+    future: Future = field(default_factory=Future)
+    enqueued_at: float = field(default_factory=time.perf_counter)
+    generated: list[int] = field(default_factory=list)
+    position: int = 0
+    prompt_ids: torch.Tensor | None = None
+    logits_processor: LogitsProcessorList | None = None
+
+    def finish(self, error: BaseException | None = None) -> None:
+        if self.streamer is not None:
+            self.streamer.end()
+        if self.future.done():
+            return
+        if error is not None:
+            self.future.set_exception(error)
+        else:
+            self.future.set_result(
+                torch.tensor(self.generated, dtype=torch.long)
+            )
+
+
+def _cache_layers(cache) -> list[tuple[torch.Tensor, torch.Tensor]]:
+    """Return per-layer ``(keys, values)`` of a KV cache."""
+    if hasattr(cache, 'layers'):
+        return [(layer.keys, layer.values) for layer in cache.layers]
+    if hasattr(cache, 'key_cache'):
+        return list(zip(cache.key_cache, cache.value_cache, strict=True))
+    return [(keys, values) for keys, values in cache]
+
+
+def _build_cache(layers: list[tuple[torch.Tensor, torch.Tensor]]):
+    if hasattr(DynamicCache, 'from_legacy_cache'):
+        return DynamicCache.from_legacy_cache(tuple(layers))
+    return DynamicCache(layers)
+
+
+def _left_pad(tensor: torch.Tensor, length: int, dim: int) -> torch.Tensor:
+    missing = length - tensor.shape[dim]
+    if missing <= 0:
+        return tensor
+    shape = list(tensor.shape)
+    shape[dim] = missing
+    return torch.cat([tensor.new_zeros(shape), tensor], dim=dim)
+
+
+def _greedy_generation_config(model):
+    """Return the model's generation config as ``generate`` uses it here."""
+    config = getattr(model, 'generation_config', None)
+    if config is None or not hasattr(model, '_get_logits_processor'):
+        return None
+    config = copy.deepcopy(config)
+    config.do_sample = False
+    if hasattr(model, '_prepare_special_tokens'):
+        # Sets the eos tensors that min-length processors read.
+        model._prepare_special_tokens(config, True)
+    return config
+
+
+class GenerationScheduler:
+    """Continuous-batching greedy decoder for one shared model.
+
+    A single worker thread owns the model, so concurrent requests never
+    call ``generate`` on it in parallel. Text-only prompts (only
+    ``input_ids``/``attention_mask``) are prefilled together, then decoded
+    one token per step for the whole batch over a shared left-padded KV
+    cache; sequences leave the batch when they finish and queued prompts
+    join between steps. Prompts with extra inputs (images) run alone via
+    ``model.generate`` once the running batch drains.
+
+    Logits processors from the model's ``generation_config`` (repetition
+    penalty, n-gram blocking, ...) are applied to each row over its own
+    prompt and generated ids, so tokens match ``generate(do_sample=False)``.
+    """
+
+    def __init__(
+        self,
+        model,
+        *,
+        model_name: str,
+        pad_token_id: int | None,
+        max_batch_size: int | None = None,
+        max_queued_prompts: int | None = None,
+    ) -> None:
+        """Create a scheduler; the worker thread starts on first submit."""
+        self.model = model
+        self.model_name = model_name
+        eos = getattr(
+            getattr(model, 'generation_config', None), 'eos_token_id', None
+        )
+        if eos is None:
+            eos = getattr(getattr(model, 'config', None), 'eos_token_id', None)
+        if isinstance(eos, int):
+            eos = [eos]
+        self.eos_token_ids: set[int] = set(eos or [])
+        self._generation_config = _greedy_generation_config(model)
+        self.pad_token_id = (
+            pad_token_id
+            if pad_token_id is not None
+            else min(self.eos_token_ids, default=0)
+        )
+        self.max_batch_size = max(
+            1,
+            max_batch_size
+            if max_batch_size is not None
+            else Config.llm_max_batch_size,
+        )
+        self._queue: queue.Queue[_GenerationRequest | None] = queue.Queue(
+            maxsize=max(
+                1,
+                max_queued_prompts
+                if max_queued_prompts is not None
+                else Config.llm_max_queued_prompts,
+            )
+        )
+        self._active: list[_GenerationRequest] = []
+        self._exclusive: _GenerationRequest | None = None
+        self._cache = None
+        self._attention_mask: torch.Tensor | None = None
+        self._worker: Thread | None = None
+        self._worker_lock = Lock()
+        self._closed = False
+
+    def submit(
+        self,
+        inputs,
+        *,
+        max_new_tokens: int | None = None,
+        streamer: TextIteratorStreamer | None = None,
+        cancelled: Event | None = None,
+    ) -> Future:
+        """Queue one prompt (batch of 1); the future yields generated ids."""
+        if self._closed:
+            raise RuntimeError(f'Model "{self.model_name}" was unloaded')
+        request = _GenerationRequest(
+            inputs=inputs,
+            max_new_tokens=max_new_tokens or Config.llm_max_new_tokens,
+            streamer=streamer,
+            cancelled=cancelled or Event(),
+        )
+        try:
+            self._queue.put_nowait(request)
+        except queue.Full:
+            observe_llm_scheduler_rejection(model=self.model_name)
+            raise GenerationQueueFullError(
+                f'Generation queue for "{self.model_name}" is full'
+            ) from None
+        self._ensure_worker()
+        return request.future
+
+    def close(self) -> None:
+        """Stop the worker once the queue drains; later submits fail."""
+        self._closed = True
+        if self._worker is not None:
+            self._queue.put(None)
+
+    def _ensure_worker(self) -> None:
+        if self._worker is not None:
+            return
+        with self._worker_lock:
+            if self._worker is None:
+                self._worker = Thread(
+                    target=self._run,
+                    name=f'llm-scheduler-{self.model_name}',
+                    daemon=True,
+                )
+                self._worker.start()
+
+    def _run(self) -> None:
+        while not (self._closed and self._idle()):
+            joining = self._admit()
+            try:
+                with torch.inference_mode():
+                    if joining:
+                        self._prefill(joining)
+                    if self._active:
+                        self._step()
+                    elif self._exclusive is not None:
+                        request, self._exclusive = self._exclusive, None
+                        self._run_exclusive(request)
+            except Exception as exc:
+                logger.exception('Generation failed for %s', self.model_name)
+                for request in self._active + joining:
+                    request.finish(exc)
+                self._active = []
+                self._cache = None
+                self._attention_mask = None
+
+    def _admit(self) -> list[_GenerationRequest]:
+        """Take queued prompts into free batch slots (FIFO)."""
+        joining: list[_GenerationRequest] = []
+        while (
+            self._exclusive is None
+            and len(self._active) + len(joining) < self.max_batch_size
+        ):
+            try:
+                if self._active or joining:
+                    request = self._queue.get_nowait()
+                else:
+                    request = self._queue.get()
+            except queue.Empty:
+                break
+            if request is None:
+                break
+            observe_llm_queue_wait(
+                model=self.model_name,
+                wait_seconds=time.perf_counter() - request.enqueued_at,
+            )
+            if request.cancelled.is_set():
+                request.finish()
+            elif set(request.inputs.keys()) <= _STEP_INPUT_KEYS:
+                joining.append(request)
+            else:
+                self._exclusive = request
+        return joining
+
+    def _idle(self) -> bool:
+        return (
+            not self._active
+            and self._exclusive is None
+            and self._queue.empty()
+        )
+
+    def _run_exclusive(self, request: _GenerationRequest) -> None:
+        kwargs: dict[str, Any] = {
+            'stopping_criteria': StoppingCriteriaList(
+                [_StopOnEvent(request.cancelled)]
+            )
+        }
+        if request.streamer is not None:
+            kwargs['streamer'] = request.streamer
+        try:
+            output = self.model.generate(
+                **request.inputs,
+                max_new_tokens=request.max_new_tokens,
+                do_sample=False,
+                **kwargs,
+            )
+        except Exception as exc:
+            request.finish(exc)
+            return
+        prompt_length = request.inputs['input_ids'].shape[-1]
+        request.generated = output[0][prompt_length:].tolist()
+        request.finish()
+
+    def _prefill(self, joining: list[_GenerationRequest]) -> None:
+        """Run the prompts of joining sequences and merge their cache."""
+        prompts = []
+        for request in joining:
+            ids = request.inputs['input_ids'][0]
+            mask = request.inputs.get('attention_mask')
+            if mask is not None:
+                ids = ids[mask[0].bool()]
+            prompts.append(ids)
+            request.prompt_ids = ids
+            request.logits_processor = self._logits_processor(ids)
+            if request.streamer is not None:
+                request.streamer.put(ids.unsqueeze(0).cpu())
+        length = max(ids.shape[0] for ids in prompts)
+        input_ids = torch.stack(
+            [
+                torch.cat(
+                    [
+                        ids.new_full(
+                            (length - ids.shape[0],), self.pad_token_id
+                        ),
+                        ids,
+                    ]
+                )
+                for ids in prompts
+            ]
+        )
+        attention_mask = torch.stack(
+            [_left_pad(torch.ones_like(ids), length, dim=0) for ids in prompts]
+        )
+        position_ids = (attention_mask.cumsum(-1) - 1).clamp(min=0)
+        outputs = self.model(
+            input_ids=input_ids,
+            attention_mask=attention_mask,
+            position_ids=position_ids,
+            past_key_values=DynamicCache(),
+            use_cache=True,
+        )
+        for request, ids in zip(joining, prompts, strict=True):
+            request.position = ids.shape[0]
+        self._merge(joining, outputs.past_key_values, attention_mask)
+        self._emit(joining, self._next_tokens(joining, outputs.logits))
+
+    def _step(self) -> None:
+        """Decode one token for every running sequence."""
+        observe_llm_batch_step(
+            model=self.model_name, batch_size=len(self._active)
+        )
+        device = self._attention_mask.device
+        input_ids = torch.tensor(
+            [[request.generated[-1]] for request in self._active],
+            device=device,
+        )
+        position_ids = torch.tensor(
+            [[request.position] for request in self._active], device=device
+        )
+        self._attention_mask = torch.cat(
+            [
+                self._attention_mask,
+                self._attention_mask.new_ones((len(self._active), 1)),
+            ],
+            dim=-1,
+        )
+        outputs = self.model(
+            input_ids=input_ids,
+            attention_mask=self._attention_mask,
+            position_ids=position_ids,
+            past_key_values=self._cache,
+            use_cache=True,
+        )
+        self._cache = outputs.past_key_values
+        for request in self._active:
+            request.position += 1
+        active = list(self._active)
+        self._emit(active, self._next_tokens(active, outputs.logits))
+
+    def _logits_processor(
+        self, prompt_ids: torch.Tensor
+    ) -> LogitsProcessorList | None:
+        if self._generation_config is None:
+            return None
+        processors = self.model._get_logits_processor(
+            generation_config=self._generation_config,
+            input_ids_seq_length=prompt_ids.shape[-1],
+            encoder_input_ids=prompt_ids.unsqueeze(0),
+            prefix_allowed_tokens_fn=None,
+            logits_processor=LogitsProcessorList(),
+            device=prompt_ids.device,
+        )
+        return processors or None
+
+    def _next_tokens(
+        self, requests: list[_GenerationRequest], logits: torch.Tensor
+    ) -> torch.Tensor:
+        """Pick each row's greedy token after its logits processors."""
+        scores = logits[:, -1, :]
+        for row, request in enumerate(requests):
+            if request.logits_processor is None:
+                continue
+            ids = torch.cat(
+                [
+                    request.prompt_ids,
+                    request.prompt_ids.new_tensor(request.generated),
+                ]
+            ).unsqueeze(0)
+            processed = request.logits_processor(ids, scores[row : row + 1])
+            scores[row] = processed[0]
+        return scores.argmax(-1)
+
+    def _emit(
+        self, requests: list[_GenerationRequest], tokens: torch.Tensor
+    ) -> None:
+        """Record next tokens and evict sequences that are done."""
+        finished: set[int] = set()
+        for request, token in zip(requests, tokens.tolist(), strict=True):
+            request.generated.append(token)
+            if request.streamer is not None:
+                request.streamer.put(torch.tensor([token]))
+            if (
+                token in self.eos_token_ids
+                or len(request.generated) >= request.max_new_tokens
+                or request.cancelled.is_set()
+            ):
+                finished.add(id(request))
+                request.finish()
+        if finished:
+            self._evict(finished)
+
+    def _merge(
+        self,
+        joining: list[_GenerationRequest],
+        cache,
+        attention_mask: torch.Tensor,
+    ) -> None:
+        if not self._active:
+            self._active = list(joining)
+            self._cache = cache
+            self._attention_mask = attention_mask
+            return
+        length = max(self._attention_mask.shape[-1], attention_mask.shape[-1])
+        self._cache = _build_cache(
+            [
+                (
+                    torch.cat(
+                        [
+                            _left_pad(k_old, length, -2),
+                            _left_pad(k_new, length, -2),
+                        ]
+                    ),
+                    torch.cat(
+                        [
+                            _left_pad(v_old, length, -2),
+                            _left_pad(v_new, length, -2),
+                        ]
+                    ),
+                )
+                for (k_old, v_old), (k_new, v_new) in zip(
+                    _cache_layers(self._cache),
+                    _cache_layers(cache),
+                    strict=True,
+                )
+            ]
+        )
+        self._attention_mask = torch.cat(
+            [
+                _left_pad(self._attention_mask, length, -1),
+                _left_pad(attention_mask, length, -1),
+            ]
+        )
+        self._active.extend(joining)
+
+    def _evict(self, finished: set[int]) -> None:
+        keep = [
+            index
+            for index, request in enumerate(self._active)
+            if id(request) not in finished
+        ]
+        if len(keep) == len(self._active):
+            return
+        if not keep:
+            self._active = []
+            self._cache = None
+            self._attention_mask = None
+            return
+        index = torch.tensor(keep, device=self._attention_mask.device)
+        mask = self._attention_mask.index_select(0, index)
+        # Drop leading columns that are padding for every remaining row.
+        start = int(mask.any(dim=0).long().argmax())
+        self._attention_mask = mask[:, start:]
+        self._cache = _build_cache(
+            [
+                (
+                    keys.index_select(0, index)[..., start:, :],
+                    values.index_select(0, index)[..., start:, :],
+                )
+                for keys, values in _cache_layers(self._cache)
+            ]
+        )
+        self._active = [self._active[i] for i in keep]
+
+
 class BaseLLMBackend(ABC):
     """Common interface for text and multimodal backends."""
 
@@ -112,8 +686,115 @@ class BaseLLMBackend(ABC):
     ) -> str:
         """Generate answer for prompt and optional context/image."""
 
+    def stream(
+        self,
+        prompt: str,
+        context: list[dict[str, Any]] | None = None,
+        image: str | Image.Image | None = None,
+    ) -> Iterator[str]:
+        """Yield answer text as it is decoded.
+
+        Backends without incremental decoding yield the full answer once.
+        """
+        yield self.generate(prompt, context=context, image=image)
+
+    def context_tokenizer(self):
+        """Return the tokenizer used to budget prompt context, if any."""
+        return None
+
+
+class _ScheduledBackend(BaseLLMBackend):
+    """Local transformers backend driven by a :class:`GenerationScheduler`."""
+
+    model_name: str
+    model: Any
+    scheduler: GenerationScheduler
+
+    @abstractmethod
+    def _prepare_inputs(
+        self,
+        prompt: str,
+        context: list[dict[str, Any]] | None,
+        image: str | Image.Image | None,
+    ):
+        """Return batch-of-one model inputs on the model device."""
+
+    @abstractmethod
+    def _text_tokenizer(self):
+        """Return the tokenizer used to decode generated ids."""
+
+    def context_tokenizer(self):
+        """Budget context with the tokenizer that decodes answers."""
+        return self._text_tokenizer()
+
+    def memory_bytes(self) -> int:
+        """Return the size of the loaded weights and buffers."""
+        return sum(
+            tensor.numel() * tensor.element_size()
+            for tensor in (*self.model.parameters(), *self.model.buffers())
+        )
+
+    def unload(self) -> None:
+        """Stop the scheduler and free the model."""
+        self.scheduler.close()
+        self.scheduler.model = None
+        self.model = None
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+    def _observe_visual_tokens(self, inputs) -> None:
+        observe_llm_visual_tokens(
+            model=self.model_name,
+            tokens=count_visual_tokens(inputs, self.model.config),
+        )
+
+    def _start_scheduler(self) -> None:
+        self.scheduler = GenerationScheduler(
+            self.model,
+            model_name=self.model_name,
+            pad_token_id=self._text_tokenizer().pad_token_id,
+        )
+
+    def generate(
+        self,
+        prompt: str,
+        context: list[dict[str, Any]] | None = None,
+        image: str | Image.Image | None = None,
+    ) -> str:
+        """Generate the full answer through the shared scheduler."""
+        inputs = self._prepare_inputs(prompt, context, image)
+        started = time.perf_counter()
+        generated = self.scheduler.submit(inputs).result()
+        observe_llm_generation(
+            model=self.model_name,
+            mode='blocking',
+            generated_tokens=int(generated.shape[-1]),
+            duration_seconds=time.perf_counter() - started,
+        )
+        return (
+            self._text_tokenizer()
+            .decode(generated, skip_special_tokens=True)
+            .strip()
+        )
+
+    def stream(
+        self,
+        prompt: str,
+        context: list[dict[str, Any]] | None = None,
+        image: str | Image.Image | None = None,
+    ) -> Iterator[str]:
+        """Yield answer text token by token."""
+        inputs = self._prepare_inputs(prompt, context, image)
+        yield from _stream_generate(
+            model_name=self.model_name,
+            tokenizer=self._text_tokenizer(),
+            submit=lambda streamer, cancelled: self.scheduler.submit(
+                inputs, streamer=streamer, cancelled=cancelled
+            ),
+        )
+
 
-class QwenVisionLLM(BaseLLMBackend):
+class QwenVisionLLM(_ScheduledBackend):
     """Vision-text backend for multimodal requests."""
 
     supports_image = True
@@ -129,6 +810,7 @@ class QwenVisionLLM(BaseLLMBackend):
             model_name,
             **self.model_kwargs,
         )
+        self._start_scheduler()
         logger.info('Vision model %s loaded', model_name)
 
     def build_messages(
@@ -137,37 +819,24 @@ class QwenVisionLLM(BaseLLMBackend):
         """Build chat template payload for Qwen vision models."""
         content: list[dict[str, Any]] = []
         if image is not None:
-            if isinstance(image, str):
-                if image.startswith('http'):
-                    response = requests.get(image, stream=True, timeout=10)
-                    response.raise_for_status()
-                    resolved_image = Image.open(response.raw).convert('RGB')
-                else:
-                    resolved_image = Image.open(image).convert('RGB')
-            else:
-                resolved_image = image
-            content.append({'type': 'image', 'image': resolved_image})
+            content.append(
+                {
+                    'type': 'image',
+                    'image': load_image(
+                        image, factor=patch_factor(self.processor)
+                    ),
+                }
+            )
         content.append({'type': 'text', 'text': prompt})
         return [{'role': 'user', 'content': content}]
 
-    def generate(
+    def _prepare_inputs(
         self,
         prompt: str,
-        context: list[dict[str, Any]] | None = None,
-        image: str | Image.Image | None = None,
-    ) -> str:
-        """Generate answer with optional image input."""
-        full_prompt = prompt
-        if context:
-            context_text = '\n'.join(item.get('text', '') for item in context)
-            full_prompt = (
-                'Используя следующий контекст:\n'
-                f'{context_text}\n\n'
-                'Ответьте на вопрос:\n'
-                f'{prompt}'
-            )
-
-        messages = self.build_messages(full_prompt, image)
+        context: list[dict[str, Any]] | None,
+        image: str | Image.Image | None,
+    ):
+        messages = self.build_messages(_with_context(prompt, context), image)
         inputs = self.processor.apply_chat_template(
             messages,
             add_generation_prompt=True,
@@ -175,21 +844,15 @@ class QwenVisionLLM(BaseLLMBackend):
             return_dict=True,
             return_tensors='pt',
         ).to(self.model.device)
+        if image is not None:
+            self._observe_visual_tokens(inputs)
+        return inputs
 
-        with torch.inference_mode():
-            output = self.model.generate(
-                **inputs,
-                max_new_tokens=Config.llm_max_new_tokens,
-                do_sample=False,
-            )
-
-        return self.processor.decode(
-            output[0][inputs['input_ids'].shape[-1] :],
-            skip_special_tokens=True,
-        )
+    def _text_tokenizer(self):
+        return self.processor.tokenizer
 
 
-class LlavaOneVisionBackend(BaseLLMBackend):
+class LlavaOneVisionBackend(_ScheduledBackend):
     """LLaVA-OneVision backend for image-text-to-text requests."""
 
     supports_image = True
@@ -206,40 +869,26 @@ class LlavaOneVisionBackend(BaseLLMBackend):
             model_name,
             **self.model_kwargs,
         )
+        self._start_scheduler()
         logger.info('Llava-OneVision model %s loaded', model_name)
 
     def _resolve_image(
         self, image: str | Image.Image | None
     ) -> Image.Image | None:
-        """Resolve image input into a PIL image."""
+        """Resolve image input into a PIL image within the pixel budget."""
         if image is None:
             return None
-        if isinstance(image, Image.Image):
-            return image.convert('RGB')
-        if image.startswith('http'):
-            response = requests.get(image, stream=True, timeout=10)
-            response.raise_for_status()
-            return Image.open(response.raw).convert('RGB')
-        return Image.open(image).convert('RGB')
+        return load_image(image, factor=patch_factor(self.processor))
 
-    def generate(
+    def _prepare_inputs(
         self,
         prompt: str,
-        context: list[dict[str, Any]] | None = None,
-        image: str | Image.Image | None = None,
-    ) -> str:
-        """Generate answer using Llava-OneVision."""
-        full_prompt = prompt
-        if context:
-            context_text = '\n'.join(item.get('text', '') for item in context)
-            full_prompt = (
-                'Используя следующий контекст:\n'
-                f'{context_text}\n\n'
-                'Ответьте на вопрос:\n'
-                f'{prompt}'
-            )
-
-        content: list[dict[str, str]] = [{'type': 'text', 'text': full_prompt}]
+        context: list[dict[str, Any]] | None,
+        image: str | Image.Image | None,
+    ):
+        content: list[dict[str, str]] = [
+            {'type': 'text', 'text': _with_context(prompt, context)}
+        ]
         resolved_image = self._resolve_image(image)
         if resolved_image is not None:
             content.append({'type': 'image'})
@@ -253,20 +902,15 @@ class LlavaOneVisionBackend(BaseLLMBackend):
             text=prompt_text,
             return_tensors='pt',
         ).to(self.model.device)
-        with torch.inference_mode():
-            output = self.model.generate(
-                **inputs,
-                max_new_tokens=Config.llm_max_new_tokens,
-                do_sample=False,
-            )
+        if resolved_image is not None:
+            self._observe_visual_tokens(inputs)
+        return inputs
 
-        generated = output[0][inputs['input_ids'].shape[-1] :]
-        return self.processor.decode(
-            generated, skip_special_tokens=True
-        ).strip()
+    def _text_tokenizer(self):
+        return self.processor.tokenizer
 
 
-class GPTOSSBackend(BaseLLMBackend):
+class GPTOSSBackend(_ScheduledBackend):
     """Text-only backend for OpenAI gpt-oss models hosted on Hugging Face."""
 
     supports_image = False
@@ -286,45 +930,51 @@ class GPTOSSBackend(BaseLLMBackend):
             tokenizer=self.tokenizer,
             **pipeline_kwargs,
         )
+        self.model = self.pipeline.model
+        self._start_scheduler()
         logger.info('Text model %s loaded', model_name)
 
-    def generate(
+    def _prepare_inputs(
         self,
         prompt: str,
-        context: list[dict[str, Any]] | None = None,
-        image: str | Image.Image | None = None,
-    ) -> str:
-        """Generate answer for text-only prompts."""
+        context: list[dict[str, Any]] | None,
+        image: str | Image.Image | None,
+    ):
         if image is not None:
             raise ValueError(
                 f'Model "{self.model_name}" does not support image input'
             )
+        return self.tokenizer.apply_chat_template(
+            [{'role': 'user', 'content': _with_context(prompt, context)}],
+            add_generation_prompt=True,
+            tokenize=True,
+            return_dict=True,
+            return_tensors='pt',
+        ).to(self.model.device)
 
-        full_prompt = prompt
-        if context:
-            context_text = '\n'.join(item.get('text', '') for item in context)
-            full_prompt = (
-                'Используя следующий контекст:\n'
-                f'{context_text}\n\n'
-                'Ответьте на вопрос:\n'
-                f'{prompt}'
-            )
+    def _text_tokenizer(self):
+        return self.tokenizer
 
-        outputs = self.pipeline(
-            [{'role': 'user', 'content': full_prompt}],
-            max_new_tokens=Config.llm_max_new_tokens,
-        )
-        generated = outputs[0].get('generated_text')
-        if isinstance(generated, list) and generated:
-            last_message = generated[-1]
-            if isinstance(last_message, dict):
-                return str(last_message.get('content', '')).strip()
-            return str(last_message).strip()
-        return str(generated or '').strip()
+    def unload(self) -> None:
+        """Drop the pipeline too, so its model reference is released."""
+        self.pipeline = None
+        super().unload()
 
 
 def _build_backend(model_name: str) -> BaseLLMBackend:
-    """Instantiate backend implementation for model name."""
+    """Instantiate backend implementation for model name.
+
+    Models routed in ``llm.remote`` are served by an OpenAI-compatible
+    server; the rest are loaded in-process.
+    """
+    from backend.core.remote_llm import (
+        OpenAICompatibleBackend,
+        remote_llm_route,
+    )
+
+    route = remote_llm_route(model_name)
+    if route is not None:
+        return OpenAICompatibleBackend(model_name, route)
     normalized = model_name.lower()
     if 'gpt-oss' in normalized:
         return GPTOSSBackend(model_name)
@@ -333,23 +983,57 @@ def _build_backend(model_name: str) -> BaseLLMBackend:
     return QwenVisionLLM(model_name)
 
 
+_RESIDENCY: ModelResidencyManager | None = None
+_RESIDENCY_LOCK = Lock()
+
+
+def get_model_residency() -> ModelResidencyManager:
+    """Return the process-wide manager of loaded LLM backends."""
+    global _RESIDENCY
+    if _RESIDENCY is None:
+        with _RESIDENCY_LOCK:
+            if _RESIDENCY is None:
+                _RESIDENCY = ModelResidencyManager(
+                    _build_backend,
+                    budget_bytes=default_memory_budget_bytes(
+                        Config.llm_memory_budget_gb
+                    ),
+                    pinned=(
+                        [Config.llm_model_name]
+                        if Config.llm_pin_default_model
+                        else []
+                    ),
+                    size_estimates={
+                        name: int(size_gb * 1024**3)
+                        for name, size_gb in (
+                            Config.llm_model_size_estimates_gb.items()
+                        )
+                    },
+                )
+    return _RESIDENCY
+
+
+def preload_llm_models() -> None:
+    """Start loading ``Config.llm_preload_models`` in the background."""
+    if Config.llm_preload_models:
+        get_model_residency().preload(Config.llm_preload_models)
+
+
 def _resolve_llm_backend(model: str | None) -> BaseLLMBackend:
-    """Resolve backend by requested model name with lazy caching."""
-    model_name = model or Config.llm_model_name
-    backend = _BACKENDS.get(model_name)
-    if backend is None:
-        backend = _build_backend(model_name)
-        _BACKENDS[model_name] = backend
-    return backend
+    """Lease the backend for a model name; pair with ``_release_llm_backend``.
 
+    Concurrent first requests for a model share one load, and a leased
+    backend is never evicted.
+    """
+    return get_model_residency().acquire(model or Config.llm_model_name)
 
-def _format_context_item(
-    item: dict[str, Any],
-    *,
-    idx: int,
-    remaining: int,
-) -> tuple[str | None, int]:
-    """Format one retrieved item into a compact prompt block."""
+
+def _release_llm_backend(backend: BaseLLMBackend) -> None:
+    get_model_residency().release(backend)
+
+
+def _context_header(item: dict[str, Any], idx: int) -> str:
+    """Return the ``[idx] source`` and metadata lines of a context block."""
     source = item.get('source') or 'unknown'
     modality = item.get('modality') or 'unknown'
     score = item.get('score')
@@ -365,50 +1049,134 @@ def _format_context_item(
         meta_parts.append(f'file_id={file_id}')
     if preview_ref:
         meta_parts.append(f'preview_ref={preview_ref}')
+    return f'[{idx}] {source}\n' + '; '.join(meta_parts)
+
 
+def _context_text(item: dict[str, Any]) -> str:
+    """Return the body of a context block."""
     text = (item.get('text') or '').strip()
     if not text:
+        source = item.get('source') or 'unknown'
         text = f'Visual candidate from source: {source}'
-    chunk = text[:remaining]
+    return text
+
+
+def _format_context_item(
+    item: dict[str, Any],
+    *,
+    idx: int,
+    remaining: int,
+) -> tuple[str | None, int]:
+    """Format one retrieved item into a compact prompt block."""
+    chunk = _context_text(item)[:remaining]
     if not chunk:
         return None, remaining
-    block = f'[{idx}] {source}\n' + '; '.join(meta_parts) + f'\n{chunk}'
+    block = f'{_context_header(item, idx)}\n{chunk}'
     return block, remaining - len(chunk)
 
 
+def _context_blocks(
+    context: list[dict[str, Any]], backend: BaseLLMBackend | None
+) -> tuple[list[str], list[dict[str, Any]]]:
+    """Select context blocks by token budget, or by characters as fallback.
+
+    Token packing is used when ``Config.llm_context_token_budget`` is set
+    and the backend exposes its tokenizer.
+    """
+    get_tokenizer = getattr(backend, 'context_tokenizer', None)
+    tokenizer = (
+        get_tokenizer()
+        if get_tokenizer is not None and Config.llm_context_token_budget > 0
+        else None
+    )
+    if tokenizer is not None:
+        packed = pack_context(
+            context,
+            counter=TokenCounter(tokenizer),
+            token_budget=Config.llm_context_token_budget,
+            header=_context_header,
+            text=_context_text,
+        )
+        observe_llm_context_packing(
+            model=getattr(backend, 'model_name', 'unknown'),
+            tokens=packed.tokens,
+            packed=len(packed.blocks),
+            duplicates=packed.duplicates,
+            skipped=packed.skipped,
+            truncated=packed.truncated,
+        )
+        return packed.blocks, packed.docs
+
+    limited_docs = context[: max(1, Config.rag_max_context_docs)]
+    context_blocks: List[str] = []
+    remaining = max(200, Config.rag_max_context_chars)
+    for idx, item in enumerate(limited_docs, start=1):
+        block, remaining = _format_context_item(
+            item, idx=idx, remaining=remaining
+        )
+        if block:
+            context_blocks.append(block)
+        if remaining <= 0:
+            break
+    return context_blocks, limited_docs
+
+
+def _fast_mode_answer(context) -> str:
+    """Answer from retrieved snippets without running the LLM."""
+    if context:
+        snippets: List[str] = []
+        for item in context[: max(1, Config.rag_max_context_docs)]:
+            text = (item.get('text') or '').strip()
+            if text:
+                snippets.append(text[:300])
+        if snippets:
+            joined = ' '.join(snippets)
+            return f'Быстрый режим: {joined[:600]}'
+    return 'Быстрый режим: данных недостаточно для уверенного ответа.'
+
+
 def get_llm_response(prompt, context=None, image=None, model=None) -> str:
     """Generate a response using the configured backend."""
     backend = _resolve_llm_backend(model)
+    try:
+        if Config.llm_fast_mode:
+            return _fast_mode_answer(context)
+
+        return backend.generate(
+            _build_prompt(prompt, context, image, backend),
+            context=None,
+            image=image,
+        )
+    finally:
+        _release_llm_backend(backend)
 
-    if Config.llm_fast_mode:
-        if context:
-            snippets: List[str] = []
-            for item in context[: max(1, Config.rag_max_context_docs)]:
-                text = (item.get('text') or '').strip()
-                if text:
-                    snippets.append(text[:300])
-            if snippets:
-                joined = ' '.join(snippets)
-                return f'Быстрый режим: {joined[:600]}'
-        return 'Быстрый режим: данных недостаточно для уверенного ответа.'
 
+def stream_llm_response(
+    prompt, context=None, image=None, model=None
+) -> Iterator[str]:
+    """Stream a response from the configured backend as text chunks."""
+    backend = _resolve_llm_backend(model)
+    try:
+        if Config.llm_fast_mode:
+            yield _fast_mode_answer(context)
+            return
+
+        yield from backend.stream(
+            _build_prompt(prompt, context, image, backend),
+            context=None,
+            image=image,
+        )
+    finally:
+        _release_llm_backend(backend)
+
+
+def _build_prompt(prompt, context, image, backend=None) -> str:
+    """Build the final prompt with compact retrieved context blocks."""
     if context:
-        limited_docs = context[: max(1, Config.rag_max_context_docs)]
-        context_blocks: List[str] = []
-        remaining = max(200, Config.rag_max_context_chars)
+        context_blocks, used_docs = _context_blocks(context, backend)
         image_hits = sum(
-            1
-            for item in limited_docs
-            if (item.get('modality') or '') == 'image'
+            1 for item in used_docs if (item.get('modality') or '') == 'image'
         )
-        for idx, item in enumerate(limited_docs, start=1):
-            block, remaining = _format_context_item(
-                item, idx=idx, remaining=remaining
-            )
-            if block:
-                context_blocks.append(block)
-            if remaining <= 0:
-                break
 
         combined_context = '\n\n'.join(context_blocks)
         if image is not None and image_hits > 0:
@@ -430,6 +1198,6 @@ def get_llm_response(prompt, context=None, image=None, model=None) -> str:
                 f'Контекст:\n{combined_context}\n\n'
                 f'Вопрос: {prompt}'
             )
-        return backend.generate(combined_prompt, context=None, image=image)
+        return combined_prompt
 
-    return backend.generate(prompt, context=None, image=image)
+    return prompt
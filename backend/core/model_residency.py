@@ -0,0 +1,242 @@
+from __future__ import annotations
+
+import gc
+import logging
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from threading import Lock, Thread
+from typing import Any, Callable, Iterable
+
+from backend.monitoring.metrics import (
+    observe_llm_model_eviction,
+    observe_llm_model_load,
+)
+
+logger = logging.getLogger(__name__)
+
+_GB = 1024**3
+
+
+class ModelBudgetExceededError(RuntimeError):
+    """Raised when a model cannot fit the budget even after evictions."""
+
+    error_code = 'llm_memory_budget_exceeded'
+
+
+@dataclass
+class _Resident:
+    name: str
+    future: Future = field(default_factory=Future)
+    size_bytes: int = 0
+    leases: int = 0
+
+
+def _measure_bytes(backend: Any) -> int:
+    """Return the weight size a backend reports (0 if unknown)."""
+    measure = getattr(backend, 'memory_bytes', None)
+    if measure is None:
+        return 0
+    try:
+        return int(measure())
+    except Exception:
+        logger.warning('Could not measure size of %r', backend)
+        return 0
+
+
+def _unload(backend: Any) -> None:
+    unload = getattr(backend, 'unload', None)
+    if unload is not None:
+        unload()
+    gc.collect()
+
+
+def default_memory_budget_bytes(budget_gb: float | None) -> int:
+    """Convert a configured budget into bytes (``None`` means auto)."""
+    if budget_gb is not None:
+        return int(max(budget_gb, 0.0) * _GB)
+    try:
+        import torch
+
+        if not torch.cuda.is_available():
+            return 0
+        total = sum(
+            torch.cuda.get_device_properties(index).total_memory
+            for index in range(torch.cuda.device_count())
+        )
+    except Exception:
+        return 0
+    return int(total * 0.9)
+
+
+class ModelResidencyManager:
+    """Keep loaded models within a memory budget.
+
+    Callers ``acquire`` a model by name and ``release`` it when the
+    request is done. The first caller loads the model; concurrent callers
+    wait on the same future instead of loading it again. Before and after
+    each load, idle (unleased), unpinned models are unloaded least recently
+    used first until the measured sizes fit ``budget_bytes``. A model whose
+    size is already known and cannot fit even after evicting every idle
+    model is rejected with :class:`ModelBudgetExceededError`.
+    """
+
+    def __init__(
+        self,
+        build: Callable[[str], Any],
+        *,
+        budget_bytes: int,
+        pinned: Iterable[str] = (),
+        size_estimates: dict[str, int] | None = None,
+    ) -> None:
+        """Create a manager; ``budget_bytes <= 0`` disables eviction."""
+        self._build = build
+        self.budget_bytes = max(0, budget_bytes)
+        self.pinned = set(pinned)
+        self._sizes: dict[str, int] = dict(size_estimates or {})
+        self._lock = Lock()
+        self._residents: OrderedDict[str, _Resident] = OrderedDict()
+
+    def acquire(self, name: str) -> Any:
+        """Return the loaded model, loading it (once) if needed."""
+        with self._lock:
+            resident = self._residents.get(name)
+            is_loader = resident is None
+            if is_loader:
+                resident = _Resident(name=name)
+                self._residents[name] = resident
+            resident.leases += 1
+            self._residents.move_to_end(name)
+        if is_loader:
+            self._load(resident)
+        try:
+            return resident.future.result()
+        except BaseException:
+            with self._lock:
+                resident.leases -= 1
+            raise
+
+    def release(self, backend: Any) -> None:
+        """Return a lease taken by :meth:`acquire` (unknown objects ignored)."""
+        with self._lock:
+            for resident in self._residents.values():
+                if (
+                    resident.future.done()
+                    and resident.future.exception() is None
+                    and resident.future.result() is backend
+                ):
+                    resident.leases = max(0, resident.leases - 1)
+                    return
+
+    def preload(self, names: Iterable[str]) -> Thread:
+        """Load models in a background thread, in order."""
+
+        def _run() -> None:
+            for name in names:
+                try:
+                    self.release(self.acquire(name))
+                except Exception:
+                    logger.exception('Preloading model %s failed', name)
+
+        thread = Thread(target=_run, name='llm-preload', daemon=True)
+        thread.start()
+        return thread
+
+    def resident_models(self) -> dict[str, int]:
+        """Return loaded model names with their measured sizes."""
+        with self._lock:
+            return {
+                name: resident.size_bytes
+                for name, resident in self._residents.items()
+                if resident.future.done()
+                and resident.future.exception() is None
+            }
+
+    def clear(self) -> None:
+        """Unload every idle model, including pinned ones."""
+        with self._lock:
+            evicted = [
+                self._residents.pop(name)
+                for name, resident in list(self._residents.items())
+                if resident.leases == 0 and resident.future.done()
+            ]
+        for resident in evicted:
+            if resident.future.exception() is None:
+                _unload(resident.future.result())
+
+    def _load(self, resident: _Resident) -> None:
+        estimate = self._sizes.get(resident.name, 0)
+        try:
+            self._make_room(resident.name, estimate, strict=True)
+            started = time.perf_counter()
+            backend = self._build(resident.name)
+        except BaseException as exc:
+            with self._lock:
+                if self._residents.get(resident.name) is resident:
+                    del self._residents[resident.name]
+            resident.future.set_exception(exc)
+            return
+        duration = time.perf_counter() - started
+        size = _measure_bytes(backend)
+        with self._lock:
+            resident.size_bytes = size
+            if size:
+                self._sizes[resident.name] = size
+        observe_llm_model_load(
+            model=resident.name, duration_seconds=duration, size_bytes=size
+        )
+        logger.info(
+            'Model %s loaded in %.1fs (%.2f GiB)',
+            resident.name,
+            duration,
+            size / _GB,
+        )
+        resident.future.set_result(backend)
+        self._make_room(resident.name, 0, strict=False)
+
+    def _make_room(self, name: str, incoming: int, *, strict: bool) -> None:
+        """Evict idle models until ``incoming`` more bytes fit the budget."""
+        if not self.budget_bytes:
+            return
+        with self._lock:
+            used = sum(
+                resident.size_bytes or self._sizes.get(other, 0)
+                for other, resident in self._residents.items()
+                if other != name
+            ) + (self._residents[name].size_bytes or incoming)
+            idle = [
+                resident
+                for other, resident in self._residents.items()
+                if other != name
+                and other not in self.pinned
+                and not resident.leases
+                and resident.future.done()
+            ]
+            if (
+                strict
+                and incoming
+                and used - sum(r.size_bytes for r in idle) > self.budget_bytes
+            ):
+                raise ModelBudgetExceededError(
+                    f'Model "{name}" ({incoming / _GB:.1f} GiB) does not fit '
+                    f'the LLM memory budget ({self.budget_bytes / _GB:.1f} GiB)'
+                )
+            evicted: list[_Resident] = []
+            for resident in idle:
+                if used <= self.budget_bytes:
+                    break
+                del self._residents[resident.name]
+                used -= resident.size_bytes
+                evicted.append(resident)
+        for resident in evicted:
+            logger.info('Unloading idle model %s', resident.name)
+            observe_llm_model_eviction(model=resident.name)
+            if resident.future.exception() is None:
+                _unload(resident.future.result())
+        if used > self.budget_bytes:
+            logger.warning(
+                'Loaded models use %.1f GiB, over the %.1f GiB budget',
+                used / _GB,
+                self.budget_bytes / _GB,
+            )
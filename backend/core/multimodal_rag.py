@@ -1,15 +1,54 @@
+import logging
 import time
-from typing import Any, Dict, List
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ThreadPoolExecutor,
+    wait,
+)
+from threading import Lock
+from typing import Any, Dict, Iterator, List
 
 from backend.core.embeddings import (
     image_embedding_from_path,
     multimodal_text_embedding,
     text_embedding,
 )
-from backend.monitoring.metrics import observe_rag_query
+from backend.core.retrieval_cache import get_retrieval_cache
+from backend.monitoring.metrics import observe_rag_query, observe_rag_search
 from backend.utils.config_handler import Config
 from backend.utils.qdrant_handler import QdrantHandler
 
+logger = logging.getLogger(__name__)
+
+# Payload fields used to build retrieved docs; owner ids, folder paths and
+# timestamps stay in Qdrant.
+RAG_PAYLOAD_FIELDS = ('text', 'source', 'source_path', 'file_id', 'modality')
+# Fields needed for exclusion and fusion before payloads are fetched in
+# two-phase mode.
+FUSION_PAYLOAD_FIELDS = ('file_id', 'modality')
+
+_SEARCH_EXECUTOR: ThreadPoolExecutor | None = None
+_SEARCH_EXECUTOR_LOCK = Lock()
+
+
+class SearchCapacityError(RuntimeError):
+    """Raised when a search waits too long for a free search worker."""
+
+    error_code = 'rag_search_busy'
+
+
+def _get_search_executor() -> ThreadPoolExecutor:
+    """Return the shared pool used to fan out per-modality searches."""
+    global _SEARCH_EXECUTOR
+    with _SEARCH_EXECUTOR_LOCK:
+        if _SEARCH_EXECUTOR is None:
+            _SEARCH_EXECUTOR = ThreadPoolExecutor(
+                max_workers=max(1, Config.rag_search_max_workers),
+                thread_name_prefix='rag-search',
+            )
+        return _SEARCH_EXECUTOR
+
 
 class LocalRAG:
     """Local Retrieval-Augmented Generation (RAG) pipeline using Qdrant and a local LLM.
@@ -45,6 +84,7 @@ class LocalRAG:
         folder_scopes: list[str] | None = None,
         file_ids: list[str] | None = None,
         exclude_file_ids: list[str] | None = None,
+        guest_session_id: str | None = None,
     ) -> List[Dict[str, Any]]:
         """Retrieve top-K most similar documents from Qdrant for a given query.
 
@@ -56,76 +96,304 @@ class LocalRAG:
             folder_scopes (list[str] | None, optional): Optional folder scope filter.
             file_ids (list[str] | None, optional): Optional file filter.
             exclude_file_ids (list[str] | None, optional): Optional file ids to remove from retrieval results, such as the query attachment itself.
+            guest_session_id (str | None, optional): Restrict results to files ingested by this guest session.
 
         Returns:
             List[Dict[str, str]]: A list of dictionaries containing the retrieved documents:
                 - 'text' (str): The text content of the document chunk.
                 - 'source' (str): Source file path or metadata for the chunk.
         """
+        docs: List[Dict[str, Any]] = []
+        for event in self.iter_retrieve_data(
+            query,
+            top_k,
+            image_query_path=image_query_path,
+            user_id=user_id,
+            folder_scopes=folder_scopes,
+            file_ids=file_ids,
+            exclude_file_ids=exclude_file_ids,
+            guest_session_id=guest_session_id,
+        ):
+            if event['event'] == 'results':
+                docs = event['results']
+        return docs
+
+    def iter_retrieve_data(
+        self,
+        query: str,
+        top_k: int = 5,
+        image_query_path: str | None = None,
+        user_id: str | None = None,
+        folder_scopes: list[str] | None = None,
+        file_ids: list[str] | None = None,
+        exclude_file_ids: list[str] | None = None,
+        guest_session_id: str | None = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """Retrieve documents, yielding each modality's hits as they arrive.
+
+        Takes the same arguments as ``retrieve_data``. Yields
+        ``{'event': 'modality', 'modality', 'status', 'results'}`` once per
+        searched collection in completion order (``status`` is ``ok`` or
+        ``timeout``), then a single ``{'event': 'results', 'results',
+        'cached', 'timed_out'}`` with the fused top-K docs and the
+        modalities missing from them. A cache hit yields only the final
+        event. In two-phase payload mode the per-modality docs carry
+        only fusion fields (no ``text``/``source``).
+        """
         excluded_ids = {str(file_id) for file_id in (exclude_file_ids or [])}
         search_limit = top_k + len(excluded_ids)
 
+        # Embed first (the multimodal vector is shared by image and video),
+        # then fan the collection searches out concurrently.
+        text_query_vector: list[float] | None = None
+        multimodal_query_vector: list[float] | None = None
         if image_query_path:
             image_query_vector = image_embedding_from_path(image_query_path)
-            text_results = []
         else:
-            text_results = self._filter_excluded_results(
-                self.client.search(
-                    query_vector=text_embedding(query),
-                    top_k=search_limit,
-                    user_id=user_id,
-                    folder_scopes=folder_scopes,
-                    file_ids=file_ids,
-                ),
-                excluded_ids=excluded_ids,
-            )
-            image_query_vector = multimodal_text_embedding(query)
-        image_results = self._filter_excluded_results(
-            self.image_client.search(
-                query_vector=image_query_vector,
-                top_k=search_limit,
-                user_id=user_id,
-                folder_scopes=folder_scopes,
-                file_ids=file_ids,
+            text_query_vector = text_embedding(query)
+            multimodal_query_vector = multimodal_text_embedding(query)
+            image_query_vector = multimodal_query_vector
+
+        # Results for the same vectors and filters are reused until the
+        # user's KB generation changes (ingest, delete or move).
+        cache = get_retrieval_cache()
+        cache_key = cache.make_key(
+            user_id=user_id,
+            query_vectors=(
+                text_query_vector,
+                image_query_vector,
+                multimodal_query_vector,
             ),
-            excluded_ids=excluded_ids,
+            top_k=top_k,
+            folder_scopes=folder_scopes,
+            file_ids=file_ids,
+            exclude_file_ids=excluded_ids,
         )
-        if image_query_path:
-            video_results = []
-        else:
-            video_results = self._filter_excluded_results(
-                self.video_client.search(
-                    query_vector=multimodal_text_embedding(query),
-                    top_k=search_limit,
-                    user_id=user_id,
-                    folder_scopes=folder_scopes,
-                    file_ids=file_ids,
-                ),
-                excluded_ids=excluded_ids,
+        if cache_key is not None:
+            cached_docs = cache.get(cache_key)
+            if cached_docs is not None:
+                yield {
+                    'event': 'results',
+                    'results': cached_docs,
+                    'cached': True,
+                    'timed_out': [],
+                }
+                return
+
+        # The text search also gets the raw query so hybrid mode can fuse
+        # dense and BM25 candidates inside Qdrant.
+        two_phase = Config.rag_payload_fetch == 'two_phase'
+        results_by_modality: dict[str, list[dict[str, Any]]] = {
+            'text': [],
+            'image': [],
+            'video': [],
+        }
+        timed_out: list[str] = []
+        for modality, hits, status in self._iter_search_modalities(
+            {
+                'text': (self.client, text_query_vector, query),
+                'image': (self.image_client, image_query_vector, None),
+                'video': (self.video_client, multimodal_query_vector, None),
+            },
+            top_k=search_limit,
+            user_id=user_id,
+            folder_scopes=folder_scopes,
+            file_ids=file_ids,
+            with_payload=list(
+                FUSION_PAYLOAD_FIELDS if two_phase else RAG_PAYLOAD_FIELDS
+            ),
+            **(
+                {'guest_session_id': guest_session_id}
+                if guest_session_id
+                else {}
+            ),
+        ):
+            if status == 'timeout':
+                timed_out.append(modality)
+            results_by_modality[modality] = self._filter_excluded_results(
+                hits, excluded_ids=excluded_ids
             )
+            yield {
+                'event': 'modality',
+                'modality': modality,
+                'status': status,
+                'results': [
+                    self._build_doc(item)
+                    for item in results_by_modality[modality][:top_k]
+                ],
+            }
 
         results = self._merge_results(
-            text_results=text_results,
-            image_results=image_results,
-            video_results=video_results,
+            text_results=results_by_modality['text'],
+            image_results=results_by_modality['image'],
+            video_results=results_by_modality['video'],
             top_k=top_k,
         )
+        if two_phase:
+            results = self._fetch_payloads(results)
 
-        docs: list[dict[str, Any]] = []
-        for r in results:
-            payload = r.get('payload', {})
-            docs.append(
-                {
-                    'text': payload.get('text', ''),
-                    'source': payload.get('source', ''),
-                    'file_id': payload.get('file_id'),
-                    'modality': payload.get('modality', 'text'),
-                    'score': r.get('score'),
-                    'preview_ref': self._build_preview_ref(payload),
-                }
+        docs = [self._build_doc(r) for r in results]
+
+        # Partial results after a timeout are not worth pinning in cache.
+        if cache_key is not None and not timed_out:
+            cache.put(cache_key, docs)
+        yield {
+            'event': 'results',
+            'results': docs,
+            'cached': False,
+            'timed_out': timed_out,
+        }
+
+    def _iter_search_modalities(
+        self,
+        searches: dict[
+            str, tuple[QdrantHandler, list[float] | None, str | None]
+        ],
+        **search_kwargs: Any,
+    ) -> Iterator[tuple[str, list[dict[str, Any]], str]]:
+        """Run per-modality searches concurrently with per-modality timeouts.
+
+        Each search is ``(handler, query_vector, query_text)``; the text is
+        passed only when set. A modality without a query vector is skipped.
+        Yields ``(modality, hits, status)`` as soon as each search finishes.
+        A modality that does not answer within ``Config.rag_search_timeouts``
+        of starting is yielded with no hits and status ``timeout``, so one
+        slow collection degrades recall instead of stalling the answer.
+        Time spent queued for the shared pool does not count against that
+        timeout; a search still queued after it raises
+        ``SearchCapacityError`` instead of looking like "no matches".
+        Search errors still propagate.
+        """
+        executor = _get_search_executor()
+        submitted_at = time.perf_counter()
+        started_at: dict[str, float] = {}
+
+        def _run(modality: str, handler: QdrantHandler, **kwargs: Any):
+            started_at[modality] = time.perf_counter()
+            return handler.search(**kwargs)
+
+        pending: dict[Future, str] = {
+            executor.submit(
+                _run,
+                modality,
+                handler,
+                query_vector=query_vector,
+                **search_kwargs,
+                **({'query_text': query_text} if query_text else {}),
+            ): modality
+            for modality, (handler, query_vector, query_text) in (
+                searches.items()
+            )
+            if query_vector is not None
+        }
+        timeouts = {
+            modality: Config.rag_search_timeouts.get(
+                modality, Config.rag_search_timeout_seconds
             )
+            for modality in pending.values()
+        }
 
-        return docs
+        def _deadline(modality: str) -> float:
+            # Until a worker picks the search up, the same budget bounds
+            # the queue wait.
+            return started_at.get(modality, submitted_at) + timeouts[modality]
+
+        try:
+            while pending:
+                next_deadline = min(_deadline(m) for m in pending.values())
+                done, _ = wait(
+                    pending,
+                    timeout=max(next_deadline - time.perf_counter(), 0.0),
+                    return_when=FIRST_COMPLETED,
+                )
+                for future in done:
+                    modality = pending.pop(future)
+                    status = 'ok'
+                    try:
+                        hits = future.result()
+                    except Exception:
+                        status = 'error'
+                        raise
+                    finally:
+                        observe_rag_search(
+                            modality=modality,
+                            status=status,
+                            duration_seconds=time.perf_counter()
+                            - started_at.get(modality, submitted_at),
+                        )
+                    yield modality, hits, status
+
+                now = time.perf_counter()
+                for future, modality in list(pending.items()):
+                    if _deadline(modality) > now:
+                        continue
+                    if modality not in started_at and future.cancel():
+                        del pending[future]
+                        observe_rag_search(
+                            modality=modality,
+                            status='rejected',
+                            duration_seconds=now - submitted_at,
+                        )
+                        raise SearchCapacityError(
+                            f'RAG {modality} search waited '
+                            f'{now - submitted_at:.2f}s for a search worker'
+                        )
+                    if modality not in started_at:
+                        # Picked up just now; its timeout starts here.
+                        continue
+                    del pending[future]
+                    future.cancel()
+                    logger.warning(
+                        'RAG %s search timed out after %.2fs, '
+                        'continuing with partial results',
+                        modality,
+                        timeouts[modality],
+                    )
+                    observe_rag_search(
+                        modality=modality,
+                        status='timeout',
+                        duration_seconds=now - started_at[modality],
+                    )
+                    yield modality, [], 'timeout'
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def _fetch_payloads(
+        self, results: list[dict[str, Any]]
+    ) -> list[dict[str, Any]]:
+        """Fetch full payloads for fused winners, one call per collection.
+
+        Winners whose point disappeared between the two phases are dropped.
+        """
+        handlers = {
+            'text': self.client,
+            'image': self.image_client,
+            'video': self.video_client,
+        }
+        ids_by_modality: dict[str, list[Any]] = {}
+        for item in results:
+            ids_by_modality.setdefault(item['collection_modality'], []).append(
+                item['id']
+            )
+        executor = _get_search_executor()
+        futures = {
+            modality: executor.submit(
+                handlers[modality].retrieve_payloads,
+                ids,
+                with_payload=list(RAG_PAYLOAD_FIELDS),
+            )
+            for modality, ids in ids_by_modality.items()
+        }
+        payloads = {
+            modality: future.result() for modality, future in futures.items()
+        }
+        hydrated: list[dict[str, Any]] = []
+        for item in results:
+            payload = payloads[item['collection_modality']].get(item['id'])
+            if payload is not None:
+                hydrated.append({**item, 'payload': payload})
+        return hydrated
 
     def _filter_excluded_results(
         self,
@@ -155,7 +423,11 @@ class LocalRAG:
     ) -> list[dict[str, Any]]:
         """Merge modality-specific candidates with reciprocal rank fusion."""
         by_id: dict[str, dict[str, Any]] = {}
-        for results in (text_results, image_results, video_results):
+        for collection_modality, results in (
+            ('text', text_results),
+            ('image', image_results),
+            ('video', video_results),
+        ):
             for rank, item in enumerate(results, start=1):
                 payload = item.get('payload', {}) or {}
                 file_id = str(payload.get('file_id') or item.get('id') or '')
@@ -168,6 +440,8 @@ class LocalRAG:
                         'payload': payload,
                         'score': 0.0,
                         'raw_score': item.get('score'),
+                        # Collection the kept payload (and id) came from.
+                        'collection_modality': collection_modality,
                     },
                 )
                 entry['score'] += 1.0 / (60.0 + rank)
@@ -177,7 +451,9 @@ class LocalRAG:
                     if prev_raw is None or raw_score > prev_raw:
                         entry['raw_score'] = raw_score
                 if payload.get('modality') == 'text':
+                    entry['id'] = item.get('id')
                     entry['payload'] = payload
+                    entry['collection_modality'] = collection_modality
 
         merged = sorted(
             by_id.values(),
@@ -186,6 +462,18 @@ class LocalRAG:
         )
         return merged[:top_k]
 
+    def _build_doc(self, result: dict[str, Any]) -> dict[str, Any]:
+        """Convert a search hit into a retrieved doc."""
+        payload = result.get('payload', {}) or {}
+        return {
+            'text': payload.get('text', ''),
+            'source': payload.get('source', ''),
+            'file_id': payload.get('file_id'),
+            'modality': payload.get('modality', 'text'),
+            'score': result.get('score'),
+            'preview_ref': self._build_preview_ref(payload),
+        }
+
     def _build_preview_ref(self, payload: dict[str, Any]) -> str | None:
         """Return a stable preview reference for a retrieved source."""
         file_id = payload.get('file_id')
@@ -291,3 +579,72 @@ class LocalRAG:
                 duration_seconds=time.perf_counter() - started,
                 retrieved_docs_count=len(docs),
             )
+
+    def stream_answer(
+        self,
+        query: str,
+        top_k: int = 5,
+        image=None,
+        image_query_path: str | None = None,
+        user_id: str | None = None,
+        model: str | None = None,
+        folder_scopes: list[str] | None = None,
+        file_ids: list[str] | None = None,
+        exclude_file_ids: list[str] | None = None,
+        extra_docs: list[dict[str, str]] | None = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """Stream an answer as events: sources first, then tokens.
+
+        Accepts the same arguments as :meth:`generate_answer` and yields:
+            - ``{'event': 'sources', 'retrieved_docs', 'used_sources'}``
+              once retrieval finishes, before generation starts;
+            - ``{'event': 'token', 'text'}`` per decoded text chunk;
+            - ``{'event': 'done', 'answer'}`` with the full answer.
+        """
+        effective_image = image or image_query_path
+        query_type = 'multimodal' if effective_image else 'text'
+        started = time.perf_counter()
+        status = 'ok'
+        docs: List[Dict[str, Any]] = []
+
+        try:
+            from backend.core.llm import stream_llm_response
+
+            docs = self.retrieve_data(
+                query,
+                top_k,
+                image_query_path=image_query_path,
+                user_id=user_id,
+                folder_scopes=folder_scopes,
+                file_ids=file_ids,
+                exclude_file_ids=exclude_file_ids,
+            )
+            final_docs = docs + (extra_docs or [])
+            yield {
+                'event': 'sources',
+                'retrieved_docs': final_docs,
+                'used_sources': self._build_used_sources(final_docs),
+            }
+            parts: list[str] = []
+            for text in stream_llm_response(
+                query,
+                context=final_docs,
+                image=effective_image,
+                model=model,
+            ):
+                parts.append(text)
+                yield {'event': 'token', 'text': text}
+            yield {'event': 'done', 'answer': ''.join(parts).strip()}
+        except GeneratorExit:
+            status = 'cancelled'
+            raise
+        except Exception:
+            status = 'error'
+            raise
+        finally:
+            observe_rag_query(
+                query_type=query_type,
+                status=status,
+                duration_seconds=time.perf_counter() - started,
+                retrieved_docs_count=len(docs),
+            )
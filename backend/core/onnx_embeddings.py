@@ -0,0 +1,531 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Any, Iterable
+
+import numpy as np
+from PIL import Image
+
+from backend.core.embedding_providers import EmbeddingProvider, _model_slots
+from backend.monitoring.metrics import observe_embedding_model_load
+
+logger = logging.getLogger(__name__)
+
+_OPSET_VERSION = 17
+_TEXT_INPUTS = ('input_ids', 'attention_mask', 'token_type_ids')
+_QUANTIZED_OPS = ['MatMul', 'Gemm']
+
+
+def resolve_model_source(model_name: str) -> str:
+    """Map SentenceTransformers short names to a local path or hub repo."""
+    if '/' in model_name or Path(model_name).exists():
+        return model_name
+    return f'sentence-transformers/{model_name}'
+
+
+def _read_json(source: str, filename: str, subfolder: str = '') -> Any:
+    from transformers.utils import cached_file
+
+    path = cached_file(
+        source,
+        filename,
+        subfolder=subfolder,
+        _raise_exceptions_for_missing_entries=False,
+    )
+    if not path:
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _pooling_mode(config: dict[str, Any]) -> str:
+    """Return pooling mode from current or legacy Pooling config."""
+    if isinstance(config.get('pooling_mode'), str):
+        return config['pooling_mode']
+    for flag, mode in (
+        ('pooling_mode_cls_token', 'cls'),
+        ('pooling_mode_max_tokens', 'max'),
+        ('pooling_mode_mean_tokens', 'mean'),
+        ('pooling_mode_mean_sqrt_len_tokens', 'mean_sqrt_len_tokens'),
+        ('pooling_mode_weightedmean_tokens', 'weightedmean'),
+        ('pooling_mode_lasttoken', 'lasttoken'),
+    ):
+        if config.get(flag):
+            return mode
+    return 'mean'
+
+
+def _read_sentence_transformer_layout(source: str) -> dict[str, Any]:
+    """Read module layout, pooling and normalization of an ST checkpoint."""
+    modules = _read_json(source, 'modules.json') or []
+    subfolder = modules[0]['path'] if modules else ''
+    pooling = 'mean'
+    normalize = False
+    for module in modules[1:]:
+        module_type = str(module.get('type', ''))
+        if module_type.endswith('Pooling'):
+            pooling = _pooling_mode(
+                _read_json(source, 'config.json', module['path']) or {}
+            )
+            if pooling not in {'mean', 'cls', 'max'}:
+                raise ValueError(
+                    f'Unsupported pooling mode "{pooling}" in {source}'
+                )
+        elif module_type.endswith('Normalize'):
+            normalize = True
+    st_config = (
+        _read_json(source, 'sentence_bert_config.json', subfolder)
+        or _read_json(source, 'sentence_bert_config.json')
+        or {}
+    )
+    return {
+        'subfolder': subfolder,
+        'pooling': pooling,
+        'normalize': normalize,
+        'max_seq_length': st_config.get('max_seq_length'),
+    }
+
+
+def _export_graph(
+    module,
+    inputs: dict[str, Any],
+    output_path: Path,
+    *,
+    output_name: str,
+) -> None:
+    import torch
+
+    input_names = list(inputs)
+    dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in input_names}
+    if 'pixel_values' in dynamic_axes:
+        dynamic_axes['pixel_values'] = {0: 'batch'}
+    dynamic_axes[output_name] = {0: 'batch'}
+    # torch.onnx.export restores the training flag afterwards, so the
+    # wrapper itself must be in eval mode to trace inference behaviour.
+    module.eval()
+    with torch.no_grad():
+        torch.onnx.export(
+            module,
+            tuple(inputs.values()),
+            str(output_path),
+            input_names=input_names,
+            output_names=[output_name],
+            dynamic_axes=dynamic_axes,
+            opset_version=_OPSET_VERSION,
+            dynamo=False,
+        )
+
+
+def _export_text_encoder(source: str, layout: dict, output_dir: Path) -> dict:
+    """Export a transformer text encoder with pooling baked into the graph."""
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    subfolder = layout['subfolder']
+    tokenizer = AutoTokenizer.from_pretrained(source, subfolder=subfolder)
+    model = AutoModel.from_pretrained(source, subfolder=subfolder).eval()
+    sample = tokenizer(
+        ['onnx export sample sentence', 'short'],
+        padding=True,
+        return_tensors='pt',
+    )
+    input_names = [name for name in _TEXT_INPUTS if name in sample]
+
+    class _PooledTextEncoder(torch.nn.Module):
+        def __init__(self) -> None:
+            super().__init__()
+            self.model = model
+
+        def forward(self, *inputs):
+            features = dict(zip(input_names, inputs, strict=True))
+            hidden = self.model(**features).last_hidden_state
+            mask = features['attention_mask'].unsqueeze(-1).to(hidden.dtype)
+            if layout['pooling'] == 'cls':
+                pooled = hidden[:, 0]
+            elif layout['pooling'] == 'max':
+                pooled = hidden.masked_fill(mask == 0, -1e9).max(dim=1).values
+            else:
+                pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(
+                    min=1e-9
+                )
+            if layout['normalize']:
+                pooled = torch.nn.functional.normalize(pooled, p=2, dim=1)
+            return pooled
+
+    _export_graph(
+        _PooledTextEncoder(),
+        {name: sample[name] for name in input_names},
+        output_dir / 'text.onnx',
+        output_name='embedding',
+    )
+    tokenizer.save_pretrained(output_dir / 'tokenizer')
+    return {
+        'kind': 'text',
+        'graphs': ['text'],
+        'input_names': input_names,
+        'max_seq_length': layout['max_seq_length'],
+    }
+
+
+def _export_clip_encoder(source: str, layout: dict, output_dir: Path) -> dict:
+    """Export CLIP text and image towers that return projected features."""
+    import torch
+    from transformers import CLIPModel, CLIPProcessor
+
+    subfolder = layout['subfolder']
+    processor = CLIPProcessor.from_pretrained(source, subfolder=subfolder)
+    model = CLIPModel.from_pretrained(source, subfolder=subfolder).eval()
+
+    def _features(output):
+        return output if torch.is_tensor(output) else output.pooler_output
+
+    class _ClipTextEncoder(torch.nn.Module):
+        def __init__(self) -> None:
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask):
+            return _features(
+                self.model.get_text_features(
+                    input_ids=input_ids, attention_mask=attention_mask
+                )
+            )
+
+    class _ClipImageEncoder(torch.nn.Module):
+        def __init__(self) -> None:
+            super().__init__()
+            self.model = model
+
+        def forward(self, pixel_values):
+            return _features(
+                self.model.get_image_features(pixel_values=pixel_values)
+            )
+
+    text_sample = processor.tokenizer(
+        ['onnx export sample sentence', 'short'],
+        padding=True,
+        return_tensors='pt',
+    )
+    _export_graph(
+        _ClipTextEncoder(),
+        {
+            'input_ids': text_sample['input_ids'],
+            'attention_mask': text_sample['attention_mask'],
+        },
+        output_dir / 'text.onnx',
+        output_name='embedding',
+    )
+    image_sample = processor.image_processor(
+        images=[Image.new('RGB', (64, 64))] * 2,
+        return_tensors='pt',
+    )
+    _export_graph(
+        _ClipImageEncoder(),
+        {'pixel_values': image_sample['pixel_values']},
+        output_dir / 'image.onnx',
+        output_name='embedding',
+    )
+    processor.save_pretrained(output_dir / 'processor')
+    return {
+        'kind': 'clip',
+        'graphs': ['text', 'image'],
+        'input_names': ['input_ids', 'attention_mask'],
+        'max_seq_length': model.config.text_config.max_position_embeddings,
+    }
+
+
+def export_onnx_encoder(model_name: str, output_dir: str | Path) -> Path:
+    """Export a SentenceTransformers checkpoint to ONNX graphs.
+
+    Text models get pooling and normalization baked into the graph; CLIP
+    models get separate text and image towers. The export is written to a
+    temporary directory and renamed into place, so concurrent workers
+    sharing ``output_dir`` never observe a partial export.
+
+    Args:
+        model_name (str): SentenceTransformers model name or local path.
+        output_dir (str | Path): Directory receiving the exported files.
+
+    Returns:
+        Path: ``output_dir`` containing ``encoder.json`` and ``*.onnx``.
+    """
+    from transformers import AutoConfig
+
+    output_dir = Path(output_dir)
+    if (output_dir / 'encoder.json').exists():
+        return output_dir
+
+    source = resolve_model_source(model_name)
+    layout = _read_sentence_transformer_layout(source)
+    config = AutoConfig.from_pretrained(source, subfolder=layout['subfolder'])
+    staging_dir = output_dir.with_name(f'{output_dir.name}.tmp-{os.getpid()}')
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    staging_dir.mkdir(parents=True)
+    try:
+        if config.model_type == 'clip':
+            metadata = _export_clip_encoder(source, layout, staging_dir)
+        else:
+            metadata = _export_text_encoder(source, layout, staging_dir)
+        metadata['source'] = model_name
+        (staging_dir / 'encoder.json').write_text(
+            json.dumps(metadata, indent=2), encoding='utf-8'
+        )
+        try:
+            staging_dir.rename(output_dir)
+        except OSError:
+            # Another worker finished the same export first.
+            if not (output_dir / 'encoder.json').exists():
+                raise
+    finally:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+    return output_dir
+
+
+def encoder_variant(*, quantize: bool) -> str:
+    """Return the export settings that change vectors, e.g. ``opset17-int8``.
+
+    Vectors from different variants of one checkpoint are not
+    interchangeable, so the variant is part of the embedding store key.
+    """
+    return f'opset{_OPSET_VERSION}-{"int8" if quantize else "fp32"}'
+
+
+def _quantized_graph(graph_path: Path) -> Path:
+    """Return an int8 dynamically quantized copy of ``graph_path``."""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantized_path = graph_path.with_suffix('.int8.onnx')
+    if quantized_path.exists():
+        return quantized_path
+    staging_path = graph_path.with_suffix(f'.int8.tmp-{os.getpid()}.onnx')
+    quantize_dynamic(
+        str(graph_path),
+        str(staging_path),
+        weight_type=QuantType.QInt8,
+        op_types_to_quantize=_QUANTIZED_OPS,
+    )
+    os.replace(staging_path, quantized_path)
+    return quantized_path
+
+
+class OnnxEncoder:
+    """onnxruntime sessions plus preprocessing for one exported model."""
+
+    def __init__(
+        self,
+        export_dir: Path,
+        *,
+        quantize: bool,
+        intra_op_threads: int,
+        batch_size: int,
+    ) -> None:
+        """Open sessions for every graph listed in ``encoder.json``."""
+        import onnxruntime as ort
+
+        self.metadata = json.loads(
+            (export_dir / 'encoder.json').read_text(encoding='utf-8')
+        )
+        self.batch_size = batch_size
+        options = ort.SessionOptions()
+        options.graph_optimization_level = (
+            ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        )
+        if intra_op_threads > 0:
+            options.intra_op_num_threads = intra_op_threads
+        self._sessions = {}
+        for graph in self.metadata['graphs']:
+            graph_path = export_dir / f'{graph}.onnx'
+            if quantize:
+                graph_path = _quantized_graph(graph_path)
+            self._sessions[graph] = ort.InferenceSession(
+                str(graph_path),
+                sess_options=options,
+                providers=['CPUExecutionProvider'],
+            )
+
+        if self.metadata['kind'] == 'clip':
+            from transformers import CLIPProcessor
+
+            processor = CLIPProcessor.from_pretrained(export_dir / 'processor')
+            self._tokenizer = processor.tokenizer
+            self._image_processor = processor.image_processor
+        else:
+            from transformers import AutoTokenizer
+
+            self._tokenizer = AutoTokenizer.from_pretrained(
+                export_dir / 'tokenizer'
+            )
+            self._image_processor = None
+
+    def _run(self, graph: str, inputs: dict[str, np.ndarray]) -> np.ndarray:
+        return self._sessions[graph].run(None, inputs)[0]
+
+    def encode_texts(self, texts: list[str]) -> np.ndarray:
+        """Encode texts in batches of ``batch_size``."""
+        max_length = self.metadata.get('max_seq_length')
+        chunks = []
+        for start in range(0, len(texts), self.batch_size):
+            encoded = self._tokenizer(
+                texts[start : start + self.batch_size],
+                padding=True,
+                truncation=True,
+                max_length=max_length,
+                return_tensors='np',
+            )
+            chunks.append(
+                self._run(
+                    'text',
+                    {
+                        name: encoded[name].astype(np.int64)
+                        for name in self.metadata['input_names']
+                    },
+                )
+            )
+        return np.concatenate(chunks, axis=0)
+
+    def encode_images(self, images: list[Image.Image]) -> np.ndarray:
+        """Encode RGB images in batches of ``batch_size``."""
+        if self._image_processor is None:
+            raise ValueError(
+                f'ONNX model {self.metadata["source"]} has no image encoder'
+            )
+        chunks = []
+        for start in range(0, len(images), self.batch_size):
+            pixel_values = self._image_processor(
+                images=[
+                    image.convert('RGB')
+                    for image in images[start : start + self.batch_size]
+                ],
+                return_tensors='np',
+            )['pixel_values']
+            chunks.append(
+                self._run(
+                    'image', {'pixel_values': pixel_values.astype(np.float32)}
+                )
+            )
+        return np.concatenate(chunks, axis=0)
+
+
+class OnnxEmbeddingProvider(EmbeddingProvider):
+    """onnxruntime provider compatible with SentenceTransformerProvider.
+
+    Models are exported from the same SentenceTransformers checkpoints on
+    first use and cached under ``model_dir``, so vectors stay in the space
+    of existing collections. ``quantize`` applies dynamic int8 weight
+    quantization to MatMul/Gemm nodes for faster CPU inference.
+    """
+
+    def __init__(
+        self,
+        text_model_name: str = 'all-MiniLM-L6-v2',
+        image_model_name: str = 'clip-ViT-B-32',
+        *,
+        model_dir: str | Path = 'data/onnx_models',
+        quantize: bool = True,
+        intra_op_threads: int = 0,
+        batch_size: int = 32,
+    ) -> None:
+        """Configure ONNX export location and runtime options.
+
+        Args:
+            text_model_name (str): SentenceTransformers model name for text.
+            image_model_name (str): SentenceTransformers CLIP-like model.
+            model_dir (str | Path): Cache directory for exported graphs.
+            quantize (bool): Run int8 dynamically quantized graphs.
+            intra_op_threads (int): onnxruntime intra-op threads, 0 = auto.
+            batch_size (int): Max items per inference call.
+        """
+        self.text_model_name = text_model_name
+        self.image_model_name = image_model_name
+        self.model_dir = Path(model_dir)
+        self.quantize = quantize
+        self.intra_op_threads = max(0, intra_op_threads)
+        self.batch_size = max(1, batch_size)
+        self._encoders: dict[str, OnnxEncoder] = {}
+        self._encoders_lock = threading.Lock()
+
+    @property
+    def _text_encoder(self) -> OnnxEncoder:
+        return self._load_encoder('text', self.text_model_name)
+
+    @property
+    def _image_encoder(self) -> OnnxEncoder:
+        return self._load_encoder('image', self.image_model_name)
+
+    def _load_encoder(self, slot: str, model_name: str) -> OnnxEncoder:
+        """Export (if needed) and open a model once per slot."""
+        encoder = self._encoders.get(slot)
+        if encoder is not None:
+            return encoder
+        with self._encoders_lock:
+            encoder = self._encoders.get(slot)
+            if encoder is None:
+                started = time.perf_counter()
+                export_dir = export_onnx_encoder(
+                    model_name,
+                    self.model_dir / re.sub(r'[^\w.-]+', '__', model_name),
+                )
+                encoder = OnnxEncoder(
+                    export_dir,
+                    quantize=self.quantize,
+                    intra_op_threads=self.intra_op_threads,
+                    batch_size=self.batch_size,
+                )
+                duration = time.perf_counter() - started
+                observe_embedding_model_load(
+                    model=model_name,
+                    duration_seconds=duration,
+                )
+                logger.info(
+                    'Loaded ONNX embedding model %s (int8=%s) in %.2fs',
+                    model_name,
+                    self.quantize,
+                    duration,
+                )
+                self._encoders[slot] = encoder
+        return encoder
+
+    def warmup(self, modalities: Iterable[str] | None = None) -> None:
+        """Export and open sessions needed for modalities."""
+        for slot in _model_slots(modalities):
+            if slot == 'text':
+                _ = self._text_encoder
+            else:
+                _ = self._image_encoder
+
+    def encode_text(self, text: str) -> list[float]:
+        """Encode a text string into a dense vector."""
+        return self.encode_texts([text])[0]
+
+    def encode_texts(self, texts: list[str]) -> list[list[float]]:
+        """Encode many text strings with batched inference."""
+        if not texts:
+            return []
+        return self._text_encoder.encode_texts(texts).tolist()
+
+    def encode_multimodal_text(self, text: str) -> list[float]:
+        """Encode text in CLIP-compatible space for image/video retrieval."""
+        return self.encode_multimodal_texts([text])[0]
+
+    def encode_multimodal_texts(self, texts: list[str]) -> list[list[float]]:
+        """Encode many texts in CLIP-compatible space in batches."""
+        if not texts:
+            return []
+        return self._image_encoder.encode_texts(texts).tolist()
+
+    def encode_image(self, image: Image.Image) -> list[float]:
+        """Encode a PIL image into a dense vector."""
+        return self.encode_images([image])[0]
+
+    def encode_images(self, images: list[Image.Image]) -> list[list[float]]:
+        """Encode many PIL images with batched inference."""
+        if not images:
+            return []
+        return self._image_encoder.encode_images(images).tolist()
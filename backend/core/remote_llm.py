@@ -0,0 +1,248 @@
+from __future__ import annotations
+
+import base64
+import io
+import logging
+import os
+import time
+from threading import Lock
+from typing import Any, Iterator
+
+import httpx
+import openai
+from PIL import Image
+
+from backend.core.llm import BaseLLMBackend, _with_context
+from backend.core.vision_inputs import load_image
+from backend.monitoring.metrics import (
+    observe_llm_generation,
+    observe_llm_remote_request,
+)
+from backend.utils.config_handler import Config
+
+logger = logging.getLogger(__name__)
+
+_KEEPALIVE_EXPIRY_SECONDS = 30.0
+_UNAVAILABLE_ERRORS = (
+    openai.APIConnectionError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+)
+
+
+class RemoteLLMUnavailableError(RuntimeError):
+    """Raised when an LLM server stays unreachable or overloaded."""
+
+    error_code = 'llm_remote_unavailable'
+
+
+_HTTP_CLIENTS: dict[str, httpx.Client] = {}
+_HTTP_CLIENTS_LOCK = Lock()
+
+
+def _pooled_http_client(base_url: str) -> httpx.Client:
+    """Return the keep-alive client shared by all models of one server."""
+    with _HTTP_CLIENTS_LOCK:
+        client = _HTTP_CLIENTS.get(base_url)
+        if client is None or client.is_closed:
+            limit = max(1, Config.llm_remote_max_connections)
+            client = httpx.Client(
+                limits=httpx.Limits(
+                    max_connections=limit,
+                    max_keepalive_connections=limit,
+                    keepalive_expiry=_KEEPALIVE_EXPIRY_SECONDS,
+                ),
+            )
+            _HTTP_CLIENTS[base_url] = client
+        return client
+
+
+def close_remote_http_clients() -> None:
+    """Close pooled connections to LLM servers (shutdown, tests)."""
+    with _HTTP_CLIENTS_LOCK:
+        clients = list(_HTTP_CLIENTS.values())
+        _HTTP_CLIENTS.clear()
+    for client in clients:
+        client.close()
+
+
+def remote_llm_route(model_name: str) -> dict[str, Any] | None:
+    """Return the server settings a model is routed to, if any."""
+    routes = Config.llm_remote_routes
+    return routes.get(model_name) or routes.get('*')
+
+
+def _image_url(image: str | Image.Image) -> str:
+    """Pass URLs through; inline local files and PIL images as data URIs.
+
+    Inlined images are downscaled to the pixel budget first, which also
+    keeps request bodies small.
+    """
+    if isinstance(image, str) and image.startswith(
+        ('http://', 'https://', 'data:')
+    ):
+        return image
+    buffer = io.BytesIO()
+    load_image(image).save(buffer, format='JPEG', quality=90)
+    encoded = base64.b64encode(buffer.getvalue()).decode('ascii')
+    return f'data:image/jpeg;base64,{encoded}'
+
+
+class OpenAICompatibleBackend(BaseLLMBackend):
+    """Backend that calls an OpenAI-compatible chat completions server.
+
+    Nothing is loaded in-process: generation runs on a vLLM, llama.cpp or
+    TGI server, so web replicas and GPU servers scale independently.
+    """
+
+    def __init__(self, model_name: str, route: dict[str, Any]) -> None:
+        """Create a client for ``model_name`` using its route settings."""
+        self.model_name = model_name
+        self.served_model = route.get('model') or model_name
+        self.supports_image = bool(route.get('supports_image', False))
+        self._tokenizer_name = route.get('tokenizer')
+        self._tokenizer = None
+        self.client = openai.OpenAI(
+            base_url=route['base_url'],
+            api_key=os.getenv(route.get('api_key_env') or '') or 'EMPTY',
+            timeout=float(route.get('timeout_seconds', 60.0)),
+            max_retries=int(route.get('max_retries', 2)),
+            http_client=_pooled_http_client(route['base_url']),
+        )
+        logger.info(
+            'Model %s routed to %s (%s)',
+            model_name,
+            route['base_url'],
+            self.served_model,
+        )
+
+    def build_messages(
+        self, prompt: str, image: str | Image.Image | None = None
+    ) -> list[dict[str, Any]]:
+        """Build chat messages with an optional ``image_url`` part."""
+        if image is None:
+            return [{'role': 'user', 'content': prompt}]
+        if not self.supports_image:
+            raise ValueError(
+                f'Model "{self.model_name}" does not support image input'
+            )
+        return [
+            {
+                'role': 'user',
+                'content': [
+                    {
+                        'type': 'image_url',
+                        'image_url': {'url': _image_url(image)},
+                    },
+                    {'type': 'text', 'text': prompt},
+                ],
+            }
+        ]
+
+    def context_tokenizer(self):
+        """Load the configured tokenizer (only) for context budgeting."""
+        if self._tokenizer is None and self._tokenizer_name:
+            from transformers import AutoTokenizer
+
+            self._tokenizer = AutoTokenizer.from_pretrained(
+                self._tokenizer_name
+            )
+        return self._tokenizer
+
+    def memory_bytes(self) -> int:
+        """Remote models hold no local weights."""
+        return 0
+
+    def _create(self, messages: list[dict[str, Any]], *, stream: bool):
+        try:
+            return self.client.chat.completions.create(
+                model=self.served_model,
+                messages=messages,
+                max_tokens=Config.llm_max_new_tokens,
+                temperature=0,
+                stream=stream,
+            )
+        except _UNAVAILABLE_ERRORS as exc:
+            observe_llm_remote_request(
+                model=self.model_name, status='unavailable'
+            )
+            raise RemoteLLMUnavailableError(
+                f'LLM server for "{self.model_name}" is unavailable: {exc}'
+            ) from exc
+        except openai.OpenAIError:
+            observe_llm_remote_request(model=self.model_name, status='error')
+            raise
+
+    def generate(
+        self,
+        prompt: str,
+        context: list[dict[str, Any]] | None = None,
+        image: str | Image.Image | None = None,
+    ) -> str:
+        """Return the full completion of one chat request."""
+        messages = self.build_messages(_with_context(prompt, context), image)
+        started = time.perf_counter()
+        response = self._create(messages, stream=False)
+        observe_llm_remote_request(model=self.model_name, status='ok')
+        usage = getattr(response, 'usage', None)
+        observe_llm_generation(
+            model=self.model_name,
+            mode='blocking',
+            generated_tokens=int(getattr(usage, 'completion_tokens', 0) or 0),
+            duration_seconds=time.perf_counter() - started,
+        )
+        if not response.choices:
+            return ''
+        return (response.choices[0].message.content or '').strip()
+
+    def stream(
+        self,
+        prompt: str,
+        context: list[dict[str, Any]] | None = None,
+        image: str | Image.Image | None = None,
+    ) -> Iterator[str]:
+        """Yield completion deltas; closing early drops the connection.
+
+        Servers report no per-token counts while streaming, so each content
+        delta counts as one token unless the final chunk carries usage.
+        """
+        messages = self.build_messages(_with_context(prompt, context), image)
+        started = time.perf_counter()
+        first_token_at: float | None = None
+        deltas = 0
+        usage_tokens: int | None = None
+        status = 'cancelled'
+        stream = self._create(messages, stream=True)
+        try:
+            for chunk in stream:
+                usage = getattr(chunk, 'usage', None)
+                if usage is not None and usage.completion_tokens:
+                    usage_tokens = int(usage.completion_tokens)
+                for choice in chunk.choices:
+                    text = choice.delta.content if choice.delta else None
+                    if not text:
+                        continue
+                    if first_token_at is None:
+                        first_token_at = time.perf_counter()
+                    deltas += 1
+                    yield text
+            status = 'ok'
+        except (openai.OpenAIError, httpx.HTTPError):
+            status = 'error'
+            raise
+        finally:
+            stream.close()
+            observe_llm_remote_request(model=self.model_name, status=status)
+        observe_llm_generation(
+            model=self.model_name,
+            mode='stream',
+            generated_tokens=usage_tokens
+            if usage_tokens is not None
+            else deltas,
+            duration_seconds=time.perf_counter() - started,
+            time_to_first_token_seconds=(
+                first_token_at - started
+                if first_token_at is not None
+                else None
+            ),
+        )
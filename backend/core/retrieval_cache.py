@@ -0,0 +1,290 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Iterable, Sequence
+
+import numpy as np
+
+from backend.monitoring.metrics import observe_retrieval_cache_event
+from backend.utils.config_handler import Config
+
+logger = logging.getLogger(__name__)
+
+_GENERATION_PREFIX = 'rag_kb_generation:'
+_ENTRY_PREFIX = 'rag_retrieval:'
+
+
+class _MemoryBackend:
+    """In-process LRU store with TTL and per-owner generation counters."""
+
+    name = 'memory'
+
+    def __init__(self, *, max_entries: int) -> None:
+        self.max_entries = max(0, max_entries)
+        self._lock = Lock()
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._generations: dict[str, int] = {}
+
+    def get_generation(self, owner_id: str) -> int:
+        with self._lock:
+            return self._generations.get(owner_id, 0)
+
+    def bump_generation(self, owner_id: str) -> None:
+        with self._lock:
+            self._generations[owner_id] = (
+                self._generations.get(owner_id, 0) + 1
+            )
+
+    def get(self, key: str) -> str | None:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= now:
+                del self._entries[key]
+                observe_retrieval_cache_event(self.name, 'eviction')
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, value: str, ttl_seconds: float) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                observe_retrieval_cache_event(self.name, 'eviction')
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._generations.clear()
+
+
+class _RedisBackend:
+    """Redis store shared by all web/worker processes.
+
+    Generation counters live in Redis too, so an ingest finished by the
+    worker process invalidates entries cached by the web process.
+    """
+
+    name = 'redis'
+
+    def __init__(self, client) -> None:
+        self._client = client
+
+    def get_generation(self, owner_id: str) -> int:
+        raw = self._client.get(f'{_GENERATION_PREFIX}{owner_id}')
+        return int(raw) if raw is not None else 0
+
+    def bump_generation(self, owner_id: str) -> None:
+        self._client.incr(f'{_GENERATION_PREFIX}{owner_id}')
+
+    def get(self, key: str) -> str | None:
+        raw = self._client.get(f'{_ENTRY_PREFIX}{key}')
+        if raw is None:
+            return None
+        return raw.decode('utf-8') if isinstance(raw, bytes) else str(raw)
+
+    def set(self, key: str, value: str, ttl_seconds: float) -> None:
+        self._client.set(
+            f'{_ENTRY_PREFIX}{key}',
+            value,
+            ex=max(1, int(ttl_seconds)),
+        )
+
+    def clear(self) -> None:
+        # Entries expire on their own; bumping generations is the
+        # supported way to invalidate a shared cache.
+        return None
+
+
+def _vector_fingerprint(vector: Sequence[float] | None) -> str:
+    if vector is None:
+        return '-'
+    data = np.asarray(vector, dtype=np.float32).tobytes()
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _sorted_ids(values: Iterable[str] | None) -> list[str]:
+    return sorted({str(value) for value in values or []})
+
+
+class RetrievalCache:
+    """Cache of retrieval results keyed by query vectors and filters.
+
+    Each owner (user) has a KB generation counter that is part of the
+    key. Ingest, delete and move operations bump it, which makes all
+    entries cached for the previous generation unreachable, so stale
+    results are never served; they simply age out by TTL or LRU.
+    The generation is read before searching, so a result computed while
+    the KB changed is stored under the old generation and never reused.
+    """
+
+    def __init__(self, backend, *, ttl_seconds: float) -> None:
+        """Initialize the cache on top of a memory or Redis backend."""
+        self.backend = backend
+        self.ttl_seconds = max(0.0, ttl_seconds)
+        self._stats_lock = Lock()
+        self._lookups = 0
+        self._hits = 0
+
+    @property
+    def enabled(self) -> bool:
+        """Return whether caching is turned on."""
+        return (
+            self.ttl_seconds > 0
+            and getattr(self.backend, 'max_entries', 1) > 0
+        )
+
+    def make_key(
+        self,
+        *,
+        user_id: str | None,
+        query_vectors: Sequence[Sequence[float] | None],
+        top_k: int,
+        folder_scopes: Iterable[str] | None = None,
+        file_ids: Iterable[str] | None = None,
+        exclude_file_ids: Iterable[str] | None = None,
+    ) -> str | None:
+        """Return a cache key, or None when the query must not be cached.
+
+        Queries without a user id are not scoped to one KB, so no single
+        generation counter covers them and they are never cached.
+        """
+        if not self.enabled or not user_id:
+            return None
+        try:
+            generation = self.backend.get_generation(user_id)
+        except Exception:
+            logger.warning('Retrieval cache generation lookup failed')
+            observe_retrieval_cache_event(self.backend.name, 'error')
+            return None
+        raw = json.dumps(
+            [
+                user_id,
+                generation,
+                [_vector_fingerprint(vector) for vector in query_vectors],
+                int(top_k),
+                _sorted_ids(folder_scopes),
+                _sorted_ids(file_ids),
+                _sorted_ids(exclude_file_ids),
+            ]
+        )
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> list[dict[str, Any]] | None:
+        """Return cached docs or None on miss."""
+        try:
+            raw = self.backend.get(key)
+        except Exception:
+            logger.warning('Retrieval cache read failed')
+            observe_retrieval_cache_event(self.backend.name, 'error')
+            return None
+        with self._stats_lock:
+            self._lookups += 1
+            if raw is not None:
+                self._hits += 1
+            hit_ratio = self._hits / self._lookups
+        observe_retrieval_cache_event(
+            self.backend.name,
+            'hit' if raw is not None else 'miss',
+            hit_ratio=hit_ratio,
+        )
+        return json.loads(raw) if raw is not None else None
+
+    def put(self, key: str, docs: list[dict[str, Any]]) -> None:
+        """Store retrieved docs for the key's generation."""
+        try:
+            self.backend.set(key, json.dumps(docs), self.ttl_seconds)
+        except Exception:
+            logger.warning('Retrieval cache write failed')
+            observe_retrieval_cache_event(self.backend.name, 'error')
+            return
+        observe_retrieval_cache_event(self.backend.name, 'store')
+
+    def bump_generation(self, owner_id: str | None) -> None:
+        """Invalidate everything cached for an owner's knowledge base."""
+        if not owner_id:
+            return
+        try:
+            self.backend.bump_generation(owner_id)
+        except Exception:
+            logger.warning(
+                'Retrieval cache invalidation failed for %s; entries '
+                'expire within %.0fs',
+                owner_id,
+                self.ttl_seconds,
+            )
+            observe_retrieval_cache_event(self.backend.name, 'error')
+            return
+        observe_retrieval_cache_event(self.backend.name, 'invalidation')
+
+    def clear(self) -> None:
+        """Drop local entries and statistics."""
+        self.backend.clear()
+        with self._stats_lock:
+            self._lookups = 0
+            self._hits = 0
+
+
+def _build_redis_client():
+    redis_url = (os.getenv('REDIS_URL') or '').strip()
+    if not redis_url:
+        return None
+    try:
+        import redis  # type: ignore
+
+        return redis.Redis.from_url(redis_url)
+    except Exception:
+        return None
+
+
+def _build_backend():
+    backend = Config.rag_retrieval_cache_backend
+    if backend == 'memory':
+        return _MemoryBackend(
+            max_entries=Config.rag_retrieval_cache_max_entries
+        )
+    client = _build_redis_client()
+    if client is not None:
+        return _RedisBackend(client)
+    # Generation counters must be shared: with per-process counters an
+    # ingest or delete done by rag-worker never invalidates rag-web entries.
+    if backend == 'redis':
+        logger.warning(
+            'RAG_RETRIEVAL_CACHE_BACKEND=redis but Redis is not available; '
+            'retrieval cache is disabled'
+        )
+    else:
+        logger.info('REDIS_URL is not set; retrieval cache is disabled')
+    return _MemoryBackend(max_entries=0)
+
+
+_RETRIEVAL_CACHE: RetrievalCache | None = None
+_RETRIEVAL_CACHE_LOCK = Lock()
+
+
+def get_retrieval_cache() -> RetrievalCache:
+    """Return the process-wide retrieval cache."""
+    global _RETRIEVAL_CACHE
+    if _RETRIEVAL_CACHE is None:
+        with _RETRIEVAL_CACHE_LOCK:
+            if _RETRIEVAL_CACHE is None:
+                _RETRIEVAL_CACHE = RetrievalCache(
+                    _build_backend(),
+                    ttl_seconds=Config.rag_retrieval_cache_ttl_seconds,
+                )
+    return _RETRIEVAL_CACHE
+
+
+def bump_kb_generation(owner_id: str | None) -> None:
+    """Mark an owner's knowledge base as changed."""
+    get_retrieval_cache().bump_generation(owner_id)
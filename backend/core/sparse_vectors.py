@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import re
+import zlib
+from collections import Counter
+
+from qdrant_client.models import SparseVector
+
+from backend.utils.config_handler import Config
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(text: str) -> list[str]:
+    """Split text into lowercase word tokens (any script).
+
+    Single letters are dropped as noise; single digits are kept because
+    they matter in keyword queries such as versions or section numbers.
+    """
+    return [
+        token
+        for token in _TOKEN_RE.findall(text.lower())
+        if len(token) > 1 or token.isdigit()
+    ]
+
+
+def term_index(term: str) -> int:
+    """Map a term to a stable sparse dimension without a vocabulary."""
+    return zlib.crc32(term.encode('utf-8'))
+
+
+def _to_sparse(weights: dict[int, float]) -> SparseVector:
+    indices = sorted(weights)
+    return SparseVector(
+        indices=indices, values=[weights[idx] for idx in indices]
+    )
+
+
+def bm25_document_vector(
+    text: str,
+    *,
+    k1: float | None = None,
+    b: float | None = None,
+    avg_doc_length: float | None = None,
+) -> SparseVector:
+    """Encode a document chunk as BM25 term-frequency weights.
+
+    Only the TF and length-normalization part of BM25 is computed here;
+    the collection's sparse vector uses ``Modifier.IDF``, so Qdrant
+    applies IDF from its own corpus statistics at query time.
+
+    Args:
+        text (str): Chunk text.
+        k1 (float | None): TF saturation. Defaults to ``Config.rag_bm25_k1``.
+        b (float | None): Length normalization. Defaults to
+            ``Config.rag_bm25_b``.
+        avg_doc_length (float | None): Average chunk length in tokens.
+            Defaults to ``Config.rag_bm25_avg_doc_length``.
+
+    Returns:
+        SparseVector: Sparse document vector (empty for empty text).
+    """
+    k1 = Config.rag_bm25_k1 if k1 is None else k1
+    b = Config.rag_bm25_b if b is None else b
+    avg_doc_length = (
+        Config.rag_bm25_avg_doc_length
+        if avg_doc_length is None
+        else avg_doc_length
+    )
+    tokens = tokenize(text)
+    norm = k1 * (1 - b + b * len(tokens) / max(avg_doc_length, 1.0))
+    weights: dict[int, float] = {}
+    for term, tf in Counter(tokens).items():
+        idx = term_index(term)
+        weights[idx] = weights.get(idx, 0.0) + tf * (k1 + 1) / (tf + norm)
+    return _to_sparse(weights)
+
+
+def bm25_query_vector(text: str) -> SparseVector:
+    """Encode a query as unit weights over its distinct terms."""
+    return _to_sparse({term_index(term): 1.0 for term in set(tokenize(text))})
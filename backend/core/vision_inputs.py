@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+import hashlib
+import io
+import math
+import os
+import stat
+from collections import OrderedDict
+from threading import Lock
+from typing import Any
+
+import requests
+from PIL import Image, ImageOps
+from requests.adapters import HTTPAdapter
+
+from backend.monitoring.metrics import observe_llm_image_cache
+from backend.utils.config_handler import Config
+
+DEFAULT_PATCH_FACTOR = 28
+_DOWNLOAD_CHUNK_BYTES = 64 * 1024
+
+
+class ImageTooLargeError(ValueError):
+    """Raised when an image exceeds ``Config.llm_image_max_bytes``."""
+
+
+def fit_to_pixel_budget(
+    width: int,
+    height: int,
+    *,
+    factor: int,
+    min_pixels: int,
+    max_pixels: int,
+) -> tuple[int, int]:
+    """Return ``(width, height)`` aligned to ``factor`` within the budget.
+
+    Sides are rounded to multiples of ``factor`` (patch size times merge
+    size) and scaled, keeping the aspect ratio, so the area stays between
+    ``min_pixels`` and ``max_pixels``. A budget of 0 disables that bound.
+    """
+    factor = max(1, factor)
+    new_height = max(factor, round(height / factor) * factor)
+    new_width = max(factor, round(width / factor) * factor)
+    if max_pixels > 0 and new_height * new_width > max_pixels:
+        beta = math.sqrt(height * width / max_pixels)
+        new_height = max(factor, math.floor(height / beta / factor) * factor)
+        new_width = max(factor, math.floor(width / beta / factor) * factor)
+    elif min_pixels > 0 and new_height * new_width < min_pixels:
+        beta = math.sqrt(min_pixels / (height * width))
+        new_height = math.ceil(height * beta / factor) * factor
+        new_width = math.ceil(width * beta / factor) * factor
+    return new_width, new_height
+
+
+def _target_size(image: Image.Image, factor: int) -> tuple[int, int]:
+    return fit_to_pixel_budget(
+        *image.size,
+        factor=factor,
+        min_pixels=Config.llm_image_min_pixels,
+        max_pixels=Config.llm_image_max_pixels,
+    )
+
+
+def prepare_image(image: Image.Image, *, factor: int) -> Image.Image:
+    """Apply EXIF rotation, convert to RGB and resize to the pixel budget."""
+    image = ImageOps.exif_transpose(image).convert('RGB')
+    size = _target_size(image, factor)
+    if size != image.size:
+        image = image.resize(size, Image.Resampling.BICUBIC)
+    return image
+
+
+def _decode(data: bytes, factor: int) -> Image.Image:
+    image = Image.open(io.BytesIO(data))
+    # JPEG can decode at 1/2, 1/4 or 1/8 scale directly, which skips most of
+    # the work for phone photos far above the budget.
+    image.draft('RGB', _target_size(image, factor))
+    return prepare_image(image, factor=factor)
+
+
+class _PreparedImageCache:
+    """LRU of prepared images keyed by (source, content hash, factor)."""
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max(0, max_entries)
+        self._lock = Lock()
+        self._images: OrderedDict[tuple[str, str, int], Image.Image] = (
+            OrderedDict()
+        )
+
+    def get(self, key: tuple[str, str, int]) -> Image.Image | None:
+        with self._lock:
+            image = self._images.get(key)
+            if image is not None:
+                self._images.move_to_end(key)
+            return image
+
+    def put(self, key: tuple[str, str, int], image: Image.Image) -> None:
+        if not self.max_entries:
+            return
+        with self._lock:
+            self._images[key] = image
+            self._images.move_to_end(key)
+            while len(self._images) > self.max_entries:
+                self._images.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._images.clear()
+
+
+_IMAGES = _PreparedImageCache(Config.llm_image_cache_size)
+
+
+def clear_image_cache() -> None:
+    """Drop prepared images (tests, budget changes)."""
+    _IMAGES.clear()
+
+
+_SESSION: requests.Session | None = None
+_SESSION_LOCK = Lock()
+
+
+def _http_session() -> requests.Session:
+    """Return the keep-alive session used to download remote images."""
+    global _SESSION
+    if _SESSION is None:
+        with _SESSION_LOCK:
+            if _SESSION is None:
+                pool_size = max(1, Config.llm_image_http_pool_size)
+                adapter = HTTPAdapter(
+                    pool_connections=pool_size,
+                    pool_maxsize=pool_size,
+                    max_retries=1,
+                )
+                session = requests.Session()
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                _SESSION = session
+    return _SESSION
+
+
+def _download(url: str) -> bytes:
+    """Read a remote image, rejecting it once it exceeds the size cap."""
+    limit = Config.llm_image_max_bytes
+    with _http_session().get(
+        url, stream=True, timeout=Config.llm_image_download_timeout_seconds
+    ) as response:
+        response.raise_for_status()
+        declared = int(response.headers.get('Content-Length') or 0)
+        if limit and declared > limit:
+            raise ImageTooLargeError(
+                f'Image {url} is {declared} bytes, limit is {limit}'
+            )
+        data = bytearray()
+        for chunk in response.iter_content(_DOWNLOAD_CHUNK_BYTES):
+            data.extend(chunk)
+            if limit and len(data) > limit:
+                raise ImageTooLargeError(
+                    f'Image {url} is larger than {limit} bytes'
+                )
+    return bytes(data)
+
+
+def _read_file(path: str) -> bytes:
+    """Read a local image, applying the same size cap as downloads."""
+    limit = Config.llm_image_max_bytes
+    with open(path, 'rb') as handle:
+        info = os.fstat(handle.fileno())
+        # Devices and pipes (e.g. /dev/zero) have no size to check upfront.
+        if not stat.S_ISREG(info.st_mode):
+            raise ValueError(f'Image {path} is not a regular file')
+        if limit and info.st_size > limit:
+            raise ImageTooLargeError(
+                f'Image {path} is {info.st_size} bytes, limit is {limit}'
+            )
+        data = handle.read(limit + 1) if limit else handle.read()
+    if limit and len(data) > limit:
+        raise ImageTooLargeError(f'Image {path} is larger than {limit} bytes')
+    return data
+
+
+def load_image(
+    source: str | Image.Image, *, factor: int = DEFAULT_PATCH_FACTOR
+) -> Image.Image:
+    """Return an RGB image resized to the pixel budget for a vision model.
+
+    Paths and URLs are read every time, but decoding and resizing are
+    skipped when the same source with the same content was prepared
+    before. Returned images are shared and must not be modified.
+    """
+    if isinstance(source, Image.Image):
+        return prepare_image(source, factor=factor)
+    if source.startswith(('http://', 'https://')):
+        data = _download(source)
+    else:
+        data = _read_file(source)
+    key = (source, hashlib.blake2b(data, digest_size=16).hexdigest(), factor)
+    image = _IMAGES.get(key)
+    if image is not None:
+        observe_llm_image_cache(result='hit')
+        return image
+    observe_llm_image_cache(result='miss')
+    image = _decode(data, factor)
+    _IMAGES.put(key, image)
+    return image
+
+
+def patch_factor(processor: Any) -> int:
+    """Return the side alignment (patch size x merge size) of a processor."""
+    image_processor = getattr(processor, 'image_processor', None)
+    patch_size = getattr(image_processor, 'patch_size', None)
+    if not patch_size:
+        return DEFAULT_PATCH_FACTOR
+    return int(patch_size) * int(
+        getattr(image_processor, 'merge_size', 1) or 1
+    )
+
+
+def count_visual_tokens(inputs: Any, config: Any) -> int:
+    """Count image placeholder tokens in processed model inputs."""
+    token_id = getattr(config, 'image_token_id', None)
+    if token_id is None:
+        token_id = getattr(config, 'image_token_index', None)
+    input_ids = inputs.get('input_ids') if hasattr(inputs, 'get') else None
+    if token_id is None or input_ids is None:
+        return 0
+    return int((input_ids == token_id).sum())
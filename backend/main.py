@@ -13,10 +13,20 @@ from fastapi.responses import JSONResponse, Response
 from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 
 from backend.api.endpoints import router
+from backend.core.embedding_providers import warmup_providers
+from backend.core.llm import GenerationQueueFullError, preload_llm_models
+from backend.core.model_residency import ModelBudgetExceededError
+from backend.core.multimodal_rag import SearchCapacityError
+from backend.core.remote_llm import (
+    RemoteLLMUnavailableError,
+    close_remote_http_clients,
+)
 from backend.monitoring.metrics import observe_http_request
 from backend.services.health_checks import check_dependencies
 from backend.services.ingest_poller import IngestPoller
 from backend.utils.log_config import setup_logging
+from backend.utils.qdrant_clients import close_qdrant_clients
+from backend.utils.qdrant_collections import prime_collection_registry
 
 setup_logging()
 logger = logging.getLogger(__name__)
@@ -53,25 +63,25 @@ def _format_validation_errors(
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Start and stop background services tied to app lifecycle."""
+    await asyncio.to_thread(warmup_providers)
+    await asyncio.to_thread(prime_collection_registry)
+    preload_llm_models()
     poller_enabled = os.getenv(
         'INGEST_POLLER_ENABLED', 'false'
     ).strip().lower() not in {'0', 'false', 'no', 'off'}
-    if not poller_enabled:
-        yield
-        return
-
-    interval = int(os.getenv('INGEST_POLLER_INTERVAL_SECONDS', '5'))
-    batch_size = int(os.getenv('INGEST_POLLER_BATCH_SIZE', '10'))
-    stale_seconds = int(os.getenv('INGEST_POLLER_STALE_SECONDS', '300'))
-    max_concurrency = int(os.getenv('INGEST_WORKER_MAX_CONCURRENCY', '4'))
-    poller = IngestPoller(
-        interval_seconds=max(1, interval),
-        batch_size=max(1, batch_size),
-        stale_seconds=max(30, stale_seconds),
-        max_concurrency=max(1, max_concurrency),
-    )
-    app.state.ingest_poller = poller
-    app.state.ingest_poller_task = asyncio.create_task(poller.run())
+    if poller_enabled:
+        interval = int(os.getenv('INGEST_POLLER_INTERVAL_SECONDS', '5'))
+        batch_size = int(os.getenv('INGEST_POLLER_BATCH_SIZE', '10'))
+        stale_seconds = int(os.getenv('INGEST_POLLER_STALE_SECONDS', '300'))
+        max_concurrency = int(os.getenv('INGEST_WORKER_MAX_CONCURRENCY', '4'))
+        poller = IngestPoller(
+            interval_seconds=max(1, interval),
+            batch_size=max(1, batch_size),
+            stale_seconds=max(30, stale_seconds),
+            max_concurrency=max(1, max_concurrency),
+        )
+        app.state.ingest_poller = poller
+        app.state.ingest_poller_task = asyncio.create_task(poller.run())
     try:
         yield
     finally:
@@ -84,6 +94,8 @@ async def lifespan(app: FastAPI):
                 await task
             except Exception:
                 logger.exception('Failed to stop ingest poller cleanly')
+        close_qdrant_clients()
+        close_remote_http_clients()
 
 
 app = FastAPI(title='Multimodal RAG Backend', version='0.1', lifespan=lifespan)
@@ -148,6 +160,45 @@ def value_error_handler(request: Request, exc: ValueError) -> JSONResponse:
     )
 
 
+@app.exception_handler(GenerationQueueFullError)
+@app.exception_handler(ModelBudgetExceededError)
+@app.exception_handler(RemoteLLMUnavailableError)
+def llm_capacity_error_handler(
+    request: Request,
+    exc: (
+        GenerationQueueFullError
+        | ModelBudgetExceededError
+        | RemoteLLMUnavailableError
+    ),
+) -> JSONResponse:
+    """Shed load with 503 when the LLM queue, memory or server is full."""
+    return JSONResponse(
+        status_code=503,
+        content={
+            'detail': 'LLM is busy, retry later',
+            'error_code': exc.error_code,
+            'path': request.url.path,
+        },
+        headers={'Retry-After': '1'},
+    )
+
+
+@app.exception_handler(SearchCapacityError)
+def search_capacity_error_handler(
+    request: Request, exc: SearchCapacityError
+) -> JSONResponse:
+    """Shed load with 503 when every search worker stays busy."""
+    return JSONResponse(
+        status_code=503,
+        content={
+            'detail': 'Search is busy, retry later',
+            'error_code': exc.error_code,
+            'path': request.url.path,
+        },
+        headers={'Retry-After': '1'},
+    )
+
+
 @app.exception_handler(RequestValidationError)
 def request_validation_error_handler(
     request: Request, exc: RequestValidationError
@@ -25,6 +25,32 @@ RAG_QUERY_DURATION_SECONDS = Histogram(
     ['query_type'],
     buckets=(0.05, 0.1, 0.3, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 40.0),
 )
+RAG_SEARCHES_TOTAL = Counter(
+    'rag_searches_total',
+    'Total per-modality vector searches issued by RAG retrieval.',
+    ['modality', 'status'],
+)
+RAG_SEARCH_DURATION_SECONDS = Histogram(
+    'rag_search_duration_seconds',
+    'Per-modality vector search latency during RAG retrieval.',
+    ['modality'],
+    buckets=(0.005, 0.01, 0.03, 0.05, 0.1, 0.3, 0.5, 1.0, 2.0, 5.0, 10.0),
+)
+RAG_RETRIEVAL_CACHE_EVENTS_TOTAL = Counter(
+    'rag_retrieval_cache_events_total',
+    'Retrieval result cache hits, misses, stores, evictions and errors.',
+    ['backend', 'event'],
+)
+RAG_RETRIEVAL_CACHE_HIT_RATIO = Gauge(
+    'rag_retrieval_cache_hit_ratio',
+    'Share of retrieval cache lookups served from cache in this process.',
+    ['backend'],
+)
+KB_FOLDER_TREE_CACHE_EVENTS_TOTAL = Counter(
+    'kb_folder_tree_cache_events_total',
+    'Folder tree cache hits, misses, invalidations and errors.',
+    ['event'],
+)
 RAG_RETRIEVED_DOCS = Histogram(
     'rag_retrieved_docs',
     'Number of retrieved documents per RAG query.',
@@ -32,6 +58,84 @@ RAG_RETRIEVED_DOCS = Histogram(
     buckets=(0, 1, 2, 3, 5, 10, 20, 50),
 )
 
+LLM_GENERATED_TOKENS_TOTAL = Counter(
+    'llm_generated_tokens_total',
+    'Total number of tokens generated by LLM backends.',
+    ['model', 'mode'],
+)
+LLM_TIME_TO_FIRST_TOKEN_SECONDS = Histogram(
+    'llm_time_to_first_token_seconds',
+    'Time from generation start to the first streamed token.',
+    ['model'],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 40.0),
+)
+LLM_TOKENS_PER_SECOND = Histogram(
+    'llm_tokens_per_second',
+    'Decode throughput of one LLM generation.',
+    ['model', 'mode'],
+    buckets=(1, 2, 5, 10, 20, 40, 80, 160, 320, 640),
+)
+LLM_BATCH_OCCUPANCY = Histogram(
+    'llm_batch_occupancy',
+    'Sequences decoded together in one LLM scheduler step.',
+    ['model'],
+    buckets=(1, 2, 3, 4, 6, 8, 12, 16, 32, 64),
+)
+LLM_QUEUE_WAIT_SECONDS = Histogram(
+    'llm_queue_wait_seconds',
+    'Time a prompt waited in the LLM scheduler queue.',
+    ['model'],
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.3, 1.0, 3.0, 10.0, 30.0, 60.0),
+)
+LLM_CONTEXT_TOKENS = Histogram(
+    'llm_context_tokens',
+    'Prompt tokens used by packed retrieval context.',
+    ['model'],
+    buckets=(64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384),
+)
+LLM_CONTEXT_DOCS_TOTAL = Counter(
+    'llm_context_docs_total',
+    'Context docs by packing outcome.',
+    ['outcome'],
+)
+LLM_MODEL_LOAD_SECONDS = Histogram(
+    'llm_model_load_seconds',
+    'Time spent loading an LLM backend into memory.',
+    ['model'],
+    buckets=(1.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0),
+)
+LLM_RESIDENT_MODEL_BYTES = Gauge(
+    'llm_resident_model_bytes',
+    'Measured weight size of LLM backends currently loaded.',
+    ['model'],
+)
+LLM_MODEL_EVICTIONS_TOTAL = Counter(
+    'llm_model_evictions_total',
+    'LLM backends unloaded to stay within the memory budget.',
+    ['model'],
+)
+LLM_SCHEDULER_REJECTIONS_TOTAL = Counter(
+    'llm_scheduler_rejections_total',
+    'Prompts rejected because the LLM scheduler queue was full.',
+    ['model'],
+)
+LLM_REMOTE_REQUESTS_TOTAL = Counter(
+    'llm_remote_requests_total',
+    'Chat completion requests sent to OpenAI-compatible LLM servers.',
+    ['model', 'status'],
+)
+LLM_VISUAL_TOKENS = Histogram(
+    'llm_visual_tokens',
+    'Image tokens in one multimodal LLM prompt.',
+    ['model'],
+    buckets=(64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384),
+)
+LLM_IMAGE_CACHE_TOTAL = Counter(
+    'llm_image_cache_total',
+    'Prepared LLM image inputs by cache result.',
+    ['result'],
+)
+
 EMBEDDING_REQUESTS_TOTAL = Counter(
     'embedding_requests_total',
     'Total number of embedding requests.',
@@ -43,6 +147,40 @@ EMBEDDING_DURATION_SECONDS = Histogram(
     ['modality', 'provider'],
     buckets=(0.01, 0.03, 0.05, 0.1, 0.3, 0.5, 1.0, 3.0, 5.0, 10.0, 30.0),
 )
+EMBEDDING_MODEL_LOAD_SECONDS = Histogram(
+    'embedding_model_load_seconds',
+    'Time spent loading an embedding model into memory.',
+    ['model'],
+    buckets=(0.1, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0, 120.0),
+)
+EMBEDDING_MICRO_BATCH_SIZE = Histogram(
+    'embedding_micro_batch_size',
+    'Number of requests coalesced into one embedding forward pass.',
+    ['modality', 'provider'],
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128),
+)
+EMBEDDING_MICRO_BATCH_QUEUE_DEPTH = Histogram(
+    'embedding_micro_batch_queue_depth',
+    'Requests still waiting in the embedding queue when a batch starts.',
+    ['modality', 'provider'],
+    buckets=(0, 1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+EMBEDDING_VIDEO_FRAMES = Histogram(
+    'embedding_video_frames',
+    'Frames decoded, skipped as duplicates and encoded per video.',
+    ['stage'],
+    buckets=(1, 4, 16, 32, 64, 128, 256, 1024, 4096, 16384, 65536),
+)
+EMBEDDING_QUERY_CACHE_EVENTS_TOTAL = Counter(
+    'embedding_query_cache_events_total',
+    'Query embedding cache hits, misses and evictions.',
+    ['modality', 'provider', 'event'],
+)
+EMBEDDING_STORE_LOOKUPS_TOTAL = Counter(
+    'embedding_store_lookups_total',
+    'Persistent embedding store lookups by result.',
+    ['modality', 'result'],
+)
 
 INGEST_JOB_EVENTS_TOTAL = Counter(
     'ingest_job_events_total',
@@ -128,6 +266,126 @@ def observe_rag_query(
     )
 
 
+def observe_rag_search(
+    modality: str,
+    status: str,
+    duration_seconds: float,
+) -> None:
+    """Observe one per-modality search.
+
+    Status is ``ok``, ``error``, ``timeout`` (partial results were served)
+    or ``rejected`` (no search worker freed up in time).
+    """
+    RAG_SEARCHES_TOTAL.labels(modality=modality, status=status).inc()
+    RAG_SEARCH_DURATION_SECONDS.labels(modality=modality).observe(
+        duration_seconds
+    )
+
+
+def observe_retrieval_cache_event(
+    backend: str,
+    event: str,
+    hit_ratio: float | None = None,
+) -> None:
+    """Observe retrieval cache hit/miss/store/eviction/error."""
+    RAG_RETRIEVAL_CACHE_EVENTS_TOTAL.labels(backend=backend, event=event).inc()
+    if hit_ratio is not None:
+        RAG_RETRIEVAL_CACHE_HIT_RATIO.labels(backend=backend).set(hit_ratio)
+
+
+def observe_folder_tree_cache_event(event: str) -> None:
+    """Observe folder tree cache hit/miss/invalidation/error."""
+    KB_FOLDER_TREE_CACHE_EVENTS_TOTAL.labels(event=event).inc()
+
+
+def observe_llm_generation(
+    *,
+    model: str,
+    mode: str,
+    generated_tokens: int,
+    duration_seconds: float,
+    time_to_first_token_seconds: float | None = None,
+) -> None:
+    """Observe one LLM generation (mode: blocking or stream)."""
+    tokens = max(generated_tokens, 0)
+    LLM_GENERATED_TOKENS_TOTAL.labels(model=model, mode=mode).inc(tokens)
+    if tokens and duration_seconds > 0:
+        LLM_TOKENS_PER_SECOND.labels(model=model, mode=mode).observe(
+            tokens / duration_seconds
+        )
+    if time_to_first_token_seconds is not None:
+        LLM_TIME_TO_FIRST_TOKEN_SECONDS.labels(model=model).observe(
+            max(time_to_first_token_seconds, 0.0)
+        )
+
+
+def observe_llm_batch_step(*, model: str, batch_size: int) -> None:
+    """Observe how many sequences one decode step advanced."""
+    LLM_BATCH_OCCUPANCY.labels(model=model).observe(batch_size)
+
+
+def observe_llm_queue_wait(*, model: str, wait_seconds: float) -> None:
+    """Observe queue wait of a prompt admitted by the LLM scheduler."""
+    LLM_QUEUE_WAIT_SECONDS.labels(model=model).observe(max(wait_seconds, 0.0))
+
+
+def observe_llm_context_packing(
+    *,
+    model: str,
+    tokens: int,
+    packed: int,
+    duplicates: int,
+    skipped: int,
+    truncated: int,
+) -> None:
+    """Observe one token-budget context packing."""
+    LLM_CONTEXT_TOKENS.labels(model=model).observe(max(tokens, 0))
+    for outcome, count in (
+        ('packed', packed),
+        ('duplicate', duplicates),
+        ('skipped', skipped),
+        ('truncated', truncated),
+    ):
+        if count:
+            LLM_CONTEXT_DOCS_TOTAL.labels(outcome=outcome).inc(count)
+
+
+def observe_llm_model_load(
+    *, model: str, duration_seconds: float, size_bytes: int
+) -> None:
+    """Observe an LLM backend load and its measured size."""
+    LLM_MODEL_LOAD_SECONDS.labels(model=model).observe(
+        max(duration_seconds, 0.0)
+    )
+    LLM_RESIDENT_MODEL_BYTES.labels(model=model).set(max(size_bytes, 0))
+
+
+def observe_llm_model_eviction(*, model: str) -> None:
+    """Observe an LLM backend unloaded by the residency manager."""
+    LLM_MODEL_EVICTIONS_TOTAL.labels(model=model).inc()
+    LLM_RESIDENT_MODEL_BYTES.labels(model=model).set(0)
+
+
+def observe_llm_scheduler_rejection(*, model: str) -> None:
+    """Observe a prompt rejected by a full LLM scheduler queue."""
+    LLM_SCHEDULER_REJECTIONS_TOTAL.labels(model=model).inc()
+
+
+def observe_llm_remote_request(*, model: str, status: str) -> None:
+    """Observe a remote chat completion (ok/error/unavailable/cancelled)."""
+    LLM_REMOTE_REQUESTS_TOTAL.labels(model=model, status=status).inc()
+
+
+def observe_llm_visual_tokens(*, model: str, tokens: int) -> None:
+    """Observe image tokens the processor produced for one prompt."""
+    LLM_VISUAL_TOKENS.labels(model=model).observe(max(tokens, 0))
+
+
+def observe_llm_image_cache(*, result: str) -> None:
+    """Observe a prepared image cache lookup (hit or miss)."""
+    LLM_IMAGE_CACHE_TOTAL.labels(result=result).inc()
+
+
 def observe_embedding_request(
     modality: str,
     provider: str,
@@ -146,6 +404,70 @@ def observe_embedding_request(
     ).observe(duration_seconds)
 
 
+def observe_embedding_model_load(
+    *, model: str, duration_seconds: float
+) -> None:
+    """Observe embedding model load duration."""
+    EMBEDDING_MODEL_LOAD_SECONDS.labels(model=model).observe(
+        max(duration_seconds, 0.0)
+    )
+
+
+def observe_embedding_micro_batch(
+    *,
+    modality: str,
+    provider: str,
+    batch_size: int,
+    queue_depth: int,
+) -> None:
+    """Observe one dispatched embedding micro-batch."""
+    EMBEDDING_MICRO_BATCH_SIZE.labels(
+        modality=modality,
+        provider=provider,
+    ).observe(batch_size)
+    EMBEDDING_MICRO_BATCH_QUEUE_DEPTH.labels(
+        modality=modality,
+        provider=provider,
+    ).observe(max(queue_depth, 0))
+
+
+def observe_embedding_video_frames(
+    *,
+    decoded: int,
+    deduplicated: int,
+    encoded: int,
+) -> None:
+    """Observe frame counts for one encoded video."""
+    EMBEDDING_VIDEO_FRAMES.labels(stage='decoded').observe(decoded)
+    EMBEDDING_VIDEO_FRAMES.labels(stage='deduplicated').observe(deduplicated)
+    EMBEDDING_VIDEO_FRAMES.labels(stage='encoded').observe(encoded)
+
+
+def observe_embedding_cache_event(
+    modality: str,
+    provider: str,
+    event: str,
+) -> None:
+    """Observe query embedding cache hit/miss/eviction."""
+    EMBEDDING_QUERY_CACHE_EVENTS_TOTAL.labels(
+        modality=modality,
+        provider=provider,
+        event=event,
+    ).inc()
+
+
+def observe_embedding_store_lookup(
+    modality: str,
+    result: str,
+    count: int = 1,
+) -> None:
+    """Observe persistent embedding store hits/misses."""
+    EMBEDDING_STORE_LOOKUPS_TOTAL.labels(
+        modality=modality,
+        result=result,
+    ).inc(max(count, 0))
+
+
 def observe_ingest_job_event(event: str, result: str = 'ok') -> None:
     """Observe ingest job event counters."""
     INGEST_JOB_EVENTS_TOTAL.labels(event=event, result=result).inc()
@@ -109,7 +109,7 @@ class DataConsistencyService:
             )
             if dry_run:
                 continue
-            self.kb.delete_vectors_for_file(file_id)
+            self.kb.delete_vectors_for_file(file_id, user_id=owner_user_id)
             (
                 self.supabase.table('kb_files')
                 .delete()
@@ -0,0 +1,251 @@
+from __future__ import annotations
+
+import logging
+import os
+import time
+from collections import OrderedDict, defaultdict
+from threading import Lock
+from typing import Any, Callable, Iterable
+
+from backend.monitoring.metrics import observe_folder_tree_cache_event
+from backend.utils.config_handler import Config
+
+logger = logging.getLogger(__name__)
+
+ROOT_SCOPE = 'root'
+_VERSION_PREFIX = 'kb_folder_tree_version:'
+
+
+class FolderTree:
+    """Snapshot of one user's folders with derived lookup indexes."""
+
+    def __init__(self, folders: list[dict[str, Any]]) -> None:
+        """Index folder rows (ordered as returned by Supabase)."""
+        self.folders = folders
+        self.by_id: dict[str, dict[str, Any]] = {
+            folder['id']: folder for folder in folders
+        }
+        self.children_by_parent: dict[str | None, list[str]] = defaultdict(
+            list
+        )
+        for folder in folders:
+            self.children_by_parent[folder.get('parent_id')].append(
+                folder['id']
+            )
+        self.ancestors: dict[str, list[str]] = {}
+        self.paths: dict[str, str] = {}
+        for folder_id in self.by_id:
+            chain = self._chain(folder_id)
+            self.ancestors[folder_id] = [str(node['id']) for node in chain]
+            self.paths[folder_id] = '/'.join(
+                str(node.get('name') or node['id']) for node in chain
+            )
+
+    def __contains__(self, folder_id: object) -> bool:
+        """Return whether the user owns a folder with this id."""
+        return folder_id in self.by_id
+
+    def _chain(self, folder_id: str) -> list[dict[str, Any]]:
+        """Return folders from the top level down to ``folder_id``."""
+        chain: list[dict[str, Any]] = []
+        seen: set[str] = set()
+        current_id: str | None = folder_id
+        while (
+            current_id and current_id in self.by_id and current_id not in seen
+        ):
+            seen.add(current_id)
+            chain.append(self.by_id[current_id])
+            current_id = self.by_id[current_id].get('parent_id')
+        chain.reverse()
+        return chain
+
+    def subtree_ids(self, folder_ids: Iterable[str]) -> set[str]:
+        """Return ``folder_ids`` plus all of their descendants."""
+        subtree: set[str] = set()
+        stack = list(folder_ids)
+        while stack:
+            current = stack.pop()
+            if current in subtree:
+                continue
+            subtree.add(current)
+            stack.extend(self.children_by_parent.get(current, []))
+        return subtree
+
+    def path(self, folder_id: str | None) -> str:
+        """Return the slash-separated folder path (``root`` if unknown)."""
+        if folder_id is None:
+            return ROOT_SCOPE
+        return self.paths.get(folder_id) or ROOT_SCOPE
+
+    def ancestor_ids(self, folder_id: str | None) -> list[str]:
+        """Return the ``folder_ancestors`` payload value for a folder.
+
+        Root files get ``['root']`` so a ``MatchAny(['root', *folder_ids])``
+        filter matches root files plus every file under the selected
+        folders.
+        """
+        if folder_id is None:
+            return [ROOT_SCOPE]
+        return list(self.ancestors.get(folder_id) or [ROOT_SCOPE])
+
+
+class _MemoryVersions:
+    """Per-user tree versions visible to this process only."""
+
+    name = 'memory'
+
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self._versions: dict[str, int] = {}
+
+    def get(self, user_id: str) -> int:
+        with self._lock:
+            return self._versions.get(user_id, 0)
+
+    def bump(self, user_id: str) -> None:
+        with self._lock:
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._versions.clear()
+
+
+class _RedisVersions:
+    """Per-user tree versions shared by web and worker processes."""
+
+    name = 'redis'
+
+    def __init__(self, client) -> None:
+        self._client = client
+
+    def get(self, user_id: str) -> int:
+        raw = self._client.get(f'{_VERSION_PREFIX}{user_id}')
+        return int(raw) if raw is not None else 0
+
+    def bump(self, user_id: str) -> None:
+        self._client.incr(f'{_VERSION_PREFIX}{user_id}')
+
+    def clear(self) -> None:
+        return None
+
+
+class FolderTreeCache:
+    """Per-user folder trees reused until the user's tree version changes.
+
+    Trees are kept in process memory (LRU over users, with TTL). The
+    version counter lives in Redis when ``REDIS_URL`` is set, so a folder
+    created or moved through the web process also invalidates trees
+    cached by the worker; otherwise staleness across processes is
+    bounded by the TTL.
+    """
+
+    def __init__(
+        self, versions, *, ttl_seconds: float, max_users: int
+    ) -> None:
+        """Initialize the cache on top of a memory or Redis version store."""
+        self.versions = versions
+        self.ttl_seconds = max(0.0, ttl_seconds)
+        self.max_users = max(0, max_users)
+        self._lock = Lock()
+        self._entries: OrderedDict[str, tuple[int, float, FolderTree]] = (
+            OrderedDict()
+        )
+
+    def get(
+        self,
+        user_id: str,
+        load: Callable[[], list[dict[str, Any]]],
+        *,
+        refresh: bool = False,
+    ) -> FolderTree:
+        """Return the user's tree, calling ``load`` on a miss.
+
+        The version is read before loading, so a tree loaded while the
+        folders changed is stored under the old version and not reused.
+        """
+        try:
+            version: int | None = self.versions.get(user_id)
+        except Exception:
+            logger.warning('Folder tree version lookup failed')
+            observe_folder_tree_cache_event('error')
+            version = None
+        now = time.monotonic()
+        if version is not None and not refresh:
+            with self._lock:
+                entry = self._entries.get(user_id)
+                if entry and entry[0] == version and entry[1] > now:
+                    self._entries.move_to_end(user_id)
+                    observe_folder_tree_cache_event('hit')
+                    return entry[2]
+        observe_folder_tree_cache_event('miss')
+        tree = FolderTree(load())
+        if version is not None and self.ttl_seconds > 0:
+            with self._lock:
+                self._entries[user_id] = (
+                    version,
+                    now + self.ttl_seconds,
+                    tree,
+                )
+                self._entries.move_to_end(user_id)
+                while len(self._entries) > self.max_users:
+                    self._entries.popitem(last=False)
+        return tree
+
+    def invalidate(self, user_id: str | None) -> None:
+        """Drop the user's tree here and in every process sharing versions."""
+        if not user_id:
+            return
+        with self._lock:
+            self._entries.pop(user_id, None)
+        try:
+            self.versions.bump(user_id)
+        except Exception:
+            logger.warning(
+                'Folder tree invalidation failed for %s; trees expire '
+                'within %.0fs',
+                user_id,
+                self.ttl_seconds,
+            )
+            observe_folder_tree_cache_event('error')
+            return
+        observe_folder_tree_cache_event('invalidation')
+
+    def clear(self) -> None:
+        """Drop all local trees and versions."""
+        with self._lock:
+            self._entries.clear()
+        self.versions.clear()
+
+
+def _build_versions():
+    redis_url = (os.getenv('REDIS_URL') or '').strip()
+    if redis_url:
+        try:
+            import redis  # type: ignore
+
+            return _RedisVersions(redis.Redis.from_url(redis_url))
+        except Exception:
+            logger.warning(
+                'Redis is not available; folder tree versions are '
+                'process-local'
+            )
+    return _MemoryVersions()
+
+
+_FOLDER_TREE_CACHE: FolderTreeCache | None = None
+_FOLDER_TREE_CACHE_LOCK = Lock()
+
+
+def get_folder_tree_cache() -> FolderTreeCache:
+    """Return the process-wide folder tree cache."""
+    global _FOLDER_TREE_CACHE
+    if _FOLDER_TREE_CACHE is None:
+        with _FOLDER_TREE_CACHE_LOCK:
+            if _FOLDER_TREE_CACHE is None:
+                _FOLDER_TREE_CACHE = FolderTreeCache(
+                    _build_versions(),
+                    ttl_seconds=Config.kb_folder_tree_cache_ttl_seconds,
+                    max_users=Config.kb_folder_tree_cache_max_users,
+                )
+    return _FOLDER_TREE_CACHE
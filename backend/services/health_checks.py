@@ -1,10 +1,8 @@
 from __future__ import annotations
 
-from qdrant_client import QdrantClient
-
 from backend.services.ingest_jobs import IngestJobsService
 from backend.services.runtime_config import RuntimeMode, validate_runtime_env
-from backend.utils.config_handler import Config
+from backend.utils.qdrant_clients import get_qdrant_client
 from backend.utils.supabase_client import get_supabase_client
 
 
@@ -21,8 +19,7 @@ def check_supabase() -> tuple[bool, str]:
 def check_qdrant() -> tuple[bool, str]:
     """Check Qdrant connectivity."""
     try:
-        client = QdrantClient(url=Config.qdrant_url)
-        _ = client.get_collections()
+        _ = get_qdrant_client().get_collections()
         return True, 'ok'
     except Exception as exc:
         return False, str(exc)
@@ -10,21 +10,30 @@ from zipfile import ZipFile
 import pdfplumber
 from PIL import Image
 from qdrant_client.models import (
-    Distance,
     FieldCondition,
     Filter,
     MatchValue,
     PointStruct,
-    VectorParams,
 )
 
+from backend.core.embedding_providers import (
+    VideoFrameSampler,
+    get_provider_model_id,
+)
+from backend.core.embedding_store import (
+    content_hash,
+    file_content_hash,
+    lookup_or_embed,
+)
 from backend.core.embeddings import (
     image_embedding_from_path,
-    text_embedding,
+    text_embeddings_batch,
     video_embedding_from_path,
 )
+from backend.core.retrieval_cache import bump_kb_generation
 from backend.utils.config_handler import Config
 from backend.utils.load_data import DataLoader
+from backend.utils.qdrant_collections import collection_names
 from backend.utils.qdrant_handler import QdrantHandler
 
 TEXT_MIME_TYPES = {
@@ -91,12 +100,20 @@ class IngestService:
         folder_name: str | None = None,
         folder_path: str | None = None,
         source_path: str | None = None,
+        folder_ancestors: list[str] | None = None,
     ) -> None:
-        """Extract chunks, embed them and upsert to Qdrant with metadata."""
+        """Extract chunks, embed them and upsert to Qdrant with metadata.
+
+        ``folder_ancestors`` lists the folder ids from the top level down
+        to ``folder_id`` (see ``KBService.get_folder_ancestor_ids``); it
+        defaults to the folder itself, which is exact only for top-level
+        folders and root.
+        """
         owner_id = user_id or guest_session_id
         if not owner_id:
             raise ValueError('Either user_id or guest_session_id must be set')
         owner_type = 'user' if user_id else 'guest'
+        folder_ancestors = list(folder_ancestors or [folder_id or ROOT_SCOPE])
 
         self.text_client.create_collection()
         self.image_client.create_collection()
@@ -112,37 +129,45 @@ class IngestService:
         else:
             chunks = []
 
-        self._upsert_text_chunks(
-            chunks=chunks,
-            file_id=file_id,
-            source=str(path),
-            filename=filename,
-            mime=mime,
-            source_path=source_path,
-            user_id=user_id,
-            guest_session_id=guest_session_id,
-            owner_type=owner_type,
-            owner_id=owner_id,
-            folder_id=folder_id,
-            folder_name=folder_name,
-            folder_path=folder_path,
-        )
-        self._upsert_modality_vector(
-            file_id=file_id,
-            path=path,
-            filename=filename,
-            mime=mime,
-            source_path=source_path,
-            user_id=user_id,
-            guest_session_id=guest_session_id,
-            owner_type=owner_type,
-            owner_id=owner_id,
-            folder_id=folder_id,
-            folder_path=folder_path,
-            chunks=chunks,
-        )
+        try:
+            self._upsert_text_chunks(
+                chunks=chunks,
+                file_id=file_id,
+                source=str(path),
+                filename=filename,
+                mime=mime,
+                source_path=source_path,
+                user_id=user_id,
+                guest_session_id=guest_session_id,
+                owner_type=owner_type,
+                owner_id=owner_id,
+                folder_id=folder_id,
+                folder_name=folder_name,
+                folder_path=folder_path,
+                folder_ancestors=folder_ancestors,
+            )
+            self._upsert_modality_vector(
+                file_id=file_id,
+                path=path,
+                filename=filename,
+                mime=mime,
+                source_path=source_path,
+                user_id=user_id,
+                guest_session_id=guest_session_id,
+                owner_type=owner_type,
+                owner_id=owner_id,
+                folder_id=folder_id,
+                folder_path=folder_path,
+                folder_ancestors=folder_ancestors,
+                chunks=chunks,
+            )
+        finally:
+            # Even a partially failed ingest may have upserted points.
+            bump_kb_generation(user_id)
 
-    def delete_vectors_for_file(self, *, file_id: str) -> None:
+    def delete_vectors_for_file(
+        self, *, file_id: str, user_id: str | None = None
+    ) -> None:
         """Delete all vectors for file id from all known collections."""
         selector = Filter(
             must=[
@@ -157,6 +182,7 @@ class IngestService:
                 )
             except Exception:
                 continue
+        bump_kb_generation(user_id)
 
     def _extract_text_chunks(self, path: Path, mime: str) -> list[str]:
         if mime == 'application/pdf':
@@ -210,6 +236,7 @@ class IngestService:
         owner_id: str,
         folder_id: str | None,
         folder_path: str | None,
+        folder_ancestors: list[str],
         chunks: list[str],
     ) -> None:
         if mime in IMAGE_MIME_TYPES:
@@ -225,6 +252,7 @@ class IngestService:
                 owner_id=owner_id,
                 folder_id=folder_id,
                 folder_path=folder_path,
+                folder_ancestors=folder_ancestors,
                 chunks=chunks,
             )
         elif mime in VIDEO_MIME_TYPES:
@@ -240,6 +268,7 @@ class IngestService:
                 owner_id=owner_id,
                 folder_id=folder_id,
                 folder_path=folder_path,
+                folder_ancestors=folder_ancestors,
                 chunks=chunks,
             )
 
@@ -273,18 +302,20 @@ class IngestService:
         folder_id: str | None,
         folder_name: str | None,
         folder_path: str | None,
+        folder_ancestors: list[str],
     ) -> None:
         if not chunks:
             return
 
         folder_scope = folder_id or ROOT_SCOPE
         ingested_at = datetime.now(timezone.utc).isoformat()
+        indexed_texts = [
+            (idx, chunk.strip()) for idx, chunk in enumerate(chunks)
+        ]
+        indexed_texts = [(idx, text) for idx, text in indexed_texts if text]
+        vectors = self._embed_text_chunks([text for _, text in indexed_texts])
         points: list[PointStruct] = []
-        for idx, chunk in enumerate(chunks):
-            text = chunk.strip()
-            if not text:
-                continue
-            vector = text_embedding(text)
+        for (idx, text), vector in zip(indexed_texts, vectors, strict=True):
             if len(vector) != Config.text_vector_size:
                 raise ValueError(
                     f'Embedding dimension mismatch: expected {Config.text_vector_size}, got {len(vector)}'
@@ -308,6 +339,7 @@ class IngestService:
                         'folder_id': folder_id,
                         'folder_path': folder_path,
                         'folder_scope': folder_scope,
+                        'folder_ancestors': folder_ancestors,
                         'file_id': file_id,
                         'modality': 'text',
                         'ingested_at': ingested_at,
@@ -316,19 +348,18 @@ class IngestService:
             )
 
         if points:
-            self.text_client.client.upsert(
-                collection_name=self.text_client.collection_name,
-                points=points,
-            )
+            texts = [text for _, text in indexed_texts]
+            self.text_client.upsert_points(points, sparse_texts=texts)
             scoped_collection = self._scoped_collection_name(
                 owner_id=owner_id,
                 folder_id=folder_id,
                 folder_name=folder_name,
             )
-            self._ensure_collection(scoped_collection)
-            self.text_client.client.upsert(
+            self.text_client.ensure_collection(scoped_collection)
+            self.text_client.upsert_points(
+                points,
                 collection_name=scoped_collection,
-                points=points,
+                sparse_texts=texts,
             )
 
     def _upsert_image_vector(
@@ -345,9 +376,16 @@ class IngestService:
         owner_id: str,
         folder_id: str | None,
         folder_path: str | None,
+        folder_ancestors: list[str],
         chunks: list[str],
     ) -> None:
-        vector = image_embedding_from_path(str(path))
+        vector = self._embed_file(
+            path,
+            modality='image',
+            embed=lambda: image_embedding_from_path(
+                str(path), use_cache=False
+            ),
+        )
         if len(vector) != Config.image_vector_size:
             raise ValueError(
                 f'Embedding dimension mismatch: expected {Config.image_vector_size}, got {len(vector)}'
@@ -368,6 +406,7 @@ class IngestService:
             'folder_id': folder_id,
             'folder_path': folder_path,
             'folder_scope': folder_id or ROOT_SCOPE,
+            'folder_ancestors': folder_ancestors,
             'file_id': file_id,
             'modality': 'image',
             'ingested_at': datetime.now(timezone.utc).isoformat(),
@@ -377,10 +416,7 @@ class IngestService:
             vector=vector,
             payload=payload,
         )
-        self.image_client.client.upsert(
-            collection_name=self.image_client.collection_name,
-            points=[point],
-        )
+        self.image_client.upsert_points([point])
 
     def _upsert_video_vector(
         self,
@@ -396,9 +432,14 @@ class IngestService:
         owner_id: str,
         folder_id: str | None,
         folder_path: str | None,
+        folder_ancestors: list[str],
         chunks: list[str],
     ) -> None:
-        vector = video_embedding_from_path(str(path))
+        vector = self._embed_file(
+            path,
+            modality='video',
+            embed=lambda: video_embedding_from_path(str(path)),
+        )
         if len(vector) != Config.video_vector_size:
             raise ValueError(
                 f'Embedding dimension mismatch: expected {Config.video_vector_size}, got {len(vector)}'
@@ -419,6 +460,7 @@ class IngestService:
             'folder_id': folder_id,
             'folder_path': folder_path,
             'folder_scope': folder_id or ROOT_SCOPE,
+            'folder_ancestors': folder_ancestors,
             'file_id': file_id,
             'modality': 'video',
             'ingested_at': datetime.now(timezone.utc).isoformat(),
@@ -428,24 +470,44 @@ class IngestService:
             vector=vector,
             payload=payload,
         )
-        self.video_client.client.upsert(
-            collection_name=self.video_client.collection_name,
-            points=[point],
+        self.video_client.upsert_points([point])
+
+    def _embed_text_chunks(self, texts: list[str]) -> list[list[float]]:
+        """Embed chunks, reusing vectors stored for unchanged chunk text."""
+        provider = Config.default_embedding_provider
+        return lookup_or_embed(
+            provider=provider,
+            model=get_provider_model_id(provider, modality='text'),
+            modality='text',
+            hashes=[content_hash(text) for text in texts],
+            embed_missing=lambda missing: text_embeddings_batch(
+                [texts[idx] for idx in missing]
+            ),
         )
 
-    def _ensure_collection(self, collection_name: str) -> None:
-        try:
-            self.text_client.client.get_collection(
-                collection_name=collection_name
-            )
-        except Exception:
-            self.text_client.client.create_collection(
-                collection_name=collection_name,
-                vectors_config=VectorParams(
-                    size=Config.text_vector_size,
-                    distance=Distance.COSINE,
-                ),
+    def _embed_file(
+        self,
+        path: Path,
+        *,
+        modality: str,
+        embed,
+    ) -> list[float]:
+        """Embed an image/video file, reusing vectors for unchanged content."""
+        provider = Config.default_embedding_provider
+        model = get_provider_model_id(provider, modality=modality)
+        if modality == 'video':
+            sampler = VideoFrameSampler.from_config(
+                Config.embedding_video_sample_fps
             )
+            model = f'{model}:video@{sampler.signature}'
+        vectors = lookup_or_embed(
+            provider=provider,
+            model=model,
+            modality=modality,
+            hashes=[file_content_hash(path)],
+            embed_missing=lambda _: [embed()],
+        )
+        return vectors[0]
 
     def _scoped_collection_name(
         self,
@@ -464,7 +526,6 @@ class IngestService:
 
     def _all_collection_names(self) -> list[str]:
         try:
-            collections = self.text_client.client.get_collections().collections
-            return [collection.name for collection in collections]
+            return collection_names(self.text_client.client)
         except Exception:
             return [self.text_client.collection_name]
@@ -88,13 +88,13 @@ class IngestWorker:
                     user_id=owner_user_id,
                 )
                 folder_name = folder.get('name')
-            folder_path = self.kb.get_folder_path(
+            folder_path, folder_ancestors = self.kb.get_folder_payload(
                 user_id=owner_user_id,
                 folder_id=folder_id,
             )
 
             # Make retry idempotent for Qdrant.
-            self.kb.delete_vectors_for_file(file_id)
+            self.kb.delete_vectors_for_file(file_id, user_id=owner_user_id)
             self.ingest.ingest_file(
                 file_id=file_row['id'],
                 file_path=file_row['storage_path'],
@@ -104,6 +104,7 @@ class IngestWorker:
                 folder_id=folder_id,
                 folder_name=folder_name,
                 folder_path=folder_path,
+                folder_ancestors=folder_ancestors,
                 source_path=job.get('source_path') or file_row.get('filename'),
             )
             self.jobs.mark_completed(job_id=job_id)
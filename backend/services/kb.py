@@ -1,14 +1,20 @@
 from __future__ import annotations
 
-from collections import defaultdict
 from typing import Any
 
 from fastapi import HTTPException, status
-from qdrant_client import QdrantClient
 from qdrant_client.models import FieldCondition, Filter, MatchValue
 
+from backend.core.retrieval_cache import bump_kb_generation
+from backend.services.folder_tree_cache import (
+    ROOT_SCOPE,
+    FolderTree,
+    get_folder_tree_cache,
+)
 from backend.services.storage import delete_stored_file
 from backend.utils.config_handler import Config
+from backend.utils.qdrant_clients import get_qdrant_client
+from backend.utils.qdrant_collections import collection_names
 from backend.utils.supabase_client import get_supabase_client
 
 
@@ -18,7 +24,7 @@ class KBService:
     def __init__(self) -> None:
         """Initialize DB and vector DB clients."""
         self.supabase = get_supabase_client(role='service')
-        self.qdrant = QdrantClient(url=Config.qdrant_url)
+        self.qdrant = get_qdrant_client()
 
     def create_uploaded_file_record(
         self,
@@ -101,6 +107,7 @@ class KBService:
         file_row = self.get_file(file_id=file_id, user_id=user_id)
         delete_stored_file(file_row['storage_path'])
         self._delete_vectors_by_file_id(file_id)
+        bump_kb_generation(user_id)
         (
             self.supabase.table('kb_files')
             .delete()
@@ -119,10 +126,21 @@ class KBService:
             'parent_id': parent_id,
         }
         resp = self.supabase.table('kb_folders').insert(payload).execute()
+        get_folder_tree_cache().invalidate(user_id)
         return (getattr(resp, 'data', None) or [{}])[0]
 
+    def get_folder_tree(
+        self, *, user_id: str, refresh: bool = False
+    ) -> FolderTree:
+        """Return the user's cached folder tree with derived indexes."""
+        return get_folder_tree_cache().get(
+            user_id,
+            lambda: self.list_folders(user_id=user_id),
+            refresh=refresh,
+        )
+
     def list_folders(self, *, user_id: str) -> list[dict[str, Any]]:
-        """List all folders for the user."""
+        """List all folders for the user (uncached)."""
         resp = (
             self.supabase.table('kb_folders')
             .select('*')
@@ -177,9 +195,65 @@ class KBService:
             .eq('user_id', user_id)
             .execute()
         )
+        bump_kb_generation(user_id)
+        get_folder_tree_cache().invalidate(user_id)
         updated = (getattr(resp, 'data', None) or [{}])[0]
         return updated
 
+    def move_folder(
+        self, *, user_id: str, folder_id: str, parent_id: str | None
+    ) -> dict[str, Any]:
+        """Move a folder under a new parent and re-scope its vectors.
+
+        ``folder_ancestors`` and ``folder_path`` payloads of every file in
+        the moved subtree are rewritten in place, without re-embedding.
+        """
+        tree = self.get_folder_tree(user_id=user_id, refresh=True)
+        if folder_id not in tree:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail='Folder not found',
+            )
+        subtree = tree.subtree_ids([folder_id])
+        if parent_id is not None:
+            if parent_id not in tree:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail='Folder not found',
+                )
+            if parent_id in subtree:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail='Folder cannot be moved into its own subtree',
+                )
+
+        resp = (
+            self.supabase.table('kb_folders')
+            .update({'parent_id': parent_id})
+            .eq('id', folder_id)
+            .eq('user_id', user_id)
+            .execute()
+        )
+        moved = {**tree.by_id[folder_id], 'parent_id': parent_id}
+        moved_tree = FolderTree(
+            [
+                moved if folder['id'] == folder_id else folder
+                for folder in tree.folders
+            ]
+        )
+        get_folder_tree_cache().invalidate(user_id)
+        for moved_id in subtree:
+            self._set_folder_payload(
+                user_id=user_id,
+                folder_id=moved_id,
+                payload={
+                    'folder_ancestors': moved_tree.ancestor_ids(moved_id),
+                    'folder_path': moved_tree.path(moved_id),
+                },
+            )
+        bump_kb_generation(user_id)
+        return (getattr(resp, 'data', None) or [moved])[0]
+
     def get_folder(self, *, folder_id: str, user_id: str) -> dict[str, Any]:
         """Return one folder row for a user or raise 404."""
         resp = (
@@ -200,19 +274,9 @@ class KBService:
 
     def delete_folder_recursive(self, *, folder_id: str, user_id: str) -> None:
         """Delete folder subtree and all files in it."""
-        folders = self.list_folders(user_id=user_id)
-        children_by_parent: dict[str | None, list[str]] = defaultdict(list)
-        for folder in folders:
-            children_by_parent[folder.get('parent_id')].append(folder['id'])
-
-        to_delete: set[str] = set()
-        stack = [folder_id]
-        while stack:
-            current = stack.pop()
-            if current in to_delete:
-                continue
-            to_delete.add(current)
-            stack.extend(children_by_parent.get(current, []))
+        to_delete = self.get_folder_tree(user_id=user_id).subtree_ids(
+            [folder_id]
+        )
 
         files_resp = (
             self.supabase.table('kb_files')
@@ -225,6 +289,7 @@ class KBService:
         for file_row in files:
             delete_stored_file(file_row['storage_path'])
             self._delete_vectors_by_file_id(file_row['id'])
+        bump_kb_generation(user_id)
 
         (
             self.supabase.table('kb_files')
@@ -240,10 +305,11 @@ class KBService:
             .in_('id', list(to_delete))
             .execute()
         )
+        get_folder_tree_cache().invalidate(user_id)
 
     def build_tree(self, *, user_id: str) -> dict[str, Any]:
         """Build nested folder tree with attached files."""
-        folders = self.list_folders(user_id=user_id)
+        folders = self.get_folder_tree(user_id=user_id).folders
         files = (
             self.supabase.table('kb_files')
             .select('*')
@@ -281,45 +347,71 @@ class KBService:
         if not folder_ids:
             return []
 
-        folders = self.list_folders(user_id=user_id)
-        children_by_parent: dict[str | None, list[str]] = defaultdict(list)
-        all_folder_ids = {folder['id'] for folder in folders}
-        for folder in folders:
-            children_by_parent[folder.get('parent_id')].append(folder['id'])
-
-        expanded: set[str] = set()
-        stack = [
-            folder_id
-            for folder_id in folder_ids
-            if folder_id in all_folder_ids
-        ]
-        while stack:
-            current = stack.pop()
-            if current in expanded:
-                continue
-            expanded.add(current)
-            stack.extend(children_by_parent.get(current, []))
-        return sorted(expanded)
+        tree = self.get_folder_tree(user_id=user_id)
+        return sorted(
+            tree.subtree_ids(
+                [folder_id for folder_id in folder_ids if folder_id in tree]
+            )
+        )
+
+    def get_folder_ancestor_ids(
+        self, *, user_id: str, folder_id: str | None
+    ) -> list[str]:
+        """Return the ``folder_ancestors`` payload value for a folder."""
+        if folder_id is None:
+            return [ROOT_SCOPE]
+        return self._tree_with(user_id, folder_id).ancestor_ids(folder_id)
 
     def get_folder_path(self, *, user_id: str, folder_id: str | None) -> str:
         """Build slash-separated folder path from root to folder id."""
         if folder_id is None:
-            return 'root'
+            return ROOT_SCOPE
+        return self._tree_with(user_id, folder_id).path(folder_id)
 
-        folders = self.list_folders(user_id=user_id)
-        by_id = {folder['id']: folder for folder in folders}
-        if folder_id not in by_id:
-            return 'root'
+    def get_folder_payload(
+        self, *, user_id: str, folder_id: str | None
+    ) -> tuple[str, list[str]]:
+        """Return ``(folder_path, folder_ancestors)`` from a fresh tree.
 
-        parts: list[str] = []
-        current_id: str | None = folder_id
-        while current_id and current_id in by_id:
-            node = by_id[current_id]
-            parts.append(str(node.get('name') or current_id))
-            current_id = node.get('parent_id')
-
-        parts.reverse()
-        return '/'.join(parts) if parts else 'root'
+        Ingest writes these into Qdrant permanently, so a tree cached
+        before another process moved a folder must not be used here.
+        """
+        if folder_id is None:
+            return ROOT_SCOPE, [ROOT_SCOPE]
+        tree = self.get_folder_tree(user_id=user_id, refresh=True)
+        return tree.path(folder_id), tree.ancestor_ids(folder_id)
+
+    def _tree_with(self, user_id: str, folder_id: str) -> FolderTree:
+        """Return the cached tree, reloading once if it lacks ``folder_id``.
+
+        A folder created by another process may be newer than the cached
+        tree; ids from file rows are trusted enough to pay one reload.
+        """
+        tree = self.get_folder_tree(user_id=user_id)
+        if folder_id not in tree:
+            tree = self.get_folder_tree(user_id=user_id, refresh=True)
+        return tree
+
+    def _set_folder_payload(
+        self, *, user_id: str, folder_id: str, payload: dict[str, Any]
+    ) -> None:
+        selector = Filter(
+            must=[
+                FieldCondition(key='user_id', match=MatchValue(value=user_id)),
+                FieldCondition(
+                    key='folder_id', match=MatchValue(value=folder_id)
+                ),
+            ]
+        )
+        for collection in self._all_collection_names():
+            try:
+                self.qdrant.set_payload(
+                    collection_name=collection,
+                    payload=payload,
+                    points=selector,
+                )
+            except Exception:
+                continue
 
     def _delete_vectors_by_file_id(self, file_id: str) -> None:
         selector = Filter(
@@ -335,9 +427,12 @@ class KBService:
             except Exception:
                 continue
 
-    def delete_vectors_for_file(self, file_id: str) -> None:
+    def delete_vectors_for_file(
+        self, file_id: str, *, user_id: str | None = None
+    ) -> None:
         """Delete file vectors from all collections."""
         self._delete_vectors_by_file_id(file_id)
+        bump_kb_generation(user_id)
 
     def has_vectors_for_file(self, *, file_id: str) -> bool:
         """Check whether at least one vector exists for a file id."""
@@ -384,7 +479,7 @@ class KBService:
                     point.payload = {
                         **(point.payload or {}),
                         'folder_id': folder_id,
-                        'folder_scope': folder_id or 'root',
+                        'folder_scope': folder_id or ROOT_SCOPE,
                     }
                 self.qdrant.upsert(collection_name=collection, points=points)
             except Exception:
@@ -392,8 +487,7 @@ class KBService:
 
     def _all_collection_names(self) -> list[str]:
         try:
-            collections = self.qdrant.get_collections().collections
-            return [collection.name for collection in collections]
+            return collection_names(self.qdrant)
         except Exception:
             return [
                 Config.qdrant_text_collection,
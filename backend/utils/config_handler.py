@@ -42,6 +42,54 @@ def _env_float(name: str, default: float) -> float:
         return default
 
 
+def _collection_profiles(raw: dict) -> dict[str, dict]:
+    """Merge per-profile Qdrant collection settings over ``defaults``."""
+    defaults = raw.get('defaults') or {}
+    quantization_override = (os.getenv('QDRANT_QUANTIZATION') or '').strip()
+    profiles: dict[str, dict] = {}
+    for profile in ('text', 'image', 'video', 'scoped'):
+        settings = {**defaults, **(raw.get(profile) or {})}
+        if quantization_override:
+            settings['quantization'] = {
+                **(settings.get('quantization') or {}),
+                'type': quantization_override.lower(),
+            }
+        profiles[profile] = settings
+    return profiles
+
+
+def _remote_llm_routes(raw: dict) -> dict[str, dict]:
+    """Merge per-model OpenAI-compatible server settings over defaults.
+
+    ``LLM_REMOTE_MODELS`` adds comma-separated model names served by the
+    default server; ``*`` routes every model. Routes without a base URL
+    are dropped.
+    """
+    defaults = {
+        'base_url': os.getenv(
+            'LLM_REMOTE_BASE_URL', raw.get('base_url') or ''
+        ),
+        'api_key_env': raw.get('api_key_env') or 'LLM_REMOTE_API_KEY',
+        'timeout_seconds': _env_float(
+            'LLM_REMOTE_TIMEOUT_SECONDS', raw.get('timeout_seconds', 60.0)
+        ),
+        'max_retries': _env_int(
+            'LLM_REMOTE_MAX_RETRIES', raw.get('max_retries', 2)
+        ),
+        'supports_image': bool(raw.get('supports_image', False)),
+    }
+    models = dict(raw.get('models') or {})
+    for name in os.getenv('LLM_REMOTE_MODELS', '').split(','):
+        if name.strip():
+            models.setdefault(name.strip(), {})
+    routes: dict[str, dict] = {}
+    for name, overrides in models.items():
+        route = {**defaults, **(overrides or {})}
+        if route['base_url']:
+            routes[str(name)] = route
+    return routes
+
+
 class Config:
     """Application settings loaded from backend_config.yaml."""
 
@@ -49,6 +97,38 @@ class Config:
     qdrant_image_collection: str = _config['qdrant']['image_collection']
     qdrant_video_collection: str = _config['qdrant']['video_collection']
     qdrant_url: str = os.getenv('QDRANT_URL', 'http://localhost:6333')
+    _qdrant_client: dict = _config['qdrant'].get('client') or {}
+    qdrant_prefer_grpc: bool = _env_bool(
+        'QDRANT_PREFER_GRPC',
+        bool(_qdrant_client.get('prefer_grpc', False)),
+    )
+    qdrant_grpc_port: int = _env_int(
+        'QDRANT_GRPC_PORT',
+        _qdrant_client.get('grpc_port', 6334),
+    )
+    qdrant_timeout_seconds: float = _env_float(
+        'QDRANT_TIMEOUT_SECONDS',
+        _qdrant_client.get('timeout_seconds', 10),
+    )
+    qdrant_search_timeout_seconds: float = _env_float(
+        'QDRANT_SEARCH_TIMEOUT_SECONDS',
+        _qdrant_client.get('search_timeout_seconds', 5),
+    )
+    qdrant_pool_size: int = _env_int(
+        'QDRANT_POOL_SIZE',
+        _qdrant_client.get('pool_size', 32),
+    )
+    qdrant_keepalive_connections: int = _env_int(
+        'QDRANT_KEEPALIVE_CONNECTIONS',
+        _qdrant_client.get('keepalive_connections', 16),
+    )
+    qdrant_keepalive_expiry_seconds: float = _env_float(
+        'QDRANT_KEEPALIVE_EXPIRY_SECONDS',
+        _qdrant_client.get('keepalive_expiry_seconds', 30),
+    )
+    qdrant_collection_settings: dict[str, dict] = _collection_profiles(
+        _config['qdrant'].get('collections') or {}
+    )
     text_vector_size: int = _config['qdrant']['text_vector_size']
     image_vector_size: int = _config['qdrant']['image_vector_size']
     video_vector_size: int = _config['qdrant']['video_vector_size']
@@ -79,16 +159,233 @@ class Config:
         ).split(',')
         if model.strip()
     ]
+    _llm_scheduler: dict = _config['llm'].get('scheduler') or {}
+    llm_max_batch_size: int = _env_int(
+        'LLM_MAX_BATCH_SIZE', _llm_scheduler.get('max_batch_size', 8)
+    )
+    llm_max_queued_prompts: int = _env_int(
+        'LLM_MAX_QUEUED_PROMPTS', _llm_scheduler.get('max_queued_prompts', 64)
+    )
+    _llm_context: dict = _config['llm'].get('context') or {}
+    llm_context_token_budget: int = _env_int(
+        'LLM_CONTEXT_TOKEN_BUDGET', _llm_context.get('token_budget', 0)
+    )
+    llm_context_token_cache_size: int = _env_int(
+        'LLM_CONTEXT_TOKEN_CACHE_SIZE',
+        _llm_context.get('token_count_cache_size', 20000),
+    )
+    _llm_residency: dict = _config['llm'].get('residency') or {}
+    # ``auto``: 90% of total CUDA memory; 0 disables the budget.
+    _llm_memory_budget: str = (
+        str(
+            os.getenv(
+                'LLM_MEMORY_BUDGET_GB',
+                _llm_residency.get('memory_budget_gb', 0),
+            )
+        )
+        .strip()
+        .lower()
+    )
+    llm_memory_budget_gb: float | None = (
+        None if _llm_memory_budget == 'auto' else float(_llm_memory_budget)
+    )
+    llm_pin_default_model: bool = _env_bool(
+        'LLM_PIN_DEFAULT_MODEL', _llm_residency.get('pin_default_model', True)
+    )
+    llm_preload_models: list[str] = [
+        model.strip()
+        for model in os.getenv(
+            'LLM_PRELOAD_MODELS',
+            ','.join(_llm_residency.get('preload') or []),
+        ).split(',')
+        if model.strip()
+    ]
+    llm_model_size_estimates_gb: dict[str, float] = {
+        str(model): float(size)
+        for model, size in (
+            _llm_residency.get('size_estimates_gb') or {}
+        ).items()
+    }
+    _llm_remote: dict = _config['llm'].get('remote') or {}
+    llm_remote_routes: dict[str, dict] = _remote_llm_routes(_llm_remote)
+    llm_remote_max_connections: int = _env_int(
+        'LLM_REMOTE_MAX_CONNECTIONS', _llm_remote.get('max_connections', 32)
+    )
+    _llm_vision: dict = _config['llm'].get('vision') or {}
+    llm_image_max_pixels: int = _env_int(
+        'LLM_IMAGE_MAX_PIXELS', _llm_vision.get('max_pixels', 401408)
+    )
+    llm_image_min_pixels: int = _env_int(
+        'LLM_IMAGE_MIN_PIXELS', _llm_vision.get('min_pixels', 3136)
+    )
+    llm_image_cache_size: int = _env_int(
+        'LLM_IMAGE_CACHE_SIZE', _llm_vision.get('cache_size', 64)
+    )
+    llm_image_max_bytes: int = int(
+        _env_float('LLM_IMAGE_MAX_MB', _llm_vision.get('max_image_mb', 20))
+        * 1024
+        * 1024
+    )
+    llm_image_download_timeout_seconds: float = _env_float(
+        'LLM_IMAGE_DOWNLOAD_TIMEOUT_SECONDS',
+        _llm_vision.get('download_timeout_seconds', 10.0),
+    )
+    llm_image_http_pool_size: int = _env_int(
+        'LLM_IMAGE_HTTP_POOL_SIZE', _llm_vision.get('http_pool_size', 16)
+    )
     rag_max_context_docs: int = _env_int('RAG_MAX_CONTEXT_DOCS', 4)
     rag_max_context_chars: int = _env_int('RAG_MAX_CONTEXT_CHARS', 2400)
+    rag_search_max_workers: int = _env_int('RAG_SEARCH_MAX_WORKERS', 16)
+    rag_search_timeout_seconds: float = _env_float(
+        'RAG_SEARCH_TIMEOUT_SECONDS', 5.0
+    )
+    rag_search_timeouts: dict[str, float] = {
+        'text': _env_float(
+            'RAG_TEXT_SEARCH_TIMEOUT_SECONDS', rag_search_timeout_seconds
+        ),
+        'image': _env_float(
+            'RAG_IMAGE_SEARCH_TIMEOUT_SECONDS', rag_search_timeout_seconds
+        ),
+        'video': _env_float(
+            'RAG_VIDEO_SEARCH_TIMEOUT_SECONDS', rag_search_timeout_seconds
+        ),
+    }
+    _rag: dict = _config.get('rag') or {}
+    _rag_retrieval_cache: dict = _rag.get('retrieval_cache') or {}
+    rag_retrieval_cache_backend: str = (
+        os.getenv(
+            'RAG_RETRIEVAL_CACHE_BACKEND',
+            _rag_retrieval_cache.get('backend', 'auto'),
+        )
+        .strip()
+        .lower()
+    )
+    rag_retrieval_cache_max_entries: int = _env_int(
+        'RAG_RETRIEVAL_CACHE_MAX_ENTRIES',
+        _rag_retrieval_cache.get('max_entries', 1024),
+    )
+    rag_retrieval_cache_ttl_seconds: float = _env_float(
+        'RAG_RETRIEVAL_CACHE_TTL_SECONDS',
+        _rag_retrieval_cache.get('ttl_seconds', 300),
+    )
+    rag_retrieval_mode: str = (
+        os.getenv('RAG_RETRIEVAL_MODE', _rag.get('retrieval_mode', 'dense'))
+        .strip()
+        .lower()
+    )
+    rag_payload_fetch: str = (
+        os.getenv('RAG_PAYLOAD_FETCH', _rag.get('payload_fetch', 'inline'))
+        .strip()
+        .lower()
+    )
+    rag_folder_filter: str = (
+        os.getenv('RAG_FOLDER_FILTER', _rag.get('folder_filter', 'expand'))
+        .strip()
+        .lower()
+    )
+    _rag_hybrid: dict = _rag.get('hybrid') or {}
+    rag_hybrid_prefetch_limit: int = _env_int(
+        'RAG_HYBRID_PREFETCH_LIMIT',
+        _rag_hybrid.get('prefetch_limit', 50),
+    )
+    rag_bm25_k1: float = _env_float(
+        'RAG_BM25_K1', _rag_hybrid.get('bm25_k1', 1.2)
+    )
+    rag_bm25_b: float = _env_float(
+        'RAG_BM25_B', _rag_hybrid.get('bm25_b', 0.75)
+    )
+    rag_bm25_avg_doc_length: float = _env_float(
+        'RAG_BM25_AVG_DOC_LENGTH',
+        _rag_hybrid.get('avg_doc_length', 80),
+    )
     llm_fast_mode: bool = _env_bool('LLM_FAST_MODE', False)
+    _kb_folder_tree_cache: dict = (_config.get('kb') or {}).get(
+        'folder_tree_cache'
+    ) or {}
+    kb_folder_tree_cache_ttl_seconds: float = _env_float(
+        'KB_FOLDER_TREE_CACHE_TTL_SECONDS',
+        _kb_folder_tree_cache.get('ttl_seconds', 300),
+    )
+    kb_folder_tree_cache_max_users: int = _env_int(
+        'KB_FOLDER_TREE_CACHE_MAX_USERS',
+        _kb_folder_tree_cache.get('max_users', 4096),
+    )
 
     default_embedding_provider: str = _config['embeddings']['default_provider']
     embedding_video_sample_fps: float = _env_float(
         'EMBEDDING_VIDEO_SAMPLE_FPS',
         _config['embeddings']['video_sample_fps'],
     )
+    _embedding_video_sampling: dict = (
+        _config['embeddings'].get('video_sampling') or {}
+    )
+    embedding_video_sampling_strategy: str = (
+        os.getenv(
+            'EMBEDDING_VIDEO_SAMPLING_STRATEGY',
+            _embedding_video_sampling.get('strategy', 'fps'),
+        )
+        .strip()
+        .lower()
+    )
+    embedding_video_max_frames: int = _env_int(
+        'EMBEDDING_VIDEO_MAX_FRAMES',
+        _embedding_video_sampling.get('max_frames', 64),
+    )
+    embedding_video_dedup_distance: int = _env_int(
+        'EMBEDDING_VIDEO_DEDUP_DISTANCE',
+        _embedding_video_sampling.get('dedup_distance', 4),
+    )
     embedding_providers: dict = _config['embeddings']['providers']
+    embedding_batch_size: int = _env_int(
+        'EMBEDDING_BATCH_SIZE',
+        _config['embeddings'].get('batch_size', 32),
+    )
+    _embedding_query_cache: dict = (
+        _config['embeddings'].get('query_cache') or {}
+    )
+    embedding_query_cache_max_entries: int = _env_int(
+        'EMBEDDING_QUERY_CACHE_MAX_ENTRIES',
+        _embedding_query_cache.get('max_entries', 2048),
+    )
+    embedding_query_cache_ttl_seconds: float = _env_float(
+        'EMBEDDING_QUERY_CACHE_TTL_SECONDS',
+        _embedding_query_cache.get('ttl_seconds', 600),
+    )
+    embedding_warmup_modalities: list[str] = [
+        modality.strip()
+        for modality in os.getenv(
+            'EMBEDDING_WARMUP_MODALITIES',
+            ','.join(
+                _config['embeddings'].get('warmup_modalities')
+                or ['text', 'image']
+            ),
+        ).split(',')
+        if modality.strip()
+    ]
+    _embedding_micro_batching: dict = (
+        _config['embeddings'].get('micro_batching') or {}
+    )
+    embedding_micro_batch_enabled: bool = _env_bool(
+        'EMBEDDING_MICRO_BATCH_ENABLED',
+        bool(_embedding_micro_batching.get('enabled', True)),
+    )
+    embedding_micro_batch_max_wait_ms: float = _env_float(
+        'EMBEDDING_MICRO_BATCH_MAX_WAIT_MS',
+        _embedding_micro_batching.get('max_wait_ms', 5),
+    )
+    embedding_micro_batch_max_size: int = _env_int(
+        'EMBEDDING_MICRO_BATCH_MAX_SIZE',
+        _embedding_micro_batching.get('max_batch_size', 64),
+    )
+    _embedding_store: dict = _config['embeddings'].get('store') or {}
+    embedding_store_enabled: bool = _env_bool(
+        'EMBEDDING_STORE_ENABLED',
+        bool(_embedding_store.get('enabled', True)),
+    )
+    embedding_store_dir: str = os.getenv(
+        'EMBEDDING_STORE_DIR',
+        _embedding_store.get('path', 'data/embedding_store'),
+    )
     ingest_enable_ocr: bool = _env_bool('INGEST_ENABLE_OCR', True)
     ingest_ocr_timeout_seconds: int = _env_int('INGEST_OCR_TIMEOUT_SECONDS', 6)
 
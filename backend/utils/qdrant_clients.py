@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import logging
+import math
+from threading import Lock
+
+import httpx
+from qdrant_client import QdrantClient
+
+from backend.utils.config_handler import Config
+
+logger = logging.getLogger(__name__)
+
+_CLIENTS: dict[str, QdrantClient] = {}
+_CLIENTS_LOCK = Lock()
+
+
+def _build_client(url: str) -> QdrantClient:
+    """Create a client with pooled keep-alive connections from config."""
+    kwargs: dict = {
+        'url': url,
+        'timeout': math.ceil(Config.qdrant_timeout_seconds),
+        'prefer_grpc': Config.qdrant_prefer_grpc,
+        'grpc_port': Config.qdrant_grpc_port,
+        'limits': httpx.Limits(
+            max_connections=Config.qdrant_pool_size,
+            max_keepalive_connections=Config.qdrant_keepalive_connections,
+            keepalive_expiry=Config.qdrant_keepalive_expiry_seconds,
+        ),
+    }
+    if Config.qdrant_prefer_grpc:
+        kwargs['grpc_options'] = {
+            'grpc.keepalive_time_ms': int(
+                Config.qdrant_keepalive_expiry_seconds * 1000
+            ),
+            'grpc.keepalive_permit_without_calls': 1,
+        }
+    logger.info(
+        'Creating shared Qdrant client for %s (grpc=%s, pool=%d)',
+        url,
+        Config.qdrant_prefer_grpc,
+        Config.qdrant_pool_size,
+    )
+    return QdrantClient(**kwargs)
+
+
+def get_qdrant_client(url: str | None = None) -> QdrantClient:
+    """Return the process-wide pooled Qdrant client for a server URL.
+
+    All services share one client per URL, so HTTP keep-alive connections
+    (or gRPC channels with ``prefer_grpc``) are reused across requests
+    instead of being set up per service instance.
+
+    Args:
+        url (str | None): Qdrant URL. Defaults to ``Config.qdrant_url``.
+    """
+    resolved_url = url or Config.qdrant_url
+    client = _CLIENTS.get(resolved_url)
+    if client is not None:
+        return client
+    with _CLIENTS_LOCK:
+        if resolved_url not in _CLIENTS:
+            _CLIENTS[resolved_url] = _build_client(resolved_url)
+        return _CLIENTS[resolved_url]
+
+
+def close_qdrant_clients() -> None:
+    """Close and forget all shared clients."""
+    with _CLIENTS_LOCK:
+        clients = list(_CLIENTS.values())
+        _CLIENTS.clear()
+    for client in clients:
+        try:
+            client.close()
+        except Exception:
+            logger.warning('Failed to close Qdrant client', exc_info=True)
@@ -0,0 +1,520 @@
+from __future__ import annotations
+
+import logging
+from threading import Lock
+from typing import Any, Iterable
+
+from qdrant_client.models import (
+    BinaryQuantization,
+    BinaryQuantizationConfig,
+    CompressionRatio,
+    Disabled,
+    Distance,
+    HnswConfigDiff,
+    KeywordIndexParams,
+    KeywordIndexType,
+    Modifier,
+    ProductQuantization,
+    ProductQuantizationConfig,
+    QuantizationSearchParams,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    SearchParams,
+    SparseVectorParams,
+    VectorParams,
+    VectorParamsDiff,
+)
+
+from backend.utils.config_handler import Config
+from backend.utils.qdrant_clients import get_qdrant_client
+
+logger = logging.getLogger(__name__)
+
+
+# Payload fields used in search, delete and cleanup filters. user_id is
+# marked as the tenant key so Qdrant co-locates each tenant's points.
+PAYLOAD_INDEXES: dict[str, KeywordIndexParams] = {
+    'user_id': KeywordIndexParams(
+        type=KeywordIndexType.KEYWORD, is_tenant=True
+    ),
+    'folder_scope': KeywordIndexParams(type=KeywordIndexType.KEYWORD),
+    'folder_ancestors': KeywordIndexParams(type=KeywordIndexType.KEYWORD),
+    'file_id': KeywordIndexParams(type=KeywordIndexType.KEYWORD),
+    'owner_type': KeywordIndexParams(type=KeywordIndexType.KEYWORD),
+    'guest_session_id': KeywordIndexParams(type=KeywordIndexType.KEYWORD),
+}
+
+
+def ensure_payload_indexes(
+    client,
+    collection_name: str,
+    *,
+    existing_schema: dict[str, Any] | None = None,
+    dry_run: bool = False,
+) -> list[str]:
+    """Create missing keyword payload indexes for filtered fields.
+
+    Safe to run repeatedly: fields that already have an index are skipped.
+
+    Args:
+        client: Qdrant client.
+        collection_name (str): Collection to index.
+        existing_schema (dict[str, Any] | None): Known payload schema;
+            fetched from Qdrant when None.
+        dry_run (bool): Only report which indexes are missing.
+
+    Returns:
+        list[str]: Fields whose index was created (or would be).
+    """
+    if existing_schema is None:
+        existing_schema = (
+            client.get_collection(collection_name).payload_schema or {}
+        )
+    missing = [
+        field for field in PAYLOAD_INDEXES if field not in existing_schema
+    ]
+    if dry_run:
+        return missing
+    for field in missing:
+        client.create_payload_index(
+            collection_name=collection_name,
+            field_name=field,
+            field_schema=PAYLOAD_INDEXES[field],
+            wait=True,
+        )
+    return missing
+
+
+# Per-folder collections created by the ingest pipeline.
+SCOPED_COLLECTION_PREFIX = 'kb_'
+
+# Named sparse vector stored next to the unnamed dense vector in hybrid
+# mode. The dense vector keeps its default (empty) name.
+SPARSE_VECTOR_NAME = 'bm25'
+DENSE_VECTOR_NAME = ''
+
+QuantizationConfig = (
+    ScalarQuantization | BinaryQuantization | ProductQuantization
+)
+
+
+def collection_profile(collection_name: str) -> str | None:
+    """Return the settings profile (text/image/video/scoped) of a collection."""
+    if collection_name == Config.qdrant_text_collection:
+        return 'text'
+    if collection_name == Config.qdrant_image_collection:
+        return 'image'
+    if collection_name == Config.qdrant_video_collection:
+        return 'video'
+    if collection_name.startswith(SCOPED_COLLECTION_PREFIX):
+        return 'scoped'
+    return None
+
+
+def hybrid_enabled(collection_name: str) -> bool:
+    """Return True when a collection should hold BM25 sparse vectors."""
+    return Config.rag_retrieval_mode == 'hybrid' and collection_profile(
+        collection_name
+    ) in {'text', 'scoped'}
+
+
+def sparse_vector_names(info) -> frozenset[str]:
+    """Return sparse vector names from ``get_collection`` info."""
+    sparse = getattr(info.config.params, 'sparse_vectors', None) or {}
+    return frozenset(sparse)
+
+
+def collection_names(client) -> list[str]:
+    """Return collection names as the app addresses them.
+
+    Collections behind an alias (e.g. ``documents`` -> ``documents__hybrid``
+    after the hybrid migration) are listed under the alias name.
+    """
+    names = [
+        collection.name for collection in client.get_collections().collections
+    ]
+    try:
+        aliases = {
+            alias.alias_name: alias.collection_name
+            for alias in client.get_aliases().aliases
+        }
+    except Exception:
+        return names
+    targets = set(aliases.values())
+    return [name for name in names if name not in targets] + sorted(aliases)
+
+
+def _profile_settings(collection_name: str) -> dict[str, Any]:
+    profile = collection_profile(collection_name)
+    if profile is None:
+        return {}
+    return Config.qdrant_collection_settings.get(profile) or {}
+
+
+def build_quantization_config(
+    settings: dict[str, Any] | None,
+) -> QuantizationConfig | None:
+    """Translate a ``quantization`` config section into Qdrant params.
+
+    Args:
+        settings (dict[str, Any] | None): Section with ``type`` (none,
+            scalar, binary or product), ``always_ram`` and type-specific
+            ``quantile`` or ``compression`` keys.
+
+    Returns:
+        QuantizationConfig | None: Qdrant quantization config, or None
+            when quantization is disabled.
+    """
+    settings = settings or {}
+    quantization_type = str(settings.get('type') or 'none').lower()
+    always_ram = settings.get('always_ram')
+    if quantization_type in {'none', 'off', 'disabled'}:
+        return None
+    if quantization_type == 'scalar':
+        return ScalarQuantization(
+            scalar=ScalarQuantizationConfig(
+                type=ScalarType.INT8,
+                quantile=settings.get('quantile'),
+                always_ram=always_ram,
+            )
+        )
+    if quantization_type == 'binary':
+        return BinaryQuantization(
+            binary=BinaryQuantizationConfig(always_ram=always_ram)
+        )
+    if quantization_type == 'product':
+        return ProductQuantization(
+            product=ProductQuantizationConfig(
+                compression=CompressionRatio(
+                    str(settings.get('compression', 'x16')).lower()
+                ),
+                always_ram=always_ram,
+            )
+        )
+    raise ValueError(f'Unknown Qdrant quantization type: {quantization_type}')
+
+
+def _hnsw_config(settings: dict[str, Any]) -> HnswConfigDiff | None:
+    hnsw = settings.get('hnsw') or {}
+    if not hnsw:
+        return None
+    return HnswConfigDiff(
+        m=hnsw.get('m'), ef_construct=hnsw.get('ef_construct')
+    )
+
+
+def collection_create_params(
+    collection_name: str,
+    *,
+    vector_size: int,
+    distance: Distance = Distance.COSINE,
+) -> dict[str, Any]:
+    """Return ``create_collection`` kwargs for the collection's profile."""
+    settings = _profile_settings(collection_name)
+    params: dict[str, Any] = {
+        'vectors_config': VectorParams(
+            size=vector_size,
+            distance=distance,
+            on_disk=settings.get('on_disk'),
+        )
+    }
+    hnsw_config = _hnsw_config(settings)
+    if hnsw_config is not None:
+        params['hnsw_config'] = hnsw_config
+    quantization_config = build_quantization_config(
+        settings.get('quantization')
+    )
+    if quantization_config is not None:
+        params['quantization_config'] = quantization_config
+    if hybrid_enabled(collection_name):
+        params['sparse_vectors_config'] = {
+            SPARSE_VECTOR_NAME: SparseVectorParams(modifier=Modifier.IDF)
+        }
+    return params
+
+
+def build_search_params(collection_name: str) -> SearchParams | None:
+    """Return search-time HNSW/quantization params for a collection.
+
+    With quantization enabled, candidates are scored on the compressed
+    vectors and ``oversampling`` times ``limit`` of them are rescored with
+    the original vectors, which keeps recall close to float32 search.
+    """
+    settings = _profile_settings(collection_name)
+    search = settings.get('search') or {}
+    quantization = None
+    if build_quantization_config(settings.get('quantization')) is not None:
+        quantization = QuantizationSearchParams(
+            rescore=search.get('rescore'),
+            oversampling=search.get('oversampling'),
+        )
+    if search.get('hnsw_ef') is None and quantization is None:
+        return None
+    return SearchParams(
+        hnsw_ef=search.get('hnsw_ef'), quantization=quantization
+    )
+
+
+def collection_settings_diff(client, collection_name: str) -> dict[str, Any]:
+    """Return ``update_collection`` kwargs that bring a collection in line.
+
+    Only settings that differ from the configured profile are included,
+    so an up-to-date collection yields an empty dict.
+    """
+    settings = _profile_settings(collection_name)
+    if not settings:
+        return {}
+    config = client.get_collection(collection_name).config
+    diff: dict[str, Any] = {}
+
+    hnsw_config = _hnsw_config(settings)
+    current_hnsw = config.hnsw_config
+    if hnsw_config is not None and (
+        getattr(current_hnsw, 'm', None) != hnsw_config.m
+        or getattr(current_hnsw, 'ef_construct', None)
+        != hnsw_config.ef_construct
+    ):
+        diff['hnsw_config'] = hnsw_config
+
+    quantization_config = build_quantization_config(
+        settings.get('quantization')
+    )
+    current_quantization = config.quantization_config
+    if quantization_config is None:
+        if current_quantization is not None:
+            diff['quantization_config'] = Disabled.DISABLED
+    elif current_quantization != quantization_config:
+        diff['quantization_config'] = quantization_config
+
+    on_disk = settings.get('on_disk')
+    vectors = config.params.vectors
+    if (
+        on_disk is not None
+        and isinstance(vectors, VectorParams)
+        and bool(vectors.on_disk) != bool(on_disk)
+    ):
+        diff['vectors_config'] = {'': VectorParamsDiff(on_disk=on_disk)}
+    return diff
+
+
+def apply_collection_settings(
+    client, collection_name: str, *, dry_run: bool = False
+) -> list[str]:
+    """Update an existing collection to its configured storage settings.
+
+    Qdrant rebuilds quantized data and the HNSW graph in the background,
+    so the collection stays searchable during the migration.
+
+    Returns:
+        list[str]: Names of settings that were changed (or would be).
+    """
+    diff = collection_settings_diff(client, collection_name)
+    if diff and not dry_run:
+        client.update_collection(collection_name=collection_name, **diff)
+    return sorted(diff)
+
+
+def _grpc_status_name(exc: BaseException) -> str | None:
+    code = getattr(exc, 'code', None)
+    if not callable(code):
+        return None
+    try:
+        return getattr(code(), 'name', None)
+    except Exception:
+        return None
+
+
+def is_collection_not_found(exc: BaseException) -> bool:
+    """Return True when a Qdrant error means the collection is missing."""
+    if getattr(exc, 'status_code', None) == 404:
+        return True
+    if _grpc_status_name(exc) == 'NOT_FOUND':
+        return True
+    message = str(exc).lower()
+    return 'collection' in message and (
+        'not found' in message or "doesn't exist" in message
+    )
+
+
+def _is_already_exists(exc: BaseException) -> bool:
+    if getattr(exc, 'status_code', None) == 409:
+        return True
+    if _grpc_status_name(exc) == 'ALREADY_EXISTS':
+        return True
+    return 'already exists' in str(exc).lower()
+
+
+class CollectionRegistry:
+    """Process-wide registry of Qdrant collections verified to exist.
+
+    Hot paths call ``ensure`` which returns immediately for known
+    collections, so searches and ingests do not pay a ``get_collection``
+    round trip per call. Entries are added at startup by ``refresh``, on
+    first use, or after a create, and dropped by ``invalidate`` when
+    Qdrant reports the collection as missing. Vector params are stored
+    when known and fetched lazily otherwise.
+    """
+
+    def __init__(self) -> None:
+        """Create an empty registry."""
+        self._vectors: dict[str, Any] = {}
+        self._sparse: dict[str, frozenset[str]] = {}
+        self._lock = Lock()
+
+    def is_known(self, collection_name: str) -> bool:
+        """Return True when the collection was verified to exist."""
+        return collection_name in self._vectors
+
+    def ensure(
+        self,
+        client,
+        collection_name: str,
+        *,
+        vector_size: int,
+        distance: Distance = Distance.COSINE,
+    ) -> None:
+        """Create the collection unless it is already known to exist."""
+        if collection_name in self._vectors:
+            return
+        with self._lock:
+            if collection_name in self._vectors:
+                return
+            try:
+                info = client.get_collection(collection_name)
+            except Exception as exc:
+                # Timeouts, auth and connection errors must not look like
+                # a missing collection.
+                if not is_collection_not_found(exc):
+                    raise
+                info = None
+            if info is not None:
+                self._vectors[collection_name] = info.config.params.vectors
+                self._sparse[collection_name] = sparse_vector_names(info)
+                return
+            params = collection_create_params(
+                collection_name, vector_size=vector_size, distance=distance
+            )
+            try:
+                client.create_collection(
+                    collection_name=collection_name, **params
+                )
+            except Exception as exc:
+                if not _is_already_exists(exc):
+                    raise
+                # Another process created it between our two calls, maybe
+                # with other params: fetch them lazily from Qdrant.
+                self._vectors[collection_name] = None
+                return
+            logger.info(f'Коллекция {collection_name} успешно создана')
+            self._index_new_collection(client, collection_name)
+            self._vectors[collection_name] = params['vectors_config']
+            self._sparse[collection_name] = frozenset(
+                params.get('sparse_vectors_config') or {}
+            )
+
+    def _index_new_collection(self, client, collection_name: str) -> None:
+        try:
+            ensure_payload_indexes(client, collection_name, existing_schema={})
+        except Exception:
+            # Filters still work without indexes; the migration backfills.
+            logger.warning(
+                'Failed to create payload indexes for %s',
+                collection_name,
+                exc_info=True,
+            )
+
+    def vector_params(self, client, collection_name: str) -> Any:
+        """Return vector params, fetching them once if not cached yet."""
+        vectors = self._vectors.get(collection_name)
+        if vectors is None:
+            vectors = client.get_collection(
+                collection_name
+            ).config.params.vectors
+            with self._lock:
+                self._vectors[collection_name] = vectors
+        return vectors
+
+    def sparse_vectors(self, client, collection_name: str) -> frozenset[str]:
+        """Return names of sparse vectors, fetching them once if unknown."""
+        sparse = self._sparse.get(collection_name)
+        if sparse is None:
+            sparse = sparse_vector_names(
+                client.get_collection(collection_name)
+            )
+            with self._lock:
+                self._sparse[collection_name] = sparse
+        return sparse
+
+    def refresh(
+        self,
+        client,
+        *,
+        with_params: Iterable[str] = (),
+    ) -> list[str]:
+        """Replace known entries with collections that exist in Qdrant.
+
+        Args:
+            client: Qdrant client.
+            with_params (Iterable[str]): Collections whose vector params
+                are fetched eagerly; others are fetched on demand.
+
+        Returns:
+            list[str]: Names of existing collections.
+        """
+        names = collection_names(client)
+        vectors: dict[str, Any] = dict.fromkeys(names)
+        sparse: dict[str, frozenset[str]] = {}
+        for name in with_params:
+            if name in vectors:
+                info = client.get_collection(name)
+                vectors[name] = info.config.params.vectors
+                sparse[name] = sparse_vector_names(info)
+        with self._lock:
+            self._vectors = vectors
+            self._sparse = sparse
+        return names
+
+    def invalidate(self, collection_name: str) -> None:
+        """Forget a collection, e.g. after Qdrant reported it missing."""
+        with self._lock:
+            self._vectors.pop(collection_name, None)
+            self._sparse.pop(collection_name, None)
+
+    def clear(self) -> None:
+        """Forget all collections."""
+        with self._lock:
+            self._vectors.clear()
+            self._sparse.clear()
+
+
+_REGISTRIES: dict[str, CollectionRegistry] = {}
+_REGISTRIES_LOCK = Lock()
+
+
+def get_collection_registry(url: str) -> CollectionRegistry:
+    """Return the shared registry for a Qdrant server URL."""
+    with _REGISTRIES_LOCK:
+        if url not in _REGISTRIES:
+            _REGISTRIES[url] = CollectionRegistry()
+        return _REGISTRIES[url]
+
+
+def prime_collection_registry(url: str | None = None) -> None:
+    """Register existing collections at startup; failures are only logged."""
+    resolved_url = url or Config.qdrant_url
+    try:
+        names = get_collection_registry(resolved_url).refresh(
+            get_qdrant_client(resolved_url),
+            with_params=[
+                Config.qdrant_text_collection,
+                Config.qdrant_image_collection,
+                Config.qdrant_video_collection,
+            ],
+        )
+    except Exception:
+        logger.warning(
+            'Could not prime Qdrant collection registry', exc_info=True
+        )
+        return
+    logger.info('Registered %d existing Qdrant collections', len(names))
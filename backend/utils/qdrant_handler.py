@@ -1,26 +1,40 @@
 import logging
+import math
 import uuid
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Sequence
 
-from qdrant_client import QdrantClient
 from qdrant_client.models import (
-    Distance,
     FieldCondition,
     Filter,
+    Fusion,
+    FusionQuery,
     MatchAny,
     MatchValue,
     PointStruct,
-    VectorParams,
+    Prefetch,
+    SparseVector,
 )
 
 from backend.core.embeddings import (
-    image_embedding_from_path,
-    text_embedding,
+    image_embeddings_batch_from_paths,
+    text_embeddings_batch,
     video_embedding_from_path,
 )
+from backend.core.sparse_vectors import (
+    bm25_document_vector,
+    bm25_query_vector,
+)
 from backend.utils.config_handler import Config
 from backend.utils.load_data import DataLoader
+from backend.utils.qdrant_clients import get_qdrant_client
+from backend.utils.qdrant_collections import (
+    DENSE_VECTOR_NAME,
+    SPARSE_VECTOR_NAME,
+    build_search_params,
+    get_collection_registry,
+    is_collection_not_found,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -38,23 +52,72 @@ class QdrantHandler:
         collection_name (str): Имя коллекции.
         vector_size (int): Размерность векторов.
         """
-        self.client = QdrantClient(url=url)
+        self.client = get_qdrant_client(url)
+        self.url = url
         self.collection_name = collection_name
         self.vector_size = vector_size
+        self.registry = get_collection_registry(url)
+        self.search_params = build_search_params(collection_name)
 
     def create_collection(self) -> None:
         """Создает коллекцию, если она не существует."""
+        self.ensure_collection(self.collection_name)
+
+    def ensure_collection(
+        self, collection_name: str, vector_size: int | None = None
+    ) -> None:
+        """Create a collection unless the registry already knows it exists.
+
+        Args:
+            collection_name (str): Collection to verify or create.
+            vector_size (int | None): Vector size for a new collection.
+                Defaults to this handler's vector size.
+        """
+        self.registry.ensure(
+            self.client,
+            collection_name,
+            vector_size=vector_size or self.vector_size,
+        )
+
+    def supports_sparse(self, collection_name: str | None = None) -> bool:
+        """Return True when the collection stores BM25 sparse vectors."""
+        target = collection_name or self.collection_name
+        return SPARSE_VECTOR_NAME in self.registry.sparse_vectors(
+            self.client, target
+        )
+
+    def upsert_points(
+        self,
+        points: List[PointStruct],
+        collection_name: str | None = None,
+        sparse_texts: List[str] | None = None,
+    ) -> None:
+        """Upsert points, recreating the collection if it disappeared.
+
+        Args:
+            points (List[PointStruct]): Points to upsert.
+            collection_name (str | None): Target collection. Defaults to
+                this handler's collection.
+            sparse_texts (List[str] | None): Texts aligned with ``points``;
+                their BM25 vectors are stored next to the dense vectors
+                when the collection has a sparse vector.
+        """
+        target = collection_name or self.collection_name
+
+        def _upsert() -> None:
+            batch = points
+            if sparse_texts is not None and self.supports_sparse(target):
+                batch = _with_sparse_vectors(points, sparse_texts)
+            self.client.upsert(collection_name=target, points=batch)
+
         try:
-            self.client.get_collection(self.collection_name)
-            logger.info(f'Коллекция {self.collection_name} уже существует')
-        except Exception:
-            self.client.create_collection(
-                collection_name=self.collection_name,
-                vectors_config=VectorParams(
-                    size=self.vector_size, distance=Distance.COSINE
-                ),
-            )
-            logger.info(f'Коллекция {self.collection_name} успешно создана')
+            _upsert()
+        except Exception as exc:
+            if not is_collection_not_found(exc):
+                raise
+            self.registry.invalidate(target)
+            self.ensure_collection(target)
+            _upsert()
 
     def enrich_with_data(
         self,
@@ -97,10 +160,7 @@ class QdrantHandler:
         Args:
             points (List[Dict[str, Any]]): Список точек вида {"id": str, "vector": List[float], "payload": {...}}
         """
-        self.client.upsert(
-            collection_name=self.collection_name,
-            points=[PointStruct(**p) for p in points],
-        )
+        self.upsert_points([PointStruct(**p) for p in points])
 
     def search(
         self,
@@ -109,9 +169,24 @@ class QdrantHandler:
         user_id: str | None = None,
         folder_scopes: list[str] | None = None,
         file_ids: list[str] | None = None,
+        query_text: str | None = None,
+        with_payload: bool | Sequence[str] = True,
+        guest_session_id: str | None = None,
     ) -> List[Dict[str, Any]]:
         """Search nearest points by query vector.
 
+        ``guest_session_id`` restricts the search to points ingested by
+        that guest session.
+
+        ``with_payload`` may list the payload fields to return; other
+        fields (chunk text, owner ids, paths) are not transferred.
+
+        With ``query_text`` in hybrid mode, dense and BM25 sparse
+        candidates are prefetched and fused with RRF by Qdrant in the
+        same request, and payloads are returned only for the final
+        ``top_k``. Collections without a sparse vector fall back to
+        dense search.
+
         Note:
             This method only performs retrieval and does not trigger indexing.
             Data ingestion should be done explicitly via ``enrich_with_data``.
@@ -123,10 +198,28 @@ class QdrantHandler:
             must_conditions.append(
                 FieldCondition(key='user_id', match=MatchValue(value=user_id))
             )
+        if guest_session_id:
+            must_conditions.extend(
+                [
+                    FieldCondition(
+                        key='owner_type', match=MatchValue(value='guest')
+                    ),
+                    FieldCondition(
+                        key='guest_session_id',
+                        match=MatchValue(value=guest_session_id),
+                    ),
+                ]
+            )
         if folder_scopes:
+            # In ancestors mode a scope matches the folder and everything
+            # below it; in expand mode scopes are already expanded.
             must_conditions.append(
                 FieldCondition(
-                    key='folder_scope',
+                    key=(
+                        'folder_ancestors'
+                        if Config.rag_folder_filter == 'ancestors'
+                        else 'folder_scope'
+                    ),
                     match=MatchAny(
                         any=[str(scope) for scope in folder_scopes]
                     ),
@@ -144,14 +237,36 @@ class QdrantHandler:
             Filter(must=must_conditions) if must_conditions else None
         )
 
-        hits = self.client.query_points(
-            collection_name=self.collection_name,
-            query=query_vector,
-            limit=top_k,
-            with_payload=True,
-            score_threshold=Config.score_threshold,
-            query_filter=query_filter,
-        ).points
+        try:
+            sparse_query = (
+                self._sparse_query(query_text) if query_text else None
+            )
+            if sparse_query is not None:
+                hits = self._hybrid_query(
+                    query_vector,
+                    sparse_query,
+                    top_k=top_k,
+                    query_filter=query_filter,
+                    with_payload=_payload_selector(with_payload),
+                )
+            else:
+                hits = self.client.query_points(
+                    collection_name=self.collection_name,
+                    query=query_vector,
+                    limit=top_k,
+                    with_payload=_payload_selector(with_payload),
+                    score_threshold=Config.score_threshold,
+                    query_filter=query_filter,
+                    search_params=self.search_params,
+                    timeout=math.ceil(Config.qdrant_search_timeout_seconds),
+                ).points
+        except Exception as exc:
+            if not is_collection_not_found(exc):
+                raise
+            # Dropped behind our back: recreate it; it has no points yet.
+            self.registry.invalidate(self.collection_name)
+            self.create_collection()
+            return []
 
         results = []
         for hit in hits:
@@ -161,6 +276,73 @@ class QdrantHandler:
 
         return results
 
+    def _sparse_query(self, query_text: str) -> SparseVector | None:
+        if Config.rag_retrieval_mode != 'hybrid' or not self.supports_sparse():
+            return None
+        sparse_query = bm25_query_vector(query_text)
+        return sparse_query if sparse_query.indices else None
+
+    def _hybrid_query(
+        self,
+        query_vector: List[float],
+        sparse_query: SparseVector,
+        *,
+        top_k: int,
+        query_filter: Filter | None,
+        with_payload: bool | list[str],
+    ) -> list:
+        prefetch_limit = max(top_k, Config.rag_hybrid_prefetch_limit)
+        return self.client.query_points(
+            collection_name=self.collection_name,
+            prefetch=[
+                Prefetch(
+                    query=query_vector,
+                    using=DENSE_VECTOR_NAME or None,
+                    filter=query_filter,
+                    params=self.search_params,
+                    score_threshold=Config.score_threshold,
+                    limit=prefetch_limit,
+                ),
+                Prefetch(
+                    query=sparse_query,
+                    using=SPARSE_VECTOR_NAME,
+                    filter=query_filter,
+                    limit=prefetch_limit,
+                ),
+            ],
+            query=FusionQuery(fusion=Fusion.RRF),
+            query_filter=query_filter,
+            limit=top_k,
+            with_payload=with_payload,
+            timeout=math.ceil(Config.qdrant_search_timeout_seconds),
+        ).points
+
+    def retrieve_payloads(
+        self,
+        point_ids: Sequence[Any],
+        with_payload: bool | Sequence[str] = True,
+    ) -> Dict[Any, Dict[str, Any]]:
+        """Fetch payloads for known point ids in one request.
+
+        Args:
+            point_ids (Sequence[Any]): Ids returned by an earlier search.
+            with_payload (bool | Sequence[str]): Payload fields to return.
+
+        Returns:
+            Dict[Any, Dict[str, Any]]: Payload by point id; ids that no
+                longer exist are missing.
+        """
+        if not point_ids:
+            return {}
+        records = self.client.retrieve(
+            collection_name=self.collection_name,
+            ids=list(point_ids),
+            with_payload=_payload_selector(with_payload),
+            with_vectors=False,
+            timeout=math.ceil(Config.qdrant_search_timeout_seconds),
+        )
+        return {record.id: record.payload or {} for record in records}
+
     def load_folder_to_qdrant(
         self,
         folder: Path,
@@ -170,6 +352,7 @@ class QdrantHandler:
     ) -> None:
         """Load all documents or images from folder into Qdrant."""
         all_files = list(folder.glob('*'))
+        image_files: list[Path] = []
 
         for file_path in all_files:
             if (
@@ -179,30 +362,33 @@ class QdrantHandler:
             ):
                 loader = DataLoader()
                 chunks = loader.process_file(file_path)
-                for chunk_idx, chunk in enumerate(chunks):
-                    vector = text_embedding(chunk)
-                    self.client.upsert(
-                        collection_name=collection_name,
-                        points=[
-                            {
-                                'id': str(
+                vectors = text_embeddings_batch(chunks)
+                if chunks:
+                    self.upsert_points(
+                        [
+                            PointStruct(
+                                id=str(
                                     uuid.uuid5(
                                         uuid.NAMESPACE_URL,
                                         f'{file_path}:{chunk_idx}',
                                     )
                                 ),
-                                'vector': vector,
-                                'payload': {
+                                vector=vector,
+                                payload={
                                     'text': chunk,
                                     'source': str(file_path),
                                     **(
                                         {'user_id': user_id} if user_id else {}
                                     ),
                                 },
-                            }
+                            )
+                            for chunk_idx, (chunk, vector) in enumerate(
+                                zip(chunks, vectors, strict=True)
+                            )
                         ],
+                        collection_name=collection_name,
+                        sparse_texts=chunks,
                     )
-                if chunks:
                     logger.info(
                         f'✅ Uploaded {len(chunks)} text chunks from {file_path.name}'
                     )
@@ -213,26 +399,7 @@ class QdrantHandler:
                 embed_type == 'image'
                 and file_path.suffix.lower() in Config.image_extensions
             ):
-                vector = image_embedding_from_path(str(file_path))
-                self.client.upsert(
-                    collection_name=collection_name,
-                    points=[
-                        {
-                            'id': str(
-                                uuid.uuid5(
-                                    uuid.NAMESPACE_URL,
-                                    f'{file_path}:image',
-                                )
-                            ),
-                            'vector': vector,
-                            'payload': {
-                                'source': str(file_path),
-                                **({'user_id': user_id} if user_id else {}),
-                            },
-                        }
-                    ],
-                )
-                logger.info(f'✅ Uploaded image {file_path.name}')
+                image_files.append(file_path)
 
             elif (
                 embed_type == 'video'
@@ -259,3 +426,54 @@ class QdrantHandler:
                     ],
                 )
                 logger.info(f'✅ Uploaded video {file_path.name}')
+
+        batch_size = max(1, Config.embedding_batch_size)
+        for start in range(0, len(image_files), batch_size):
+            batch = image_files[start : start + batch_size]
+            vectors = image_embeddings_batch_from_paths(
+                [str(file_path) for file_path in batch]
+            )
+            self.client.upsert(
+                collection_name=collection_name,
+                points=[
+                    {
+                        'id': str(
+                            uuid.uuid5(
+                                uuid.NAMESPACE_URL,
+                                f'{file_path}:image',
+                            )
+                        ),
+                        'vector': vector,
+                        'payload': {
+                            'source': str(file_path),
+                            **({'user_id': user_id} if user_id else {}),
+                        },
+                    }
+                    for file_path, vector in zip(batch, vectors, strict=True)
+                ],
+            )
+            for file_path in batch:
+                logger.info(f'✅ Uploaded image {file_path.name}')
+
+
+def _payload_selector(with_payload: bool | Sequence[str]) -> bool | list[str]:
+    if isinstance(with_payload, bool):
+        return with_payload
+    return list(with_payload)
+
+
+def _with_sparse_vectors(
+    points: List[PointStruct], texts: List[str]
+) -> List[PointStruct]:
+    """Return copies of points carrying dense and BM25 sparse vectors."""
+    return [
+        point.model_copy(
+            update={
+                'vector': {
+                    DENSE_VECTOR_NAME: point.vector,
+                    SPARSE_VECTOR_NAME: bm25_document_vector(text),
+                }
+            }
+        )
+        for point, text in zip(points, texts, strict=True)
+    ]
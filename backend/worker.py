@@ -4,8 +4,11 @@ import asyncio
 import logging
 import os
 
+from backend.core.embedding_providers import warmup_providers
 from backend.services.ingest_poller import IngestPoller
 from backend.utils.log_config import setup_logging
+from backend.utils.qdrant_clients import close_qdrant_clients
+from backend.utils.qdrant_collections import prime_collection_registry
 
 setup_logging()
 logger = logging.getLogger(__name__)
@@ -16,6 +19,8 @@ async def _run_worker() -> None:
     batch_size = int(os.getenv('INGEST_POLLER_BATCH_SIZE', '10'))
     stale_seconds = int(os.getenv('INGEST_POLLER_STALE_SECONDS', '300'))
     max_concurrency = int(os.getenv('INGEST_WORKER_MAX_CONCURRENCY', '4'))
+    await asyncio.to_thread(warmup_providers)
+    await asyncio.to_thread(prime_collection_registry)
 
     poller = IngestPoller(
         interval_seconds=max(1, interval),
@@ -29,6 +34,8 @@ async def _run_worker() -> None:
     except asyncio.CancelledError:
         poller.stop()
         raise
+    finally:
+        close_qdrant_clients()
 
 
 def main() -> None:
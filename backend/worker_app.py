@@ -9,9 +9,12 @@ from fastapi import FastAPI
 from fastapi.responses import JSONResponse, Response
 from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 
+from backend.core.embedding_providers import warmup_providers
 from backend.services.health_checks import check_dependencies
 from backend.services.ingest_poller import IngestPoller
 from backend.utils.log_config import setup_logging
+from backend.utils.qdrant_clients import close_qdrant_clients
+from backend.utils.qdrant_collections import prime_collection_registry
 
 setup_logging()
 
@@ -19,6 +22,8 @@ setup_logging()
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Run ingest poller in worker API process lifecycle."""
+    await asyncio.to_thread(warmup_providers)
+    await asyncio.to_thread(prime_collection_registry)
     interval = int(os.getenv('INGEST_POLLER_INTERVAL_SECONDS', '5'))
     batch_size = int(os.getenv('INGEST_POLLER_BATCH_SIZE', '10'))
     stale_seconds = int(os.getenv('INGEST_POLLER_STALE_SECONDS', '300'))
@@ -38,8 +43,11 @@ async def lifespan(app: FastAPI):
         poller = getattr(app.state, 'ingest_poller', None)
         if poller is not None:
             poller.stop()
-        if task is not None:
-            await task
+        try:
+            if task is not None:
+                await task
+        finally:
+            close_qdrant_clients()
 
 
 app = FastAPI(title='Multimodal RAG Worker', version='0.1', lifespan=lifespan)
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+import uuid
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from qdrant_client.models import (  # noqa: E402
+    Distance,
+    FieldCondition,
+    Filter,
+    MatchAny,
+    MatchValue,
+    PointStruct,
+    VectorParams,
+)
+
+from backend.utils.config_handler import Config  # noqa: E402
+from backend.utils.qdrant_clients import get_qdrant_client  # noqa: E402
+from backend.utils.qdrant_collections import (  # noqa: E402
+    ensure_payload_indexes,
+)
+
+
+def _out(line: str) -> None:
+    sys.stdout.write(f'{line}\n')
+
+
+def _percentile(values: list[float], ratio: float) -> float:
+    if not values:
+        return 0.0
+    sorted_values = sorted(values)
+    idx = int((len(sorted_values) - 1) * ratio)
+    return sorted_values[idx]
+
+
+def _fill_collection(client, args, rng: np.random.Generator) -> None:
+    """Upsert synthetic points spread over tenants and folders."""
+    for start in range(0, args.points, args.batch_size):
+        size = min(args.batch_size, args.points - start)
+        vectors = rng.standard_normal((size, args.dim), dtype=np.float32)
+        tenants = rng.integers(0, args.tenants, size)
+        folders = rng.integers(0, args.folders_per_tenant, size)
+        points = [
+            PointStruct(
+                id=str(uuid.uuid4()),
+                vector=vector.tolist(),
+                payload={
+                    'user_id': f'user-{tenant}',
+                    'owner_type': 'user',
+                    'folder_scope': f'folder-{tenant}-{folder}',
+                    'file_id': f'file-{start + offset}',
+                },
+            )
+            for offset, (vector, tenant, folder) in enumerate(
+                zip(vectors, tenants, folders, strict=True)
+            )
+        ]
+        client.upsert(
+            collection_name=args.collection, points=points, wait=True
+        )
+
+
+def _wait_until_indexed(client, collection_name: str) -> None:
+    while True:
+        status = str(client.get_collection(collection_name).status).lower()
+        if status.endswith('green'):
+            return
+        time.sleep(0.5)
+
+
+def _measure(client, args, rng: np.random.Generator) -> list[float]:
+    """Run filtered searches like LocalRAG does and return latencies."""
+    latencies: list[float] = []
+    for _ in range(args.queries):
+        tenant = int(rng.integers(0, args.tenants))
+        folder = int(rng.integers(0, args.folders_per_tenant))
+        query_filter = Filter(
+            must=[
+                FieldCondition(
+                    key='user_id', match=MatchValue(value=f'user-{tenant}')
+                ),
+                FieldCondition(
+                    key='folder_scope',
+                    match=MatchAny(any=[f'folder-{tenant}-{folder}']),
+                ),
+            ]
+        )
+        query = rng.standard_normal(args.dim, dtype=np.float32).tolist()
+        started = time.perf_counter()
+        client.query_points(
+            collection_name=args.collection,
+            query=query,
+            limit=args.top_k,
+            with_payload=True,
+            query_filter=query_filter,
+        )
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def _report(label: str, latencies: list[float]) -> None:
+    _out(
+        f'{label:<16} p50={_percentile(latencies, 0.50) * 1000:8.2f}ms '
+        f'p95={_percentile(latencies, 0.95) * 1000:8.2f}ms '
+        f'p99={_percentile(latencies, 0.99) * 1000:8.2f}ms'
+    )
+
+
+def main() -> int:
+    """Compare filtered search latency without and with payload indexes."""
+    parser = argparse.ArgumentParser(
+        description='Benchmark filtered search on a multi-tenant collection.'
+    )
+    parser.add_argument('--url', default=Config.qdrant_url)
+    parser.add_argument('--collection', default='bench_payload_indexes')
+    parser.add_argument('--points', type=int, default=200_000)
+    parser.add_argument('--tenants', type=int, default=1_000)
+    parser.add_argument('--folders-per-tenant', type=int, default=5)
+    parser.add_argument('--dim', type=int, default=Config.text_vector_size)
+    parser.add_argument('--batch-size', type=int, default=1_000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--top-k', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument(
+        '--keep', action='store_true', help='Keep the collection afterwards.'
+    )
+    args = parser.parse_args()
+
+    client = get_qdrant_client(args.url)
+    rng = np.random.default_rng(args.seed)
+    if client.collection_exists(args.collection):
+        client.delete_collection(args.collection)
+    client.create_collection(
+        collection_name=args.collection,
+        vectors_config=VectorParams(size=args.dim, distance=Distance.COSINE),
+    )
+    try:
+        _out(
+            f'Filling {args.points} points for {args.tenants} tenants '
+            f'into {args.collection}...'
+        )
+        _fill_collection(client, args, rng)
+        _wait_until_indexed(client, args.collection)
+        before = _measure(client, args, rng)
+
+        ensure_payload_indexes(client, args.collection)
+        _wait_until_indexed(client, args.collection)
+        after = _measure(client, args, rng)
+
+        _report('no indexes', before)
+        _report('keyword indexes', after)
+        speedup = _percentile(before, 0.5) / max(_percentile(after, 0.5), 1e-9)
+        _out(f'p50 speedup: {speedup:.1f}x')
+    finally:
+        if not args.keep:
+            client.delete_collection(args.collection)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from backend.utils.config_handler import Config  # noqa: E402
+from backend.utils.qdrant_clients import get_qdrant_client  # noqa: E402
+from backend.utils.qdrant_collections import (  # noqa: E402
+    apply_collection_settings,
+    collection_names,
+    collection_profile,
+)
+
+
+def _out(line: str) -> None:
+    sys.stdout.write(f'{line}\n')
+
+
+def main() -> int:
+    """Apply configured quantization/HNSW/on_disk settings to collections."""
+    parser = argparse.ArgumentParser(
+        description=(
+            'Update existing collections to the quantization, HNSW and '
+            'on_disk settings from qdrant.collections in backend_config.yaml. '
+            'Safe to run repeatedly.'
+        )
+    )
+    parser.add_argument('--url', default=Config.qdrant_url)
+    parser.add_argument(
+        '--collection',
+        action='append',
+        dest='collections',
+        help='Collection to migrate (repeatable). Defaults to all.',
+    )
+    parser.add_argument(
+        '--dry-run',
+        action='store_true',
+        help='Only report settings that differ from the config.',
+    )
+    args = parser.parse_args()
+
+    client = get_qdrant_client(args.url)
+    collections = args.collections or collection_names(client)
+    failed = 0
+    for collection_name in collections:
+        profile = collection_profile(collection_name)
+        if profile is None:
+            _out(f'{collection_name}: skipped (no settings profile)')
+            continue
+        try:
+            changed = apply_collection_settings(
+                client, collection_name, dry_run=args.dry_run
+            )
+        except Exception as exc:  # noqa: BLE001
+            failed += 1
+            _out(f'{collection_name}: error: {exc}')
+            continue
+        action = 'would update' if args.dry_run else 'updated'
+        _out(
+            f'{collection_name} [{profile}]: {action} {", ".join(changed)}'
+            if changed
+            else f'{collection_name} [{profile}]: up to date'
+        )
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
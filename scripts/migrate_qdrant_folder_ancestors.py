@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from qdrant_client.models import (  # noqa: E402
+    Filter,
+    IsEmptyCondition,
+    PayloadField,
+)
+
+from backend.services.kb import ROOT_SCOPE, KBService  # noqa: E402
+from backend.utils.config_handler import Config  # noqa: E402
+from backend.utils.qdrant_clients import get_qdrant_client  # noqa: E402
+from backend.utils.qdrant_collections import (  # noqa: E402
+    collection_names,
+    ensure_payload_indexes,
+)
+
+_MISSING_ANCESTORS = Filter(
+    must=[IsEmptyCondition(is_empty=PayloadField(key='folder_ancestors'))]
+)
+
+
+def _out(line: str) -> None:
+    sys.stdout.write(f'{line}\n')
+
+
+def _points_by_folder(
+    client, name: str, *, batch_size: int
+) -> dict[tuple[str | None, str | None], list]:
+    """Group ids of points without ``folder_ancestors`` by owner/folder."""
+    grouped: dict[tuple[str | None, str | None], list] = defaultdict(list)
+    offset = None
+    while True:
+        records, offset = client.scroll(
+            collection_name=name,
+            scroll_filter=_MISSING_ANCESTORS,
+            limit=batch_size,
+            offset=offset,
+            with_payload=['user_id', 'folder_id'],
+            with_vectors=False,
+        )
+        for record in records:
+            payload = record.payload or {}
+            grouped[(payload.get('user_id'), payload.get('folder_id'))].append(
+                record.id
+            )
+        if offset is None:
+            return grouped
+
+
+def _ancestors(
+    kb: KBService, user_id: str | None, folder_id: str | None
+) -> list[str] | None:
+    """Resolve ``folder_ancestors``, or None for deleted/orphaned folders.
+
+    An unknown folder must not fall back to ``['root']``: that would make
+    files of a deleted folder match every root-scoped search.
+    """
+    if not folder_id:
+        return [ROOT_SCOPE]
+    if not user_id:
+        # Guest points have no folder tree to resolve.
+        return [folder_id]
+    if folder_id not in kb.get_folder_tree(user_id=user_id):
+        return None
+    return kb.get_folder_ancestor_ids(user_id=user_id, folder_id=folder_id)
+
+
+def main() -> int:
+    """Backfill the folder_ancestors payload on existing points."""
+    parser = argparse.ArgumentParser(
+        description=(
+            'Set folder_ancestors (folder ids from the top level down to the '
+            "point's folder) on points ingested before the field existed, "
+            'so RAG_FOLDER_FILTER=ancestors scopes them correctly. Vectors '
+            'are not touched. Safe to run repeatedly.'
+        )
+    )
+    parser.add_argument('--url', default=Config.qdrant_url)
+    parser.add_argument(
+        '--collection',
+        action='append',
+        dest='collections',
+        help='Collection to migrate (repeatable). Defaults to all.',
+    )
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument(
+        '--dry-run',
+        action='store_true',
+        help='Only count points without folder_ancestors.',
+    )
+    args = parser.parse_args()
+
+    client = get_qdrant_client(args.url)
+    kb = KBService()
+    ancestors_cache: dict[tuple[str | None, str | None], list[str] | None] = {}
+    collections = args.collections or collection_names(client)
+    failed = 0
+    for name in collections:
+        try:
+            grouped = _points_by_folder(
+                client, name, batch_size=args.batch_size
+            )
+            total = sum(len(ids) for ids in grouped.values())
+            if not total:
+                _out(f'{name}: up to date')
+                continue
+            if args.dry_run:
+                _out(f'{name}: {total} points need folder_ancestors')
+                continue
+            ensure_payload_indexes(client, name)
+            skipped = 0
+            for key, ids in grouped.items():
+                if key not in ancestors_cache:
+                    ancestors_cache[key] = _ancestors(kb, *key)
+                ancestors = ancestors_cache[key]
+                if ancestors is None:
+                    skipped += len(ids)
+                    continue
+                for start in range(0, len(ids), args.batch_size):
+                    client.set_payload(
+                        collection_name=name,
+                        payload={'folder_ancestors': ancestors},
+                        points=ids[start : start + args.batch_size],
+                        wait=True,
+                    )
+        except Exception as exc:  # noqa: BLE001
+            failed += 1
+            _out(f'{name}: error: {exc}')
+            continue
+        _out(f'{name}: backfilled {total - skipped} points')
+        if skipped:
+            _out(
+                f'{name}: skipped {skipped} points whose folder no longer '
+                'exists'
+            )
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
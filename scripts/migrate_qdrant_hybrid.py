@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from qdrant_client.models import (  # noqa: E402
+    CreateAlias,
+    CreateAliasOperation,
+    DeleteAlias,
+    DeleteAliasOperation,
+    PointStruct,
+)
+
+from backend.core.sparse_vectors import bm25_document_vector  # noqa: E402
+from backend.utils.config_handler import Config  # noqa: E402
+from backend.utils.qdrant_clients import get_qdrant_client  # noqa: E402
+from backend.utils.qdrant_collections import (  # noqa: E402
+    DENSE_VECTOR_NAME,
+    SPARSE_VECTOR_NAME,
+    collection_create_params,
+    ensure_payload_indexes,
+    hybrid_enabled,
+    sparse_vector_names,
+)
+
+# The hybrid copy of ``name`` lives in ``name + TARGET_SUFFIX`` and ``name``
+# becomes an alias of it. A leftover target means an interrupted run, which
+# is resumed. ``LEGACY_STAGING_SUFFIX`` is the staging collection of older
+# versions of this script; its points are recovered too.
+TARGET_SUFFIX = '__hybrid'
+LEGACY_STAGING_SUFFIX = '__hybrid_tmp'
+_SWITCH_ATTEMPTS = 3
+
+
+def _out(line: str) -> None:
+    sys.stdout.write(f'{line}\n')
+
+
+def _point(record, *, add_sparse: bool) -> PointStruct:
+    vector = record.vector
+    if add_sparse:
+        vector = {
+            DENSE_VECTOR_NAME: vector,
+            SPARSE_VECTOR_NAME: bm25_document_vector(
+                str((record.payload or {}).get('text') or '')
+            ),
+        }
+    return PointStruct(id=record.id, vector=vector, payload=record.payload)
+
+
+def _needs_sparse(client, name: str) -> bool:
+    return SPARSE_VECTOR_NAME not in sparse_vector_names(
+        client.get_collection(name)
+    )
+
+
+def _copy_points(client, source: str, target: str, *, batch_size: int) -> int:
+    """Copy all points, adding BM25 vectors if ``source`` has none."""
+    add_sparse = _needs_sparse(client, source)
+    copied = 0
+    offset = None
+    while True:
+        records, offset = client.scroll(
+            collection_name=source,
+            limit=batch_size,
+            offset=offset,
+            with_payload=True,
+            with_vectors=True,
+        )
+        if records:
+            client.upsert(
+                collection_name=target,
+                points=[
+                    _point(record, add_sparse=add_sparse) for record in records
+                ],
+                wait=True,
+            )
+            copied += len(records)
+        if offset is None:
+            return copied
+
+
+def _copy_missing(client, source: str, target: str, *, batch_size: int) -> int:
+    """Copy points of ``source`` whose ids are not in ``target`` yet.
+
+    Catches up with points ingested while the full copy was running.
+    """
+    add_sparse = _needs_sparse(client, source)
+    copied = 0
+    offset = None
+    while True:
+        records, offset = client.scroll(
+            collection_name=source,
+            limit=batch_size,
+            offset=offset,
+            with_payload=False,
+            with_vectors=False,
+        )
+        ids = [record.id for record in records]
+        present = {
+            record.id
+            for record in client.retrieve(
+                collection_name=target,
+                ids=ids,
+                with_payload=False,
+                with_vectors=False,
+            )
+        }
+        missing = [point_id for point_id in ids if point_id not in present]
+        if missing:
+            full = client.retrieve(
+                collection_name=source,
+                ids=missing,
+                with_payload=True,
+                with_vectors=True,
+            )
+            client.upsert(
+                collection_name=target,
+                points=[
+                    _point(record, add_sparse=add_sparse) for record in full
+                ],
+                wait=True,
+            )
+            copied += len(full)
+        if offset is None:
+            return copied
+
+
+def _aliases(client) -> dict[str, str]:
+    """Return alias name -> collection name."""
+    return {
+        alias.alias_name: alias.collection_name
+        for alias in client.get_aliases().aliases
+    }
+
+
+def _is_collection(client, name: str) -> bool:
+    return name in {
+        collection.name for collection in client.get_collections().collections
+    }
+
+
+def _switch_alias(client, name: str, target: str, *, batch_size: int) -> None:
+    """Point alias ``name`` at ``target``; drop what ``name`` named before.
+
+    An alias that already exists is swapped in one atomic request and its
+    old collection is deleted afterwards. A collection cannot share its name
+    with an alias, so a live collection called ``name`` is caught up once
+    more and deleted right before the alias is created; if ingest recreated
+    it in that gap, the new points are copied and the switch is retried.
+    """
+    for _ in range(_SWITCH_ATTEMPTS):
+        previous = _aliases(client).get(name)
+        if previous is None and _is_collection(client, name):
+            _copy_missing(client, name, target, batch_size=batch_size)
+            client.delete_collection(name)
+        operations = []
+        if previous is not None:
+            operations.append(
+                DeleteAliasOperation(delete_alias=DeleteAlias(alias_name=name))
+            )
+        operations.append(
+            CreateAliasOperation(
+                create_alias=CreateAlias(
+                    collection_name=target, alias_name=name
+                )
+            )
+        )
+        try:
+            client.update_collection_aliases(
+                change_aliases_operations=operations
+            )
+        except Exception:  # noqa: BLE001
+            continue
+        if previous is not None and previous != target:
+            client.delete_collection(previous)
+        return
+    raise RuntimeError(f'could not switch alias {name} to {target}')
+
+
+def _migrate(client, name: str, *, batch_size: int) -> int:
+    target = f'{name}{TARGET_SUFFIX}'
+    legacy = f'{name}{LEGACY_STAGING_SUFFIX}'
+    live = name in _aliases(client) or _is_collection(client, name)
+    if not client.collection_exists(target):
+        vectors = client.get_collection(
+            name if live else legacy
+        ).config.params.vectors
+        if isinstance(vectors, dict):
+            vectors = vectors[DENSE_VECTOR_NAME]
+        client.create_collection(
+            collection_name=target,
+            **collection_create_params(
+                name, vector_size=vectors.size, distance=vectors.distance
+            ),
+        )
+    if _is_collection(client, legacy):
+        _copy_points(client, legacy, target, batch_size=batch_size)
+    if live:
+        _copy_points(client, name, target, batch_size=batch_size)
+        _copy_missing(client, name, target, batch_size=batch_size)
+    _switch_alias(client, name, target, batch_size=batch_size)
+    ensure_payload_indexes(client, name)
+    if _is_collection(client, legacy):
+        client.delete_collection(legacy)
+    return client.count(collection_name=target, exact=True).count
+
+
+def _pending(client, name: str) -> bool:
+    """Return True when ``name`` lacks sparse vectors or a run was cut off."""
+    if _is_collection(client, f'{name}{LEGACY_STAGING_SUFFIX}'):
+        return True
+    target = f'{name}{TARGET_SUFFIX}'
+    if _is_collection(client, target) and _aliases(client).get(name) != target:
+        return True
+    return _needs_sparse(client, name)
+
+
+def _collection_names(client) -> list[str]:
+    """Return live names, including ones only left as staging copies."""
+    names = set(_aliases(client))
+    for collection in client.get_collections().collections:
+        name = collection.name
+        for suffix in (TARGET_SUFFIX, LEGACY_STAGING_SUFFIX):
+            if name.endswith(suffix):
+                name = name[: -len(suffix)]
+                break
+        names.add(name)
+    return sorted(names)
+
+
+def main() -> int:
+    """Add BM25 sparse vectors to existing text collections for hybrid mode."""
+    parser = argparse.ArgumentParser(
+        description=(
+            'Rebuild dense-only text and kb_* collections with a BM25 sparse '
+            'vector computed from payload text. Dense vectors are copied, not '
+            're-embedded, into <name>__hybrid, and <name> is switched to an '
+            'alias of it. Interrupted runs resume on the next run.'
+        )
+    )
+    parser.add_argument('--url', default=Config.qdrant_url)
+    parser.add_argument(
+        '--collection',
+        action='append',
+        dest='collections',
+        help='Collection to migrate (repeatable). Defaults to all.',
+    )
+    parser.add_argument('--batch-size', type=int, default=256)
+    parser.add_argument(
+        '--dry-run',
+        action='store_true',
+        help='Only list collections without a sparse vector.',
+    )
+    args = parser.parse_args()
+
+    if Config.rag_retrieval_mode != 'hybrid':
+        _out('RAG_RETRIEVAL_MODE is not "hybrid"; nothing to do.')
+        return 0
+
+    client = get_qdrant_client(args.url)
+    collections = args.collections or _collection_names(client)
+    failed = 0
+    for name in collections:
+        if not hybrid_enabled(name):
+            continue
+        try:
+            if not _pending(client, name):
+                _out(f'{name}: up to date')
+                continue
+            if args.dry_run:
+                _out(f'{name}: needs sparse vectors')
+                continue
+            copied = _migrate(client, name, batch_size=args.batch_size)
+        except Exception as exc:  # noqa: BLE001
+            failed += 1
+            _out(f'{name}: error: {exc}')
+            continue
+        _out(f'{name}: rebuilt with {copied} points')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
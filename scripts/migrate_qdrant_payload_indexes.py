@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from backend.utils.config_handler import Config  # noqa: E402
+from backend.utils.qdrant_clients import get_qdrant_client  # noqa: E402
+from backend.utils.qdrant_collections import (  # noqa: E402
+    collection_names,
+    ensure_payload_indexes,
+)
+
+
+def _out(line: str) -> None:
+    sys.stdout.write(f'{line}\n')
+
+
+def main() -> int:
+    """Backfill keyword payload indexes on existing Qdrant collections."""
+    parser = argparse.ArgumentParser(
+        description=(
+            'Create missing user_id/folder_scope/folder_ancestors/file_id/'
+            'owner_type payload indexes. Safe to run repeatedly.'
+        )
+    )
+    parser.add_argument('--url', default=Config.qdrant_url)
+    parser.add_argument(
+        '--collection',
+        action='append',
+        dest='collections',
+        help='Collection to migrate (repeatable). Defaults to all.',
+    )
+    parser.add_argument(
+        '--dry-run',
+        action='store_true',
+        help='Only report missing indexes.',
+    )
+    args = parser.parse_args()
+
+    client = get_qdrant_client(args.url)
+    collections = args.collections or collection_names(client)
+    failed = 0
+    for collection_name in collections:
+        try:
+            fields = ensure_payload_indexes(
+                client, collection_name, dry_run=args.dry_run
+            )
+        except Exception as exc:  # noqa: BLE001
+            failed += 1
+            _out(f'{collection_name}: error: {exc}')
+            continue
+        action = 'missing' if args.dry_run else 'created'
+        _out(
+            f'{collection_name}: {action} {", ".join(fields)}'
+            if fields
+            else f'{collection_name}: up to date'
+        )
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
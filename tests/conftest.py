@@ -1,6 +1,48 @@
 import sys
 from pathlib import Path
 
+import pytest
+
 ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
+
+
+@pytest.fixture(autouse=True)
+def _clear_query_vector_cache():
+    """Keep cached query vectors from leaking between tests."""
+    from backend.core.embeddings import get_query_vector_cache
+
+    get_query_vector_cache().clear()
+    yield
+    get_query_vector_cache().clear()
+
+
+@pytest.fixture(autouse=True)
+def _clear_folder_tree_cache():
+    """Keep cached folder trees from leaking between tests."""
+    from backend.services.folder_tree_cache import get_folder_tree_cache
+
+    get_folder_tree_cache().clear()
+    yield
+    get_folder_tree_cache().clear()
+
+
+@pytest.fixture(autouse=True)
+def _clear_token_count_cache():
+    """Keep cached chunk token counts from leaking between tests."""
+    from backend.core.context_packer import clear_token_count_cache
+
+    clear_token_count_cache()
+    yield
+    clear_token_count_cache()
+
+
+@pytest.fixture(autouse=True)
+def _clear_image_cache():
+    """Keep prepared LLM images from leaking between tests."""
+    from backend.core.vision_inputs import clear_image_cache
+
+    clear_image_cache()
+    yield
+    clear_image_cache()
@@ -0,0 +1,104 @@
+import json
+from types import SimpleNamespace
+
+from fastapi.testclient import TestClient
+
+from backend.api import endpoints
+from backend.core import llm, multimodal_rag
+from backend.main import app
+
+
+def _build_rag(monkeypatch) -> None:
+    rag = multimodal_rag.LocalRAG()
+    monkeypatch.setattr(
+        rag,
+        'retrieve_data',
+        lambda query, top_k, **kwargs: [
+            {'text': 'cats purr', 'source': 'cats.txt', 'file_id': 'f1'}
+        ],
+    )
+    monkeypatch.setattr(
+        llm,
+        'stream_llm_response',
+        lambda prompt, context=None, image=None, model=None: iter(
+            ['Cats ', 'purr.']
+        ),
+    )
+    monkeypatch.setattr(endpoints, 'rag', rag)
+    monkeypatch.setattr(endpoints, '_ingest_service', SimpleNamespace)
+
+
+def _parse_sse(text: str) -> list[tuple[str, dict]]:
+    events = []
+    for block in text.strip().split('\n\n'):
+        name_line, data_line = block.split('\n')
+        events.append(
+            (
+                name_line.removeprefix('event: '),
+                json.loads(data_line.removeprefix('data: ')),
+            )
+        )
+    return events
+
+
+def test_ask_streams_sources_then_tokens_over_sse(monkeypatch) -> None:
+    """Send sources before any token, and the full answer last."""
+    _build_rag(monkeypatch)
+
+    response = TestClient(app).post(
+        '/ask',
+        data={'query': 'what do cats do?', 'stream': 'true'},
+    )
+
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('text/event-stream')
+    events = _parse_sse(response.text)
+    assert [name for name, _ in events] == [
+        'sources',
+        'token',
+        'token',
+        'done',
+    ]
+    assert events[0][1]['retrieved_docs'][0]['source'] == 'cats.txt'
+    assert events[0][1]['guest_session_id'].startswith('guest-')
+    assert [data['text'] for _, data in events[1:3]] == ['Cats ', 'purr.']
+    assert events[-1][1]['answer'] == 'Cats purr.'
+
+
+def test_ask_auth_streams_ndjson_and_records_history(monkeypatch) -> None:
+    """Save the streamed answer to query history once generation is done."""
+    _build_rag(monkeypatch)
+    inserted: list[dict] = []
+    monkeypatch.setattr(
+        endpoints,
+        '_record_query_history',
+        lambda **kwargs: inserted.append(kwargs),
+    )
+    app.dependency_overrides[endpoints.get_current_user] = lambda: {
+        'id': 'user-1'
+    }
+    try:
+        response = TestClient(app).post(
+            '/ask_auth',
+            json={'query': 'what do cats do?'},
+            headers={'Accept': 'application/x-ndjson'},
+        )
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    events = [json.loads(line) for line in response.text.splitlines()]
+    assert [event['event'] for event in events] == [
+        'sources',
+        'token',
+        'token',
+        'done',
+    ]
+    assert inserted == [
+        {
+            'user_id': 'user-1',
+            'query': 'what do cats do?',
+            'answer': 'Cats purr.',
+            'retrieved_docs': events[0]['retrieved_docs'],
+        }
+    ]
@@ -0,0 +1,149 @@
+import json
+import threading
+
+from fastapi.testclient import TestClient
+
+from backend.api import endpoints
+from backend.core import multimodal_rag
+from backend.main import app
+
+
+def _hit(file_id: str, modality: str) -> list[dict]:
+    return [
+        {
+            'id': file_id,
+            'score': 0.9,
+            'payload': {
+                'file_id': file_id,
+                'modality': modality,
+                'text': f'{modality} chunk',
+                'source': f'{file_id}.bin',
+            },
+        }
+    ]
+
+
+def _build_rag(monkeypatch, release_video: threading.Event):
+    calls: list[dict] = []
+
+    class _Handler:
+        def __init__(self, *, url, collection_name, vector_size) -> None:
+            self.collection_name = collection_name
+
+        def search(self, query_vector, **kwargs):
+            calls.append({'collection': self.collection_name, **kwargs})
+            if self.collection_name == 'video_collection':
+                release_video.wait(timeout=5)
+            return _hit(f'{self.collection_name}-file', 'text')
+
+    monkeypatch.setattr(multimodal_rag, 'QdrantHandler', _Handler)
+    for modality in ('text', 'image', 'video'):
+        monkeypatch.setattr(
+            multimodal_rag.Config,
+            f'qdrant_{modality}_collection',
+            f'{modality}_collection',
+        )
+    monkeypatch.setattr(multimodal_rag.Config, 'rag_payload_fetch', 'inline')
+    monkeypatch.setattr(
+        multimodal_rag.Config,
+        'rag_search_timeouts',
+        {'text': 10.0, 'image': 10.0, 'video': 10.0},
+    )
+    monkeypatch.setattr(multimodal_rag, 'text_embedding', lambda q: [1.0])
+    monkeypatch.setattr(
+        multimodal_rag, 'multimodal_text_embedding', lambda q: [2.0]
+    )
+    monkeypatch.setattr(endpoints, 'rag', multimodal_rag.LocalRAG())
+    return calls
+
+
+def test_retrieval_events_arrive_before_slow_modality(monkeypatch) -> None:
+    """Yield fast modality hits while a slow search is still pending."""
+    release_video = threading.Event()
+    _build_rag(monkeypatch, release_video)
+
+    events = endpoints.rag.iter_retrieve_data('cats', top_k=3)
+    try:
+        early = [next(events), next(events)]
+    finally:
+        release_video.set()
+    rest = list(events)
+
+    assert {event['modality'] for event in early} == {'text', 'image'}
+    assert all(event['event'] == 'modality' for event in early)
+    assert (rest[0]['modality'], rest[0]['status']) == ('video', 'ok')
+    assert rest[-1]['event'] == 'results'
+    assert len(rest[-1]['results']) == 3
+
+
+def test_search_streams_ndjson_events(monkeypatch) -> None:
+    """Serve retrieval events as NDJSON when the client asks for it."""
+    release_video = threading.Event()
+    release_video.set()
+    _build_rag(monkeypatch, release_video)
+
+    response = TestClient(app).post(
+        '/search',
+        json={'query': 'cats', 'top_k': 3},
+        headers={'Accept': 'application/x-ndjson'},
+    )
+
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('application/x-ndjson')
+    events = [json.loads(line) for line in response.text.splitlines()]
+    assert [event['event'] for event in events] == [
+        'modality',
+        'modality',
+        'modality',
+        'results',
+    ]
+    assert events[-1]['cached'] is False
+    assert len(events[-1]['results']) == 3
+
+
+def test_search_auth_scopes_by_user_and_folders(monkeypatch) -> None:
+    """Run retrieval only, with user and folder filters, in one JSON body."""
+    release_video = threading.Event()
+    release_video.set()
+    calls = _build_rag(monkeypatch, release_video)
+
+    def _no_folder_lookup():
+        raise AssertionError('folder scopes must not hit Supabase')
+
+    monkeypatch.setattr(endpoints, '_kb_service', _no_folder_lookup)
+    monkeypatch.setattr(endpoints.Config, 'rag_folder_filter', 'ancestors')
+    app.dependency_overrides[endpoints.get_current_user] = lambda: {
+        'id': 'user-1'
+    }
+    try:
+        response = TestClient(app).post(
+            '/search_auth',
+            data={'query': 'cats', 'top_k': '2', 'folder_ids': 'f1'},
+        )
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body['query'] == 'cats'
+    assert len(body['results']) == 2
+    assert body['timed_out'] == []
+    assert {call['user_id'] for call in calls} == {'user-1'}
+    assert {tuple(call['folder_scopes']) for call in calls} == {('root', 'f1')}
+
+
+def test_guest_search_is_scoped_to_the_guest_session(monkeypatch) -> None:
+    """Never search other tenants' points from the guest endpoint."""
+    release_video = threading.Event()
+    release_video.set()
+    calls = _build_rag(monkeypatch, release_video)
+    client = TestClient(app)
+
+    client.post('/search', json={'query': 'cats', 'guest_session_id': 'g1'})
+    client.post('/search', json={'query': 'cats'})
+
+    sessions = [call['guest_session_id'] for call in calls]
+    assert sessions[:3] == ['g1'] * 3
+    assert all(s.startswith('guest-') for s in sessions[3:])
+    assert len(sessions) == 6
+    assert all(call.get('user_id') is None for call in calls)
@@ -0,0 +1,131 @@
+from backend.core import llm
+from backend.core.context_packer import (
+    TokenCounter,
+    dedupe_overlapping_chunks,
+    pack_context,
+)
+
+
+class _WordTokenizer:
+    """One token per whitespace-separated word."""
+
+    name_or_path = 'words'
+
+    def __init__(self) -> None:
+        self.encoded: list[str] = []
+
+    def encode(self, text: str, add_special_tokens: bool = False) -> list[str]:
+        self.encoded.append(text)
+        return text.split()
+
+    def decode(self, ids, skip_special_tokens: bool = True) -> str:
+        return ' '.join(ids)
+
+
+def _doc(text: str, score: float | None, file_id: str = 'f1') -> dict:
+    return {'text': text, 'score': score, 'file_id': file_id, 'source': 's'}
+
+
+def _pack(docs: list[dict], tokenizer: _WordTokenizer, budget: int):
+    return pack_context(
+        docs,
+        counter=TokenCounter(tokenizer),
+        token_budget=budget,
+        header=lambda doc, idx: f'[{idx}]',
+        text=lambda doc: doc['text'],
+    )
+
+
+def test_pack_fills_budget_best_scored_first() -> None:
+    """Skip a doc that does not fit and keep filling with smaller ones."""
+    tokenizer = _WordTokenizer()
+    docs = [
+        _doc('low score words here', 0.1, 'a'),
+        _doc(' '.join(['long'] * 10), 0.8, 'b'),
+        _doc('best match', 0.9, 'c'),
+        _doc('attached file text', None, 'd'),
+    ]
+
+    packed = _pack(docs, tokenizer, budget=18)
+
+    # Attachment first, then by score; the 10-word doc does not fit.
+    assert [doc['file_id'] for doc in packed.docs] == ['d', 'c', 'a']
+    assert packed.tokens == 18
+    assert packed.skipped == 1
+    assert packed.blocks[0] == '[1]\nattached file text'
+
+    chunk_calls = [text for text in tokenizer.encoded if '[' not in text]
+    _pack(docs, tokenizer, budget=18)
+    assert [
+        text for text in tokenizer.encoded if '[' not in text
+    ] == chunk_calls
+
+
+def test_pack_truncates_only_when_nothing_fits() -> None:
+    """Never return an empty context for a non-empty doc list."""
+    packed = _pack(
+        [_doc(' '.join(['w'] * 50), 0.5)], _WordTokenizer(), budget=10
+    )
+
+    assert packed.truncated == 1
+    assert packed.blocks == ['[1]\n' + ' '.join(['w'] * 7)]
+
+
+def test_overlapping_chunks_of_one_file_are_deduplicated() -> None:
+    """Cut the chunk_overlap text repeated by neighbouring chunks."""
+    first = 'Alpha beta gamma delta epsilon zeta eta theta iota kappa.'
+    second = 'eta theta iota kappa. Lambda mu nu xi omicron pi rho.'
+    docs = [
+        _doc(first, 0.9),
+        _doc(second, 0.8),
+        _doc('gamma delta epsilon zeta', 0.7),
+        _doc(second, 0.6, file_id='other'),
+    ]
+
+    kept, dropped = dedupe_overlapping_chunks(docs, max_overlap_chars=64)
+
+    assert dropped == 1
+    assert [doc['text'] for doc in kept] == [
+        first,
+        'Lambda mu nu xi omicron pi rho.',
+        second,
+    ]
+
+
+def test_pack_trims_overlap_between_attachment_chunks() -> None:
+    """Attachment chunks share a file id, so their overlap is cut once."""
+    docs = [
+        _doc('one two three four five six seven eight nine ten', None),
+        _doc('seven eight nine ten eleven twelve', None),
+        _doc('retrieved match', 0.9, 'other'),
+    ]
+
+    packed = _pack(docs, _WordTokenizer(), budget=100)
+
+    assert packed.duplicates == 0
+    assert [doc['text'] for doc in packed.docs] == [
+        'one two three four five six seven eight nine ten',
+        'eleven twelve',
+        'retrieved match',
+    ]
+
+
+def test_prompt_uses_backend_tokenizer_budget(monkeypatch) -> None:
+    """Build the prompt from packed blocks when the backend has a tokenizer."""
+
+    class _Backend:
+        model_name = 'words'
+
+        def context_tokenizer(self):
+            return _WordTokenizer()
+
+    monkeypatch.setattr(llm.Config, 'llm_context_token_budget', 30)
+    prompt = llm._build_prompt(
+        'q?',
+        [_doc(' '.join(['filler'] * 40), 0.9), _doc('short fact', 0.5)],
+        None,
+        _Backend(),
+    )
+
+    assert 'short fact' in prompt
+    assert 'filler' not in prompt
@@ -0,0 +1,51 @@
+import threading
+
+import pytest
+
+from backend.core.embedding_providers import MicroBatchScheduler
+
+
+def test_micro_batch_scheduler_coalesces_concurrent_calls() -> None:
+    """Concurrent callers share batched encode calls and get own vectors."""
+    batches: list[list[str]] = []
+    release = threading.Event()
+
+    def _batch_fn(items: list[str]) -> list[list[float]]:
+        release.wait(timeout=5)
+        batches.append(list(items))
+        return [[float(len(item))] for item in items]
+
+    scheduler = MicroBatchScheduler(
+        provider_name='p',
+        modality='text',
+        batch_fn=_batch_fn,
+        max_wait_seconds=0.05,
+        max_batch_size=64,
+    )
+    texts = ['a' * size for size in range(1, 9)]
+    futures = [scheduler.submit(text) for text in texts]
+    release.set()
+
+    assert [future.result(timeout=5) for future in futures] == [
+        [float(len(text))] for text in texts
+    ]
+    assert sum(len(batch) for batch in batches) == len(texts)
+    assert len(batches) < len(texts)
+
+
+def test_micro_batch_scheduler_propagates_errors() -> None:
+    """Every caller in a failed batch receives the encode exception."""
+
+    def _batch_fn(items: list[str]) -> list[list[float]]:
+        raise RuntimeError('model failed')
+
+    scheduler = MicroBatchScheduler(
+        provider_name='p',
+        modality='text',
+        batch_fn=_batch_fn,
+        max_wait_seconds=0.0,
+        max_batch_size=4,
+    )
+    future = scheduler.submit('x')
+    with pytest.raises(RuntimeError, match='model failed'):
+        future.result(timeout=5)
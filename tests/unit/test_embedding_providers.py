@@ -0,0 +1,36 @@
+import numpy as np
+
+from backend.core import embedding_providers
+
+
+class _FakeSentenceTransformer:
+    loaded: list[str] = []
+
+    def __init__(self, model_name: str) -> None:
+        _FakeSentenceTransformer.loaded.append(model_name)
+
+    def encode(self, value, **kwargs):
+        return np.array([1.0, 2.0])
+
+
+def test_sentence_transformer_provider_loads_models_lazily(
+    monkeypatch,
+) -> None:
+    """Load each model only when its modality is first used."""
+    monkeypatch.setattr(
+        embedding_providers, 'SentenceTransformer', _FakeSentenceTransformer
+    )
+    _FakeSentenceTransformer.loaded = []
+
+    provider = embedding_providers.SentenceTransformerProvider(
+        text_model_name='text-model',
+        image_model_name='image-model',
+    )
+    assert _FakeSentenceTransformer.loaded == []
+
+    assert provider.encode_text('hello') == [1.0, 2.0]
+    provider.encode_text('again')
+    assert _FakeSentenceTransformer.loaded == ['text-model']
+
+    provider.warmup(['video'])
+    assert _FakeSentenceTransformer.loaded == ['text-model', 'image-model']
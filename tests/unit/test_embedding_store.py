@@ -0,0 +1,107 @@
+import pytest
+
+from backend.core import embedding_store
+from backend.core.embedding_providers import get_provider_model_id
+from backend.utils.config_handler import Config
+
+
+def test_embedding_store_roundtrip_across_reopen(tmp_path) -> None:
+    """Persist vectors on disk and read them back after reopening."""
+    store = embedding_store.EmbeddingStore(tmp_path)
+    hashes = [embedding_store.content_hash(t) for t in ('a', 'b')]
+    store.put_many(
+        provider='p',
+        model='m',
+        hashes=hashes,
+        vectors=[[1.0, 2.0], [3.0, 4.0]],
+    )
+    store.close()
+
+    reopened = embedding_store.EmbeddingStore(tmp_path)
+    found = reopened.get_many(
+        provider='p',
+        model='m',
+        hashes=[hashes[1], 'missing', hashes[0]],
+    )
+    assert found == [[3.0, 4.0], None, [1.0, 2.0]]
+    assert reopened.get_many(provider='p', model='other', hashes=hashes) == [
+        None,
+        None,
+    ]
+
+
+def test_lookup_or_embed_only_embeds_missing_items(
+    monkeypatch, tmp_path
+) -> None:
+    """Call the model only for chunks whose hash is not stored yet."""
+    store = embedding_store.EmbeddingStore(tmp_path)
+    monkeypatch.setattr(embedding_store, 'get_embedding_store', lambda: store)
+    texts = ['alpha', 'beta', 'gamma']
+    hashes = [embedding_store.content_hash(text) for text in texts]
+    store.put_many(
+        provider='p', model='m', hashes=[hashes[1]], vectors=[[2.0]]
+    )
+    embedded: list[list[int]] = []
+
+    def _embed_missing(missing: list[int]) -> list[list[float]]:
+        embedded.append(missing)
+        return [[float(len(texts[idx]))] for idx in missing]
+
+    vectors = embedding_store.lookup_or_embed(
+        provider='p',
+        model='m',
+        modality='text',
+        hashes=hashes,
+        embed_missing=_embed_missing,
+    )
+    assert vectors == [[5.0], [2.0], [5.0]]
+    assert embedded == [[0, 2]]
+
+    again = embedding_store.lookup_or_embed(
+        provider='p',
+        model='m',
+        modality='text',
+        hashes=hashes,
+        embed_missing=_embed_missing,
+    )
+    assert again == vectors
+    assert embedded == [[0, 2]]
+
+
+def test_lookup_or_embed_rejects_unresolved_items(
+    monkeypatch, tmp_path
+) -> None:
+    """Fail loudly instead of returning fewer vectors than hashes."""
+    store = embedding_store.EmbeddingStore(tmp_path)
+    monkeypatch.setattr(embedding_store, 'get_embedding_store', lambda: store)
+    monkeypatch.setattr(store, 'put_many', lambda **_: None)
+
+    with pytest.raises(RuntimeError):
+        embedding_store.lookup_or_embed(
+            provider='p',
+            model='m',
+            modality='text',
+            hashes=['a', 'b'],
+            embed_missing=lambda missing: [[1.0], None],
+        )
+
+
+def test_model_id_separates_onnx_variants(monkeypatch) -> None:
+    """fp32 and int8 ONNX vectors never share a store key."""
+    providers = {
+        'st': {'type': 'sentence-transformers', 'text_model_name': 'mini'},
+        'int8': {'type': 'onnx', 'text_model_name': 'mini'},
+        'fp32': {'type': 'onnx', 'text_model_name': 'mini', 'quantize': False},
+    }
+    monkeypatch.setattr(Config, 'embedding_providers', providers)
+
+    ids = {
+        name: get_provider_model_id(name, modality='text')
+        for name in providers
+    }
+
+    assert ids['st'] == 'sentence-transformers:mini'
+    assert ids['int8'].endswith('-int8')
+    assert ids['fp32'].endswith('-fp32')
+    assert ids['int8'].startswith('onnx:mini@opset')
+    assert len(set(ids.values())) == 3
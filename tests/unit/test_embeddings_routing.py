@@ -51,3 +51,30 @@ def test_video_embedding_uses_config_sample_fps(monkeypatch) -> None:
     vector = embeddings.video_embedding_from_path('/tmp/file.mp4')
     assert captured['sample_fps'] == 2.5
     assert vector == [3.0, 2.5]
+
+
+def test_text_embeddings_batch_encodes_once_and_records_per_item(
+    monkeypatch,
+) -> None:
+    """Encode the whole batch in one provider call, observe every item."""
+    calls: list[list[str]] = []
+    observed: list[str] = []
+
+    class _FakeBatchProvider(_FakeProvider):
+        def encode_texts(self, texts: list[str]) -> list[list[float]]:
+            calls.append(list(texts))
+            return [[1.0, float(len(text))] for text in texts]
+
+    monkeypatch.setattr(
+        embeddings, 'get_provider', lambda *_: _FakeBatchProvider()
+    )
+    monkeypatch.setattr(
+        embeddings,
+        'observe_embedding_request',
+        lambda **kwargs: observed.append(kwargs['modality']),
+    )
+
+    vectors = embeddings.text_embeddings_batch(['a', 'bb', 'ccc'])
+    assert calls == [['a', 'bb', 'ccc']]
+    assert vectors == [[1.0, 1.0], [1.0, 2.0], [1.0, 3.0]]
+    assert observed == ['text', 'text', 'text']
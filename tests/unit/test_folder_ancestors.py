@@ -0,0 +1,167 @@
+import importlib.util
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from qdrant_client import QdrantClient
+from qdrant_client.models import PointStruct
+
+from backend.services import kb as kb_module
+from backend.utils import qdrant_handler
+
+
+class _FakeTable:
+    def __init__(self, rows: list[dict]) -> None:
+        self.rows = rows
+        self.filters: dict = {}
+        self.update_values: dict | None = None
+
+    def select(self, *_):
+        return self
+
+    def order(self, *_):
+        return self
+
+    def eq(self, key, value):
+        self.filters[key] = value
+        return self
+
+    def update(self, values: dict):
+        self.update_values = values
+        return self
+
+    def execute(self):
+        matched = [
+            row
+            for row in self.rows
+            if all(row.get(k) == v for k, v in self.filters.items())
+        ]
+        if self.update_values is not None:
+            for row in matched:
+                row.update(self.update_values)
+        return SimpleNamespace(data=[dict(row) for row in matched])
+
+
+def _build(monkeypatch):
+    folders = [
+        {'id': 'a', 'name': 'A', 'parent_id': None, 'user_id': 'u1'},
+        {'id': 'b', 'name': 'B', 'parent_id': 'a', 'user_id': 'u1'},
+        {'id': 'c', 'name': 'C', 'parent_id': None, 'user_id': 'u1'},
+    ]
+    supabase = SimpleNamespace(table=lambda name: _FakeTable(folders))
+    client = QdrantClient(':memory:')
+    monkeypatch.setattr(
+        kb_module, 'get_supabase_client', lambda role: supabase
+    )
+    monkeypatch.setattr(kb_module, 'get_qdrant_client', lambda: client)
+    monkeypatch.setattr(
+        qdrant_handler, 'get_qdrant_client', lambda url: client
+    )
+    monkeypatch.setattr(qdrant_handler.Config, 'rag_retrieval_mode', 'dense')
+    monkeypatch.setattr(qdrant_handler.Config, 'score_threshold', None)
+    monkeypatch.setattr(
+        qdrant_handler.Config, 'rag_folder_filter', 'ancestors'
+    )
+    handler = qdrant_handler.QdrantHandler(
+        url='http://ancestors-test',
+        collection_name=qdrant_handler.Config.qdrant_text_collection,
+        vector_size=2,
+    )
+    handler.registry.clear()
+    handler.create_collection()
+
+    kb = kb_module.KBService()
+    handler.upsert_points(
+        [
+            PointStruct(
+                id=idx,
+                vector=[1.0, 0.0],
+                payload={
+                    'user_id': 'u1',
+                    'folder_id': folder_id,
+                    'folder_ancestors': kb.get_folder_ancestor_ids(
+                        user_id='u1', folder_id=folder_id
+                    ),
+                },
+            )
+            for idx, folder_id in ((1, 'b'), (2, 'c'), (3, None))
+        ]
+    )
+    return kb, handler, client
+
+
+def _scoped_ids(handler, scopes: list[str]) -> set:
+    return {
+        hit['id']
+        for hit in handler.search(
+            [1.0, 0.0], top_k=10, user_id='u1', folder_scopes=scopes
+        )
+    }
+
+
+def test_scoped_search_matches_ancestor_ids(monkeypatch) -> None:
+    """Match a folder's whole subtree with one MatchAny, no expansion."""
+    kb, handler, _ = _build(monkeypatch)
+
+    assert kb.get_folder_ancestor_ids(user_id='u1', folder_id='b') == [
+        'a',
+        'b',
+    ]
+    assert kb.get_folder_ancestor_ids(user_id='u1', folder_id=None) == ['root']
+    assert _scoped_ids(handler, ['root', 'a']) == {1, 3}
+    assert _scoped_ids(handler, ['root', 'b']) == {1, 3}
+    assert _scoped_ids(handler, ['root', 'c']) == {2, 3}
+
+
+def test_move_folder_rewrites_subtree_payloads(monkeypatch) -> None:
+    """Re-scope vectors in place when a folder moves to another parent."""
+    kb, handler, client = _build(monkeypatch)
+
+    with pytest.raises(HTTPException) as exc_info:
+        kb.move_folder(user_id='u1', folder_id='a', parent_id='b')
+    assert exc_info.value.status_code == 400
+
+    kb.move_folder(user_id='u1', folder_id='b', parent_id='c')
+
+    assert _scoped_ids(handler, ['root', 'a']) == {3}
+    assert _scoped_ids(handler, ['root', 'c']) == {1, 2, 3}
+    payload = client.retrieve(handler.collection_name, ids=[1])[0].payload
+    assert payload['folder_ancestors'] == ['c', 'b']
+    assert payload['folder_path'] == 'C/B'
+
+
+def test_migration_skips_points_of_deleted_folders(monkeypatch) -> None:
+    """Never widen an orphaned point's scope to ``['root']``."""
+    kb, _, _ = _build(monkeypatch)
+    script = (
+        Path(__file__).resolve().parents[2]
+        / 'scripts'
+        / 'migrate_qdrant_folder_ancestors.py'
+    )
+    spec = importlib.util.spec_from_file_location('migrate_ancestors', script)
+    migration = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(migration)
+
+    assert migration._ancestors(kb, 'u1', 'b') == ['a', 'b']
+    assert migration._ancestors(kb, 'u1', None) == ['root']
+    assert migration._ancestors(kb, 'u1', 'deleted') is None
+
+
+def test_guest_session_filter_hides_other_owners(monkeypatch) -> None:
+    """A guest session sees its own points and no user's points."""
+    _, handler, _ = _build(monkeypatch)
+    handler.upsert_points(
+        [
+            PointStruct(
+                id=idx,
+                vector=[1.0, 0.0],
+                payload={'owner_type': 'guest', 'guest_session_id': session},
+            )
+            for idx, session in ((10, 'g1'), (11, 'g2'))
+        ]
+    )
+
+    hits = handler.search([1.0, 0.0], top_k=10, guest_session_id='g1')
+
+    assert [hit['id'] for hit in hits] == [10]
@@ -0,0 +1,121 @@
+from types import SimpleNamespace
+
+from backend.services import kb as kb_module
+from backend.services.folder_tree_cache import (
+    FolderTreeCache,
+    _MemoryVersions,
+)
+
+
+class _FoldersTable:
+    def __init__(self, db: '_FakeSupabase') -> None:
+        self.db = db
+        self.inserted: dict | None = None
+
+    def select(self, *_):
+        self.db.selects += 1
+        return self
+
+    def insert(self, row: dict):
+        self.inserted = row
+        return self
+
+    def eq(self, *_):
+        return self
+
+    def order(self, *_):
+        return self
+
+    def execute(self):
+        if self.inserted is not None:
+            row = {'id': f'f{len(self.db.folders)}', **self.inserted}
+            self.db.folders.append(row)
+            return SimpleNamespace(data=[row])
+        return SimpleNamespace(data=list(self.db.folders))
+
+
+class _FakeSupabase:
+    def __init__(self) -> None:
+        self.selects = 0
+        self.folders = [
+            {'id': 'a', 'name': 'A', 'parent_id': None},
+            {'id': 'b', 'name': 'B', 'parent_id': 'a'},
+        ]
+
+    def table(self, name: str) -> _FoldersTable:
+        return _FoldersTable(self)
+
+
+def test_folder_lookups_share_one_fetch_until_invalidated(
+    monkeypatch,
+) -> None:
+    """Serve repeated path/ancestor lookups from one cached tree."""
+    db = _FakeSupabase()
+    monkeypatch.setattr(kb_module, 'get_supabase_client', lambda role: db)
+    monkeypatch.setattr(kb_module, 'get_qdrant_client', lambda: None)
+
+    # A bulk reindex builds one service per row; all share the cache.
+    for _ in range(50):
+        kb = kb_module.KBService()
+        assert kb.get_folder_path(user_id='u1', folder_id='b') == 'A/B'
+        assert kb.get_folder_ancestor_ids(user_id='u1', folder_id='b') == [
+            'a',
+            'b',
+        ]
+    assert kb.get_descendant_folder_ids(user_id='u1', folder_ids=['a']) == [
+        'a',
+        'b',
+    ]
+    assert db.selects == 1
+
+    created = kb.create_folder(user_id='u1', name='C', parent_id='b')
+    assert kb.get_folder_path(user_id='u1', folder_id=created['id']) == (
+        'A/B/C'
+    )
+    assert db.selects == 2
+
+    # A folder created elsewhere is picked up on the first lookup miss.
+    db.folders.append({'id': 'd', 'name': 'D', 'parent_id': None})
+    assert kb.get_folder_path(user_id='u1', folder_id='d') == 'D'
+    assert db.selects == 3
+
+
+def test_versions_invalidate_trees_cached_by_other_processes() -> None:
+    """Drop a peer's cached tree when the shared version is bumped."""
+    versions = _MemoryVersions()
+    web = FolderTreeCache(versions, ttl_seconds=60, max_users=2)
+    worker = FolderTreeCache(versions, ttl_seconds=60, max_users=2)
+    rows = [{'id': 'a', 'name': 'A', 'parent_id': None}]
+    loads: list[int] = []
+
+    def load():
+        loads.append(1)
+        return list(rows)
+
+    assert worker.get('u1', load).path('a') == 'A'
+    assert worker.get('u1', load).path('a') == 'A'
+    rows[0] = {**rows[0], 'name': 'Renamed'}
+    web.invalidate('u1')
+
+    assert worker.get('u1', load).path('a') == 'Renamed'
+    assert len(loads) == 2
+
+
+def test_ingest_payload_ignores_tree_cached_before_a_move(
+    monkeypatch,
+) -> None:
+    """A move done by another process without shared versions is seen."""
+    db = _FakeSupabase()
+    monkeypatch.setattr(kb_module, 'get_supabase_client', lambda role: db)
+    monkeypatch.setattr(kb_module, 'get_qdrant_client', lambda: None)
+    kb = kb_module.KBService()
+    assert kb.get_folder_path(user_id='u1', folder_id='b') == 'A/B'
+
+    db.folders[1] = {**db.folders[1], 'parent_id': None}
+
+    assert kb.get_folder_path(user_id='u1', folder_id='b') == 'A/B'
+    assert kb.get_folder_payload(user_id='u1', folder_id='b') == ('B', ['b'])
+    assert kb.get_folder_payload(user_id='u1', folder_id=None) == (
+        'root',
+        ['root'],
+    )
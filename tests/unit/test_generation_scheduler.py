@@ -0,0 +1,135 @@
+import threading
+from concurrent.futures import wait
+
+import pytest
+import torch
+from prometheus_client import REGISTRY
+from transformers import LlamaConfig, LlamaForCausalLM
+
+from backend.core import llm
+
+
+def _tiny_model() -> LlamaForCausalLM:
+    torch.manual_seed(0)
+    config = LlamaConfig(
+        vocab_size=64,
+        hidden_size=32,
+        intermediate_size=64,
+        num_hidden_layers=2,
+        num_attention_heads=4,
+        num_key_value_heads=2,
+        max_position_embeddings=128,
+        bos_token_id=None,
+        eos_token_id=None,
+        pad_token_id=None,
+    )
+    model = LlamaForCausalLM(config).eval()
+    model.generation_config.eos_token_id = None
+    model.generation_config.pad_token_id = 0
+    return model
+
+
+def _inputs(prompt: list[int]) -> dict[str, torch.Tensor]:
+    ids = torch.tensor([prompt])
+    return {'input_ids': ids, 'attention_mask': torch.ones_like(ids)}
+
+
+def _greedy(model, prompt: list[int], limit: int) -> list[int]:
+    output = model.generate(
+        **_inputs(prompt), max_new_tokens=limit, do_sample=False
+    )
+    return output[0][len(prompt) :].tolist()
+
+
+def test_continuous_batches_match_sequential_greedy_decoding() -> None:
+    """Join and evict sequences mid-batch without changing their tokens."""
+    model = _tiny_model()
+    prompts = [[5, 6, 7, 8, 9], [10, 11], [12, 13, 14, 15, 16, 17, 18], [3]]
+    max_new_tokens = [3, 8, 5, 6]
+    expected = []
+    for prompt, limit in zip(prompts, max_new_tokens, strict=True):
+        output = model.generate(
+            **_inputs(prompt), max_new_tokens=limit, do_sample=False
+        )
+        expected.append(output[0][len(prompt) :].tolist())
+    steps_before = (
+        REGISTRY.get_sample_value(
+            'llm_batch_occupancy_count', {'model': 'tiny'}
+        )
+        or 0.0
+    )
+
+    scheduler = llm.GenerationScheduler(
+        model, model_name='tiny', pad_token_id=0, max_batch_size=2
+    )
+    futures = [
+        scheduler.submit(_inputs(prompt), max_new_tokens=limit)
+        for prompt, limit in zip(prompts, max_new_tokens, strict=True)
+    ]
+    wait(futures, timeout=60)
+
+    assert [future.result().tolist() for future in futures] == expected
+    steps = (
+        REGISTRY.get_sample_value(
+            'llm_batch_occupancy_count', {'model': 'tiny'}
+        )
+        - steps_before
+    )
+    # Sequential decoding would need sum(max_new_tokens - 1) = 18 steps.
+    assert steps < 18
+    assert (
+        REGISTRY.get_sample_value('llm_batch_occupancy_sum', {'model': 'tiny'})
+        > steps
+    )
+
+
+def test_generation_config_logits_processors_are_applied() -> None:
+    """Honour repetition_penalty and n-gram blocking like ``generate``."""
+    model = _tiny_model()
+    prompts = [[5, 6, 7, 8, 9], [10, 11], [3]]
+    plain = [_greedy(model, prompt, 12) for prompt in prompts]
+    model.generation_config.repetition_penalty = 3.0
+    model.generation_config.no_repeat_ngram_size = 2
+    expected = [_greedy(model, prompt, 12) for prompt in prompts]
+    assert expected != plain
+
+    scheduler = llm.GenerationScheduler(
+        model, model_name='tiny', pad_token_id=0, max_batch_size=2
+    )
+    futures = [
+        scheduler.submit(_inputs(prompt), max_new_tokens=12)
+        for prompt in prompts
+    ]
+    wait(futures, timeout=60)
+
+    assert [future.result().tolist() for future in futures] == expected
+
+
+class _BlockingModel:
+    def __init__(self) -> None:
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def generate(self, input_ids, **kwargs) -> torch.Tensor:
+        self.started.set()
+        self.release.wait(timeout=10)
+        return torch.cat([input_ids, torch.tensor([[7]])], dim=-1)
+
+
+def test_full_queue_rejects_prompts() -> None:
+    """Reject prompts once max_queued_prompts are waiting."""
+    model = _BlockingModel()
+    scheduler = llm.GenerationScheduler(
+        model, model_name='blocking', pad_token_id=0, max_queued_prompts=1
+    )
+    image_inputs = {**_inputs([1, 2]), 'pixel_values': torch.zeros(1, 3)}
+
+    running = scheduler.submit(image_inputs)
+    assert model.started.wait(timeout=10)
+    queued = scheduler.submit(image_inputs)
+    with pytest.raises(llm.GenerationQueueFullError):
+        scheduler.submit(image_inputs)
+    model.release.set()
+
+    assert running.result(timeout=10).tolist() == [7]
+    assert queued.result(timeout=10).tolist() == [7]
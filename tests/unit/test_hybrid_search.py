@@ -0,0 +1,83 @@
+from qdrant_client import QdrantClient
+from qdrant_client.models import PointStruct
+
+from backend.core.sparse_vectors import (
+    bm25_document_vector,
+    bm25_query_vector,
+    term_index,
+    tokenize,
+)
+from backend.utils import qdrant_handler
+from backend.utils.qdrant_collections import SPARSE_VECTOR_NAME
+
+
+def test_bm25_vectors_saturate_term_frequency() -> None:
+    """Weight repeated terms sublinearly and keep any-script tokens."""
+    assert tokenize('МРТ головного мозга, T2 и 3 серии') == [
+        'мрт',
+        'головного',
+        'мозга',
+        't2',
+        '3',
+        'серии',
+    ]
+    doc = bm25_document_vector(
+        'glioma glioma glioma scan', k1=1.2, b=0.0, avg_doc_length=4
+    )
+    weights = dict(zip(doc.indices, doc.values, strict=True))
+    assert weights[term_index('scan')] == 1.0
+    assert 1.0 < weights[term_index('glioma')] < 3.0
+    assert doc.indices == sorted(doc.indices)
+    assert bm25_query_vector('Glioma glioma').values == [1.0]
+
+
+def test_hybrid_search_fuses_dense_and_sparse_in_qdrant(monkeypatch) -> None:
+    """Surface keyword matches that dense similarity alone ranks low."""
+    client = QdrantClient(':memory:')
+    monkeypatch.setattr(
+        qdrant_handler, 'get_qdrant_client', lambda url: client
+    )
+    monkeypatch.setattr(qdrant_handler.Config, 'rag_retrieval_mode', 'hybrid')
+    monkeypatch.setattr(qdrant_handler.Config, 'score_threshold', None)
+    handler = qdrant_handler.QdrantHandler(
+        url='http://hybrid-test',
+        collection_name=qdrant_handler.Config.qdrant_text_collection,
+        vector_size=2,
+    )
+    handler.registry.clear()
+    handler.create_collection()
+    assert handler.supports_sparse()
+
+    texts = {
+        1: 'general notes about the weekly schedule',
+        2: 'another unrelated paragraph about lunch',
+        3: 'pembrolizumab dosage for stage IV melanoma',
+    }
+    dense = {1: [1.0, 0.0], 2: [0.9, 0.1], 3: [0.0, 1.0]}
+    handler.upsert_points(
+        [
+            PointStruct(id=idx, vector=dense[idx], payload={'text': text})
+            for idx, text in texts.items()
+        ],
+        sparse_texts=list(texts.values()),
+    )
+    stored = client.retrieve(
+        handler.collection_name, ids=[3], with_vectors=True
+    )[0]
+    assert SPARSE_VECTOR_NAME in stored.vector
+
+    dense_only = handler.search([1.0, 0.0], top_k=1)
+    hybrid = handler.search(
+        [1.0, 0.0], top_k=2, query_text='pembrolizumab dosage'
+    )
+
+    assert [hit['id'] for hit in dense_only] == [1]
+    assert 3 in [hit['id'] for hit in hybrid]
+
+    monkeypatch.setattr(qdrant_handler.Config, 'rag_retrieval_mode', 'dense')
+    assert [
+        hit['id']
+        for hit in handler.search(
+            [1.0, 0.0], top_k=1, query_text='pembrolizumab'
+        )
+    ] == [1]
@@ -0,0 +1,90 @@
+import threading
+import time
+from concurrent.futures import Future
+
+import torch
+from prometheus_client import REGISTRY
+
+from backend.core import llm
+
+
+class _Tokenizer:
+    def decode(self, token_ids, **kwargs) -> str:
+        return ''.join(f'w{int(token_id)} ' for token_id in token_ids)
+
+
+def _fake_submit(steps: list[int]):
+    def _submit(streamer, cancelled: threading.Event) -> Future:
+        future: Future = Future()
+
+        def _decode() -> None:
+            streamer.put(torch.tensor([[100, 101]]))
+            for token_id in range(1, 6):
+                if cancelled.is_set():
+                    break
+                steps.append(token_id)
+                streamer.put(torch.tensor([token_id]))
+                time.sleep(0.05)
+            streamer.end()
+            future.set_result(torch.tensor(steps))
+
+        threading.Thread(target=_decode, daemon=True).start()
+        return future
+
+    return _submit
+
+
+def _sample(name: str) -> float:
+    return (
+        REGISTRY.get_sample_value(name, {'model': 'fake', 'mode': 'stream'})
+        or 0.0
+    )
+
+
+def test_stream_generate_yields_tokens_and_observes_metrics() -> None:
+    """Yield decoded text per token, skipping the prompt."""
+    tokens_before = _sample('llm_generated_tokens_total')
+    steps: list[int] = []
+
+    chunks = list(
+        llm._stream_generate(
+            model_name='fake',
+            tokenizer=_Tokenizer(),
+            submit=_fake_submit(steps),
+        )
+    )
+
+    assert ''.join(chunks) == 'w1 w2 w3 w4 w5 '
+    assert _sample('llm_generated_tokens_total') - tokens_before == 5
+    assert (
+        REGISTRY.get_sample_value(
+            'llm_time_to_first_token_seconds_count', {'model': 'fake'}
+        )
+        >= 1
+    )
+
+
+def test_closing_stream_stops_generation() -> None:
+    """Stop decoding once the consumer stops reading."""
+    steps: list[int] = []
+    chunks = llm._stream_generate(
+        model_name='fake',
+        tokenizer=_Tokenizer(),
+        submit=_fake_submit(steps),
+    )
+
+    assert next(chunks) == 'w1 '
+    chunks.close()
+    time.sleep(0.2)
+
+    assert len(steps) < 5
+
+
+def test_base_backend_streams_blocking_answer() -> None:
+    """Fall back to one chunk for backends without incremental decoding."""
+
+    class _Backend(llm.BaseLLMBackend):
+        def generate(self, prompt, context=None, image=None) -> str:
+            return f'answer to {prompt}'
+
+    assert list(_Backend().stream('q')) == ['answer to q']
@@ -0,0 +1,112 @@
+import importlib.util
+from pathlib import Path
+
+import pytest
+from qdrant_client import QdrantClient
+from qdrant_client.models import Distance, PointStruct, VectorParams
+
+from backend.utils.config_handler import Config
+from backend.utils.qdrant_collections import (
+    SPARSE_VECTOR_NAME,
+    collection_create_params,
+    collection_names,
+    sparse_vector_names,
+)
+
+_SCRIPT = (
+    Path(__file__).resolve().parents[2]
+    / 'scripts'
+    / 'migrate_qdrant_hybrid.py'
+)
+
+
+@pytest.fixture
+def migration(monkeypatch):
+    """Load the migration script as a module in hybrid mode."""
+    monkeypatch.setattr(Config, 'rag_retrieval_mode', 'hybrid')
+    spec = importlib.util.spec_from_file_location('migrate_hybrid', _SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _points(ids: range) -> list[PointStruct]:
+    return [
+        PointStruct(
+            id=idx, vector=[1.0, float(idx)], payload={'text': f'doc {idx}'}
+        )
+        for idx in ids
+    ]
+
+
+def _assert_migrated(client, name: str, count: int) -> None:
+    target = f'{name}__hybrid'
+    assert {
+        a.alias_name: a.collection_name for a in client.get_aliases().aliases
+    }[name] == target
+    assert SPARSE_VECTOR_NAME in sparse_vector_names(
+        client.get_collection(name)
+    )
+    assert client.count(name, exact=True).count == count
+    assert collection_names(client) == [name]
+
+
+def test_rebuilds_behind_alias(migration) -> None:
+    """Copy into ``name__hybrid`` and make ``name`` an alias of it."""
+    name = Config.qdrant_text_collection
+    client = QdrantClient(':memory:')
+    client.create_collection(
+        name, vectors_config=VectorParams(size=2, distance=Distance.COSINE)
+    )
+    client.upsert(name, points=_points(range(5)))
+
+    assert migration._pending(client, name)
+    assert migration._migrate(client, name, batch_size=2) == 5
+
+    _assert_migrated(client, name, 5)
+    assert not migration._pending(client, name)
+
+
+def test_resumes_after_crash_between_delete_and_switch(migration) -> None:
+    """A target without its alias is finished, not reported up to date."""
+    name = Config.qdrant_text_collection
+    client = QdrantClient(':memory:')
+    target = f'{name}__hybrid'
+    client.create_collection(
+        target, **collection_create_params(name, vector_size=2)
+    )
+    client.create_collection(
+        'source', vectors_config=VectorParams(size=2, distance=Distance.COSINE)
+    )
+    client.upsert('source', points=_points(range(3)))
+    migration._copy_points(client, 'source', target, batch_size=10)
+    client.delete_collection('source')
+
+    assert migration._collection_names(client) == [name]
+    assert migration._pending(client, name)
+    migration._migrate(client, name, batch_size=10)
+
+    _assert_migrated(client, name, 3)
+
+
+def test_recovers_legacy_staging_collection(migration) -> None:
+    """Points left in ``__hybrid_tmp`` by the old script are restored."""
+    name = Config.qdrant_text_collection
+    client = QdrantClient(':memory:')
+    legacy = f'{name}__hybrid_tmp'
+    params = collection_create_params(name, vector_size=2)
+    client.create_collection(
+        'source', vectors_config=VectorParams(size=2, distance=Distance.COSINE)
+    )
+    client.upsert('source', points=_points(range(4)))
+    client.create_collection(legacy, **params)
+    migration._copy_points(client, 'source', legacy, batch_size=10)
+    client.delete_collection('source')
+    # Searches recreated the live collection empty, with sparse vectors.
+    client.create_collection(name, **params)
+
+    assert migration._pending(client, name)
+    migration._migrate(client, name, batch_size=10)
+
+    _assert_migrated(client, name, 4)
+    assert not client.collection_exists(legacy)
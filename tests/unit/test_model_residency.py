@@ -0,0 +1,82 @@
+import threading
+import time
+
+import pytest
+
+from backend.core.model_residency import (
+    ModelBudgetExceededError,
+    ModelResidencyManager,
+)
+
+
+class _Backend:
+    def __init__(self, name: str, size: int) -> None:
+        self.name = name
+        self.size = size
+        self.unloaded = False
+
+    def memory_bytes(self) -> int:
+        return self.size
+
+    def unload(self) -> None:
+        self.unloaded = True
+
+
+def test_concurrent_first_requests_share_one_load() -> None:
+    """Wait on the in-flight load instead of building the model again."""
+    builds: list[str] = []
+
+    def build(name: str) -> _Backend:
+        builds.append(name)
+        time.sleep(0.2)
+        return _Backend(name, 1)
+
+    manager = ModelResidencyManager(build, budget_bytes=0)
+    results: list[_Backend] = []
+    threads = [
+        threading.Thread(target=lambda: results.append(manager.acquire('m')))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert builds == ['m']
+    assert len({id(backend) for backend in results}) == 1
+
+
+def test_budget_evicts_idle_models_least_recently_used_first() -> None:
+    """Unload idle unpinned models, keep leased ones, reject what can't fit."""
+    built: dict[str, _Backend] = {}
+
+    def build(name: str) -> _Backend:
+        built[name] = _Backend(name, 4)
+        return built[name]
+
+    manager = ModelResidencyManager(
+        build,
+        budget_bytes=10,
+        pinned=['default'],
+        size_estimates={'huge': 20},
+    )
+    for name in ('default', 'b', 'c'):
+        manager.release(manager.acquire(name))
+
+    assert manager.resident_models() == {'default': 4, 'c': 4}
+    assert built['b'].unloaded
+
+    leased = manager.acquire('c')
+    manager.release(manager.acquire('d'))
+    assert set(manager.resident_models()) == {'default', 'c', 'd'}
+    assert not leased.unloaded
+
+    manager.release(leased)
+    manager.release(manager.acquire('b'))
+    assert set(manager.resident_models()) == {'default', 'b'}
+    assert built['c'].unloaded and built['d'].unloaded
+
+    with pytest.raises(ModelBudgetExceededError):
+        manager.acquire('huge')
+    assert 'huge' not in built
+    assert set(manager.resident_models()) == {'default', 'b'}
@@ -1,3 +1,9 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
 from backend.core import multimodal_rag
 
 
@@ -18,6 +24,8 @@ class _FakeHandler:
         user_id: str | None = None,
         folder_scopes: list[str] | None = None,
         file_ids: list[str] | None = None,
+        query_text: str | None = None,
+        with_payload: bool | list[str] = True,
     ) -> list[dict]:
         _FakeHandler.calls_by_collection[self.collection_name].append(
             {
@@ -26,6 +34,8 @@ class _FakeHandler:
                 'user_id': user_id,
                 'folder_scopes': folder_scopes,
                 'file_ids': file_ids,
+                'query_text': query_text,
+                'with_payload': with_payload,
             }
         )
         return list(
@@ -103,3 +113,135 @@ def test_retrieve_data_uses_attachment_image_vector(monkeypatch) -> None:
     assert _FakeHandler.calls_by_collection['text_collection'] == []
     assert _FakeHandler.calls_by_collection['video_collection'] == []
     assert [doc['file_id'] for doc in docs] == ['other-file']
+
+
+def test_retrieve_data_fans_out_and_drops_slow_modality(monkeypatch) -> None:
+    """Search collections concurrently and skip a modality that times out."""
+    barrier = threading.Barrier(2, timeout=2)
+    release_video = threading.Event()
+
+    class _ConcurrentHandler(_FakeHandler):
+        def search(self, query_vector, **kwargs):
+            if self.collection_name == 'video_collection':
+                release_video.wait(timeout=2)
+            else:
+                # Text and image must be in flight at the same time.
+                barrier.wait()
+            return super().search(query_vector, **kwargs)
+
+    monkeypatch.setattr(multimodal_rag, 'QdrantHandler', _ConcurrentHandler)
+    for modality in ('text', 'image', 'video'):
+        monkeypatch.setattr(
+            multimodal_rag.Config,
+            f'qdrant_{modality}_collection',
+            f'{modality}_collection',
+        )
+    monkeypatch.setattr(
+        multimodal_rag.Config,
+        'rag_search_timeouts',
+        {'text': 2.0, 'image': 2.0, 'video': 0.05},
+    )
+    monkeypatch.setattr(multimodal_rag, 'text_embedding', lambda q: [1.0])
+    monkeypatch.setattr(
+        multimodal_rag, 'multimodal_text_embedding', lambda q: [2.0]
+    )
+
+    def _hit(file_id: str, modality: str) -> list[dict]:
+        return [
+            {
+                'id': file_id,
+                'score': 0.9,
+                'payload': {'file_id': file_id, 'modality': modality},
+            }
+        ]
+
+    _FakeHandler.calls_by_collection = {}
+    _FakeHandler.results_by_collection = {
+        'text_collection': _hit('text-file', 'text'),
+        'image_collection': _hit('image-file', 'image'),
+        'video_collection': _hit('video-file', 'video'),
+    }
+
+    try:
+        docs = multimodal_rag.LocalRAG().retrieve_data('cats', top_k=5)
+    finally:
+        release_video.set()
+
+    assert {doc['file_id'] for doc in docs} == {'text-file', 'image-file'}
+    assert (
+        _FakeHandler.calls_by_collection['text_collection'][0]['query_text']
+        == 'cats'
+    )
+    assert (
+        _FakeHandler.calls_by_collection['image_collection'][0]['query_text']
+        is None
+    )
+
+
+def _single_worker_rag(monkeypatch, handler_cls, timeouts: dict):
+    """Build a LocalRAG whose searches share one search worker."""
+    executor = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(multimodal_rag, '_SEARCH_EXECUTOR', executor)
+    monkeypatch.setattr(multimodal_rag, 'QdrantHandler', handler_cls)
+    for modality in ('text', 'image', 'video'):
+        monkeypatch.setattr(
+            multimodal_rag.Config,
+            f'qdrant_{modality}_collection',
+            f'{modality}_collection',
+        )
+    monkeypatch.setattr(multimodal_rag.Config, 'rag_search_timeouts', timeouts)
+    monkeypatch.setattr(multimodal_rag.Config, 'rag_payload_fetch', 'inline')
+    monkeypatch.setattr(multimodal_rag, 'text_embedding', lambda q: [1.0])
+    monkeypatch.setattr(
+        multimodal_rag, 'multimodal_text_embedding', lambda q: [2.0]
+    )
+    _FakeHandler.calls_by_collection = {}
+    _FakeHandler.results_by_collection = {}
+    return multimodal_rag.LocalRAG(), executor
+
+
+def test_queue_wait_does_not_count_against_search_timeout(
+    monkeypatch,
+) -> None:
+    """A search queued behind others still gets its full timeout."""
+
+    class _SlowHandler(_FakeHandler):
+        def search(self, query_vector, **kwargs):
+            time.sleep(0.4)
+            return super().search(query_vector, **kwargs)
+
+    rag, executor = _single_worker_rag(
+        monkeypatch, _SlowHandler, {'text': 1.0, 'image': 1.0, 'video': 1.0}
+    )
+    try:
+        events = list(rag.iter_retrieve_data('cats', top_k=5))
+    finally:
+        executor.shutdown(wait=True)
+
+    # Video starts after ~0.8s in the queue and runs another 0.4s.
+    assert [event.get('status') for event in events[:-1]] == ['ok'] * 3
+    assert events[-1]['timed_out'] == []
+
+
+def test_search_still_queued_after_timeout_is_rejected(monkeypatch) -> None:
+    """Raise instead of reporting a starved modality as "no matches"."""
+    release = threading.Event()
+
+    class _BlockingHandler(_FakeHandler):
+        def search(self, query_vector, **kwargs):
+            if self.collection_name == 'text_collection':
+                release.wait(timeout=5)
+            return super().search(query_vector, **kwargs)
+
+    rag, executor = _single_worker_rag(
+        monkeypatch,
+        _BlockingHandler,
+        {'text': 5.0, 'image': 0.1, 'video': 5.0},
+    )
+    try:
+        with pytest.raises(multimodal_rag.SearchCapacityError):
+            rag.retrieve_data('cats', top_k=5)
+    finally:
+        release.set()
+        executor.shutdown(wait=True)
+    assert _FakeHandler.calls_by_collection['image_collection'] == []
@@ -0,0 +1,183 @@
+import json
+
+import numpy as np
+import pytest
+from PIL import Image
+
+pytest.importorskip('onnxruntime')
+torch = pytest.importorskip('torch')
+transformers = pytest.importorskip('transformers')
+sentence_transformers = pytest.importorskip('sentence_transformers')
+
+from backend.core.onnx_embeddings import OnnxEmbeddingProvider  # noqa: E402
+
+_TEXTS = ['the cat sat on the mat', 'a red car', 'blue sky photo ' * 8]
+
+
+@pytest.fixture(scope='module')
+def tiny_models(tmp_path_factory):
+    """Build tiny random ST text and CLIP checkpoints on local disk."""
+    root = tmp_path_factory.mktemp('tiny-models')
+    torch.manual_seed(0)
+
+    words = ['[PAD]', '[UNK]', '[CLS]', '[SEP]', '[MASK]']
+    words += 'the a cat sat on mat red car blue sky photo'.split()
+    (root / 'vocab.txt').write_text('\n'.join(words))
+    hf_dir = root / 'bert'
+    transformers.BertModel(
+        transformers.BertConfig(
+            vocab_size=len(words),
+            hidden_size=32,
+            num_hidden_layers=2,
+            num_attention_heads=4,
+            intermediate_size=64,
+            max_position_embeddings=64,
+        )
+    ).save_pretrained(hf_dir)
+    transformers.BertTokenizerFast(
+        vocab_file=str(root / 'vocab.txt')
+    ).save_pretrained(hf_dir)
+    from sentence_transformers import models
+
+    text_model = sentence_transformers.SentenceTransformer(
+        modules=[
+            models.Transformer(str(hf_dir), max_seq_length=16),
+            models.Pooling(32, 'mean'),
+            models.Normalize(),
+        ]
+    )
+    text_model.save(str(root / 'st-text'))
+
+    vocab = {'<|startoftext|>': 0, '<|endoftext|>': 1}
+    for char in 'abcdefghijklmnopqrstuvwxyz':
+        vocab[char] = len(vocab)
+        vocab[f'{char}</w>'] = len(vocab)
+    (root / 'vocab.json').write_text(json.dumps(vocab))
+    (root / 'merges.txt').write_text('#version: 0.2\n')
+    processor = transformers.CLIPProcessor(
+        image_processor=transformers.CLIPImageProcessor(
+            size={'shortest_edge': 32},
+            crop_size={'height': 32, 'width': 32},
+        ),
+        tokenizer=transformers.CLIPTokenizer(
+            str(root / 'vocab.json'),
+            str(root / 'merges.txt'),
+            model_max_length=77,
+        ),
+    )
+    clip_model = transformers.CLIPModel(
+        transformers.CLIPConfig(
+            text_config={
+                'hidden_size': 32,
+                'intermediate_size': 64,
+                'num_hidden_layers': 2,
+                'num_attention_heads': 4,
+                'vocab_size': len(vocab),
+                'bos_token_id': 0,
+                'eos_token_id': 1,
+                'pad_token_id': 1,
+            },
+            vision_config={
+                'hidden_size': 32,
+                'intermediate_size': 64,
+                'num_hidden_layers': 2,
+                'num_attention_heads': 4,
+                'image_size': 32,
+                'patch_size': 8,
+            },
+            projection_dim=16,
+        )
+    ).eval()
+    clip_dir = root / 'st-clip'
+    clip_model.save_pretrained(clip_dir / '0_CLIPModel')
+    processor.save_pretrained(clip_dir / '0_CLIPModel')
+    (clip_dir / 'modules.json').write_text(
+        json.dumps(
+            [
+                {
+                    'idx': 0,
+                    'name': '0',
+                    'path': '0_CLIPModel',
+                    'type': 'sentence_transformers.models.CLIPModel',
+                }
+            ]
+        )
+    )
+    return {
+        'root': root,
+        'text_model': text_model,
+        'clip_model': clip_model,
+        'processor': processor,
+    }
+
+
+def _clip_reference(tiny_models, images):
+    clip_model = tiny_models['clip_model']
+    processor = tiny_models['processor']
+
+    def _features(output):
+        return output if torch.is_tensor(output) else output.pooler_output
+
+    with torch.no_grad():
+        text_inputs = processor.tokenizer(
+            _TEXTS, padding=True, truncation=True, return_tensors='pt'
+        )
+        image_inputs = processor.image_processor(
+            images=images, return_tensors='pt'
+        )
+        return (
+            _features(clip_model.get_text_features(**text_inputs)).numpy(),
+            _features(clip_model.get_image_features(**image_inputs)).numpy(),
+        )
+
+
+def _cosine(left: np.ndarray, right: np.ndarray) -> np.ndarray:
+    return (left * right).sum(axis=1) / (
+        np.linalg.norm(left, axis=1) * np.linalg.norm(right, axis=1)
+    )
+
+
+@pytest.mark.parametrize('quantize', [False, True])
+def test_onnx_provider_matches_torch_vectors(tiny_models, quantize) -> None:
+    """Keep ONNX vectors interchangeable with SentenceTransformers ones."""
+    root = tiny_models['root']
+    provider = OnnxEmbeddingProvider(
+        text_model_name=str(root / 'st-text'),
+        image_model_name=str(root / 'st-clip'),
+        model_dir=root / 'onnx',
+        quantize=quantize,
+        intra_op_threads=1,
+        batch_size=2,
+    )
+    images = [
+        Image.fromarray(
+            np.random.RandomState(seed).randint(
+                0, 255, (40 + seed * 10, 50, 3), dtype=np.uint8
+            )
+        )
+        for seed in range(3)
+    ]
+
+    text_vectors = np.asarray(provider.encode_texts(_TEXTS))
+    expected_text = tiny_models['text_model'].encode(_TEXTS)
+    clip_text_vectors = np.asarray(provider.encode_multimodal_texts(_TEXTS))
+    image_vectors = np.asarray(provider.encode_images(images))
+    expected_clip_text, expected_images = _clip_reference(tiny_models, images)
+
+    single_vector = np.asarray([provider.encode_text(_TEXTS[0])])
+
+    assert text_vectors.shape == expected_text.shape
+    assert image_vectors.shape == expected_images.shape
+    pairs = [
+        (text_vectors, expected_text),
+        (single_vector, expected_text[:1]),
+        (clip_text_vectors, expected_clip_text),
+        (image_vectors, expected_images),
+    ]
+    for actual, expected in pairs:
+        if quantize:
+            # Dynamic int8 quantizes activations per batch, so compare
+            # directions rather than exact values.
+            assert _cosine(actual, expected).min() > 0.99
+        else:
+            np.testing.assert_allclose(actual, expected, atol=1e-4)
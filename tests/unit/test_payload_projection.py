@@ -0,0 +1,124 @@
+import json
+
+from qdrant_client import QdrantClient
+from qdrant_client.models import PointStruct
+
+from backend.core import multimodal_rag
+from backend.utils import qdrant_handler
+
+
+class _SpyClient(QdrantClient):
+    def __init__(self) -> None:
+        super().__init__(':memory:')
+        self.queries: list[dict] = []
+        self.retrieves: list[dict] = []
+        self.payload_bytes = 0
+
+    def query_points(self, collection_name: str, **kwargs):
+        response = super().query_points(collection_name, **kwargs)
+        self.queries.append(
+            {'collection': collection_name, **kwargs},
+        )
+        self.payload_bytes += sum(
+            len(json.dumps(point.payload or {})) for point in response.points
+        )
+        return response
+
+    def retrieve(self, collection_name: str, ids, **kwargs):
+        records = super().retrieve(collection_name, ids, **kwargs)
+        self.retrieves.append({'collection': collection_name, 'ids': ids})
+        self.payload_bytes += sum(
+            len(json.dumps(record.payload or {})) for record in records
+        )
+        return records
+
+
+def _payload(file_id: str, modality: str, text: str) -> dict:
+    return {
+        'text': text,
+        'source': f'/uploads/{file_id}',
+        'source_path': f'{file_id}.bin',
+        'file_id': file_id,
+        'modality': modality,
+        'owner_id': 'owner-' + '0' * 32,
+        'folder_path': 'root/' + '/'.join(['nested-folder'] * 8),
+        'ingested_at': '2026-01-01T00:00:00+00:00',
+    }
+
+
+def _build_rag(monkeypatch, payload_fetch: str):
+    client = _SpyClient()
+    monkeypatch.setattr(
+        qdrant_handler, 'get_qdrant_client', lambda url: client
+    )
+    monkeypatch.setattr(multimodal_rag.Config, 'rag_retrieval_mode', 'dense')
+    monkeypatch.setattr(
+        multimodal_rag.Config, 'rag_payload_fetch', payload_fetch
+    )
+    monkeypatch.setattr(multimodal_rag.Config, 'score_threshold', None)
+    for modality in ('text', 'image', 'video'):
+        monkeypatch.setattr(
+            multimodal_rag.Config, f'{modality}_vector_size', 2
+        )
+    monkeypatch.setattr(multimodal_rag, 'text_embedding', lambda q: [1.0, 0])
+    monkeypatch.setattr(
+        multimodal_rag, 'multimodal_text_embedding', lambda q: [0.0, 1.0]
+    )
+    rag = multimodal_rag.LocalRAG()
+    rag.client.registry.clear()
+    long_text = 'chunk text ' * 200
+    rag.client.create_collection()
+    rag.image_client.create_collection()
+    rag.video_client.create_collection()
+    rag.client.upsert_points(
+        [
+            PointStruct(
+                id=idx,
+                vector=[1.0, idx / 10],
+                payload=_payload(f'doc-{idx}', 'text', long_text),
+            )
+            for idx in range(8)
+        ]
+    )
+    rag.image_client.upsert_points(
+        [
+            PointStruct(
+                id=100 + idx,
+                vector=[idx / 10, 1.0],
+                payload=_payload(f'img-{idx}', 'image', long_text),
+            )
+            for idx in range(8)
+        ]
+    )
+    return rag, client
+
+
+def test_two_phase_fetches_payloads_only_for_winners(monkeypatch) -> None:
+    """Search with projected payloads and hydrate only the fused top_k."""
+    rag, full_client = _build_rag(monkeypatch, 'inline')
+    rag.client.search([1.0, 0.0], top_k=3)
+    rag.image_client.search([0.0, 1.0], top_k=3)
+    full_bytes = full_client.payload_bytes
+
+    rag, inline_client = _build_rag(monkeypatch, 'inline')
+    inline_docs = rag.retrieve_data('query', top_k=3)
+    inline_bytes = inline_client.payload_bytes
+
+    assert {
+        tuple(query['with_payload']) for query in inline_client.queries
+    } == {multimodal_rag.RAG_PAYLOAD_FIELDS}
+    assert inline_client.retrieves == []
+
+    rag, two_phase_client = _build_rag(monkeypatch, 'two_phase')
+    two_phase_docs = rag.retrieve_data('query', top_k=3)
+
+    assert two_phase_docs == inline_docs
+    assert {
+        tuple(query['with_payload']) for query in two_phase_client.queries
+    } == {multimodal_rag.FUSION_PAYLOAD_FIELDS}
+    assert sum(len(call['ids']) for call in two_phase_client.retrieves) == len(
+        two_phase_docs
+    )
+    assert len(two_phase_client.retrieves) <= 2
+    assert two_phase_client.payload_bytes < inline_bytes < full_bytes
+    assert all(doc['text'] for doc in two_phase_docs)
@@ -0,0 +1,363 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from qdrant_client.models import (
+    Disabled,
+    Distance,
+    ScalarQuantization,
+    VectorParams,
+)
+
+from backend.utils import qdrant_clients, qdrant_collections, qdrant_handler
+from backend.utils.qdrant_collections import (
+    PAYLOAD_INDEXES,
+    CollectionRegistry,
+    apply_collection_settings,
+    build_search_params,
+    ensure_payload_indexes,
+)
+
+
+class _NotFoundError(Exception):
+    status_code = 404
+
+
+class _FakeQdrantClient:
+    def __init__(self, *, url: str | None = None, **kwargs) -> None:
+        self.collections: dict[str, object] = {}
+        self.payload_schema: dict[str, dict[str, object]] = {}
+        self.create_kwargs: dict[str, dict[str, object]] = {}
+        self.calls: list[str] = []
+        self.kwargs = kwargs
+
+    def close(self) -> None:
+        self.calls.append('close')
+
+    def get_collections(self):
+        self.calls.append('get_collections')
+        return SimpleNamespace(
+            collections=[
+                SimpleNamespace(name=name) for name in self.collections
+            ]
+        )
+
+    def get_collection(self, collection_name: str):
+        self.calls.append('get_collection')
+        if collection_name not in self.collections:
+            raise _NotFoundError(f'Collection {collection_name} not found')
+        kwargs = self.create_kwargs.get(collection_name, {})
+        return SimpleNamespace(
+            config=SimpleNamespace(
+                params=SimpleNamespace(
+                    vectors=self.collections[collection_name]
+                ),
+                hnsw_config=kwargs.get('hnsw_config'),
+                quantization_config=kwargs.get('quantization_config'),
+            ),
+            payload_schema=self.payload_schema.get(collection_name, {}),
+        )
+
+    def update_collection(self, *, collection_name: str, **kwargs):
+        self.calls.append(f'update_collection:{",".join(sorted(kwargs))}')
+        self.create_kwargs.setdefault(collection_name, {}).update(kwargs)
+        if 'vectors_config' in kwargs:
+            vectors = self.collections[collection_name]
+            self.collections[collection_name] = vectors.model_copy(
+                update={'on_disk': kwargs['vectors_config'][''].on_disk}
+            )
+
+    def create_collection(
+        self, *, collection_name: str, vectors_config, **kwargs
+    ):
+        self.calls.append('create_collection')
+        self.collections[collection_name] = vectors_config
+        self.create_kwargs[collection_name] = kwargs
+
+    def create_payload_index(
+        self, *, collection_name: str, field_name: str, field_schema, wait
+    ):
+        self.calls.append(f'create_payload_index:{field_name}')
+        self.payload_schema.setdefault(collection_name, {})[field_name] = (
+            field_schema
+        )
+
+    def query_points(self, *, collection_name: str, **kwargs):
+        self.calls.append('query_points')
+        if collection_name not in self.collections:
+            raise _NotFoundError(f'Collection {collection_name} not found')
+        return SimpleNamespace(points=[])
+
+
+def test_registry_skips_existence_checks_for_known_collections() -> None:
+    """Verify a collection once, then answer from the registry."""
+    client = _FakeQdrantClient()
+    client.collections['docs'] = 'docs-params'
+    registry = CollectionRegistry()
+
+    assert registry.refresh(client, with_params=['docs']) == ['docs']
+    registry.ensure(client, 'docs', vector_size=4)
+    registry.ensure(client, 'scoped', vector_size=4)
+    registry.ensure(client, 'scoped', vector_size=4)
+
+    assert client.calls == [
+        'get_collections',
+        'get_collection',
+        'get_collection',
+        'create_collection',
+        *(f'create_payload_index:{field}' for field in PAYLOAD_INDEXES),
+    ]
+    assert registry.vector_params(client, 'docs') == 'docs-params'
+    assert registry.vector_params(client, 'scoped').size == 4
+
+
+def test_search_recreates_collection_dropped_behind_registry(
+    monkeypatch,
+) -> None:
+    """Invalidate on "not found" and recreate instead of failing search."""
+    monkeypatch.setattr(
+        qdrant_handler,
+        'get_qdrant_client',
+        lambda url: _FakeQdrantClient(url=url),
+    )
+    handler = qdrant_handler.QdrantHandler(
+        url='http://registry-test', collection_name='docs', vector_size=4
+    )
+    handler.registry.clear()
+
+    assert handler.search([0.1, 0.2, 0.3, 0.4]) == []
+    assert handler.search([0.1, 0.2, 0.3, 0.4]) == []
+    assert handler.client.calls.count('get_collection') == 1
+
+    del handler.client.collections['docs']
+    assert handler.search([0.1, 0.2, 0.3, 0.4]) == []
+    assert 'docs' in handler.client.collections
+    assert handler.client.calls[-len(PAYLOAD_INDEXES) - 3 :] == [
+        'query_points',
+        'get_collection',
+        'create_collection',
+        *(f'create_payload_index:{field}' for field in PAYLOAD_INDEXES),
+    ]
+    with pytest.raises(ValueError):
+        handler.registry.ensure(
+            SimpleNamespace(
+                get_collection=_raise_value_error,
+                create_collection=_raise_value_error,
+            ),
+            'broken',
+            vector_size=4,
+        )
+
+
+def _raise_value_error(*args, **kwargs):
+    raise ValueError('qdrant unavailable')
+
+
+class _RacingClient(_FakeQdrantClient):
+    """Another process creates a dense-only collection after our lookup."""
+
+    def create_collection(self, *, collection_name: str, **kwargs):
+        self.calls.append('create_collection')
+        self.collections[collection_name] = 'their-params'
+        raise _ConflictError(f'Collection {collection_name} already exists')
+
+
+class _ConflictError(Exception):
+    status_code = 409
+
+
+def _raise_timeout(*args, **kwargs):
+    raise TimeoutError('timed out')
+
+
+def test_registry_only_creates_missing_collections(monkeypatch) -> None:
+    """Propagate lookup failures and re-read params after a create race."""
+    monkeypatch.setattr(
+        qdrant_collections.Config, 'rag_retrieval_mode', 'hybrid'
+    )
+    name = qdrant_collections.Config.qdrant_text_collection
+    assert qdrant_collections.collection_create_params(name, vector_size=4)[
+        'sparse_vectors_config'
+    ]
+    registry = CollectionRegistry()
+    client = _FakeQdrantClient()
+    client.get_collection = _raise_timeout
+    with pytest.raises(TimeoutError):
+        registry.ensure(client, name, vector_size=4)
+    assert 'create_collection' not in client.calls
+    assert not registry.is_known(name)
+
+    racing = _RacingClient()
+    registry.ensure(racing, name, vector_size=4)
+
+    assert registry.is_known(name)
+    assert registry.vector_params(racing, name) == 'their-params'
+    assert registry.sparse_vectors(racing, name) == frozenset()
+
+
+def test_payload_indexes_are_created_once_and_backfilled() -> None:
+    """Index filtered fields on create and only backfill missing ones."""
+    client = _FakeQdrantClient()
+    CollectionRegistry().ensure(client, 'fresh', vector_size=4)
+
+    schema = client.payload_schema['fresh']
+    assert set(schema) == set(PAYLOAD_INDEXES)
+    assert schema['user_id'].is_tenant is True
+    assert ensure_payload_indexes(client, 'fresh') == []
+
+    client.collections['legacy'] = 'legacy-params'
+    client.payload_schema['legacy'] = {'file_id': 'keyword'}
+    assert ensure_payload_indexes(client, 'legacy', dry_run=True) == [
+        'user_id',
+        'folder_scope',
+        'folder_ancestors',
+        'owner_type',
+        'guest_session_id',
+    ]
+    assert 'user_id' not in client.payload_schema['legacy']
+    assert ensure_payload_indexes(client, 'legacy') == [
+        'user_id',
+        'folder_scope',
+        'folder_ancestors',
+        'owner_type',
+        'guest_session_id',
+    ]
+    assert ensure_payload_indexes(client, 'legacy') == []
+
+
+def test_collections_use_profile_quantization_and_hnsw(monkeypatch) -> None:
+    """Create, search and migrate collections with per-profile settings."""
+    monkeypatch.setattr(
+        qdrant_collections.Config,
+        'qdrant_collection_settings',
+        {
+            'text': {
+                'on_disk': True,
+                'hnsw': {'m': 32, 'ef_construct': 200},
+                'quantization': {'type': 'scalar', 'always_ram': True},
+                'search': {'hnsw_ef': 96, 'rescore': True, 'oversampling': 2},
+            },
+            'scoped': {'quantization': {'type': 'none'}},
+        },
+    )
+    text = qdrant_collections.Config.qdrant_text_collection
+    client = _FakeQdrantClient()
+    CollectionRegistry().ensure(client, text, vector_size=4)
+
+    kwargs = client.create_kwargs[text]
+    assert client.collections[text].on_disk is True
+    assert kwargs['hnsw_config'].m == 32
+    assert kwargs['quantization_config'].scalar.always_ram is True
+    search_params = build_search_params(text)
+    assert search_params.hnsw_ef == 96
+    assert search_params.quantization.oversampling == 2
+    assert build_search_params('kb_user_root_root') is None
+    assert apply_collection_settings(client, text) == []
+
+    client.collections['legacy'] = VectorParams(
+        size=4, distance=Distance.COSINE
+    )
+    monkeypatch.setattr(
+        qdrant_collections.Config, 'qdrant_text_collection', 'legacy'
+    )
+    assert apply_collection_settings(client, 'legacy', dry_run=True) == [
+        'hnsw_config',
+        'quantization_config',
+        'vectors_config',
+    ]
+    assert 'legacy' not in client.create_kwargs
+    apply_collection_settings(client, 'legacy')
+    assert isinstance(
+        client.create_kwargs['legacy']['quantization_config'],
+        ScalarQuantization,
+    )
+    assert apply_collection_settings(client, 'legacy') == []
+
+    client.collections['kb_user_root_root'] = client.collections['legacy']
+    client.create_kwargs['kb_user_root_root'] = {
+        'quantization_config': kwargs['quantization_config']
+    }
+    apply_collection_settings(client, 'kb_user_root_root')
+    assert (
+        client.create_kwargs['kb_user_root_root']['quantization_config']
+        is Disabled.DISABLED
+    )
+    assert apply_collection_settings(client, 'unrelated') == []
+
+
+def test_qdrant_client_factory_shares_pooled_client(monkeypatch) -> None:
+    """Build one pooled client per URL and reuse it across services."""
+    monkeypatch.setattr(qdrant_clients, 'QdrantClient', _FakeQdrantClient)
+    monkeypatch.setattr(qdrant_clients.Config, 'qdrant_prefer_grpc', True)
+    monkeypatch.setattr(qdrant_clients.Config, 'qdrant_pool_size', 8)
+    qdrant_clients.close_qdrant_clients()
+
+    first = qdrant_clients.get_qdrant_client('http://pool-test')
+    second = qdrant_clients.get_qdrant_client('http://pool-test')
+
+    assert first is second
+    assert first.kwargs['prefer_grpc'] is True
+    assert first.kwargs['limits'].max_connections == 8
+    assert 'grpc.keepalive_time_ms' in first.kwargs['grpc_options']
+    qdrant_clients.close_qdrant_clients()
+    assert first.calls == ['close']
+
+
+def test_app_shutdown_closes_shared_clients(monkeypatch) -> None:
+    """Close pooled Qdrant clients when the app stops, poller or not."""
+    from backend import main
+
+    monkeypatch.setattr(qdrant_clients, 'QdrantClient', _FakeQdrantClient)
+    for name in (
+        'warmup_providers',
+        'prime_collection_registry',
+        'preload_llm_models',
+    ):
+        monkeypatch.setattr(main, name, lambda: None)
+    monkeypatch.setenv('INGEST_POLLER_ENABLED', 'false')
+    qdrant_clients.close_qdrant_clients()
+    client = qdrant_clients.get_qdrant_client('http://shutdown-test')
+
+    async def _run() -> None:
+        async with main.lifespan(main.app):
+            pass
+
+    asyncio.run(_run())
+
+    assert client.calls == ['close']
+    assert qdrant_clients.get_qdrant_client('http://shutdown-test') is not (
+        client
+    )
+    qdrant_clients.close_qdrant_clients()
+
+
+class _StoppedPoller:
+    def __init__(self, **kwargs) -> None:
+        pass
+
+    async def run(self) -> None:
+        return None
+
+    def stop(self) -> None:
+        pass
+
+
+def test_worker_shutdown_closes_shared_clients(monkeypatch) -> None:
+    """Both ingest worker entry points close pooled Qdrant clients."""
+    from backend import worker, worker_app
+
+    monkeypatch.setattr(qdrant_clients, 'QdrantClient', _FakeQdrantClient)
+    for module in (worker, worker_app):
+        monkeypatch.setattr(module, 'warmup_providers', lambda: None)
+        monkeypatch.setattr(module, 'prime_collection_registry', lambda: None)
+        monkeypatch.setattr(module, 'IngestPoller', _StoppedPoller)
+
+    async def _serve() -> None:
+        async with worker_app.lifespan(worker_app.app):
+            pass
+
+    for run in (_serve, worker._run_worker):
+        qdrant_clients.close_qdrant_clients()
+        client = qdrant_clients.get_qdrant_client('http://worker-test')
+        asyncio.run(run())
+        assert client.calls == ['close']
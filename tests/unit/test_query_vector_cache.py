@@ -0,0 +1,89 @@
+from PIL import Image
+
+from backend.core import embeddings
+
+
+class _CountingProvider:
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def encode_text(self, text: str) -> list[float]:
+        self.calls += 1
+        return [float(len(text))]
+
+    def encode_multimodal_text(self, text: str) -> list[float]:
+        self.calls += 1
+        return [-float(len(text))]
+
+    def encode_image(self, image) -> list[float]:
+        self.calls += 1
+        return [float(image.width)]
+
+
+def test_text_embedding_reuses_cached_vector(monkeypatch) -> None:
+    """Repeated queries differing only in whitespace skip the provider."""
+    provider = _CountingProvider()
+    monkeypatch.setattr(embeddings, 'get_provider', lambda *_: provider)
+
+    first = embeddings.text_embedding('hello  world', provider_name='p')
+    second = embeddings.text_embedding(' hello world ', provider_name='p')
+
+    assert first == second == [12.0]
+    assert provider.calls == 1
+
+
+def test_cache_keys_are_separated_by_modality(monkeypatch) -> None:
+    """Text and CLIP-space vectors for the same query never collide."""
+    provider = _CountingProvider()
+    monkeypatch.setattr(embeddings, 'get_provider', lambda *_: provider)
+
+    text_vector = embeddings.text_embedding('cat', provider_name='p')
+    clip_vector = embeddings.multimodal_text_embedding(
+        'cat', provider_name='p'
+    )
+
+    assert text_vector == [3.0]
+    assert clip_vector == [-3.0]
+    assert provider.calls == 2
+
+
+def test_query_vector_cache_evicts_lru_and_expired(monkeypatch) -> None:
+    """Drop least recently used entries and entries past their TTL."""
+    now = {'value': 100.0}
+    monkeypatch.setattr(embeddings.time, 'monotonic', lambda: now['value'])
+    cache = embeddings.QueryVectorCache(max_entries=2, ttl_seconds=10)
+
+    cache.put(('p', 'text', 'a'), [1.0])
+    cache.put(('p', 'text', 'b'), [2.0])
+    assert cache.get(('p', 'text', 'a')) == [1.0]
+    cache.put(('p', 'text', 'c'), [3.0])
+
+    assert cache.get(('p', 'text', 'b')) is None
+    assert cache.get(('p', 'text', 'c')) == [3.0]
+
+    now['value'] = 111.0
+    assert cache.get(('p', 'text', 'a')) is None
+
+
+def test_ingest_image_embedding_bypasses_query_cache(
+    monkeypatch, tmp_path
+) -> None:
+    """Ingest neither hashes the file again nor evicts cached queries."""
+    provider = _CountingProvider()
+    cache = embeddings.QueryVectorCache(max_entries=1, ttl_seconds=60)
+    cache.put(('p', 'text', 'hot'), [1.0])
+    monkeypatch.setattr(embeddings, 'get_provider', lambda *_: provider)
+    monkeypatch.setattr(embeddings, '_QUERY_VECTOR_CACHE', cache)
+    path = tmp_path / 'photo.png'
+    Image.new('RGB', (4, 2)).save(path)
+
+    def _no_hash(_path) -> str:
+        raise AssertionError('ingest must not hash the file here')
+
+    monkeypatch.setattr(embeddings, 'file_content_hash', _no_hash)
+    vector = embeddings.image_embedding_from_path(
+        str(path), provider_name='p', use_cache=False
+    )
+
+    assert vector == [4.0]
+    assert cache.get(('p', 'text', 'hot')) == [1.0]
@@ -0,0 +1,189 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from PIL import Image
+
+from backend.core import llm, remote_llm
+from backend.core.remote_llm import (
+    OpenAICompatibleBackend,
+    RemoteLLMUnavailableError,
+)
+from backend.utils.config_handler import Config
+
+
+class _StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self) -> None:
+        super().__init__(('127.0.0.1', 0), _Handler)
+        self.requests: list[dict] = []
+        self.client_ports: list[int] = []
+        self.failures = 0
+
+    @property
+    def base_url(self) -> str:
+        return f'http://127.0.0.1:{self.server_address[1]}/v1'
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def do_POST(self) -> None:
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        server: _StubServer = self.server
+        server.requests.append(body)
+        server.client_ports.append(self.client_address[1])
+        if server.failures:
+            server.failures -= 1
+            self._send(503, {'error': {'message': 'busy'}})
+            return
+        words = ['Ответ', ' от', ' сервера']
+        if not body.get('stream'):
+            self._send(
+                200,
+                {
+                    'id': 'cmpl-1',
+                    'object': 'chat.completion',
+                    'created': 0,
+                    'model': body['model'],
+                    'choices': [
+                        {
+                            'index': 0,
+                            'finish_reason': 'stop',
+                            'message': {
+                                'role': 'assistant',
+                                'content': ''.join(words),
+                            },
+                        }
+                    ],
+                    'usage': {
+                        'prompt_tokens': 5,
+                        'completion_tokens': 3,
+                        'total_tokens': 8,
+                    },
+                },
+            )
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        for word in words:
+            chunk = {
+                'id': 'cmpl-1',
+                'object': 'chat.completion.chunk',
+                'created': 0,
+                'model': body['model'],
+                'choices': [{'index': 0, 'delta': {'content': word}}],
+            }
+            self.wfile.write(f'data: {json.dumps(chunk)}\n\n'.encode())
+            self.wfile.flush()
+        self.wfile.write(b'data: [DONE]\n\n')
+        self.close_connection = True
+
+    def _send(self, status: int, payload: dict) -> None:
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.send_header('retry-after-ms', '1')
+        self.end_headers()
+        self.wfile.write(data)
+
+
+@pytest.fixture
+def server():
+    """Serve a stub OpenAI-compatible API on a free local port."""
+    stub = _StubServer()
+    thread = threading.Thread(target=stub.serve_forever, daemon=True)
+    thread.start()
+    yield stub
+    stub.shutdown()
+    stub.server_close()
+    remote_llm.close_remote_http_clients()
+
+
+def _route(server: _StubServer, **overrides) -> dict:
+    return {
+        'base_url': server.base_url,
+        'api_key_env': 'LLM_REMOTE_API_KEY',
+        'timeout_seconds': 5,
+        'max_retries': 2,
+        'supports_image': False,
+        **overrides,
+    }
+
+
+def test_models_are_routed_per_name(monkeypatch, server) -> None:
+    """Route configured names remotely; ``*`` catches the rest."""
+    monkeypatch.setattr(
+        Config,
+        'llm_remote_routes',
+        {'vision': _route(server, model='served-vision')},
+    )
+
+    backend = llm._build_backend('vision')
+
+    assert isinstance(backend, OpenAICompatibleBackend)
+    assert backend.served_model == 'served-vision'
+    assert backend.memory_bytes() == 0
+    assert remote_llm.remote_llm_route('other') is None
+
+    monkeypatch.setattr(Config, 'llm_remote_routes', {'*': _route(server)})
+    assert llm._build_backend('other').served_model == 'other'
+
+
+def test_generate_reuses_pooled_connection(server) -> None:
+    """Blocking calls share one keep-alive connection per server."""
+    backend = OpenAICompatibleBackend('m', _route(server))
+    other = OpenAICompatibleBackend('n', _route(server))
+
+    assert backend.generate('Вопрос') == 'Ответ от сервера'
+    assert other.generate('Вопрос') == 'Ответ от сервера'
+
+    assert backend.client._client is other.client._client
+    assert len(set(server.client_ports)) == 1
+    assert server.requests[0]['messages'] == [
+        {'role': 'user', 'content': 'Вопрос'}
+    ]
+    assert server.requests[0]['max_tokens'] == Config.llm_max_new_tokens
+
+
+def test_stream_sends_image_part_and_yields_deltas(server) -> None:
+    """Stream deltas and inline local images as ``image_url`` data URIs."""
+    backend = OpenAICompatibleBackend(
+        'vision', _route(server, supports_image=True)
+    )
+
+    chunks = list(
+        backend.stream('Что на фото?', image=Image.new('RGB', (8, 8)))
+    )
+
+    assert chunks == ['Ответ', ' от', ' сервера']
+    content = server.requests[0]['messages'][0]['content']
+    assert content[0]['type'] == 'image_url'
+    assert content[0]['image_url']['url'].startswith('data:image/jpeg;base64,')
+    assert content[1] == {'type': 'text', 'text': 'Что на фото?'}
+    assert server.requests[0]['stream'] is True
+
+    text_only = OpenAICompatibleBackend('text', _route(server))
+    with pytest.raises(ValueError):
+        text_only.generate('Что на фото?', image='https://example.com/a.jpg')
+
+
+def test_retries_then_reports_unavailable(server) -> None:
+    """Retry 5xx responses, then surface a 503-mapped error."""
+    backend = OpenAICompatibleBackend('m', _route(server, max_retries=2))
+
+    server.failures = 2
+    assert backend.generate('Вопрос') == 'Ответ от сервера'
+    assert len(server.requests) == 3
+
+    server.failures = 3
+    with pytest.raises(RemoteLLMUnavailableError):
+        backend.generate('Вопрос')
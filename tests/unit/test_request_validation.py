@@ -38,3 +38,13 @@ def test_video_embedding_request_accepts_existing_path(tmp_path: Path) -> None:
     video_file.write_bytes(b'00')
     request = VideoEmbeddingRequest(video_path=str(video_file), sample_fps=1.0)
     assert request.video_path == str(video_file)
+
+
+def test_query_request_accepts_only_image_urls() -> None:
+    """Reject local paths in ``image``; they must be uploaded instead."""
+    assert (
+        QueryRequest(query='q', image='https://example.com/a.jpg').image
+        == 'https://example.com/a.jpg'
+    )
+    with pytest.raises(ValidationError):
+        QueryRequest(query='q', image='/dev/zero')
@@ -0,0 +1,150 @@
+from backend.core import multimodal_rag, retrieval_cache
+
+
+class _CountingHandler:
+    searches = 0
+
+    def __init__(
+        self, *, url: str, collection_name: str, vector_size: int
+    ) -> None:
+        self.collection_name = collection_name
+
+    def search(self, query_vector, **kwargs) -> list[dict]:
+        _CountingHandler.searches += 1
+        file_id = f'{self.collection_name}-file'
+        return [
+            {
+                'id': file_id,
+                'score': 0.5,
+                'payload': {'file_id': file_id, 'text': 'hit'},
+            }
+        ]
+
+
+class _FakeRedis:
+    def __init__(self) -> None:
+        self.values: dict[str, object] = {}
+
+    def get(self, key: str):
+        value = self.values.get(key)
+        return value.encode('utf-8') if isinstance(value, str) else value
+
+    def set(self, key: str, value: str, ex: int) -> None:
+        self.values[key] = value
+
+    def incr(self, key: str) -> int:
+        self.values[key] = int(self.values.get(key) or 0) + 1
+        return self.values[key]
+
+
+def _patch_rag(monkeypatch, cache) -> multimodal_rag.LocalRAG:
+    monkeypatch.setattr(multimodal_rag, 'QdrantHandler', _CountingHandler)
+    monkeypatch.setattr(multimodal_rag, 'get_retrieval_cache', lambda: cache)
+    monkeypatch.setattr(multimodal_rag, 'text_embedding', lambda q: [1.0])
+    monkeypatch.setattr(
+        multimodal_rag, 'multimodal_text_embedding', lambda q: [2.0]
+    )
+    _CountingHandler.searches = 0
+    return multimodal_rag.LocalRAG()
+
+
+def test_repeated_query_is_served_until_kb_generation_changes(
+    monkeypatch,
+) -> None:
+    """Reuse results per user and filters; a KB change forces a search."""
+    cache = retrieval_cache.RetrievalCache(
+        retrieval_cache._MemoryBackend(max_entries=16), ttl_seconds=60
+    )
+    rag = _patch_rag(monkeypatch, cache)
+
+    first = rag.retrieve_data('cats', user_id='u1', folder_scopes=['a', 'b'])
+    second = rag.retrieve_data('cats', user_id='u1', folder_scopes=['b', 'a'])
+    assert second == first
+    assert _CountingHandler.searches == 3
+
+    rag.retrieve_data('cats', user_id='u2', folder_scopes=['a', 'b'])
+    rag.retrieve_data('cats', user_id='u1', file_ids=['x'])
+    assert _CountingHandler.searches == 9
+
+    cache.bump_generation('u1')
+    rag.retrieve_data('cats', user_id='u1', folder_scopes=['a', 'b'])
+    assert _CountingHandler.searches == 12
+
+    rag.retrieve_data('cats')
+    rag.retrieve_data('cats')
+    assert _CountingHandler.searches == 18
+
+
+def test_redis_generation_is_shared_between_processes(monkeypatch) -> None:
+    """An ingest bump in one process invalidates entries cached by another."""
+    client = _FakeRedis()
+    web = retrieval_cache.RetrievalCache(
+        retrieval_cache._RedisBackend(client), ttl_seconds=60
+    )
+    worker = retrieval_cache.RetrievalCache(
+        retrieval_cache._RedisBackend(client), ttl_seconds=60
+    )
+    rag = _patch_rag(monkeypatch, web)
+
+    rag.retrieve_data('cats', user_id='u1')
+    rag.retrieve_data('cats', user_id='u1')
+    assert _CountingHandler.searches == 3
+
+    worker.bump_generation('u1')
+    rag.retrieve_data('cats', user_id='u1')
+    assert _CountingHandler.searches == 6
+    assert client.values['rag_kb_generation:u1'] == 1
+
+
+def test_memory_backend_evicts_lru_and_expired(monkeypatch) -> None:
+    """Bound the in-memory store by entry count and TTL."""
+    now = {'value': 100.0}
+    monkeypatch.setattr(
+        retrieval_cache.time, 'monotonic', lambda: now['value']
+    )
+    backend = retrieval_cache._MemoryBackend(max_entries=2)
+
+    backend.set('a', '[1]', 10)
+    backend.set('b', '[2]', 10)
+    assert backend.get('a') == '[1]'
+    backend.set('c', '[3]', 10)
+
+    assert backend.get('b') is None
+    now['value'] = 111.0
+    assert backend.get('a') is None
+
+
+def test_cache_is_disabled_without_shared_redis(monkeypatch) -> None:
+    """Per-process counters would miss worker ingests, so do not cache."""
+    monkeypatch.delenv('REDIS_URL', raising=False)
+    config = retrieval_cache.Config
+    for backend in ('auto', 'redis'):
+        monkeypatch.setattr(config, 'rag_retrieval_cache_backend', backend)
+        cache = retrieval_cache.RetrievalCache(
+            retrieval_cache._build_backend(), ttl_seconds=60
+        )
+        assert not cache.enabled
+
+    monkeypatch.setattr(config, 'rag_retrieval_cache_backend', 'memory')
+    cache = retrieval_cache.RetrievalCache(
+        retrieval_cache._build_backend(), ttl_seconds=60
+    )
+    assert cache.enabled
+
+
+def test_vector_deletes_bump_kb_generation(monkeypatch) -> None:
+    """Both vector-delete paths invalidate the owner's cached results."""
+    from backend.services import ingest, kb
+
+    bumped: list[str | None] = []
+    for module in (ingest, kb):
+        monkeypatch.setattr(module, 'bump_kb_generation', bumped.append)
+    kb_service = object.__new__(kb.KBService)
+    kb_service._delete_vectors_by_file_id = lambda file_id: None
+    ingest_service = object.__new__(ingest.IngestService)
+    ingest_service._all_collection_names = lambda: []
+
+    kb_service.delete_vectors_for_file('f1', user_id='u1')
+    ingest_service.delete_vectors_for_file(file_id='f2', user_id='u2')
+
+    assert bumped == ['u1', 'u2']
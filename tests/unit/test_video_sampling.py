@@ -0,0 +1,120 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from backend.core import embedding_providers
+
+av = pytest.importorskip('av')
+
+
+def _write_video(
+    path, *, seconds: int, fps: int = 10, static_after: int | None = None
+) -> None:
+    """Write a small video whose frame brightness encodes its index.
+
+    The right half is seeded noise so frames differ by dHash; after
+    ``static_after`` frames the picture stops changing.
+    """
+    with av.open(str(path), mode='w') as container:
+        stream = container.add_stream('mpeg4', rate=fps)
+        stream.width = 32
+        stream.height = 32
+        stream.pix_fmt = 'yuv420p'
+        stream.codec_context.gop_size = fps
+        for index in range(seconds * fps):
+            level = index if static_after is None else min(index, static_after)
+            pixels = np.full((32, 32, 3), level % 256, dtype=np.uint8)
+            pixels[:, 16:] = np.random.RandomState(level).randint(
+                0, 255, (32, 16, 1), dtype=np.uint8
+            )
+            frame = av.VideoFrame.from_ndarray(pixels, format='rgb24')
+            for packet in stream.encode(frame):
+                container.mux(packet)
+        for packet in stream.encode():
+            container.mux(packet)
+
+
+class _BrightnessProvider(embedding_providers.EmbeddingProvider):
+    batch_size = 3
+
+    def __init__(self) -> None:
+        self.batches: list[int] = []
+
+    def encode_text(self, text: str) -> list[float]:
+        return [0.0]
+
+    def encode_multimodal_text(self, text: str) -> list[float]:
+        return [0.0]
+
+    def encode_image(self, image: Image.Image) -> list[float]:
+        return [float(np.asarray(image)[:, :16].mean())]
+
+    def encode_images(self, images: list[Image.Image]) -> list[list[float]]:
+        self.batches.append(len(images))
+        return [self.encode_image(image) for image in images]
+
+
+def test_fps_sampler_samples_by_timestamp(tmp_path) -> None:
+    """Sample one frame per interval, including across keyframe seeks."""
+    video_path = tmp_path / 'clip.mp4'
+    _write_video(video_path, seconds=12)
+
+    per_second = list(
+        embedding_providers.VideoFrameSampler().iter_frames(str(video_path))
+    )
+    sparse = list(
+        embedding_providers.VideoFrameSampler(0.2).iter_frames(str(video_path))
+    )
+
+    assert len(per_second) == 12
+    brightness = [np.asarray(frame)[:, :16].mean() for frame in sparse]
+    assert len(sparse) == 3
+    assert brightness == pytest.approx([0, 50, 100], abs=5)
+
+
+def test_budget_sampler_caps_frames_with_uniform_coverage(tmp_path) -> None:
+    """Spread a capped frame budget over the whole video."""
+    video_path = tmp_path / 'clip.mp4'
+    _write_video(video_path, seconds=20)
+    sampler = embedding_providers.VideoFrameSampler(
+        2.0, strategy='budget', max_frames=4, dedup_distance=-1
+    )
+
+    frames = list(sampler.iter_frames(str(video_path)))
+
+    brightness = [np.asarray(frame)[:, :16].mean() for frame in frames]
+    assert brightness == pytest.approx([0, 50, 100, 150], abs=5)
+    assert sampler.sampled_frames == 4
+    assert sampler.decoded_frames < 200
+
+
+def test_budget_sampler_skips_static_scenes(tmp_path) -> None:
+    """Drop frames that are near-identical to the last kept frame."""
+    video_path = tmp_path / 'clip.mp4'
+    _write_video(video_path, seconds=10, static_after=31)
+    sampler = embedding_providers.VideoFrameSampler(
+        1.0, strategy='budget', max_frames=64, dedup_distance=4
+    )
+
+    frames = list(sampler.iter_frames(str(video_path)))
+
+    assert len(frames) == 5
+    assert sampler.deduplicated_frames == 5
+    assert sampler.signature == 'budget@1.0/64/4'
+
+
+def test_encode_video_streams_fixed_size_batches(
+    tmp_path, monkeypatch
+) -> None:
+    """Encode sampled frames in bounded batches with a running mean."""
+    monkeypatch.setattr(
+        embedding_providers.Config, 'embedding_video_sampling_strategy', 'fps'
+    )
+    video_path = tmp_path / 'clip.mp4'
+    _write_video(video_path, seconds=8)
+    provider = _BrightnessProvider()
+
+    vector = provider.encode_video(str(video_path), sample_fps=1.0)
+
+    assert provider.batches == [3, 3, 2]
+    assert vector == pytest.approx([np.mean(range(0, 80, 10))], abs=5)
@@ -0,0 +1,155 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from types import SimpleNamespace
+
+import pytest
+import torch
+from PIL import Image
+
+from backend.core import vision_inputs
+from backend.core.vision_inputs import (
+    ImageTooLargeError,
+    count_visual_tokens,
+    fit_to_pixel_budget,
+    load_image,
+)
+from backend.utils.config_handler import Config
+
+_BUDGET = 1280 * 28 * 28
+
+
+def _jpeg(width: int, height: int, color: str = 'red') -> bytes:
+    buffer = BytesIO()
+    Image.new('RGB', (width, height), color).save(buffer, format='JPEG')
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def budget(monkeypatch):
+    """Pin the pixel budget regardless of the loaded yaml profile."""
+    monkeypatch.setattr(Config, 'llm_image_max_pixels', _BUDGET)
+    monkeypatch.setattr(Config, 'llm_image_min_pixels', 56 * 56)
+
+
+def test_fit_to_pixel_budget_aligns_sides_and_caps_area() -> None:
+    """Keep aspect ratio, align to the patch grid, stay within the budget."""
+    width, height = fit_to_pixel_budget(
+        4032, 3024, factor=28, min_pixels=3136, max_pixels=_BUDGET
+    )
+    assert width % 28 == 0 and height % 28 == 0
+    assert width * height <= _BUDGET
+    assert abs(width / height - 4032 / 3024) < 0.05
+
+    assert fit_to_pixel_budget(
+        20, 10, factor=28, min_pixels=3136, max_pixels=_BUDGET
+    ) == (84, 56)
+    assert fit_to_pixel_budget(
+        4032, 3024, factor=28, min_pixels=0, max_pixels=0
+    ) == (4032, 3024)
+
+
+def test_prepared_image_needs_no_processor_resize(budget) -> None:
+    """Qwen2-VL keeps the prepared size, so visual tokens follow the budget."""
+    transformers = pytest.importorskip('transformers')
+    processor = transformers.Qwen2VLImageProcessor()
+
+    image = load_image(Image.new('RGB', (4032, 3024)), factor=28)
+    grid = processor(images=image, return_tensors='pt')['image_grid_thw'][0]
+
+    assert (int(grid[1]) * 14, int(grid[2]) * 14) == (
+        image.height,
+        image.width,
+    )
+    visual_tokens = int(grid.prod()) // 4
+    assert visual_tokens == (image.width // 28) * (image.height // 28) <= 1280
+
+
+def test_files_are_cached_by_path_and_content(tmp_path, budget) -> None:
+    """Reuse a decoded file until its bytes change."""
+    path = tmp_path / 'photo.jpg'
+    path.write_bytes(_jpeg(4032, 3024))
+
+    first = load_image(str(path))
+    assert first.width * first.height <= _BUDGET
+    assert load_image(str(path)) is first
+
+    path.write_bytes(_jpeg(4032, 3024, 'blue'))
+    assert load_image(str(path)) is not first
+
+
+def test_local_files_are_size_capped(tmp_path, monkeypatch) -> None:
+    """Apply the byte cap to files and refuse devices like /dev/zero."""
+    path = tmp_path / 'photo.jpg'
+    path.write_bytes(_jpeg(64, 64))
+    monkeypatch.setattr(Config, 'llm_image_max_bytes', 100)
+
+    with pytest.raises(ImageTooLargeError):
+        load_image(str(path))
+    with pytest.raises(ValueError):
+        load_image('/dev/zero')
+
+
+class _ImageServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self) -> None:
+        super().__init__(('127.0.0.1', 0), _ImageHandler)
+        self.client_ports: list[int] = []
+        self.body = _jpeg(640, 480)
+
+    def url(self, name: str) -> str:
+        return f'http://127.0.0.1:{self.server_address[1]}/{name}'
+
+
+class _ImageHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        server: _ImageServer = self.server
+        server.client_ports.append(self.client_address[1])
+        self.send_response(200)
+        self.send_header('Content-Type', 'image/jpeg')
+        self.send_header('Content-Length', str(len(server.body)))
+        self.end_headers()
+        self.wfile.write(server.body)
+
+
+@pytest.fixture
+def image_server(monkeypatch):
+    """Serve one JPEG over keep-alive HTTP with a fresh session pool."""
+    monkeypatch.setattr(vision_inputs, '_SESSION', None)
+    server = _ImageServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_remote_images_use_pooled_session_and_size_cap(
+    monkeypatch, image_server, budget
+) -> None:
+    """Download over one keep-alive connection and reject oversized images."""
+    first = load_image(image_server.url('a.jpg'))
+    assert load_image(image_server.url('a.jpg')) is first
+    assert first.size == (644, 476)
+    assert len(set(image_server.client_ports)) == 1
+
+    monkeypatch.setattr(Config, 'llm_image_max_bytes', 100)
+    with pytest.raises(ImageTooLargeError):
+        load_image(image_server.url('b.jpg'))
+
+
+def test_count_visual_tokens_uses_image_token_id() -> None:
+    """Count placeholder ids with either config attribute name."""
+    inputs = {'input_ids': torch.tensor([[1, 7, 7, 7, 2]])}
+
+    assert count_visual_tokens(inputs, SimpleNamespace(image_token_id=7)) == 3
+    assert (
+        count_visual_tokens(inputs, SimpleNamespace(image_token_index=7)) == 3
+    )
+    assert count_visual_tokens(inputs, SimpleNamespace()) == 0